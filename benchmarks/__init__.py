@@ -0,0 +1,11 @@
+"""
+End-to-end benchmarks of the measurement loop.
+
+Run all cases and store the report:
+
+    python -m benchmarks --output results.json
+
+Compare with a previous report (exits with code 1 on regressions):
+
+    python -m benchmarks --output new.json --compare results.json
+"""
@@ -0,0 +1,64 @@
+import argparse
+import sys
+
+import matplotlib
+
+matplotlib.use("Agg")  # frame times are measured off-screen
+
+from drivers.simulated.latency_model import LatencyModel
+from benchmarks.cases import ALL_CASES
+from benchmarks.runner import BenchmarkRunner, save_results, load_results, \
+    compare_results
+
+LATENCY_PRESETS = {"instant": LatencyModel.instant, "lan": LatencyModel.lan,
+                   "gpib": LatencyModel.gpib, "pxi": LatencyModel.pxi}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Measurement loop benchmarks on simulated devices")
+    parser.add_argument("--cases", nargs="*",
+                        help="names of the cases to run, all by default")
+    parser.add_argument("--latency", choices=sorted(LATENCY_PRESETS),
+                        default="instant",
+                        help="latency model of the simulated devices")
+    parser.add_argument("--frames", type=int, default=5,
+                        help="number of live plot redraws to time")
+    parser.add_argument("--no-io", action="store_true",
+                        help="do not time saving and loading of the results")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="report to compare the results with")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed relative degradation of a metric")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in ALL_CASES
+             if not args.cases or case.name in args.cases]
+    runner = BenchmarkRunner(LATENCY_PRESETS[args.latency](),
+                             n_frames=args.frames, measure_io=not args.no_io)
+    results = runner.run(cases)
+    save_results(results, args.output)
+
+    for entry in results["cases"]:
+        if entry["status"] != "ok":
+            print("%-24s %-14s %s: %s" % (entry["name"], entry["size"],
+                                          entry["status"], entry["reason"]))
+            continue
+        print("%-24s %-14s %10.0f pts/s  p50 %.2e s  p99 %.2e s" % (
+            entry["name"], entry["size"], entry["points_per_second"],
+            entry["latency"]["p50"], entry["latency"]["p99"]))
+
+    if args.compare is not None:
+        regressions = compare_results(load_results(args.compare), results,
+                                      args.tolerance)
+        for regression in regressions:
+            print("REGRESSION {name} {size} {metric}: {baseline:.3g} -> "
+                  "{current:.3g} ({change:+.0%})".format(**regression))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
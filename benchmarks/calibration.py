@@ -0,0 +1,91 @@
+"""
+Benchmark of the IQ mixer calibrators on the simulated mixer.
+
+Every calibrator is run against the same `SimulatedLab` mixer and the
+report contains the number of spectrum analyzer reads, the wall time and
+the grades of the resulting calibration:
+
+    python -m benchmarks.calibration --latency lan
+"""
+import argparse
+import time
+
+import numpy as np
+
+from drivers.IQAWG import AWGChannel, IQAWG
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.latency_model import LatencyModel
+from drivers.simulated.sim_agilent_EXA import SimulatedEXA
+from drivers.simulated.sim_E8257D import SimulatedEXG
+from drivers.simulated.sim_keysightM3202A import SimulatedM3202A
+from lib.iq_mixer_calibration import FastIQCalibrator, IQCalibrator
+
+CALIBRATORS = {"IQCalibrator": IQCalibrator,
+               "FastIQCalibrator": FastIQCalibrator}
+
+
+class _SilentWidget:
+    """
+    Swallows the progress messages of the calibrators
+    """
+    value = ""
+
+
+def run_calibration_benchmark(latency=None, lo_frequency=6e9,
+                              if_frequency=50e6, lo_power=10, ssb_power=-20,
+                              sideband_to_maintain="right", seed=0):
+    """
+    Returns
+    -------
+    results : list[dict]
+        {"name", "status", "sa_reads", "wall_time", "grades"} for every
+        calibrator in `CALIBRATORS`
+    """
+    if latency is None:
+        latency = LatencyModel.instant()
+    results = []
+    for name, calibrator_class in CALIBRATORS.items():
+        np.random.seed(seed)  # IQCalibrator draws random starting offsets
+        lab = SimulatedLab(seed=seed)
+        awg = SimulatedM3202A("bench_awg", lab=lab, latency=latency)
+        sa = SimulatedEXA("SIM-EXA", lab=lab, latency=latency)
+        lo = SimulatedEXG("SIM-EXG", lab=lab, latency=latency)
+        calibrator = calibrator_class(
+            IQAWG(AWGChannel(awg, 1), AWGChannel(awg, 2)), sa, lo, "sim", 0,
+            sideband_to_maintain=sideband_to_maintain,
+            output_widget=_SilentWidget())
+
+        entry = {"name": name, "status": "ok", "grades": None}
+        start = time.perf_counter()
+        try:
+            calibration = calibrator.calibrate(lo_frequency, if_frequency,
+                                               lo_power, ssb_power)
+            entry["grades"] = {key: float(np.ravel(value)[0])
+                               for key, value in calibration.grade().items()}
+        except ValueError as e:  # poor calibration grades
+            entry.update(status="poor", reason=str(e).split("\n")[0])
+        entry["wall_time"] = time.perf_counter() - start
+        entry["sa_reads"] = calibrator.get_sa_reads_number()
+        results.append(entry)
+    return results
+
+
+def main(argv=None):
+    from benchmarks.__main__ import LATENCY_PRESETS
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.calibration")
+    parser.add_argument("--latency", choices=sorted(LATENCY_PRESETS),
+                        default="lan")
+    parser.add_argument("--sideband", choices=["left", "right"],
+                        default="right")
+    args = parser.parse_args(argv)
+
+    for entry in run_calibration_benchmark(
+            LATENCY_PRESETS[args.latency](),
+            sideband_to_maintain=args.sideband):
+        print("%-18s %-5s %5i SA reads %8.2f s  %s" % (
+            entry["name"], entry["status"], entry["sa_reads"],
+            entry["wall_time"], entry["grades"] or entry["reason"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Benchmark cases: real measurement classes driven by simulated devices.
+
+Sizes of every case are tuples described in the class docstrings.
+"""
+import numpy as np
+
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.sim_E8257D import SimulatedEXG
+from drivers.simulated.sim_keysightM3202A import SimulatedM3202A
+from drivers.simulated.sim_Spectrum_m4x import SimulatedSPCM
+
+from benchmarks.runner import BenchmarkCase
+from tests.fixtures import make_calibration
+
+SAMPLE_NAME = "benchmark"
+
+
+def make_iqawg(awg, channels=(1, 2)):
+    from drivers.IQAWG import AWGChannel, IQAWG
+    return IQAWG(AWGChannel(awg, channels[0]), AWGChannel(awg, channels[1]))
+
+
+def digitizer_parameters(duration, n_avg, n_seg=1, mode="AVERAGING"):
+    return {"channels": [0, 1], "ch_amplitude": 200, "dur_seg": duration,
+            "n_avg": n_avg, "n_seg": n_seg, "oversampling_factor": 1,
+            "pretrigger": 32, "mode": mode, "trig_source": "EXT0",
+            "digitizer_delay": 0}
+
+
+class SingleToneSpectroscopyCase(BenchmarkCase):
+    """
+    size: (number of bias points, VNA number of points)
+    """
+    name = "SingleToneSpectroscopy"
+    sizes = ((11, 201), (51, 1001), (101, 4001))
+
+    def setup(self, size):
+        from lib2.SingleToneSpectroscopy import SingleToneSpectroscopy
+        n_bias, nop = size
+        sts = SingleToneSpectroscopy("bench_sts", SAMPLE_NAME,
+                                     vna=["sim_vna"], src=["sim_yok"])
+        resonator = SimulatedLab.get_default().get_resonator_frequency()
+        sts.set_fixed_parameters(vna=[{"bandwidth": 1e3, "power": -20,
+                                       "averages": 1, "nop": nop,
+                                       "freq_limits": (resonator - 10e6,
+                                                       resonator + 10e6)}])
+        sts.sweep_current(np.linspace(0, 0.5e-3, n_bias))
+        return sts
+
+
+class TwoToneSpectroscopyCase(BenchmarkCase):
+    """
+    size: (number of bias points, number of drive frequencies)
+    """
+    name = "FluxTwoToneSpectroscopy"
+    sizes = ((5, 51), (21, 201), (51, 501))
+
+    def setup(self, size):
+        from lib2.TwoToneSpectroscopy import FluxTwoToneSpectroscopy
+        n_bias, n_freq = size
+        lab = SimulatedLab.get_default()
+        tts = FluxTwoToneSpectroscopy("bench_tts", SAMPLE_NAME,
+                                      vna=["sim_vna"], mw_src=["sim_exg"],
+                                      bias_src=["sim_yok"])
+        resonator = lab.get_resonator_frequency()
+        tts.set_fixed_parameters(
+            sweet_spot_bias=0,
+            vna=[{"bandwidth": 1e3, "power": -20, "averages": 1, "nop": 10,
+                  "freq_limits": (resonator, resonator)}],
+            mw_src=[{"power": -10}])
+        qubit = lab.get_qubit_frequency()
+        tts.set_swept_parameters(np.linspace(qubit - 1e9, qubit + 0.1e9,
+                                             n_freq),
+                                 np.linspace(0, 0.5e-3, n_bias))
+        return tts
+
+
+class DigitizerRabiCase(BenchmarkCase):
+    """
+    size: (number of excitation durations, digitizer averages)
+    """
+    name = "DigitizerRabi"
+    sizes = ((21, 1000), (101, 1000), (101, 10000))
+
+    def setup(self, size):
+        from lib2.directMeasurements.directRabi import \
+            DirectRabiFromPulseDuration
+        n_durations, n_avg = size
+        lab = SimulatedLab.get_default()
+        awg = SimulatedM3202A("bench_q_awg")
+        rabi = DirectRabiFromPulseDuration(
+            "bench_rabi", SAMPLE_NAME, q_lo=[SimulatedEXG("SIM-EXG")],
+            q_iqawg=[make_iqawg(awg)], dig=[SimulatedSPCM()])
+
+        readout_duration = 2000
+        q_lo_freq = lab.get_qubit_frequency() - 50e6
+        rabi.set_fixed_parameters(
+            pulse_sequence_parameters={
+                "start_delay": 0, "repetition_period": 10000,
+                "excitation_amplitude": 1, "modulating_window": "rectangular",
+                "digitizer_delay": 0},
+            freq_limits=(-90e6, 90e6),
+            q_lo_params=[{"freq": q_lo_freq}],
+            q_iqawg_params=[{"calibration": make_calibration(q_lo_freq)}],
+            dig_params=[digitizer_parameters(readout_duration, n_avg)])
+        rabi.sweep_excitation_durations(np.linspace(0, 500, n_durations))
+        return rabi
+
+
+def _pulse_mixing_sequence_parameters():
+    return {"start_delay": 0, "digitizer_delay": 0,
+            "repetition_period": 10000, "pulse_sequence": ["P", "N"],
+            "excitation_durations": [100], "after_pulse_delays": [100],
+            "pulse_shifts": [0, 0], "excitation_amplitudes": [1],
+            "modulating_window": "rectangular", "d_freq": 100e3,
+            "envelopes_in_pulse_group": 1, "periods_per_segment": 1,
+            "readout_duration": 2000}
+
+
+class PulseMixingCase(BenchmarkCase):
+    """
+    size: (number of excitation amplitudes, digitizer segments)
+    """
+    name = "PulseMixing"
+    sizes = ((11, 8), (51, 32), (101, 128))
+
+    def setup(self, size):
+        from lib2.directMeasurements.waveMixing import PulseMixing
+        n_amplitudes, n_seg = size
+        lab = SimulatedLab.get_default()
+        awg = SimulatedM3202A("bench_q_awg")
+        mixing = PulseMixing("bench_mixing", SAMPLE_NAME, "benchmark",
+                             q_lo=[SimulatedEXG("SIM-EXG")],
+                             q_iqawg=[make_iqawg(awg)],
+                             dig=[SimulatedSPCM()])
+        mixing.set_fixed_parameters(
+            _pulse_mixing_sequence_parameters(), freq_limits=(-90e6, 90e6),
+            q_lo_params=[{"freq": lab.get_qubit_frequency() - 50e6}],
+            q_iqawg_params=[{"calibration": make_calibration(
+                lab.get_qubit_frequency() - 50e6)}],
+            dig_params=[digitizer_parameters(2000, 1000, n_seg)])
+        mixing.sweep_excitation_amplitude(np.linspace(0, 1, n_amplitudes))
+        return mixing
+
+
+def _stimulated_emission_sequence_parameters():
+    return {"start_delay": 0, "digitizer_delay": 0,
+            "repetition_period": 200, "pulse_sequence": ["0"],
+            "excitation_durations": [50], "after_pulse_delay": 0,
+            "excitation_amplitudes": [1], "modulating_window": "rectangular",
+            "d_freq": 0, "periods_per_segment": 1}
+
+
+class CorrelatorCase(BenchmarkCase):
+    """
+    size: (number of iterations, digitizer segments)
+    """
+    name = "CorrelatorMeasurement"
+    sizes = ((10, 64), (50, 256), (100, 1024))
+    timed_method = "_measure_one_trace"
+
+    def setup(self, size):
+        from lib2.correlatorMeasurement import CorrelatorMeasurement
+        n_iterations, n_seg = size
+        lab = SimulatedLab.get_default()
+        awg = SimulatedM3202A("bench_q_awg")
+        correlator = CorrelatorMeasurement(
+            "bench_correlator", SAMPLE_NAME, "benchmark",
+            q_lo=[SimulatedEXG("SIM-EXG")], q_iqawg=[make_iqawg(awg)],
+            dig=[SimulatedSPCM()])
+        correlator.set_fixed_parameters(
+            _stimulated_emission_sequence_parameters(), freq_limits=(-90e6, 90e6),
+            q_lo_params=[{"freq": lab.get_qubit_frequency() - 50e6}],
+            q_iqawg_params=[{"calibration": make_calibration(
+                lab.get_qubit_frequency() - 50e6)}],
+            dig_params=[digitizer_parameters(200, 1, n_seg,
+                                             mode="MULTIPLE")],
+            iterations_number=n_iterations)
+        correlator.dont_sweep()
+        return correlator
+
+
+ALL_CASES = [SingleToneSpectroscopyCase(), TwoToneSpectroscopyCase(),
+             DigitizerRabiCase(), PulseMixingCase(), CorrelatorCase()]
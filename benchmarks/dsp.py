@@ -0,0 +1,83 @@
+"""
+Throughput of the power measurement DSP (`lib2.dsp`) on random digitizer
+buffers:
+
+    python -m benchmarks.dsp --threads 1 4 --spectrum
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from lib2 import dsp
+
+
+def run_dsp_benchmark(n_threads=(1,), n_seg=2000, segment_size=2048,
+                      repeats=5, spectrum=False, backend="cpu", seed=0):
+    """
+    Returns
+    -------
+    results : list[dict]
+        {"backend", "n_threads", "wall_time", "samples_per_second",
+        "samples_per_second_per_core"} for every number of threads
+    """
+    rng = np.random.default_rng(seed)
+    buffer = rng.integers(-128, 128, size=2 * n_seg * segment_size,
+                          dtype=np.int8)
+    downconversion = np.exp(-2j * np.pi * 0.1 * np.arange(segment_size))
+    kernel = np.ones(16) / 16
+    coefficients = np.array([[1., 0., 0.], [0., 1., 0.]])
+    results = []
+    for threads in n_threads:
+        if backend == "cpu":
+            be = dsp.get_backend("cpu", n_threads=threads)
+        else:
+            be = dsp.get_backend(backend)
+            threads = 1
+        accumulator = dsp.PowerAccumulator(segment_size, spectrum, be)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            i_segs, q_segs = dsp.unpack_segments(buffer, n_seg, segment_size,
+                                                 200, be)
+            i_segs, q_segs = dsp.down_calibrate(i_segs, q_segs, coefficients)
+            i_segs, q_segs = dsp.downconvert(i_segs, q_segs,
+                                             be.asarray(downconversion), be)
+            dsp.filter(i_segs, kernel, be)
+            dsp.filter(q_segs, kernel, be)
+            accumulator.add(i_segs, q_segs)
+        accumulator.get_p1()
+        wall_time = time.perf_counter() - start
+        samples_per_second = repeats * n_seg * segment_size / wall_time
+        results.append({
+            "backend": be.name, "n_threads": threads,
+            "wall_time": wall_time,
+            "samples_per_second": samples_per_second,
+            "samples_per_second_per_core": samples_per_second /
+            min(threads, os.cpu_count() or 1)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.dsp")
+    parser.add_argument("--backend", choices=["cpu", "cupy", "auto"],
+                        default="cpu")
+    parser.add_argument("--threads", type=int, nargs="*", default=[1])
+    parser.add_argument("--segments", type=int, default=2000)
+    parser.add_argument("--segment-size", type=int, default=2048)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--spectrum", action="store_true",
+                        help="accumulate the averaged power spectrum too")
+    args = parser.parse_args(argv)
+
+    for entry in run_dsp_benchmark(args.threads, args.segments,
+                                   args.segment_size, args.repeats,
+                                   args.spectrum, args.backend):
+        print("%-5s %3i threads %8.2f s %10.3g samples/s %10.3g per core" % (
+            entry["backend"], entry["n_threads"], entry["wall_time"],
+            entry["samples_per_second"],
+            entry["samples_per_second_per_core"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Time to build long pulse sequences with `IQPulseBuilder`, e.g. the
+sequences of randomized benchmarking:
+
+    python -m benchmarks.pulse_sequence --pulses 200 1000 5000
+
+The time to append the pulses and the time of the final render of the
+waveforms by `get_I_waveform`/`get_Q_waveform` are reported separately.
+With `--builders` the `IQPulseBuilder.build_*_sequences` helpers are
+timed in a sweep that rebuilds and renders the sequences for every delay,
+once from scratch, once patched by `ParametricSequence` and once as a
+whole bank by `lib2.sequence_batch`.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from lib2.IQPulseSequence import IQPulseBuilder
+from lib2.parametric_sequence import ParametricSequence
+from lib2.sequence_batch import build_dispersive_hahn_echo_batch, \
+    build_dispersive_rabi_batch, build_dispersive_ramsey_batch
+from tests.fixtures import make_calibration
+
+
+def run_pulse_sequence_benchmark(n_pulses=(1000,), pulse_duration=20,
+                                 gap_duration=5, waveform_resolution=1,
+                                 seed=0):
+    """
+    Builds sequences of `n_pulses` gaussian pulses of random phases
+    separated by zero pulses
+
+    Returns
+    -------
+    results : list[dict]
+        {"n_pulses", "n_points", "build_time", "render_time"} for every
+        number of pulses
+    """
+    calibration = make_calibration(6e9,
+                                   waveform_resolution=waveform_resolution)
+    rng = np.random.default_rng(seed)
+    results = []
+    for n in n_pulses:
+        phases = rng.uniform(0, 2 * np.pi, n)
+        builder = IQPulseBuilder(calibration)
+        start = time.perf_counter()
+        for phase in phases:
+            builder.add_sine_pulse(pulse_duration, phase, window="gaussian")
+            builder.add_zero_pulse(gap_duration)
+        sequence = builder.build()
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        waveform = sequence.get_I_waveform()
+        sequence.get_Q_waveform()
+        render_time = time.perf_counter() - start
+        results.append({"n_pulses": n, "n_points": len(waveform),
+                        "build_time": build_time,
+                        "render_time": render_time})
+    return results
+
+
+SWEEP_PARAMETERS = {"awg_trigger_reaction_delay": 0, "readout_duration": 2000,
+                    "modulating_window": "gaussian", "excitation_amplitude": 1,
+                    "half_pi_pulse_duration": 20}
+
+# builder name: (swept parameter, its values in ns)
+SWEEP_BUILDERS = {
+    "build_dispersive_rabi_sequences": ("excitation_duration",
+                                        np.arange(10, 1010, 5)),
+    "build_dispersive_ramsey_sequences": ("ramsey_delay",
+                                          np.arange(0, 1000, 5)),
+    "build_dispersive_hahn_echo_sequences": ("echo_delay",
+                                             np.arange(0, 2000, 10))}
+
+BATCH_BUILDERS = {
+    "build_dispersive_rabi_sequences": build_dispersive_rabi_batch,
+    "build_dispersive_ramsey_sequences": build_dispersive_ramsey_batch,
+    "build_dispersive_hahn_echo_sequences": build_dispersive_hahn_echo_batch}
+
+
+def _render(seqs):
+    for sequences in seqs.values():
+        for sequence in sequences:
+            sequence.get_I_waveform()
+            sequence.get_Q_waveform()
+
+
+def run_sequence_builders_benchmark(builders=None, waveform_resolution=1,
+                                    incremental=False,
+                                    repetition_period=20000, batch=False):
+    """
+    Builds and renders the excitation and readout sequences for every
+    point of the sweeps of `SWEEP_BUILDERS`
+
+    Parameters
+    ----------
+    incremental : bool
+        patch the waveforms of the previous point by `ParametricSequence`
+    batch : bool
+        render all points at once by the functions of `BATCH_BUILDERS`
+
+    Returns
+    -------
+    results : list[dict]
+        {"builder", "incremental", "batch", "n_sequences", "build_time",
+        "time_per_sequence"}
+    """
+    calibration = make_calibration(6e9,
+                                   waveform_resolution=waveform_resolution)
+    results = []
+    for name in builders or SWEEP_BUILDERS:
+        parameter, values = SWEEP_BUILDERS[name]
+        build = getattr(IQPulseBuilder, name)
+        parameters = dict(SWEEP_PARAMETERS,
+                          repetition_period=repetition_period)
+        sequence = ParametricSequence(build, parameters, parameter)
+        start = time.perf_counter()
+        if batch:
+            seqs = BATCH_BUILDERS[name](dict(parameters,
+                                             **{parameter: values}),
+                                        calibration, calibration)
+            for batches in seqs.values():
+                for sequence_batch in batches:
+                    sequence_batch.render()
+        else:
+            for value in values:
+                pbs = {"q_pbs": [IQPulseBuilder(calibration)],
+                       "ro_pbs": [IQPulseBuilder(calibration)]}
+                if incremental:
+                    sequence.build(value, **pbs)
+                else:
+                    _render(build(dict(parameters, **{parameter: value}),
+                                  **pbs))
+        build_time = time.perf_counter() - start
+        results.append({"builder": name, "incremental": incremental,
+                        "batch": batch,
+                        "n_sequences": len(values),
+                        "build_time": build_time,
+                        "time_per_sequence": build_time / len(values)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.pulse_sequence")
+    parser.add_argument("--pulses", type=int, nargs="*", default=[1000])
+    parser.add_argument("--duration", type=float, default=20,
+                        help="duration of a pulse, ns")
+    parser.add_argument("--gap", type=float, default=5,
+                        help="zero pulse between the pulses, ns")
+    parser.add_argument("--builders", action="store_true",
+                        help="time the build_*_sequences sweeps too")
+    parser.add_argument("--period", type=float, default=20000,
+                        help="repetition period of the sweeps, ns")
+    args = parser.parse_args(argv)
+
+    for entry in run_pulse_sequence_benchmark(args.pulses, args.duration,
+                                              args.gap):
+        print("%6i pulses %9i points  build %.3e s  render %.3e s" % (
+            entry["n_pulses"], entry["n_points"], entry["build_time"],
+            entry["render_time"]))
+    if not args.builders:
+        return
+    for incremental, batch in ((False, False), (True, False), (False, True)):
+        for entry in run_sequence_builders_benchmark(
+                incremental=incremental, repetition_period=args.period,
+                batch=batch):
+            print("%-40s %-11s %5i sequences %8.3f s  %.3e s/sequence" % (
+                entry["builder"],
+                "batch" if entry["batch"] else
+                "incremental" if entry["incremental"] else "full",
+                entry["n_sequences"], entry["build_time"],
+                entry["time_per_sequence"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+Runner of the end-to-end measurement benchmarks.
+
+Every benchmark case builds a real measurement class on top of simulated
+devices (see `drivers.simulated`), records the data synchronously and then
+reports
+
+    points_per_second       complex data points stored per second of
+                            recording
+    iterations_per_second   main loop iterations per second
+    latency                 percentiles of the per-iteration latency, s
+    peak_rss_mb             peak resident set size during the recording, MB
+    rss_growth_mb           peak RSS minus RSS before the recording, MB
+    frame_time              percentiles of the live plot redraw time, s
+    save_time, load_time    MeasurementResult.save() and .load() duration, s
+
+Results of a run are stored as JSON so that two runs can be compared with
+`compare_results()`.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime as dt
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from drivers.simulated.latency_model import LatencyModel
+from lib2.MeasurementResult import MeasurementResult
+
+LATENCY_PERCENTILES = (50, 90, 99)
+
+# metric name -> +1 if larger is better, -1 if smaller is better
+TRACKED_METRICS = {"points_per_second": 1,
+                   "latency.p50": -1,
+                   "latency.p99": -1,
+                   "frame_time.p50": -1,
+                   "save_time": -1,
+                   "load_time": -1,
+                   "peak_rss_mb": -1}
+
+
+class BenchmarkSkipped(Exception):
+    """
+    Raised by `BenchmarkCase.setup()` when the case cannot be run in the
+    current environment (e.g. vendor libraries are missing).
+    """
+    pass
+
+
+class BenchmarkCase:
+    """
+    Base class of a benchmark case.
+
+    Child classes set `name` and `sizes` and implement `setup(size)` that
+    returns a measurement ready to be recorded with `measure()`.
+    """
+    name = None
+    # data sizes the case is run at by default, the meaning is case-specific
+    sizes = ()
+    # measurement method that is called once per loop iteration;
+    # the latency of an iteration is the time between its consecutive returns
+    timed_method = "_recording_iteration"
+
+    def setup(self, size):
+        raise NotImplementedError
+
+    def teardown(self, measurement):
+        pass
+
+
+def _get_rss():
+    """
+    Current resident set size in bytes or None if it can not be determined
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _RSSSampler(threading.Thread):
+    """
+    Polls the resident set size of the process in the background
+    """
+
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.baseline = _get_rss()
+        self.peak = self.baseline
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = _get_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            self._stop_event.wait(self._interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return None
+    stats = {"p%i" % p: float(np.percentile(values, p))
+             for p in LATENCY_PERCENTILES}
+    stats["max"] = float(np.max(values))
+    stats["n"] = len(values)
+    return stats
+
+
+def _count_points(measurement):
+    raw_data = measurement._raw_data
+    if raw_data is None:
+        return 0
+    return int(np.size(raw_data))
+
+
+class BenchmarkRunner:
+    """
+    Runs benchmark cases and collects their metrics.
+
+    Parameters
+    ----------
+    latency : LatencyModel
+        latency model applied to every simulated device of the measurement,
+        instant by default, i.e. only the software overhead is measured
+    n_frames : int
+        number of live plot redraws used to estimate the frame time
+    measure_io : bool
+        whether to measure `save()` and `load()` of the result
+    """
+
+    def __init__(self, latency=None, n_frames=5, measure_io=True):
+        self._latency = latency if latency is not None \
+            else LatencyModel.instant()
+        self._n_frames = n_frames
+        self._measure_io = measure_io
+
+    def run(self, cases, sizes=None):
+        """
+        Parameters
+        ----------
+        cases : list[BenchmarkCase]
+        sizes : list
+            overrides the default sizes of every case if not None
+
+        Returns
+        -------
+        results : dict
+            JSON-serializable benchmark report
+        """
+        report = self._describe_environment()
+        report["cases"] = []
+        for case in cases:
+            for size in (sizes if sizes is not None else case.sizes):
+                report["cases"].append(self.run_case(case, size))
+        return report
+
+    def run_case(self, case, size):
+        entry = {"name": case.name, "size": size}
+        print("Benchmarking %s at size %s" % (case.name, str(size)),
+              flush=True)
+        try:
+            measurement = case.setup(size)
+        except BenchmarkSkipped as e:
+            entry.update(status="skipped", reason=str(e))
+            return entry
+
+        try:
+            self._apply_latency(measurement)
+            entry.update(self._record(case, measurement))
+            if entry["status"] == "ok":
+                entry["frame_time"] = self._time_frames(measurement)
+                if self._measure_io:
+                    entry.update(self._time_io(measurement))
+        finally:
+            case.teardown(measurement)
+            plt.close("all")
+        return entry
+
+    def _apply_latency(self, measurement):
+        for value in measurement.__dict__.values():
+            devices = list(value) if isinstance(value, list) else [value]
+            for device in devices:
+                # IQAWG and AWGChannel wrap the host AWG
+                for channel in getattr(device, "_channels", []):
+                    devices.append(getattr(channel, "_host_awg", None))
+                if hasattr(device, "_host_awg"):
+                    devices.append(device._host_awg)
+                visainstrument = getattr(device, "_visainstrument", None)
+                if hasattr(visainstrument, "latency"):
+                    visainstrument.latency = self._latency
+
+    def _record(self, case, measurement):
+        iteration_ends = []
+        method = getattr(measurement, case.timed_method)
+
+        def timed(*args, **kwargs):
+            ret = method(*args, **kwargs)
+            iteration_ends.append(time.perf_counter())
+            return ret
+
+        setattr(measurement, case.timed_method, timed)
+        result = measurement._measurement_result
+        result.set_start_datetime(dt.now())
+
+        sampler = _RSSSampler()
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            measurement.measure()
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+            delattr(measurement, case.timed_method)
+
+        metrics = {"status": "ok", "recording_time": elapsed}
+        if result._exception_info is not None:
+            exc_type, exc_value = result._exception_info[:2]
+            metrics.update(status="error",
+                           reason="%s: %s" % (exc_type.__name__, exc_value))
+        latencies = np.diff([start] + iteration_ends)
+        n_points = _count_points(measurement)
+        metrics["n_points"] = n_points
+        metrics["n_iterations"] = len(iteration_ends)
+        metrics["points_per_second"] = n_points / elapsed
+        metrics["iterations_per_second"] = len(iteration_ends) / elapsed
+        metrics["latency"] = _percentiles(latencies)
+        if sampler.peak is not None:
+            metrics["peak_rss_mb"] = sampler.peak / 2 ** 20
+            metrics["rss_growth_mb"] = (sampler.peak - sampler.baseline) / \
+                                       2 ** 20
+        return metrics
+
+    def _time_frames(self, measurement):
+        result = measurement._measurement_result
+        fig, axes, caxes = result._prepare_figure()
+        result._figure, result._axes, result._caxes = fig, axes, caxes
+        result._dynamic = True
+        frame_times = []
+        try:
+            for i in range(self._n_frames):
+                start = time.perf_counter()
+                result._plot(result.get_data())
+                fig.canvas.draw()
+                frame_times.append(time.perf_counter() - start)
+        finally:
+            result._dynamic = False
+            plt.close(fig)
+        return _percentiles(frame_times)
+
+    def _time_io(self, measurement):
+        result = measurement._measurement_result
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # results are saved relative to the working directory
+            os.chdir(tmp_dir)
+            try:
+                start = time.perf_counter()
+                result.save()
+                save_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                MeasurementResult.load(result._sample_name, result.get_name())
+                load_time = time.perf_counter() - start
+            finally:
+                os.chdir(cwd)
+                plt.close("all")
+        return {"save_time": save_time, "load_time": load_time}
+
+    def _describe_environment(self):
+        try:
+            revision = subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            ).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            revision = None
+        return {"date": dt.now().isoformat(timespec="seconds"),
+                "git_revision": revision,
+                "python": sys.version.split()[0],
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "latency_model": self._latency.toJSON()}
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _get_metric(entry, metric):
+    value = entry
+    for key in metric.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare_results(baseline, current, tolerance=0.1):
+    """
+    Finds tracked metrics that became worse by more than `tolerance`.
+
+    Parameters
+    ----------
+    baseline, current : dict
+        reports returned by `BenchmarkRunner.run()` or `load_results()`
+    tolerance : float
+        allowed relative degradation
+
+    Returns
+    -------
+    regressions : list[dict]
+        {"name", "size", "metric", "baseline", "current", "change"}, where
+        `change` is the relative change of the metric value
+    """
+    baseline_entries = {(entry["name"], json.dumps(entry["size"])): entry
+                        for entry in baseline["cases"]}
+    regressions = []
+    for entry in current["cases"]:
+        key = (entry["name"], json.dumps(entry["size"]))
+        if key not in baseline_entries:
+            continue
+        for metric, sign in TRACKED_METRICS.items():
+            old = _get_metric(baseline_entries[key], metric)
+            new = _get_metric(entry, metric)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / old
+            if sign * change < -tolerance:
+                regressions.append({"name": entry["name"],
+                                    "size": entry["size"],
+                                    "metric": metric, "baseline": old,
+                                    "current": new, "change": change})
+    return regressions
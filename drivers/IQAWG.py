@@ -34,15 +34,59 @@ class AWGChannel():
 
         self._host_awg = host_awg
         self._channel_number = channel_number
-
-    def output_arbitrary_waveform(self, waveform, frequency, asynchronous=False):
-
-        self._host_awg.output_arbitrary_waveform(
-            waveform, frequency, self._channel_number
-        )
+        # revision, repetition frequency and full scale of the waveform
+        # loaded last (see PulseSequence.get_revision) and its array in the
+        # driver
+        self._loaded_revision = (None, None, None, None)
+
+    def output_arbitrary_waveform(self, waveform, frequency, asynchronous=False,
+                                  revision=None, full_scale=None):
+        """
+        revision: tuple
+            `PulseSequence.get_revision()` of the waveform; the upload is
+            skipped if the same revision is already loaded
+        full_scale: float
+            volts of the largest DAC code if the waveform is in DAC codes
+            (see `lib2.dac.quantize`), None for a waveform in volts
+        """
+        if revision is not None and \
+                (revision, frequency, full_scale) == \
+                self._loaded_revision[:3] and \
+                self._get_host_waveform() is self._loaded_revision[3]:
+            return
+        self.forget_loaded_waveform()
+        if full_scale is None:
+            self._host_awg.output_arbitrary_waveform(
+                waveform, frequency, self._channel_number
+            )
+        else:
+            self._host_awg.output_arbitrary_waveform(
+                waveform, frequency, self._channel_number,
+                full_scale=full_scale
+            )
+        host_waveform = self._get_host_waveform()
+        if revision is not None and host_waveform is not None:
+            self._loaded_revision = (revision, frequency, full_scale,
+                                     host_waveform)
+
+    def _get_host_waveform(self):
+        # the waveform array kept by the AWG driver is replaced on every
+        # load and cleared on reset, also by the other channels
+        waveforms = getattr(self._host_awg, "waveforms", None)
+        return waveforms[self._channel_number - 1] \
+            if waveforms is not None else None
+
+    def forget_loaded_waveform(self):
+        """
+        Makes the next output_arbitrary_waveform upload the waveform even
+        if its revision is loaded; to be called when the channel is set up
+        bypassing this class
+        """
+        self._loaded_revision = (None, None, None, None)
 
     def output_continuous_wave(self, frequency, amplitude, phase, offset, waveform_resolution, asynchronous=False,
                                trigger_sync_every=None):
+        self.forget_loaded_waveform()
         self._host_awg.output_continuous_wave(frequency, amplitude, phase,
                                               offset, waveform_resolution, self._channel_number, asynchronous=asynchronous,
                                               trigger_sync_every=trigger_sync_every)
@@ -89,7 +133,8 @@ class CalibratedAWG():
         self._channel.output_arbitrary_waveform(
             pulse_sequence.get_waveform(),
             frequency,
-            asynchronous=asynchronous
+            asynchronous=asynchronous,
+            revision=pulse_sequence.get_revision()
         )
 
 class IQAWG():
@@ -98,6 +143,10 @@ class IQAWG():
         self.MAX_OUTPUT_VOLTAGE = channel_I._host_awg.MAX_OUTPUT_VOLTAGE
         self._triggered = triggered
         self._calibration: IQCalibrationData = None  # TODO: BUG CAN BE HERE (SHAMIL 23.04.2019)
+        # np.int16 or np.float32 to upload the pulse sequences as DAC codes
+        # or normalized samples to the AWGs that take them (the drivers
+        # with DAC_MAX_CODE)
+        self._dac_dtype = None
 
     def set_parameters(self, parameters):
         """
@@ -107,7 +156,7 @@ class IQAWG():
         -----------
         parameteres: dict {"param_name":param_value, ...}
         """
-        par_names = ["calibration"]
+        par_names = ["calibration", "dac_dtype"]
         for par_name in par_names:
             if par_name in parameters.keys():
                 setattr(self, "_"+par_name, parameters[par_name])
@@ -115,6 +164,36 @@ class IQAWG():
     def get_calibration(self):
         return self._calibration
 
+    def _get_channel_waveforms(self, pulse_sequence, end_idx):
+        """
+        (waveform, full_scale) for the I and Q channels; the full scale is
+        None for the waveforms in volts
+        """
+        host_awg = self._channels[0]._host_awg
+        if self._dac_dtype is None or \
+                not hasattr(host_awg, "DAC_MAX_CODE"):
+            return [(pulse_sequence.get_I_waveform()[:end_idx], None),
+                    (pulse_sequence.get_Q_waveform()[:end_idx], None)]
+        waveforms = []
+        for sequence in pulse_sequence.get_IQ_sequences():
+            # the waveform is scaled to its peak as the drivers do with the
+            # waveforms in volts
+            full_scale = sequence.get_peak() or self.MAX_OUTPUT_VOLTAGE
+            waveform = sequence.get_dac_waveform(
+                full_scale, self._dac_dtype,
+                host_awg.DAC_MAX_CODE
+                if np.issubdtype(self._dac_dtype, np.integer) else None)
+            waveforms.append((waveform[:end_idx], full_scale))
+        return waveforms
+
+    def _get_host_awg(self):
+        """
+        AWG of the channels for the methods that set them up directly
+        """
+        for channel in self._channels:
+            channel.forget_loaded_waveform()
+        return self._channels[0]._host_awg
+
     # def set_channel_coupling(self, state):
     #     '''
     #     Assuming that user knows what he is doing here. Make sure your channels
@@ -197,7 +276,7 @@ class IQAWG():
 
     def output_zero(self, trigger_sync_every=None):
         cal = self._calibration
-        awg = self._channels[0]._host_awg
+        awg = self._get_host_awg()
         chanI = self._channels[0]._channel_number
         chanQ = self._channels[1]._channel_number
         awg.synchronize_channels(chanI, chanQ)
@@ -227,7 +306,7 @@ class IQAWG():
 
     def change_amplitudes_of_cont_IQ_waves(self, ampl_coef):
         cal = self._calibration
-        awg = self._channels[0]._host_awg
+        awg = self._get_host_awg()
         awg.change_amplitude_of_carrier_signal(cal._if_amplitudes[0], self._channels[0]._channel_number, ampl_coef)
         awg.change_amplitude_of_carrier_signal(cal._if_amplitudes[1], self._channels[1]._channel_number, ampl_coef)
 
@@ -245,7 +324,7 @@ class IQAWG():
         -------
         None
         """
-        awg = self._channels[0]._host_awg
+        awg = self._get_host_awg()
         chanI = self._channels[0]._channel_number
         chanQ = self._channels[1]._channel_number
         awg.setup_modulation_amp(chanI, modulation_amp)
@@ -286,7 +365,7 @@ class IQAWG():
             raise ValueError("no calibration provided")
 
         if( self._channels[0]._host_awg is self._channels[1]._host_awg ):
-            awg = self._channels[0]._host_awg
+            awg = self._get_host_awg()
         else:
             raise NotImplementedError("Two channels are in different AWG. "
                                       "'setup_carrier_from_calibration' is not implemented")
@@ -330,7 +409,7 @@ class IQAWG():
         modulationCoeff = 2
         """
         cal = self._calibration
-        awg = self._channels[0]._host_awg
+        awg = self._get_host_awg()
         chanI = self._channels[0]._channel_number
         chanQ = self._channels[1]._channel_number
         awg.synchronize_channels(chanI, chanQ)
@@ -354,7 +433,7 @@ class IQAWG():
         awg._start_AWG(chanI)
 
     def stop_modulated_IQ_waves(self):
-        awg = self._channels[0]._host_awg
+        awg = self._get_host_awg()
         chanI = self._channels[0]._channel_number
         chanQ = self._channels[1]._channel_number
         awg.stop_modulation(chanI)
@@ -394,7 +473,7 @@ class IQAWG():
         pulse_sequence: IQPulseSequence instance
         """
         resolution = pulse_sequence.get_waveform_resolution()
-        length = len(pulse_sequence.get_I_waveform())
+        length = pulse_sequence.get_IQ_sequences()[0].total_points()
         if self._triggered:
             # this is made if 2 AWG is triggering another one and has the same trace period
             duration = pulse_sequence.get_duration() - 1000 * resolution
@@ -404,12 +483,17 @@ class IQAWG():
             end_idx = length
 
         frequency = 1 / duration * 1e9
-        self._channels[0].output_arbitrary_waveform(pulse_sequence \
-                                                    .get_I_waveform()[:end_idx], frequency,
-                                                    asynchronous=True)
-        self._channels[1].output_arbitrary_waveform(pulse_sequence
-                                                    .get_Q_waveform()[:end_idx], frequency,
-                                                    asynchronous=asynchronous)
+        sequence_I, sequence_Q = pulse_sequence.get_IQ_sequences()
+        (waveform_I, full_scale_I), (waveform_Q, full_scale_Q) = \
+            self._get_channel_waveforms(pulse_sequence, end_idx)
+        self._channels[0].output_arbitrary_waveform(waveform_I, frequency,
+                                                    asynchronous=True,
+                                                    revision=sequence_I.get_revision(),
+                                                    full_scale=full_scale_I)
+        self._channels[1].output_arbitrary_waveform(waveform_Q, frequency,
+                                                    asynchronous=asynchronous,
+                                                    revision=sequence_Q.get_revision(),
+                                                    full_scale=full_scale_Q)
 
 class IQAWG_Multiplexed(IQAWG):
     """
@@ -425,7 +509,7 @@ class IQAWG_Multiplexed(IQAWG):
         -----------
         parameteres: dict {"param_name":param_value, ...}
         """
-        par_names = ["calibration", "calibration2"]
+        par_names = ["calibration", "calibration2", "dac_dtype"]
         for par_name in par_names:
             if par_name in parameters.keys():
                 setattr(self, "_"+par_name, parameters[par_name])
@@ -500,7 +584,7 @@ class IQAWG_Multiplexed(IQAWG):
         pulse_sequence: IQPulseSequence instance
         """
         resolution = pulse_sequence.get_waveform_resolution()
-        length = len(pulse_sequence.get_I_waveform())
+        length = pulse_sequence.get_IQ_sequences()[0].total_points()
         if self._triggered:
             duration = pulse_sequence.get_duration() - 1000 * resolution
             end_idx = length - 1000
@@ -509,9 +593,14 @@ class IQAWG_Multiplexed(IQAWG):
             end_idx = length
 
         frequency = 1 / duration * 1e9
-        self._channels[0].output_arbitrary_waveform(pulse_sequence \
-                                                    .get_I_waveform()[:end_idx], frequency,
-                                                    asynchronous=True)
-        self._channels[1].output_arbitrary_waveform(pulse_sequence
-                                                    .get_Q_waveform()[:end_idx], frequency,
-                                                    asynchronous=asynchronous)
\ No newline at end of file
+        sequence_I, sequence_Q = pulse_sequence.get_IQ_sequences()
+        (waveform_I, full_scale_I), (waveform_Q, full_scale_Q) = \
+            self._get_channel_waveforms(pulse_sequence, end_idx)
+        self._channels[0].output_arbitrary_waveform(waveform_I, frequency,
+                                                    asynchronous=True,
+                                                    revision=sequence_I.get_revision(),
+                                                    full_scale=full_scale_I)
+        self._channels[1].output_arbitrary_waveform(waveform_Q, frequency,
+                                                    asynchronous=asynchronous,
+                                                    revision=sequence_Q.get_revision(),
+                                                    full_scale=full_scale_Q)
\ No newline at end of file
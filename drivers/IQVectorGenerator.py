@@ -7,8 +7,7 @@ from matplotlib import pyplot as plt
 
 import lib.iq_mixer_calibration
 from drivers import IQAWG
-from lib.data_management import load_IQMX_calibration_database, \
-    save_IQMX_calibration
+from lib.data_management import load_IQMX_calibration_store
 from lib.iq_mixer_calibration import IQCalibrator
 
 
@@ -16,7 +15,8 @@ class IQVectorGenerator:
 
     def __init__(self, name, lo, iq_awg: IQAWG, sa, calibration_db_name="IQVG",
                  default_calibration_power=-30, marker_period_divisor=None,
-                 slave_iqvgs=None, calibration_step=10e6):
+                 slave_iqvgs=None, calibration_step=10e6,
+                 max_interpolation_span=None):
         """
 
         Parameters
@@ -31,6 +31,13 @@ class IQVectorGenerator:
             however, in some cases other divisor may be required, i.e. when
             m3202 is used with PXICLK10 trigger sync mode this divisor
             should be set to 100
+        calibration_step: float, Hz
+            frequency grid of new calibrations; a saved calibration closer
+            than half of the step to the requested frequency is reused
+        max_interpolation_span: float, Hz
+            calibrations at neighbouring frequencies that are at most this
+            far apart are interpolated instead of calibrating the mixer at
+            the requested frequency, `calibration_step` by default
         """
         self._name = name
         self._lo = lo
@@ -53,7 +60,7 @@ class IQVectorGenerator:
         self._dac_overridden = False
         self._current_cal = None
         self._requested_cal: lib.iq_mixer_calibration.IQCalibrationData = None
-        self._cal_db = None
+        self._cal_store = None
 
         self._marker_period = None
         self._requested_marker_period = None
@@ -62,6 +69,8 @@ class IQVectorGenerator:
                                            "if_amplitudes": (.1, .1),
                                            "if_phase": -np.pi * 0.54}
         self._calibration_step = calibration_step
+        self._max_interpolation_span = max_interpolation_span \
+            if max_interpolation_span is not None else calibration_step
         self._calibration_test_data = []
         self._load_cal_db()
 
@@ -166,27 +175,27 @@ class IQVectorGenerator:
             # time.sleep(1)
 
     def _load_cal_db(self):
-        self._cal_db = load_IQMX_calibration_database(self._cal_db_name, 0)
+        self._cal_store = load_IQMX_calibration_store(self._cal_db_name)
 
     def _around_frequency(self, frequency):
         # return ceil(frequency/self._calibration_step)*self._calibration_step
         return round(frequency / self._calibration_step) * self._calibration_step
 
     def get_calibration(self, frequency, power):
-        frequency = self._around_frequency(frequency)
-        # frequency = round(frequency/self._calibration_step)*self._calibration_step
-
-        if self._cal_db is None:
+        if self._cal_store is None:
             self._load_cal_db()
 
-        cal = \
-            self._cal_db.get(frozenset(dict(lo_power=14,
-                                            ssb_power=self._default_calibration_power,
-                                            lo_frequency=self._if_frequency + frequency,
-                                            if_frequency=self._if_frequency,
-                                            waveform_resolution=1,
-                                            sideband_to_maintain='left').items()))
-        if (cal is None) or self._recalibrate_mixer:
+        cal = None
+        if not self._recalibrate_mixer:
+            cal = self._cal_store.find(
+                lo_frequency=self._if_frequency + frequency,
+                if_frequency=self._if_frequency, lo_power=14,
+                ssb_power=self._default_calibration_power,
+                sideband_to_maintain='left', waveform_resolution=1,
+                max_interpolation_span=self._max_interpolation_span,
+                max_nearest_distance=self._calibration_step / 2)
+        if cal is None:
+            frequency = self._around_frequency(frequency)
             calibrator = IQCalibrator(self._iqawg, self._sa, self._lo,
                                       self._cal_db_name, 0,
                                       sidebands_to_suppress=6,
@@ -202,9 +211,9 @@ class IQVectorGenerator:
                 minimize_iterlimit=100,
                 sa_res_bandwidth=300,
                 initial_guess=ig)
-            save_IQMX_calibration(cal)
+            self._cal_store.add(cal)
 
-            self._load_cal_db()  # make sure to include new calibration into cache
+            cal = cal.copy()
             cal._ssb_power = power
             cal._if_amplitudes = cal._if_amplitudes / np.sqrt(
                 10 ** ((self._default_calibration_power - power) / 10))
@@ -17,6 +17,8 @@ import numpy as np
 from scipy import fftpack
 import matplotlib.pyplot as plt
 from drivers.pyspcm import *
+from lib2.Profiler import span
+from lib2.psd import PSDAccumulator
 
 
 class CardError(Exception):
@@ -727,11 +729,12 @@ class SPCM:
         if res is not 0:
             print("Error: %d" % res)
             return None
-        # Start the transfer and wait till it's completed
-        self._write_to_reg_32(SPC_M2CMD,
-                              M2CMD_DATA_STARTDMA | M2CMD_DATA_WAITDMA)
-        # Explicitly stop DMA transfer
-        self._write_to_reg_32(SPC_M2CMD, M2CMD_DATA_STOPDMA)
+        with span("dig.dma"):
+            # Start the transfer and wait till it's completed
+            self._write_to_reg_32(SPC_M2CMD,
+                                  M2CMD_DATA_STARTDMA | M2CMD_DATA_WAITDMA)
+            # Explicitly stop DMA transfer
+            self._write_to_reg_32(SPC_M2CMD, M2CMD_DATA_STOPDMA)
         # Invalidate the buffer
         self._invalidate_buffer()
         if self.mode == SPCM_MODE.AVERAGING:
@@ -970,30 +973,42 @@ class SPCM:
             self.trigger_source = trigger_source
             init_trigger()
 
-    def measure(self, timeout = 1000):
+    def get_mv_per_code(self):
+        """
+        Scale of the raw data returned by `measure(raw=True)`, mV
+        """
+        return self.ch_amplitude / self.n_avg / 128
+
+    def measure(self, timeout = 1000, raw=False):
         """
         Launches measurement and returns data, normalized to milivolts.
         It finishes faster than safe_measure method, but cannot be interrupted
         during measurement.
+        With `raw` the card codes are returned as they are, multiply them by
+        `get_mv_per_code()` to get milivolts.
         Note:
         Two channels A and B return data with samples intertwined with each
         other, i.e. A0B0A1B1A2B2...ANBN
         """
         self.start_card()
         try:
-            self.wait_for_card(timeout)  # wait till the end of a measurement
+            with span("dig.wait"):
+                # wait till the end of a measurement
+                self.wait_for_card(timeout)
         except KeyboardInterrupt:
             self.stop_card()
             print("Card was interrupted")
             return None
         data = self.obtain_data()  # download data from the card
+        if raw:
+            return data
         # convertion to mV is according to
         # https://spectrum-instrumentation.com/sites/default/files/download/m4i_m4x_22xx_manual_english.pdf
         # p.81
         data = data.astype(float) / self.n_avg / 128 * self.ch_amplitude
         return data
 
-    def safe_measure(self):
+    def safe_measure(self, raw=False):
         """
         Launches measurement and returns data normalized to milivolts.
         Does not hang if something goes wrong like its counterpart measure()
@@ -1016,6 +1031,8 @@ class SPCM:
             print("Card was interrupted")
             return None
         data = self.obtain_data()  # download data from the card
+        if raw:
+            return data
         # convertion to mV is according to
         # https://spectrum-instrumentation.com/sites/default/files/download/m4i_m4x_22xx_manual_english.pdf
         # p.81
@@ -1094,18 +1111,19 @@ class SPCM:
         freq = samplerate / 1e6
         ymax = 0
 
-        nfft = fftpack.helper.next_fast_len(int(len(data) / N))
-        xf = np.fft.fftfreq(nfft, 1. / samplerate) / 1e6
-        startfrom = np.searchsorted(xf[:int(nfft / 2) - 1], freq_from)
-        endin = np.searchsorted(xf[:int(nfft / 2) - 1], freq_until)
+        n_samples = int(len(data) / N)
+        nfft = fftpack.helper.next_fast_len(n_samples)
+        # |FFT|^2 with norm="ortho" in the frequency window
+        psd = PSDAccumulator(n_samples, samplerate, nfft=nfft, onesided=True,
+                             band=(freq_from * 1e6, freq_until * 1e6),
+                             n_channels=N, scaling=1 / nfft)
+        spectra = psd.power(data[:N * n_samples].reshape(-1, N).T)
+        xf = psd.frequencies / 1e6
 
         for i in range(0, N):
-            ydata = data[i::N]
-            yf = np.abs(
-                np.fft.fft(ydata, nfft, norm="ortho")) * 2 / nfft / np.sqrt(
-                50 * 1e-3)
-            plt.plot(xf[startfrom:endin], 20 * np.log10(yf[startfrom:endin]))
-            ymax = max(max(yf[2:]), ymax)
+            yf = np.sqrt(spectra[i]) * 2 / nfft / np.sqrt(50 * 1e-3)
+            plt.plot(xf, 20 * np.log10(yf))
+            ymax = max(max(yf), ymax)
 
         plt.grid(True)
         plt.xlim(freq_from, freq_until)
@@ -1247,10 +1265,8 @@ class SPCM:
                                            pretrigger, num_averages)
 
         # deleting extra samples from segments
-        a = np.arange(N * segment_size_optimal, len(data), N * segment_size)
-        b = np.concatenate([a + i for i in range(0, N * (
-                    segment_size - segment_size_optimal))])
-        data_cut = np.delete(data, b)
+        data_cut = data.reshape(-1, N * segment_size)[
+            :, :N * segment_size_optimal].ravel()
         SPCM.plot_spectrum(channels, data_cut, freq_from, freq_until,
                            self.get_sample_rate())
         return data_cut
@@ -1262,7 +1278,7 @@ class SPCM:
         every = n_channels * segment_size
         # Generation of an array of indexes to cut at the beginning
         if samples_per_segment_to_cut_at_beginning > 0:
-            first_idxs = np.arange(0, len(data), every, dtype=np.int)
+            first_idxs = np.arange(0, len(data), every, dtype=int)
             # to cut data from every channel
             times_at_beginning = n_channels * samples_per_segment_to_cut_at_beginning
             idxs_at_beginning = np.concatenate(
@@ -191,34 +191,34 @@ class Tektronix_AWG5014(Instrument):
 
     def set_waveform(self, waveform, repetition_rate, channel):
 
-        w = np.array(waveform, dtype=np.float)
+        w = np.array(waveform, dtype=float)
         m1 = self._markers[(channel - 1) * 2]
         m2 = self._markers[(channel - 1) * 2 + 1]
 
         if m1 is None:
-            m1 = np.zeros(len(w), dtype=np.int)
+            m1 = np.zeros(len(w), dtype=int)
             self.set_marker_voltages((channel - 1) * 2 + 1, 0, 1)
         elif len(m1) != len(w):
             if len(np.unique(m1)) == 1:
                 # match marker length and value and do not change its high/low
-                m1 = np.ones(len(w), dtype=np.int) * m1[0]
+                m1 = np.ones(len(w), dtype=int) * m1[0]
             else:
-                m1 = np.zeros(len(w), dtype=np.int)
+                m1 = np.zeros(len(w), dtype=int)
                 self.set_marker_voltages((channel - 1) * 2 + 1, 0, 1)
 
         if m2 is None:
-            m2 = np.zeros(len(w), dtype=np.int)
+            m2 = np.zeros(len(w), dtype=int)
             self.set_marker_voltages((channel - 1) * 2 + 2, 0, 1)
         elif len(m2) != len(w):
             if len(np.unique(m2)) == 1:
                 # match marker length and value and do not change its high/low
-                m2 = np.ones(len(w), dtype=np.int) * m2[0]
+                m2 = np.ones(len(w), dtype=int) * m2[0]
             else:
-                m2 = np.zeros(len(w), dtype=np.int)
+                m2 = np.zeros(len(w), dtype=int)
                 self.set_marker_voltages((channel - 1) * 2 + 2, 0, 1)
 
-        m1 = np.array(m1, dtype=np.int)
-        m2 = np.array(m2, dtype=np.int)
+        m1 = np.array(m1, dtype=int)
+        m2 = np.array(m2, dtype=int)
 
         filename = 'test_ch{0}.wfm'.format(channel)
 
@@ -5,6 +5,10 @@ import visa
 
 from drivers.instrument import Instrument
 
+# ms, added to the VISA timeout of a list sweep for the command and the
+# trace transfer
+LIST_SWEEP_TIMEOUT_MARGIN = 1000
+
 
 class Agilent_EXA_N9010A(Instrument):
     """
@@ -32,6 +36,10 @@ class Agilent_EXA_N9010A(Instrument):
         self._freqpoints = 0
         self._zerospan = False
         self._list_sweep = False
+        # ms, the sum of the dwell times of the list
+        self._list_sweep_time = 0
+        # sweeps triggered per list measurement, see _update_list_averaging
+        self._n_list_sweeps = 1
         self._ci = channel_index
         self._start = 0
         self._stop = 0
@@ -316,6 +324,8 @@ class Agilent_EXA_N9010A(Instrument):
             self._visainstrument.write(':AVERage:STAT 1')
         else:
             self._visainstrument.write(':AVERage:STAT 0')
+        if self._list_sweep:
+            self._update_list_averaging()
 
     def do_get_average(self):
         """
@@ -346,6 +356,8 @@ class Agilent_EXA_N9010A(Instrument):
         else:
             self.do_set_average(False)
             # self._visainstrument.write('SENS:SWE:GRO:COUN 1')
+        if self._list_sweep:
+            self._update_list_averaging()
 
     def do_get_averages(self):
         """
@@ -442,9 +454,51 @@ class Agilent_EXA_N9010A(Instrument):
             vbws_str = "".join([f"{vbw:f}," for vbw in vbw_list])
             self._visainstrument.write(":LIST:BAND:VID " + vbws_str[:-1])
 
-        sweep_times = "".join([f"{swt:f}," for swt in numpy.ones_like(
-            frequency_list) / 1e3])
+        dwell_times = numpy.ones(len(frequency_list)) / 1e3
+        sweep_times = "".join([f"{swt:f}," for swt in dwell_times])
         self._visainstrument.write(":LIST:SWEep:TIME " + sweep_times[:-1])
+        self._list_sweep_time = dwell_times.sum() * 1e3
+
+        # binary trace format is set once here instead of before every read
+        self._visainstrument.write(":FORMat:DATA REAL,32")
+        self._visainstrument.write(":FORMat:BORDer SWAP")
+        self._update_list_averaging()
+
+    def _update_list_averaging(self):
+        """
+        Reads the averaging once per list setup or change of the averaging,
+        so that `start_list_sweep()` does not query the analyzer
+        """
+        self._n_list_sweeps = self.get_averages() if self.get_average() \
+            else 1
+        # the read of *OPC? in get_list_sweep_data() lasts all the sweeps
+        self._visainstrument.timeout = \
+            self._list_sweep_time * self._n_list_sweeps + \
+            LIST_SWEEP_TIMEOUT_MARGIN
+
+    def start_list_sweep(self):
+        """
+        Triggers the list sweeps, one per average like `init()`, and returns
+        immediately. The completion is collected by `get_list_sweep_data()`,
+        so the host may do other work while the analyzer is sweeping.
+        """
+        for i in range(self._n_list_sweeps - 1):
+            self._visainstrument.write(":INIT1")
+        self._visainstrument.write(":INIT1;*OPC?")
+
+    def get_list_sweep_data(self):
+        """
+        Waits for the sweep started by `start_list_sweep()` and reads the
+        powers at all the frequencies of the list in a single transfer.
+
+        Returns
+        -------
+        powers : numpy.ndarray
+            powers in dBm in the order of `frequency_list`
+        """
+        self._visainstrument.read()  # "1" from *OPC? when the sweep is done
+        return numpy.array(
+            self._visainstrument.query_binary_values(":CALC:DATA1?"))
 
     def setup_swept_sa(self, center_freq=5e9, span=1e9, nop=1001, rbw=1e6):
         """
@@ -464,6 +518,8 @@ class Agilent_EXA_N9010A(Instrument):
         self._visainstrument.write(":CONFigure:SAN")
         self._visainstrument.write(":DET:trace1 POS")
         self._list_sweep = False
+        # no timeout, as set in __init__, the list sweeps set their own
+        self._visainstrument.timeout = None
         self.do_set_centerfreq(center_freq)
         self.do_set_span(span)
         self.do_set_nop(nop)
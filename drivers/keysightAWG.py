@@ -20,6 +20,7 @@ from enum import Enum
 import visa
 
 from lib2.IQPulseSequence import *
+from lib2.dac import quantize
 from drivers.instrument import Instrument
 
 
@@ -35,6 +36,8 @@ class WaveformType(Enum):
 
 class KeysightAWG(Instrument):
     MAX_OUTPUT_VOLTAGE = 1.0  # V
+    # DAC codes of the full scale for :DATA:DAC
+    DAC_MAX_CODE = 8191
     def __init__(self, address):
         """Create a default Keysight AWG instrument"""
         Instrument.__init__(self, 'AWG', tags=['physical'])
@@ -70,25 +73,34 @@ class KeysightAWG(Instrument):
 
         self.add_function("apply_waveform")
 
-    def output_arbitrary_waveform(self, waveform, repetition_rate, channel, asynchronous=False):
+    def output_arbitrary_waveform(self, waveform, repetition_rate, channel, asynchronous=False,
+                                  full_scale=None):
         """
         Prepare and output an arbitrary waveform repeated at some repetition_rate
 
         Parameters:
         -----------
         waveform: array
-            ADC levels, in Volts
+            ADC levels, in Volts; DAC codes up to DAC_MAX_CODE if full_scale
+            is given
         repetition_rate: foat, Hz
             if_freq at which the waveform will be repeated
         channel: 1 or 2
             channel which will output the waveform
-        """
-        waveform = array(waveform)
-        if len(set((waveform * 8191).astype(int))) == 1:
+        full_scale: float
+            volts of the code DAC_MAX_CODE, 1 V by default
+        """
+        waveform = np.asarray(waveform)
+        if full_scale is None:
+            full_scale = self.MAX_OUTPUT_VOLTAGE
+            waveform = quantize(waveform, full_scale, np.int16,
+                                self.DAC_MAX_CODE)
+        if waveform.min() == waveform.max():
             # Crest data out of range KOSTYL FUCK YOU KEYSIGHT look carefully.
             waveform = waveform[:3]
         self.load_arbitrary_waveform_to_volatile_memory(waveform[:-1], channel)
-        self.prepare_waveform(WaveformType.arbitrary, repetition_rate, 2, 0, channel)
+        self.prepare_waveform(WaveformType.arbitrary, repetition_rate,
+                              2 * full_scale, 0, channel)
         self.set_output(channel, 1)
 
     def set_trigger(self, trigger_string: str):
@@ -286,14 +298,16 @@ class KeysightAWG(Instrument):
         Parameters:
         -----------
         waveform_array: ndarray
-            an array of floats within the range [-1,1], of length
-            131072 at maximum; if the range is too large the array
-            will be normalized
+            an array of floats within the range [-1,1] or of integer DAC
+            codes within [-8191, 8191], of length 131072 at maximum
         channel : 1 or 2
             channel index where the waveform will be stored
 
         """
-        waveform_array = around(waveform_array * 8191).astype(int)
+        waveform_array = np.asarray(waveform_array)
+        if not np.issubdtype(waveform_array.dtype, np.integer):
+            waveform_array = quantize(waveform_array, 1., np.int16,
+                                      self.DAC_MAX_CODE)
         self._visainstrument.write("*OPC")
         # self._visainstrument.write(":DATA%d VOLATILE, "%channel+array_string)
         self._visainstrument.write_binary_values(":DATA%d:DAC VOLATILE," % channel,
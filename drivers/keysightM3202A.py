@@ -8,8 +8,12 @@ https://literature.cdn.keysight.com/litweb/pdf/M3201-90001.pdf?id=2787170
 user's guide for Keysight SD1 version 3.x
 https://literature.cdn.keysight.com/litweb/pdf/M3XXX-90003.pdf?id=3120777
 """
+from ctypes import c_double, c_int, c_void_p
+
 import numpy as np
-from scipy.interpolate import interp1d
+
+from lib2.Profiler import span
+from lib2.dac import quantize, resample_periodic
 
 try:
     from drivers.keysightSD1 import SD_AOU, SD_Wave
@@ -25,6 +29,8 @@ class KeysightM3202A:
     MAX_OUTPUT_VOLTAGE = 1.5  # V
     VOLTAGE_RESOLUTION_BITS = 12
     MIN_SAMPLE_PERIOD = 1  # ns
+    # integer waveforms of SD_Wave span -32767..32767 of the channel amplitude
+    DAC_MAX_CODE = 32767
 
     def __init__(self, awg_alias, slot,
                  chassis=0, allow_unmatched_waveforms=True):
@@ -261,7 +267,8 @@ class KeysightM3202A:
                                                  delay=0)
                 self.module.triggerIOconfig(SD_TriggerDirections.AOU_TRG_IN)
 
-    def output_arbitrary_waveform(self, waveform, frequency, channel):
+    def output_arbitrary_waveform(self, waveform, frequency, channel,
+                                  full_scale=None):
         """
         Prepare and output an arbitrary waveform repeated at some repetition_rate
 
@@ -269,10 +276,14 @@ class KeysightM3202A:
         -----------
         waveform: array
             ADC levels, in Volts. max( abs(waveform) ) < 1.5 V
+            or DAC codes if full_scale is given, see
+            load_waveform_to_channel
         if_freq: float, Hz
             if_freq at which the waveform will be repeated
         channel: 1,2,3,4
             channel which will output the waveform
+        full_scale: float
+            volts of the code DAC_MAX_CODE, <= 1.5 V
 
         NOTE_1: waveform length must be a multiple of 10, but you do not need to
         provide an array that complies with such condition. Note only that this array will be copied 10
@@ -335,7 +346,8 @@ class KeysightM3202A:
             clear_unmatched_waveforms()
 
         # loading a waveform to internal RAM and putting waveform into the channel's AWG queue
-        self.load_waveform_to_channel(waveform, frequency, channel)
+        self.load_waveform_to_channel(waveform, frequency, channel,
+                                      full_scale)
         # starting operation
         self.start_AWG(channel)
         # self.reset_phase()
@@ -531,8 +543,27 @@ class KeysightM3202A:
                                               SD_ModulationTypes.AOU_MOD_AM,
                                               deviation_gain)
 
-    def load_waveform_to_channel(self, waveform, frequency, channel):
-        if np.max(np.abs(waveform)) > 1.5:
+    def load_waveform_to_channel(self, waveform, frequency, channel,
+                                 full_scale=None):
+        """
+        Parameters
+        ----------
+        waveform : np.ndarray
+            volts; if full_scale is given, integer DAC codes up to
+            DAC_MAX_CODE or floats normalized to (-1, 1), see
+            `lib2.dac.quantize`
+        frequency : float
+            Hz, repetition frequency of the waveform
+        channel : int
+            Channel number starting from 1.
+        full_scale : float
+            volts of the code DAC_MAX_CODE
+        """
+        waveform = np.asarray(waveform)
+        if full_scale is not None:
+            if full_scale > self.MAX_OUTPUT_VOLTAGE:
+                raise ValueError("Trace maximal amplitude is exceeding AWG range: (-1.5 ; 1.5) volts")
+        elif np.max(np.abs(waveform)) > 1.5:
             raise ValueError("Trace maximal amplitude is exceeding AWG range: (-1.5 ; 1.5) volts")
 
         # number of points
@@ -541,40 +572,31 @@ class KeysightM3202A:
 
         duration_initial = 1 / frequency * 1e9 if frequency != 0 else 10.0  # float, ns
 
-        if not np.allclose(duration_initial, 1/self.get_sample_rate() * 1e9 * len(waveform)):
-            # interpolating input waveform to the next step
-            # that rescales waveform to fit repetition frequency
-            interpolation_method = "cubic" if frequency != 0 else "linear"
-            old_x = np.linspace(0, duration_initial, len(waveform) + 1)
-            interpolating_function = interp1d(old_x, np.concatenate((waveform, [waveform[0]])),
-                              kind=interpolation_method)
-
-            # in order to satisfy NOTE_1 we simply make 10 subsequent waveforms
-            # but to provide if_freq accuracy, we are sampling from
-            # interval 1000 times wider then the original, and we are extending
-            # interpolation function domain using its periodicity
-            # duration = duration_initial*1e4 if duration_initial < 1e2 else 1e6  # here it is
-
-            duration = duration_initial
-            new_x = np.linspace(0, duration, int(
-                np.round(duration / self.get_sample_rate() * 1e9)), endpoint=False)
-
-            # converting domain values in the function domain
-            new_x_converted = np.remainder(new_x, duration_initial)
-            waveform = interpolating_function(new_x_converted)  # obtaining new waveform values
-
-        normalization = np.max(np.abs(waveform))
+        n_points = int(np.round(duration_initial / self.get_sample_period()))
+        if n_points != len(waveform):
+            # resampling the waveform as one period of a periodic signal
+            # to fit the repetition frequency
+            if full_scale is not None and \
+                    np.issubdtype(waveform.dtype, np.integer):
+                waveform = quantize(
+                    resample_periodic(waveform, n_points), self.DAC_MAX_CODE,
+                    waveform.dtype, self.DAC_MAX_CODE)
+            else:
+                waveform = resample_periodic(waveform, n_points)
+
+        if full_scale is not None:
+            # integer codes or floats normalized to the full scale
+            normalization = full_scale
+        else:
+            normalization = np.max(np.abs(waveform))
+            # normalize waveform to (-1,1) interval, all points are equal to
+            # zero otherwise; the array of the caller is not modified
+            if normalization != 0:
+                waveform = waveform / normalization
 
         if self.waveshape_types[channel - 1] == SD_Waveshapes.AOU_AWG:
             self.output_voltages[channel - 1] = normalization
 
-        # normalize waveform to (-1,1) interval
-        if normalization != 0:
-            waveform /= normalization
-        else:
-            # all points are equal to zero
-            pass
-
         self.repetition_frequencies[channel - 1] = frequency
         self._load_array_into_AWG(waveform, channel)
 
@@ -583,7 +605,9 @@ class KeysightM3202A:
 
         Parameters
         ----------
-        waveform_array_normalized
+        waveform_array_normalized : np.ndarray
+            floats in (-1, 1) or integer codes up to DAC_MAX_CODE; the array
+            is kept and must not be modified afterwards
         channel : int
             Channel number starting from 1.
 
@@ -591,8 +615,6 @@ class KeysightM3202A:
         -------
 
         """
-        from copy import deepcopy
-        waveform_array_normalized = deepcopy(waveform_array_normalized)
         # only float 16 is supported by AWG (it is actually 12 bit AWG), so
         # if you want to guess what is actually outputted by AWG
         # you should properly convert this to 12 bit numbers
@@ -612,9 +634,7 @@ class KeysightM3202A:
         self.waveforms[channel - 1] = waveform_array_normalized
 
         # creating SD_Wave() object from keysight API
-        wave = SD_Wave()
-        wave.newFromArrayDouble(SD_WaveformTypes.WAVE_ANALOG,
-                                waveform_array_normalized)
+        wave = self._new_wave(waveform_array_normalized)
         waveform_number = channel - 1
         self.waveform_ids[channel - 1] = waveform_number
 
@@ -629,13 +649,14 @@ class KeysightM3202A:
         self.module.AWGflush(channel - 1)
 
         # load waveform to board RAM
-        if not reload:
-            ret = self.module.waveformLoad(wave, waveform_number)
-            if ret == SD_Error.INVALID_OBJECTID or ret == SD_Error.INVALID_OPERATION:
+        with span("awg.upload"):
+            if not reload:
+                ret = self.module.waveformLoad(wave, waveform_number)
+                if ret == SD_Error.INVALID_OBJECTID or ret == SD_Error.INVALID_OPERATION:
+                    self._handle_error(ret)
+            else:
+                ret = self.module.waveformReLoad(wave, waveform_number)
                 self._handle_error(ret)
-        else:
-            ret = self.module.waveformReLoad(wave, waveform_number)
-            self._handle_error(ret)
 
         # clear channel queue
         self.module.AWGflush(channel - 1)
@@ -656,6 +677,34 @@ class KeysightM3202A:
                                            self.output_voltages[channel - 1])
         self._handle_error(ret)
 
+    @staticmethod
+    def _new_wave(waveform):
+        """
+        SD_Wave of an analog waveform. SD_Wave.newFromArray* copy the
+        samples one by one into a ctypes array; here the C array shares the
+        memory of a contiguous numpy array of the C type instead.
+        """
+        # SD_Wave.newFromArray* refuse empty arrays, the library is not
+        # called for them
+        if len(waveform) == 0:
+            raise ValueError("an empty waveform can not be loaded")
+        wave = SD_Wave()
+        if np.issubdtype(waveform.dtype, np.integer):
+            data = np.require(waveform, np.intc, ["C", "W"])
+            c_type, new = c_int, "SD_Wave_newFromArrayInteger"
+        else:
+            data = np.require(waveform, np.double, ["C", "W"])
+            c_type, new = c_double, "SD_Wave_newFromArrayDouble"
+        c_data = (c_type * len(data)).from_buffer(data)
+        # SD_Wave has no public way to create the wave from a C array: the
+        # name-mangled private attributes of SD_Object are set the way
+        # SD_Wave.newFromArray* of keysightSD1 do it, and have to be
+        # checked against that module when it is updated
+        core_dll = wave._SD_Object__core_dll
+        wave._SD_Object__handle = getattr(core_dll, new)(
+            SD_WaveformTypes.WAVE_ANALOG, len(data), c_data, c_void_p(0))
+        return wave
+
     def start_AWG(self, channel):
         """
 
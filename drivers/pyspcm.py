@@ -46,6 +46,39 @@ uptr32 = POINTER (uint32)
 uptr64 = POINTER (uint64)
 
 
+class _MissingFunction:
+    """Function of a driver library that could not be loaded"""
+
+    def __init__(self, name, error):
+        self._name = name
+        self._error = error
+
+    def __call__(self, *args):
+        raise OSError("{0}: the Spectrum driver library is not "
+                      "available".format(self._name)) from self._error
+
+
+class _MissingLibrary:
+    """
+    Stands in for the driver library on machines without the Spectrum
+    driver, so that the registers and the classes built on them can be
+    imported, e.g. with the simulated card. Calls raise the load error.
+    """
+
+    def __init__(self, error):
+        self._error = error
+
+    def __getattr__(self, name):
+        return _MissingFunction(name, self._error)
+
+
+def _load_library(loader, path):
+    try:
+        return loader.LoadLibrary(path)
+    except OSError as error:
+        return _MissingLibrary(error)
+
+
 # Windows
 if os.name == 'nt':
     #sys.stdout.write("Python Version: {0} on Windows\n\n".format (
@@ -61,9 +94,9 @@ if os.name == 'nt':
     # Load DLL into memory.
     # use windll because all driver access functions use _stdcall calling convention under windows
     if (bIs64Bit == 1):
-        spcmDll = windll.LoadLibrary ("c:\\windows\\system32\\spcm_win64.dll")
+        spcmDll = _load_library(windll, "c:\\windows\\system32\\spcm_win64.dll")
     else:
-        spcmDll = windll.LoadLibrary ("c:\\windows\\system32\\spcm_win32.dll")
+        spcmDll = _load_library(windll, "c:\\windows\\system32\\spcm_win32.dll")
 
     # load spcm_hOpen
     if (bIs64Bit):
@@ -165,7 +198,7 @@ elif os.name == 'posix':
 
     # Load DLL into memory.
     # use cdll because all driver access functions use cdecl calling convention under linux 
-    spcmDll = cdll.LoadLibrary ("libspcm_linux.so")
+    spcmDll = _load_library(cdll, "libspcm_linux.so")
 
     # load spcm_hOpen
     spcm_hOpen = getattr (spcmDll, "spcm_hOpen")
@@ -0,0 +1,17 @@
+"""
+Simulated instruments that stand in for the lab hardware when measuring
+the throughput of the measurement classes offline.
+
+All devices constructed without an explicit `lab` share the state of
+`SimulatedLab.get_default()`, so a bias source, a VNA and a spectrum
+analyzer see the same sample and mixer. Device latencies are emulated by
+`LatencyModel`; the default model does not wait at all.
+"""
+__all__ = ["latency_model", "lab_model", "sim_agilent_PNA_L",
+           "sim_agilent_EXA", "sim_E8257D", "sim_Yokogawa_GS210",
+           "sim_Spectrum_m4x", "sim_keysightM3202A"]
+
+# pseudo VISA aliases under which `lib2.Measurement` discovers simulated
+# devices
+SIMULATED_ADDRESSES = ["SIM-PNA-L", "SIM-EXA", "SIM-MXG", "SIM-EXG",
+                       "SIM-GS210", "SIM-M4X", "SIM-M3202A"]
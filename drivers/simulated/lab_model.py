@@ -0,0 +1,353 @@
+"""
+Physical model behind the simulated instruments.
+
+A single `SimulatedLab` object plays the role of the cryostat, the sample and
+the room-temperature IQ mixer at once. Simulated sources write their output
+state into it (bias, microwave tones, AWG channels) and simulated receivers
+(VNA, spectrum analyzer, digitizer) read back physically plausible responses:
+
+    * a notch-type readout resonator dispersively coupled to a flux-tunable
+      transmon; the resonator dip moves with the bias
+    * a Lorentzian two-tone response of the qubit to a CW drive
+    * Rabi oscillations driven by the waveforms loaded into the AWG channels
+      that feed the IQ mixer
+    * an IQ mixer with LO leakage and amplitude/phase imbalance, so that the
+      spectrum analyzer sees realistic sidebands during mixer calibration
+
+Units follow the rest of the library: Hz, A, V, dBm, ns for AWG waveforms.
+"""
+import numpy as np
+
+
+class SimulatedLab:
+    _default_instance = None
+
+    def __init__(self, seed=None):
+        self._rng = np.random.RandomState(seed)
+
+        # readout resonator (notch type)
+        self.resonator_frequency = 7.5e9  # bare frequency, Hz
+        self.resonator_kappa = 2e6  # total linewidth, Hz
+        self.resonator_kappa_c = 1.5e6  # coupling linewidth, Hz
+        self.cable_delay = 50e-9  # s
+        self.line_attenuation = 0.5  # |S21| far from the resonance
+
+        # flux-tunable transmon
+        self.qubit_max_frequency = 6e9  # Hz
+        self.qubit_linewidth = 2e6  # Hz
+        self.coupling = 60e6  # g, Hz
+        self.flux_period = 1e-3  # bias change that threads one flux quantum
+        self.sweet_spot_bias = 0.1e-3
+        # Rabi frequency for 0 dBm CW drive at the sample
+        self.rabi_frequency_at_0dBm = 20e6  # Hz
+        # Rabi frequency per Volt of the IQ mixer baseband amplitude
+        self.rabi_frequency_per_volt = 50e6  # Hz / V
+        self.rabi_decay_time = 2e-6  # s
+
+        # IQ mixer feeding the qubit drive line
+        self.mixer_lo_source = None  # address of the LO, None - any source
+        self.mixer_channels = (1, 2)  # AWG channels used as I and Q
+        self.mixer_dc_leakage = (0.021 - 0.013j)  # V, compensated by offsets
+        self.mixer_amplitude_imbalance = 0.07
+        self.mixer_phase_imbalance = 0.06  # rad
+        self.mixer_conversion_loss = 7  # dB
+        self.mixer_reference_voltage = 0.5  # V, baseband for 0 dB conversion
+        self.mixer_harmonics_suppression = 60  # dBc for |k| > 1 sidebands
+
+        # measurement chain
+        self.vna_noise = 2e-3  # |S21| rms at 1 kHz bandwidth, 1 average
+        self.sa_noise_floor = -150  # dBm/Hz
+        self.sa_noise = 0.2  # dB rms
+        self.digitizer_noise = 5  # mV rms per sample and single shot
+        self.digitizer_signal = 40  # mV for |S21| = 1
+        self.digitizer_if_frequency = 50e6  # Hz
+        self.readout_frequency = None  # None - dressed ground state frequency
+
+        # state written by the simulated sources
+        self.bias = 0.
+        self._tones = {}
+        self._awg_channels = {}
+
+    @staticmethod
+    def get_default():
+        """
+        Instance shared by all simulated devices constructed without an
+        explicit `lab` argument.
+        """
+        if SimulatedLab._default_instance is None:
+            SimulatedLab._default_instance = SimulatedLab()
+        return SimulatedLab._default_instance
+
+    """ Sources """
+
+    def set_bias(self, bias):
+        self.bias = bias
+
+    def set_tone(self, address, frequency=None, power=None, state=None):
+        tone = self._tones.setdefault(
+            address, {"frequency": 0., "power": -130., "state": False})
+        if frequency is not None:
+            tone["frequency"] = frequency
+        if power is not None:
+            tone["power"] = power
+        if state is not None:
+            tone["state"] = state
+
+    def get_tone(self, address):
+        return self._tones.get(address)
+
+    def set_awg_channel(self, address, channel, **channel_state):
+        """
+        Parameters
+        ----------
+        address : str
+            AWG alias
+        channel : int
+            channel number, starting from 1
+        channel_state
+            `mode="fg"` with `frequency`, `amplitude`, `phase` and `offset` for
+            the embedded function generator
+            `mode="awg"` with `waveform` (Volts) and `sample_period` (ns) for an
+            arbitrary waveform
+        """
+        self._awg_channels[(address, channel)] = channel_state
+
+    def _mixer_channel_states(self):
+        states = []
+        for channel in self.mixer_channels:
+            state = None
+            for (address, ch), channel_state in self._awg_channels.items():
+                if ch == channel:
+                    state = channel_state
+            states.append(state)
+        return states
+
+    def _lo_tone(self):
+        if self.mixer_lo_source is not None:
+            tone = self._tones.get(self.mixer_lo_source)
+            return tone if tone is not None and tone["state"] else None
+        active = [tone for tone in self._tones.values() if tone["state"]]
+        return max(active, key=lambda t: t["power"]) if active else None
+
+    """ Sample """
+
+    def get_qubit_frequency(self):
+        phase = np.pi * (self.bias - self.sweet_spot_bias) / self.flux_period
+        return self.qubit_max_frequency * np.sqrt(np.abs(np.cos(phase)))
+
+    def get_resonator_frequency(self, excited=False):
+        detuning = self.resonator_frequency - self.get_qubit_frequency()
+        shift = self.coupling ** 2 / detuning
+        return self.resonator_frequency + (-shift if excited else shift)
+
+    def get_cw_excited_population(self):
+        """
+        Steady-state population of the qubit under all active CW tones
+        """
+        f_q = self.get_qubit_frequency()
+        population = 0
+        for tone in self._tones.values():
+            if not tone["state"]:
+                continue
+            rabi = self.rabi_frequency_at_0dBm * 10 ** (tone["power"] / 20)
+            detuning = tone["frequency"] - f_q
+            population += 0.5 * rabi ** 2 / (
+                    rabi ** 2 + (self.qubit_linewidth / 2) ** 2 + detuning ** 2)
+        return min(population, 0.5)
+
+    def get_pulsed_excited_population(self):
+        """
+        Qubit population after the pulse sequence that is currently loaded
+        into the mixer AWG channels
+        """
+        baseband, sample_period = self._mixer_baseband_waveform()
+        if baseband is None:
+            return 0.
+        envelope = np.abs(baseband - baseband[0])  # drop DC offsets
+        threshold = 1e-2 * np.max(envelope) if len(envelope) else 0
+        dt = sample_period * 1e-9
+        angle = 2 * np.pi * self.rabi_frequency_per_volt * \
+                np.sum(envelope) * dt
+        pulse_duration = np.count_nonzero(envelope > threshold) * dt
+        contrast = np.exp(-pulse_duration / self.rabi_decay_time)
+        return 0.5 * (1 - contrast * np.cos(angle))
+
+    def _mixer_baseband_waveform(self):
+        states = self._mixer_channel_states()
+        if any(state is None or state.get("mode") != "awg"
+               for state in states):
+            return None, None
+        i_wave = np.asarray(states[0]["waveform"], dtype=float)
+        q_wave = np.asarray(states[1]["waveform"], dtype=float)
+        length = min(len(i_wave), len(q_wave))
+        return i_wave[:length] + 1j * q_wave[:length], \
+               states[0]["sample_period"]
+
+    def get_s21(self, frequencies, excited_population=None):
+        """
+        Noiseless transmission of the readout line
+
+        Parameters
+        ----------
+        frequencies : np.ndarray
+            probe frequencies in Hz
+        excited_population : float
+            qubit excited state population, CW value is used if None
+        """
+        frequencies = np.asarray(frequencies, dtype=float)
+        if excited_population is None:
+            excited_population = self.get_cw_excited_population()
+
+        def notch(resonance):
+            return 1 - (self.resonator_kappa_c / self.resonator_kappa) / \
+                   (1 + 2j * (frequencies - resonance) / self.resonator_kappa)
+
+        s21 = (1 - excited_population) * notch(self.get_resonator_frequency()) \
+              + excited_population * notch(
+            self.get_resonator_frequency(excited=True))
+        environment = self.line_attenuation * \
+                      np.exp(-2j * np.pi * frequencies * self.cable_delay)
+        return environment * s21
+
+    def measure_s21(self, frequencies, bandwidth, averages=1):
+        s21 = self.get_s21(frequencies)
+        sigma = self.vna_noise * np.sqrt(bandwidth / 1e3 / max(averages, 1))
+        return s21 + sigma / np.sqrt(2) * (
+                self._rng.standard_normal(s21.shape) +
+                1j * self._rng.standard_normal(s21.shape))
+
+    """ IQ mixer """
+
+    def get_mixer_sidebands(self):
+        """
+        Complex baseband amplitudes of the mixer output.
+
+        Returns
+        -------
+        if_frequency, amplitudes : float, dict
+            `amplitudes[k]` is the amplitude in Volts of the spectral line
+            at `LO + k * if_frequency`, k = -1, 0, 1
+        """
+        states = self._mixer_channel_states()
+        fg_states = []
+        for state in states:
+            if state is None:
+                state = {"mode": "fg", "frequency": 0, "amplitude": 0,
+                         "phase": 0, "offset": 0}
+            fg_states.append(state)
+
+        if any(state["mode"] != "fg" for state in fg_states):
+            # arbitrary waveform: only the average offset is accounted for
+            offsets = [np.mean(state.get("waveform", [0]))
+                       if state["mode"] == "awg" else state["offset"]
+                       for state in fg_states]
+            plus, minus = 0, 0
+            if_frequency = 0
+        else:
+            offsets = [state["offset"] for state in fg_states]
+            if_frequency = max(state["frequency"] for state in fg_states)
+
+            # A*sin(wt + phi) = A/2j * (exp(j(wt+phi)) - exp(-j(wt+phi)))
+            def components(state):
+                if state["frequency"] == 0:
+                    return 0, 0
+                a, phi = state["amplitude"], state["phase"]
+                return a / 2j * np.exp(1j * phi), -a / 2j * np.exp(-1j * phi)
+
+            i_plus, i_minus = components(fg_states[0])
+            q_plus, q_minus = components(fg_states[1])
+            imbalance = (1 + self.mixer_amplitude_imbalance) * \
+                        np.exp(1j * self.mixer_phase_imbalance)
+            plus = i_plus + 1j * imbalance * q_plus
+            minus = i_minus + 1j * imbalance * q_minus
+
+            if fg_states[0]["frequency"] == 0:
+                offsets[0] += fg_states[0]["amplitude"] * \
+                              np.sin(fg_states[0]["phase"])
+            if fg_states[1]["frequency"] == 0:
+                offsets[1] += fg_states[1]["amplitude"] * \
+                              np.sin(fg_states[1]["phase"])
+
+        carrier = offsets[0] + 1j * offsets[1] + self.mixer_dc_leakage
+        return if_frequency, {-1: minus, 0: carrier, 1: plus}
+
+    def get_spectrum(self, frequencies, resolution_bandwidth):
+        """
+        Power that a spectrum analyzer would see at given frequencies.
+
+        Parameters
+        ----------
+        frequencies : np.ndarray
+            analyzer frequencies in Hz
+        resolution_bandwidth : Union[float, np.ndarray]
+            resolution bandwidths in Hz
+
+        Returns
+        -------
+        powers : np.ndarray
+            powers in dBm
+        """
+        frequencies = np.asarray(frequencies, dtype=float)
+        rbw = np.broadcast_to(np.asarray(resolution_bandwidth, dtype=float),
+                              frequencies.shape)
+        power_mw = 10 ** ((self.sa_noise_floor + 10 * np.log10(rbw)) / 10)
+
+        lo = self._lo_tone()
+        if lo is not None:
+            if_frequency, amplitudes = self.get_mixer_sidebands()
+            lines = dict(amplitudes)
+            if if_frequency == 0:
+                # all the lines are at the LO frequency, only the carrier is
+                # physical
+                lines = {0: amplitudes[0]}
+            else:
+                strongest = max(abs(amplitudes[-1]), abs(amplitudes[1]))
+                harmonic = strongest * \
+                           10 ** (-self.mixer_harmonics_suppression / 20)
+                for k in (-3, -2, 2, 3):
+                    lines[k] = harmonic / abs(k)
+            for k, amplitude in lines.items():
+                line_frequency = lo["frequency"] + k * if_frequency
+                level = lo["power"] - self.mixer_conversion_loss + \
+                        20 * np.log10(abs(amplitude) /
+                                      self.mixer_reference_voltage + 1e-12)
+                # Gaussian RBW filter shape
+                weight = np.exp(-0.5 * ((frequencies - line_frequency) /
+                                        rbw) ** 2)
+                power_mw = power_mw + weight * 10 ** (level / 10)
+
+        powers = 10 * np.log10(power_mw)
+        return powers + self.sa_noise * self._rng.standard_normal(powers.shape)
+
+    """ Digitizer """
+
+    def get_readout_traces(self, n_seg, segment_size, sample_rate,
+                           n_channels=2, n_avg=1, start_time=0.):
+        """
+        Down-converted readout signal as seen by a digitizer.
+
+        Returns
+        -------
+        traces : np.ndarray
+            shape (n_seg, segment_size, n_channels), mV
+        """
+        population = self.get_pulsed_excited_population()
+        readout_frequency = self.readout_frequency
+        if readout_frequency is None:
+            readout_frequency = self.get_resonator_frequency()
+        response = self.digitizer_signal * self.get_s21(
+            [readout_frequency], excited_population=population)[0]
+
+        t = start_time + np.arange(segment_size) / sample_rate
+        signal = response * np.exp(2j * np.pi *
+                                   self.digitizer_if_frequency * t)
+        noise_sigma = self.digitizer_noise / np.sqrt(max(n_avg, 1))
+
+        traces = np.empty((n_seg, segment_size, n_channels))
+        traces[:, :, 0] = np.real(signal)
+        if n_channels > 1:
+            traces[:, :, 1] = np.imag(signal)
+        if n_channels > 2:
+            traces[:, :, 2:] = 0
+        traces += noise_sigma * self._rng.standard_normal(traces.shape)
+        return traces
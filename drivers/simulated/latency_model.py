@@ -0,0 +1,163 @@
+"""
+I/O timing model shared by the simulated instruments.
+
+Every simulated driver owns a `SimulatedVisaInstrument` that stands in for the
+pyvisa resource of the real device (`self._visainstrument`). It does not
+transfer anything, but it sleeps according to a `LatencyModel` and counts the
+issued commands, so that throughput benchmarks see realistic bus overheads
+without the lab.
+"""
+import time
+
+import numpy as np
+
+
+class LatencyModel:
+    """
+    Describes how long a simulated instrument "talks" to the host.
+
+    All durations are in seconds. Default values produce an instrument with no
+    I/O overhead at all.
+    """
+
+    def __init__(self, write=0., query=0., per_point=0., acquisition_scale=0.,
+                 jitter=0., seed=None):
+        """
+        Parameters
+        ----------
+        write : float
+            time spent for a single command write
+        query : float
+            round-trip time of a single query (without payload)
+        per_point : float
+            additional transfer time for every data point returned by a
+            binary block query or a DMA transfer
+        acquisition_scale : float
+            fraction of the physical acquisition time (sweep time of a VNA,
+            trigger train of a digitizer, etc.) that is actually waited.
+            0 - acquisition is instant, 1 - real-time operation.
+        jitter : float
+            relative standard deviation of every delay
+        seed : int
+            seed of the jitter random generator
+        """
+        self.write = write
+        self.query = query
+        self.per_point = per_point
+        self.acquisition_scale = acquisition_scale
+        self.jitter = jitter
+        self._rng = np.random.RandomState(seed)
+
+    @staticmethod
+    def instant():
+        return LatencyModel()
+
+    @staticmethod
+    def lan():
+        """
+        Typical figures for a LAN (VXI-11/HiSLIP) connected instrument
+        """
+        return LatencyModel(write=0.3e-3, query=1e-3, per_point=50e-9,
+                            acquisition_scale=1, jitter=0.1)
+
+    @staticmethod
+    def gpib():
+        """
+        Typical figures for a GPIB connected instrument
+        """
+        return LatencyModel(write=2e-3, query=5e-3, per_point=1e-6,
+                            acquisition_scale=1, jitter=0.1)
+
+    @staticmethod
+    def pxi():
+        """
+        Typical figures for a PXIe card driven through the vendor library
+        """
+        return LatencyModel(write=20e-6, query=50e-6, per_point=0.5e-9,
+                            acquisition_scale=1, jitter=0.05)
+
+    def sleep(self, duration):
+        if self.jitter > 0:
+            duration *= 1 + self.jitter * self._rng.standard_normal()
+        if duration > 0:
+            time.sleep(duration)
+
+    def wait_write(self):
+        self.sleep(self.write)
+
+    def wait_query(self, n_points=0):
+        self.sleep(self.query + self.per_point * n_points)
+
+    def wait_acquisition(self, duration):
+        """
+        Parameters
+        ----------
+        duration : float
+            physical duration of the acquisition in seconds
+        """
+        self.sleep(self.acquisition_scale * duration)
+
+    def toJSON(self):
+        return {"write": self.write, "query": self.query,
+                "per_point": self.per_point,
+                "acquisition_scale": self.acquisition_scale,
+                "jitter": self.jitter}
+
+
+class SimulatedVisaInstrument:
+    """
+    Minimal stand-in for `pyvisa.resources.MessageBasedResource`.
+
+    Queries are answered by the `responder` callable supplied by the owning
+    simulated driver.
+    """
+
+    def __init__(self, address, latency=None, responder=None):
+        self.resource_name = address
+        self.latency = latency if latency is not None else LatencyModel()
+        self._responder = responder
+        self.n_writes = 0
+        self.n_queries = 0
+        self.n_points_transferred = 0
+        self.last_command = None
+        self._is_open = True
+
+    def write(self, msg):
+        self.latency.wait_write()
+        self.n_writes += 1
+        self.last_command = msg
+        return len(msg)
+
+    def read(self):
+        return ""
+
+    def query(self, msg):
+        self.latency.wait_query()
+        self.n_queries += 1
+        self.last_command = msg
+        if self._responder is None:
+            return "0\n"
+        return self._responder(msg)
+
+    # legacy pyvisa name still used in some measurement classes
+    ask = query
+
+    def transfer(self, n_points):
+        """
+        Accounts for a binary block or DMA transfer of `n_points` values.
+        """
+        self.latency.wait_query(n_points)
+        self.n_queries += 1
+        self.n_points_transferred += n_points
+
+    def read_stb(self):
+        # operation complete bit is always set: acquisition delays are
+        # accounted for by the drivers themselves
+        return 2 ** 5
+
+    def close(self):
+        self._is_open = False
+
+    def get_statistics(self):
+        return {"writes": self.n_writes, "queries": self.n_queries,
+                "points_transferred": self.n_points_transferred}
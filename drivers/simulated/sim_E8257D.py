@@ -0,0 +1,126 @@
+"""
+Simulated counterpart of the MXG/EXG microwave sources from
+`drivers.E8257D`.
+
+The source registers its output (frequency, power, ON/OFF) in a
+`SimulatedLab`, where it acts both as a CW qubit drive and as the LO of the
+simulated IQ mixer.
+"""
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.latency_model import LatencyModel, \
+    SimulatedVisaInstrument
+
+
+class SimulatedMXG:
+    MIN_POWER = -130
+    MAX_POWER = 19
+
+    def __init__(self, address, lab=None, latency=None):
+        self._address = address
+        self._lab = lab if lab is not None else SimulatedLab.get_default()
+        self._visainstrument = SimulatedVisaInstrument(
+            address, latency if latency is not None else LatencyModel(),
+            responder=self._respond)
+        self._frequency = 5e9
+        self._power = -20
+        self._output_state = "ON"
+        self._nop = 1
+        self._freq_limits = (self._frequency, self._frequency)
+        self._sweep_parameters = {}
+        self._lab.set_tone(address, self._frequency, self._power, True)
+
+    def _respond(self, msg):
+        if msg == ":SOURce:FREQuency:CW?":
+            return "%e\n" % self._frequency
+        if msg == ":SOURce:POWer?":
+            return "%e\n" % self._power
+        if msg == ":OUTput:STATe?":
+            return ("1" if self._output_state == "ON" else "0") + "\n"
+        return "0\n"
+
+    def read(self):
+        return self._visainstrument.read()
+
+    def write(self, msg):
+        return self._visainstrument.write(msg)
+
+    def query(self, msg):
+        return self._visainstrument.query(msg)
+
+    def get_parameters(self):
+        return {"power": self.get_power(), "if_freq": self.get_frequency()}
+
+    def set_parameters(self, parameters_dict):
+        keys = parameters_dict.keys()
+        if "power" in keys:
+            self.set_power(parameters_dict["power"])
+        if "freq" in keys:
+            self.set_frequency(parameters_dict["freq"])
+        if "frequencies" in keys:
+            freqs = parameters_dict["frequencies"]
+            self.set_freq_limits((freqs[0], freqs[-1]))
+            self.set_nop(len(freqs))
+        for key in ["sweep_trg_src", "InSweep_trg_src", "ext_trig_channel"]:
+            if key in keys:
+                self._sweep_parameters[key] = parameters_dict[key]
+                self.write(":TRIG:%s %s" % (key, parameters_dict[key]))
+
+    def set_output_state(self, output_state):
+        """
+        "ON" of "OFF"
+        """
+        self.write(":OUTput:STATe " + output_state)
+        self._output_state = output_state
+        self._lab.set_tone(self._address, state=output_state == "ON")
+
+    def get_output_state(self):
+        return self.query(":OUTput:STATe?")
+
+    def set_frequency(self, freq):
+        self.write(":SOURce:FREQuency:CW {0}HZ".format(freq))
+        self._frequency = freq
+        self._lab.set_tone(self._address, frequency=freq)
+
+    def get_frequency(self):
+        return float(self.query(":SOURce:FREQuency:CW?"))
+
+    def set_power(self, power_dBm):
+        if (power_dBm >= self.MIN_POWER) & (power_dBm <= self.MAX_POWER):
+            self.write(":SOURce:POWer {0}DBM".format(power_dBm))
+            self._power = power_dBm
+            self._lab.set_tone(self._address, power=power_dBm)
+        else:
+            print("Error: power must be between %i and %i dBm" %
+                  (self.MIN_POWER, self.MAX_POWER))
+
+    def get_power(self):
+        return float(self.query(":SOURce:POWer?"))
+
+    def set_freq_limits(self, freq_limits):
+        self.write(":FREQuency:STARt %f%s" % (freq_limits[0], "Hz"))
+        self.write(":FREQuency:STOP %f%s" % (freq_limits[-1], "Hz"))
+        self._freq_limits = (freq_limits[0], freq_limits[-1])
+
+    def set_nop(self, nop):
+        self.write(":SWEep:POINts %i" % nop)
+        self._nop = nop
+
+    def get_nop(self):
+        return self._nop
+
+    def use_internal_clock(self, is_clock_internal):
+        self.write(":SOURce:ROSCillator:SOURce:AUTO %s" %
+                   ("OFF" if is_clock_internal else "ON"))
+
+    def set_freq_mode_fixed(self):
+        self.write(":SOURce:FREQuency:MODE FIXed")
+
+    def set_power_mode_fixed(self):
+        self.write(":SOURce:POWer:MODE FIXed")
+
+    def send_sweep_trigger(self):
+        self.write("*TRG")
+
+
+class SimulatedEXG(SimulatedMXG):
+    MIN_POWER = -20
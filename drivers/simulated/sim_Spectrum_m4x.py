@@ -0,0 +1,309 @@
+"""
+Simulated counterpart of `drivers.Spectrum_m4x.SPCM`.
+
+The real driver loads the vendor library at import time, so the public
+interface (parameters, trigger delay and segment size arithmetic, data
+format of `measure()`) is reproduced here instead of being inherited.
+Returned traces are quantized in the same way the card does it: 8 bit
+samples in the standard modes, 16 or 32 bit sums in the averaging mode.
+"""
+import numpy as np
+
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.latency_model import LatencyModel, \
+    SimulatedVisaInstrument
+from lib2.Profiler import span
+
+
+class SimulatedCardError(Exception):
+    pass
+
+
+class SimulatedSPCM:
+    MODES = ["STANDARD", "MULTIPLE", "AVERAGING", "MULTIPLE_FIFO",
+             "UNDEFINED"]
+    TRIGGERS = ["AUTOTIG", "EXT0"]
+    MODEL_NAME = "M4X.2212-X4 (simulated)"
+    BASE_SAMPLE_RATE = 1250000000  # Hz
+    # PCIe streaming rate used to charge data transfer time, bytes per second
+    TRANSFER_RATE = 3.4e9
+
+    def __init__(self, path=b"SIM-M4X", lab=None, latency=None):
+        if isinstance(path, bytes):
+            path = path.decode()
+        self._lab = lab if lab is not None else SimulatedLab.get_default()
+        self._visainstrument = SimulatedVisaInstrument(
+            path, latency if latency is not None else LatencyModel())
+        self._samplerate = self.BASE_SAMPLE_RATE
+        self._oversampling = 1
+
+        self._segment_size = None
+        self._bufsize = 0
+        self._n_samples_to_drop_by_delay = 0
+        self._n_samples_to_drop_in_end = 0
+
+        self.channels = []
+        self.ch_amplitude = 0
+        self.dur_seg_ns = 0
+        self.dur_seg_samples = 0
+        self.decrease_segment_size_by = 0
+        self.n_avg = 0
+        self.n_seg = 0
+        self.delay_ns_desired = 0
+        self.delay_in_samples = 0
+        self.pretrigger_in_samples = 0
+        self.mode = "UNDEFINED"
+        self.trigger_source = "EXT0"
+        self._timeout = None
+        self._n_measurements = 0
+
+    def close(self):
+        self._visainstrument.close()
+
+    def set_parameters(self, parameters):
+        if isinstance(parameters, dict):
+            pars_dict = parameters
+        else:
+            pars_dict = parameters.__dict__
+
+        if "oversampling_factor" in pars_dict:
+            self.set_oversampling_factor(pars_dict["oversampling_factor"])
+        if "channels" in pars_dict:
+            self.channels = pars_dict["channels"]
+        if "ch_amplitude" in pars_dict:
+            self.ch_amplitude = pars_dict["ch_amplitude"]
+        if "dur_seg" in pars_dict:
+            self.dur_seg_ns = pars_dict["dur_seg"]
+            self.dur_seg_samples = \
+                self.dur_seg_ns * (1e-9 * self.get_sample_rate())
+        if "n_seg" in pars_dict:
+            self.n_seg = pars_dict["n_seg"]
+        if "pretrigger" in pars_dict:
+            pretrigger = pars_dict["pretrigger"]
+            if pretrigger % 32 != 0:
+                raise SimulatedCardError(
+                    f"Prettiger is not multiple of 32; "
+                    f"you requested {pretrigger}")
+            if pretrigger < 32:
+                raise SimulatedCardError(
+                    f"Pretrigger has to be at least 32 samples; "
+                    f"you requested {pretrigger}")
+            self.pretrigger_in_samples = pretrigger
+        if "mode" in pars_dict:
+            mode = pars_dict["mode"]
+            if mode in self.MODES:
+                self.mode = str(getattr(mode, "value", mode))
+            else:
+                raise ValueError(
+                    f"Underfined opeation mode; you requested {mode}")
+        if "n_avg" in pars_dict:
+            n_avg = pars_dict["n_avg"]
+            if self.mode == "AVERAGING" and n_avg < 4:
+                raise ValueError(
+                    f"Minimum number of averages: 4;"
+                    f"you requested n_avg = {n_avg} for `SPCM_MODE.AVERAGING`")
+            self.n_avg = n_avg
+        if "trig_source" in pars_dict:
+            trig_source = pars_dict["trig_source"]
+            if trig_source in self.TRIGGERS:
+                self.trigger_source = str(getattr(trig_source, "value",
+                                                  trig_source))
+            else:
+                raise ValueError(
+                    f"Underfined trigger source; you requested {trig_source}")
+        if "digitizer_delay" in pars_dict:
+            self.calc_and_set_trigger_delay(
+                pars_dict["digitizer_delay"],
+                pars_dict.get("include_pretrigger", True))
+
+        self.calc_segment_size()
+        if self.mode == "AVERAGING":
+            self.setup_averaging_mode()
+        elif self.mode != "UNDEFINED":
+            self._visainstrument.write("SETUP %s" % self.mode)
+
+    def set_timeout(self, timeout):
+        self._timeout = timeout
+
+    def set_trigger_delay(self, delay_in_samples):
+        self._visainstrument.write("SPC_TRIG_DELAY %i" % delay_in_samples)
+
+    def calc_and_set_trigger_delay(self, timedelay_ns,
+                                   include_pretrigger=True):
+        """
+        Same arithmetic as `SPCM.calc_and_set_trigger_delay`: the hardware
+        delay is rounded down to a multiple of 32 samples and the excess
+        samples are dropped in software.
+        """
+        self.delay_ns_desired = timedelay_ns
+        requested_delay_in_samples = \
+            timedelay_ns * (1e-9 * self.get_sample_rate())
+        if include_pretrigger:
+            requested_delay_in_samples += self.pretrigger_in_samples
+
+        self.delay_in_samples = int((requested_delay_in_samples // 32) * 32)
+        self._n_samples_to_drop_by_delay = \
+            int(requested_delay_in_samples - self.delay_in_samples) - 1
+        if self._n_samples_to_drop_by_delay < 0:
+            self._n_samples_to_drop_by_delay = 0
+        self.set_trigger_delay(self.delay_in_samples)
+
+    def calc_segment_size(self, dur_seg_ns=None, decrease_segment_size_by=0):
+        """
+        Same arithmetic as `SPCM.calc_segment_size`: the segment is extended
+        to the next multiple of 32 samples.
+        """
+        self.decrease_segment_size_by = decrease_segment_size_by
+        if decrease_segment_size_by % 32 != 0:
+            self.decrease_segment_size_by = \
+                (self.decrease_segment_size_by // 32 + 1) * 32
+
+        if dur_seg_ns is None:
+            dur_seg_ns = self.dur_seg_ns
+        else:
+            self.dur_seg_ns = dur_seg_ns
+
+        requested_segment_size_samples = \
+            dur_seg_ns / (1 / self.get_sample_rate() * 1e9) - \
+            self.decrease_segment_size_by
+        self._segment_size = int((requested_segment_size_samples // 32 + 1)
+                                 * 32)
+        self._n_samples_to_drop_in_end = \
+            int(self._segment_size - requested_segment_size_samples) - 1
+        self._bufsize = self.n_seg * self._segment_size * \
+                        self._bytes_per_sample() * len(self.channels)
+
+    def _bytes_per_sample(self):
+        if self.mode == "AVERAGING":
+            return 2 if self.n_avg <= 256 else 4
+        return 1
+
+    def get_segment_size(self):
+        return self._segment_size
+
+    def get_how_many_samples_to_drop_in_front(self):
+        return self._n_samples_to_drop_by_delay
+
+    def get_how_many_samples_to_drop_in_end(self):
+        return self._n_samples_to_drop_in_end
+
+    def set_oversampling_factor(self, factor):
+        allowed = [2 ** n for n in range(0, 19)]
+        if factor in allowed:
+            self._oversampling = factor
+            self._samplerate = self.BASE_SAMPLE_RATE // self._oversampling
+        else:
+            raise ValueError("This oversampling factor is not supported. "
+                             "Allowed factors are 1, 2, 4, 8, ..., 262144")
+
+    def get_sample_rate(self):
+        """
+        Returns
+        -------
+        samplerate : float
+            samplerate in Hz
+        """
+        return self._samplerate
+
+    def setup_averaging_mode(self, channels=None, ampl=None, num_segments=None,
+                             segment_size=None, pretrigger=None,
+                             num_averages=None):
+        if channels is not None:
+            self.channels = channels
+        if ampl is not None:
+            self.ch_amplitude = ampl
+        if num_segments is not None:
+            self.n_seg = num_segments
+        if segment_size is not None:
+            self._segment_size = segment_size
+        if num_averages is not None:
+            self.n_avg = num_averages
+        if self._segment_size % 32 != 0:
+            raise SimulatedCardError(f"Segment size must be a multiple of 32")
+        self.mode = "AVERAGING"
+
+        max_seg_size = (128 if self.n_avg <= 256 else 64) * 2 ** 10 / \
+                       len(self.channels)
+        if self._segment_size > max_seg_size:
+            raise SimulatedCardError(
+                f"Segment size {self._segment_size} exceeds maximal "
+                f"segment size {max_seg_size} for {len(self.channels)} "
+                f"channels in ABA mode")
+        self._visainstrument.write("SETUP AVERAGING")
+
+    def setup_current_mode(self, **kwargs):
+        if self.mode == "UNDEFINED":
+            raise Exception("bias Spectrum_m4x mode is not initialized\n"
+                            "default is: SPCM_MODE.UNDERFINED")
+        self.calc_segment_size()
+        if self.mode == "AVERAGING":
+            self.setup_averaging_mode(**kwargs)
+
+    def start_card(self):
+        self._visainstrument.write("M2CMD_CARD_START")
+
+    def stop_card(self):
+        self._visainstrument.write("M2CMD_CARD_STOP")
+
+    def reset_card(self):
+        self._visainstrument.write("M2CMD_CARD_RESET")
+
+    def is_ready(self):
+        return True
+
+    def _acquisition_time(self):
+        # `n_avg` triggers per segment, triggers come back to back
+        n_avg = self.n_avg if self.mode == "AVERAGING" else 1
+        n_seg = max(self.n_seg, 1)
+        return n_seg * n_avg * self._segment_size / self.get_sample_rate()
+
+    def obtain_data(self):
+        """
+        Returns raw data as the card would put it into the host buffer.
+        """
+        n_seg = max(self.n_seg, 1)
+        n_channels = len(self.channels)
+        traces = self._lab.get_readout_traces(
+            n_seg, self._segment_size, self.get_sample_rate(),
+            n_channels=n_channels,
+            n_avg=self.n_avg if self.mode == "AVERAGING" else 1,
+            start_time=(self.delay_in_samples - self.pretrigger_in_samples) /
+                       self.get_sample_rate())
+        lsb = self.ch_amplitude / 128
+        codes = np.clip(np.round(traces / lsb), -128, 127)
+        if self.mode == "AVERAGING":
+            dtype = np.int16 if self.n_avg <= 256 else np.int32
+            raw = (codes * self.n_avg).astype(dtype)
+        else:
+            raw = codes.astype(np.int8)
+
+        with span("dig.dma"):
+            self._visainstrument.latency.sleep(raw.nbytes /
+                                               self.TRANSFER_RATE)
+            self._visainstrument.transfer(raw.size)
+        return raw.reshape(-1)
+
+    def get_mv_per_code(self):
+        n_avg = self.n_avg if self.mode == "AVERAGING" else 1
+        return self.ch_amplitude / n_avg / 128
+
+    def measure(self, timeout=1000, raw=False):
+        """
+        Launches measurement and returns data, normalized to milivolts, or
+        the raw card codes.
+        Note:
+        Two channels A and B return data with samples intertwined with each
+        other, i.e. A0B0A1B1A2B2...ANBN
+        """
+        self.start_card()
+        with span("dig.wait"):
+            self._visainstrument.latency.wait_acquisition(
+                self._acquisition_time())
+        data = self.obtain_data()
+        self._n_measurements += 1
+        if raw:
+            return data
+        return data.astype(float) * self.get_mv_per_code()
+
+    def safe_measure(self, raw=False):
+        return self.measure(raw=raw)
@@ -0,0 +1,152 @@
+"""
+Simulated counterpart of the Yokogawa GS210 bias source.
+
+Implements both the `drivers.Yokogawa_GS210` interface (`set_current`,
+`set_voltage`, ...) and the unified `set(...)`/`get_bias_type()` interface
+used by the two-tone spectroscopy classes.
+"""
+from drivers.BiasType import BiasType
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.latency_model import LatencyModel, \
+    SimulatedVisaInstrument
+
+
+class SimulatedYokogawa_GS210:
+
+    current_ranges_supported = [.001, .01, .1, .2]
+    voltage_ranges_supported = [.01, .1, 1, 10, 30]
+
+    def __init__(self, address, volt_compliance=3, current_compliance=.01,
+                 lab=None, latency=None, load_resistance=1e3):
+        """
+        Parameters
+        ----------
+        load_resistance : float
+            resistance of the bias line in Ohms; used to convert voltage to
+            current flowing through the flux coil in the voltage source mode
+        """
+        self._address = address
+        self._lab = lab if lab is not None else SimulatedLab.get_default()
+        self._visainstrument = SimulatedVisaInstrument(
+            address, latency if latency is not None else LatencyModel(),
+            responder=self._respond)
+        self._load_resistance = load_resistance
+        self._mode = "CURR"
+        self._level = 0.
+        self._status = 1
+        self._range = .01
+        self._voltage_compliance = volt_compliance
+        self._current_compliance = current_compliance
+        self._apply()
+
+    def _respond(self, msg):
+        if msg == ":SOUR:FUNC?":
+            return self._mode + "\n"
+        if msg == "SOUR:LEVEL?":
+            return "%e\n" % self._level
+        if msg == "OUTP?":
+            return "%i\n" % self._status
+        if msg == "*OPC?":
+            return "1\n"
+        if msg == "*IDN?":
+            return "YOKOGAWA,GS210,SIMULATED,0.0\n"
+        return "0\n"
+
+    def _apply(self):
+        if not self._status:
+            self._lab.set_bias(0.)
+        elif self._mode == "CURR":
+            self._lab.set_bias(self._level)
+        else:
+            self._lab.set_bias(self._level / self._load_resistance)
+
+    def get_id(self):
+        return self._visainstrument.query("*IDN?")
+
+    def set_current(self, current):
+        if self._mode == "VOLT":
+            print("Tough luck, mode is voltage source, cannot set bias.")
+            return False
+        self._visainstrument.write("SOUR:LEVEL %e" % current)
+        self._visainstrument.query("*OPC?")
+        self._level = current
+        self._apply()
+
+    def get_current(self):
+        if self._mode == "VOLT":
+            print("Tough luck, mode is voltage source, cannot get bias.")
+            return False
+        return float(self._visainstrument.query("SOUR:LEVEL?"))
+
+    def set_voltage(self, voltage):
+        if self._mode == "CURR":
+            print("Tough luck, mode is bias source, cannot get voltage.")
+            return False
+        self._visainstrument.write("SOUR:LEVEL %e" % voltage)
+        self._level = voltage
+        self._apply()
+
+    def get_voltage(self):
+        if self._mode == "CURR":
+            print("Tough luck, mode is bias source, cannot get voltage.")
+            return False
+        return float(self._visainstrument.query("SOUR:LEVEL?"))
+
+    def set(self, parameter):
+        if self._mode == "CURR":
+            self.set_current(parameter)
+        else:
+            self.set_voltage(parameter)
+
+    def get_bias_type(self):
+        return BiasType.CURRENT if self._mode == "CURR" else BiasType.VOLTAGE
+
+    def set_status(self, status):
+        self._visainstrument.write("OUTP " + ("ON" if status == 1 else "OFF"))
+        self._status = status
+        self._apply()
+
+    def get_status(self):
+        return self._visainstrument.query("OUTP?")
+
+    def set_range(self, maxval):
+        self._visainstrument.write("SOUR:RANG %e" % maxval)
+        self._range = maxval
+
+    def get_range(self):
+        return self._range
+
+    def set_appropriate_range(self, maxcurrent=1E-3, mincurrent=-1E-3):
+        for current_range in self.current_ranges_supported:
+            if current_range >= max(abs(maxcurrent), abs(mincurrent)):
+                self.set_range(current_range)
+                return
+
+    def set_src_mode_volt(self, current_compliance=.001):
+        self._visainstrument.write(":SOUR:FUNC VOLT")
+        self._mode = "VOLT"
+        self._current_compliance = current_compliance
+        self._level = 0.
+        self._apply()
+
+    def set_src_mode_curr(self, voltage_compliance=1):
+        self._visainstrument.write(":SOUR:FUNC CURR")
+        self._mode = "CURR"
+        self._voltage_compliance = voltage_compliance
+        self._level = 0.
+        self._apply()
+
+    def set_voltage_compliance(self, compliance):
+        self._voltage_compliance = compliance
+
+    def get_voltage_compliance(self):
+        return self._voltage_compliance
+
+    def set_current_compliance(self, compliance):
+        self._current_compliance = compliance
+
+    def get_current_compliance(self):
+        return self._current_compliance
+
+    def clear(self):
+        self._visainstrument.write("*CLS")
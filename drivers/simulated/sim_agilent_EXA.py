@@ -0,0 +1,236 @@
+"""
+Simulated counterpart of `drivers.agilent_EXA.Agilent_EXA_N9010A`.
+
+The analyzer observes the output of the IQ mixer modelled by a
+`SimulatedLab`, both in the swept SA mode and in the list sweep mode used by
+the mixer calibrators.
+"""
+import numpy as np
+
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.latency_model import LatencyModel, \
+    SimulatedVisaInstrument
+
+
+class SimulatedEXA:
+
+    def __init__(self, address, channel_index=1, lab=None, latency=None):
+        self._address = address
+        self._ci = channel_index
+        self._lab = lab if lab is not None else SimulatedLab.get_default()
+        self._visainstrument = SimulatedVisaInstrument(
+            address, latency if latency is not None else LatencyModel(),
+            responder=self._respond)
+
+        self._start = 5e9 - 0.5e9
+        self._stop = 5e9 + 0.5e9
+        self._nop = 1001
+        self._bandwidth = 1e6
+        self._video_bandwidth = 1e6
+        self._averages = 1
+        self._average = False
+        self._continuous = True
+        self._list_sweep = False
+        self._list_frequencies = []
+        self._list_rbws = []
+        self._n_list_sweeps = 1
+        self._tracedata = None
+
+    def _respond(self, msg):
+        if msg == "*STB?":
+            return "%i\n" % 2 ** 5
+        return "0\n"
+
+    """ Acquisition """
+
+    def _get_points(self):
+        if self._list_sweep:
+            return np.asarray(self._list_frequencies, dtype=float), \
+                   np.asarray(self._list_rbws, dtype=float)
+        return self.get_freqpoints(), self._bandwidth
+
+    def init(self):
+        self._visainstrument.write('INIT1')
+        frequencies, rbws = self._get_points()
+        self._tracedata = self._lab.get_spectrum(frequencies, rbws)
+
+    def sweep_single(self):
+        self.init()
+
+    def prepare_for_stb(self):
+        self._visainstrument.write("*CLS")
+        self._visainstrument.write("*ESE 1")
+        return "OPC bit enabled (*ESE 1)."
+
+    def wait_for_stb(self):
+        self._visainstrument.write("*OPC")
+        self._visainstrument.latency.wait_acquisition(self.get_sweep_time() /
+                                                      1e3)
+        self._visainstrument.query("*STB?")
+
+    def get_tracedata(self):
+        if self._tracedata is None:
+            self.init()
+        n_points = len(self._tracedata) if self._list_sweep \
+            else 2 * len(self._tracedata)
+        self._visainstrument.transfer(n_points)
+        return self._tracedata.copy()
+
+    def start_list_sweep(self):
+        self._n_list_sweeps = self._averages if self._average else 1
+        for i in range(self._n_list_sweeps - 1):
+            self._visainstrument.write(":INIT1")
+        self._visainstrument.write(":INIT1;*OPC?")
+        frequencies, rbws = self._get_points()
+        self._tracedata = self._lab.get_spectrum(frequencies, rbws)
+
+    def get_list_sweep_data(self):
+        self._visainstrument.latency.wait_acquisition(
+            self.get_sweep_time() * self._n_list_sweeps / 1e3)
+        self._visainstrument.read()
+        self._visainstrument.transfer(len(self._tracedata))
+        return self._tracedata.copy()
+
+    def make_sweep_get_data(self):
+        self.prepare_for_stb()
+        self.sweep_single()
+        self.wait_for_stb()
+        return self.get_tracedata()
+
+    def get_freqpoints(self):
+        self._freqpoints = np.linspace(self._start, self._stop, self._nop)
+        return self._freqpoints
+
+    def get_sweep_time(self):
+        """
+        Returns
+        -------
+        sweep_time : float
+            time in ms needed for a single sweep
+        """
+        if self._list_sweep:
+            # 1 ms per point is set in `setup_list_sweep`
+            return len(self._list_frequencies) * 1
+        # swept SA: span / rbw^2 with the usual k = 2.5 shape factor
+        span = max(self._stop - self._start, self._bandwidth)
+        return max(2.5 * span / self._bandwidth ** 2 * 1e3, 1)
+
+    def setup_list_sweep(self, frequency_list, rbw_list, vbw_list=None):
+        self._visainstrument.write(":CONFigure:LIST")
+        self._list_sweep = True
+        frequency_list = list(frequency_list)
+        rbw_list = list(rbw_list)
+        if len(rbw_list) < len(frequency_list):
+            # the analyzer pads the list with its last value
+            rbw_list += [rbw_list[-1]] * (len(frequency_list) - len(rbw_list))
+        self._list_frequencies = frequency_list
+        self._list_rbws = rbw_list[:len(frequency_list)]
+        self._visainstrument.write(":LIST:FREQ")
+        self._visainstrument.write(":LIST:BAND:RES")
+        if vbw_list is not None:
+            self._visainstrument.write(":LIST:BAND:VID")
+        self._visainstrument.write(":LIST:SWEep:TIME")
+        self._visainstrument.write(":FORMat:DATA REAL,32")
+        self._visainstrument.write(":FORMat:BORDer SWAP")
+
+    def setup_swept_sa(self, center_freq=5e9, span=1e9, nop=1001, rbw=1e6):
+        self._visainstrument.write(":CONFigure:SAN")
+        self._list_sweep = False
+        self.set_centerfreq(center_freq)
+        self.set_span(span)
+        self.set_nop(nop)
+        self.set_bandwidth(rbw)
+
+    """ Parameters """
+
+    def get_parameters(self):
+        return {"bandwidth": self.get_bandwidth(),
+                "nop": self.get_nop(),
+                "centerfreq": self.get_centerfreq(),
+                "span": self.get_span(),
+                "avs": self.get_averages(),
+                "av_status": self.get_average()}
+
+    def set_parameters(self, pars_dict):
+        keys = pars_dict.keys()
+        if "bandwidth" in keys: self.set_bandwidth(pars_dict["bandwidth"])
+        if "nop" in keys: self.set_nop(pars_dict["nop"])
+        if "centerfreq" in keys: self.set_centerfreq(pars_dict["centerfreq"])
+        if "span" in keys: self.set_span(pars_dict["span"])
+        if "averages" in keys: self.set_averages(pars_dict["averages"])
+        if "avg_status" in keys: self.set_average(pars_dict["avg_status"])
+
+    def set_continuous(self, ON=True):
+        self._visainstrument.write("INITiate:CONTinuous %s" %
+                                   ("ON" if ON else "Off"))
+        self._continuous = ON
+
+    def set_xlim(self, start, stop):
+        self._visainstrument.write('SENS%i:FREQ:STAR %f' % (self._ci, start))
+        self._visainstrument.write('SENS%i:FREQ:STOP %f' % (self._ci, stop))
+        self._start, self._stop = start, stop
+
+    def get_xlim(self):
+        return self._start, self._stop
+
+    def set_centerfreq(self, centerfreq):
+        span = self._stop - self._start
+        self.set_xlim(centerfreq - span / 2, centerfreq + span / 2)
+
+    def get_centerfreq(self):
+        return (self._start + self._stop) / 2
+
+    def set_span(self, span):
+        center = self.get_centerfreq()
+        self.set_xlim(center - span / 2, center + span / 2)
+
+    def get_span(self):
+        return self._stop - self._start
+
+    def set_nop(self, nop):
+        self._visainstrument.write(':SENS%i:SWE:POIN %i' % (self._ci, nop))
+        self._nop = int(nop)
+
+    def get_nop(self):
+        return self._nop
+
+    def set_bandwidth(self, band):
+        self._visainstrument.write('SENS%i:BWID:RES %i' % (self._ci, band))
+        self._bandwidth = band
+
+    def get_bandwidth(self):
+        return self._bandwidth
+
+    def set_video_bandwidth(self, band):
+        self._visainstrument.write('SENS%i:BWID:VID %i' % (self._ci, band))
+        self._video_bandwidth = band
+
+    def get_video_bandwidth(self):
+        return self._video_bandwidth
+
+    def set_averages(self, av):
+        self._visainstrument.write('SENS%i:AVER:COUN %i' % (self._ci, av))
+        self._averages = int(av)
+
+    def get_averages(self):
+        return self._averages
+
+    def set_average(self, status):
+        self._visainstrument.write('SENS%i:AVER:STAT %s' %
+                                   (self._ci, "ON" if status else "OFF"))
+        self._average = bool(status)
+
+    def get_average(self):
+        return self._average
+
+    def avg_clear(self):
+        self._visainstrument.write(':SENS%i:AVER:CLE' % self._ci)
+
+    def read(self):
+        return self._visainstrument.read()
+
+    def write(self, msg):
+        return self._visainstrument.write(msg)
+
+    def query(self, msg):
+        return self._visainstrument.query(msg)
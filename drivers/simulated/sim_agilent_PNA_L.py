@@ -0,0 +1,271 @@
+"""
+Simulated counterpart of `drivers.agilent_PNA_L.Agilent_PNA_L`.
+
+The VNA probes the readout resonator of a `SimulatedLab`. The lab state
+(bias, CW tones) is captured at `sweep_single()`, the acquisition time
+(nop / bandwidth * averages) is waited in `wait_for_stb()` according to the
+latency model and the trace transfer is charged in `get_sdata()`.
+"""
+import numpy as np
+
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.latency_model import LatencyModel, \
+    SimulatedVisaInstrument
+
+
+class SimulatedPNA_L:
+
+    def __init__(self, address, channel_index=1, lab=None, latency=None):
+        self._address = address
+        self._ci = channel_index
+        self._lab = lab if lab is not None else SimulatedLab.get_default()
+        self._visainstrument = SimulatedVisaInstrument(
+            address, latency if latency is not None else LatencyModel(),
+            responder=self._respond)
+
+        self._start = 7e9
+        self._stop = 8e9
+        self._nop = 201
+        self._bandwidth = 1e3
+        self._averages = 1
+        self._average = False
+        self._power = -20
+        self._sweep_type = "LIN"
+        self._output_state = "ON"
+        self._electrical_delay = 0
+        self._trigger_source = "IMM"
+        self._s_parameter = "S21"
+        self._trigger_parameters = {}
+        self._sdata = None
+
+    def _respond(self, msg):
+        if msg == "*OPC?":
+            return "1\n"
+        return "0\n"
+
+    """ Acquisition """
+
+    def avg_clear(self):
+        self._visainstrument.write(':SENS%i:AVER:CLE' % self._ci)
+
+    def prepare_for_stb(self):
+        self._visainstrument.write("*CLS")
+        self._visainstrument.write("*ESE 1")
+        return "OPC bit enabled (*ESE 1)."
+
+    def sweep_single(self):
+        self._visainstrument.write("INIT%i" % self._ci)
+        if self._output_state == "OFF":
+            self._sdata = np.zeros(self._nop, dtype=complex)
+        else:
+            self._sdata = self._lab.measure_s21(self.get_frequencies(),
+                                                self._bandwidth,
+                                                self._averages)
+
+    def wait_for_stb(self):
+        self._visainstrument.write("*OPC")
+        self._visainstrument.latency.wait_acquisition(self.get_sweep_time() /
+                                                      1e3)
+
+    def get_sdata(self):
+        if self._sdata is None:
+            self.sweep_single()
+        self._visainstrument.transfer(2 * self._nop)
+        return self._sdata.copy()
+
+    def get_tracedata(self, format="RAW"):
+        data = self.get_sdata()
+        if format.upper() == "RAW":
+            return data
+        if format.upper() == "REALIMAG":
+            return np.real(data), np.imag(data)
+        elif format.upper() == "AMPPHA":
+            return np.abs(data), np.angle(data)
+        else:
+            raise ValueError('get_tracedata(): Format must be AmpPha or '
+                             'RealImag')
+
+    def measure_and_get_data(self, data_format="RAW"):
+        self.prepare_for_stb()
+        self.sweep_single()
+        self.wait_for_stb()
+        return self.get_tracedata(format=data_format)
+
+    def get_frequencies(self, query=False):
+        return np.linspace(self._start, self._stop, self._nop)
+
+    def get_freqpoints(self, query=False):
+        return self.get_frequencies()
+
+    def get_sweep_time(self):
+        """
+        Returns
+        -------
+        sweep_time : float
+            time in ms needed for one sweep with current settings
+        """
+        averages = self._averages if self._average else 1
+        return self._nop / self._bandwidth * averages * 1e3
+
+    """ Parameters """
+
+    def get_parameters(self):
+        return {"bandwidth": self.get_bandwidth(),
+                "nop": self.get_nop(),
+                "sweep_type": self.get_sweep_type(),
+                "power": self.get_power(),
+                "averages": self.get_averages(),
+                "freq_limits": self.get_freq_limits()}
+
+    def set_parameters(self, parameters_dict):
+        if "bandwidth" in parameters_dict.keys():
+            self.set_bandwidth(parameters_dict["bandwidth"])
+        if "averages" in parameters_dict.keys():
+            self.set_averages(parameters_dict["averages"])
+        if "power" in parameters_dict.keys():
+            self.set_power(parameters_dict["power"])
+        if "nop" in parameters_dict.keys():
+            self.set_nop(parameters_dict["nop"])
+        if "freq_limits" in parameters_dict.keys():
+            if parameters_dict.get("sweep_type") == "CW":
+                self.set_cw_time(np.mean(parameters_dict["freq_limits"]))
+            else:
+                self.set_freq_limits(*parameters_dict["freq_limits"])
+        if "span" in parameters_dict.keys():
+            self.set_span(parameters_dict["span"])
+        if "centerfreq" in parameters_dict.keys():
+            self.set_centerfreq(parameters_dict["centerfreq"])
+        if "sweep_type" in parameters_dict.keys():
+            self.set_sweep_type(parameters_dict["sweep_type"])
+        for key in ["aux_num", "trigger_source", "trig_per_point", "pos",
+                    "bef", "trig_dur"]:
+            if key in parameters_dict.keys():
+                self._trigger_parameters[key] = parameters_dict[key]
+                self._visainstrument.write("TRIG:%s" % key)
+
+    def set_freq_limits(self, start, stop):
+        self._visainstrument.write('SENS%i:FREQ:STAR %f' % (self._ci, start))
+        self._visainstrument.write('SENS%i:FREQ:STOP %f' % (self._ci, stop))
+        self._start, self._stop = start, stop
+
+    def get_freq_limits(self):
+        return self._start, self._stop
+
+    def set_xlim(self, start, stop):
+        self.set_freq_limits(start, stop)
+
+    def get_xlim(self):
+        return self.get_freq_limits()
+
+    def set_nop(self, nop):
+        self._visainstrument.write('SENS%i:SWE:POIN %i' % (self._ci, nop))
+        self._nop = int(nop)
+
+    def get_nop(self):
+        return self._nop
+
+    def set_bandwidth(self, bandwidth):
+        self._visainstrument.write('SENS%i:BWID:RES %i' % (self._ci,
+                                                           bandwidth))
+        self._bandwidth = bandwidth
+
+    def get_bandwidth(self):
+        return self._bandwidth
+
+    def set_averages(self, averages, mode="SWEEP"):
+        self._visainstrument.write('SENS%i:AVER:COUN %i' % (self._ci,
+                                                            averages))
+        self._averages = int(averages)
+        self.set_average(self._averages > 1)
+
+    def get_averages(self):
+        return self._averages
+
+    def set_average(self, status):
+        self._visainstrument.write('SENS%i:AVER:STAT %s' %
+                                   (self._ci, "ON" if status else "OFF"))
+        self._average = bool(status)
+
+    def get_average(self):
+        return self._average
+
+    def set_power(self, power):
+        self._visainstrument.write('SOUR%i:POW1 %.1f' % (self._ci, power))
+        self._power = power
+
+    def get_power(self):
+        return self._power
+
+    def set_centerfreq(self, centerfreq):
+        span = self._stop - self._start
+        self.set_freq_limits(centerfreq - span / 2, centerfreq + span / 2)
+
+    def get_centerfreq(self):
+        return (self._start + self._stop) / 2
+
+    def set_span(self, span):
+        center = self.get_centerfreq()
+        self.set_freq_limits(center - span / 2, center + span / 2)
+
+    def get_span(self):
+        return self._stop - self._start
+
+    def set_sweep_type(self, sweep_type="LIN"):
+        self._visainstrument.write("SENS:SWE:TYPE %s" % sweep_type)
+        self._sweep_type = sweep_type
+
+    def get_sweep_type(self):
+        return self._sweep_type
+
+    def set_cw_time(self, frequency, sweep_time=0):
+        self.set_sweep_type("CW")
+        self.set_freq_limits(frequency, frequency)
+
+    def set_frequency(self, frequency):
+        self.set_centerfreq(frequency)
+
+    def set_trigger_source(self, source):
+        self._visainstrument.write("TRIG:SOUR %s" % source)
+        self._trigger_source = source
+
+    def get_trigger_source(self):
+        return self._trigger_source
+
+    def send_software_trigger(self):
+        self.sweep_single()
+
+    def set_electrical_delay(self, delay):
+        self._visainstrument.write("CALC%i:CORR:EDEL:TIME %e" %
+                                   (self._ci, delay))
+        self._electrical_delay = delay
+
+    def get_electrical_delay(self):
+        return self._electrical_delay
+
+    def select_S_param(self, S_param):
+        self._s_parameter = S_param
+
+    def set_output_state(self, state):
+        available_states = {'ON', 'OFF'}
+        if state not in available_states:
+            raise ValueError("state must be 'ON' or 'OFF'")
+        self._visainstrument.write("OUTP {}".format(state))
+        self._output_state = state
+
+    def sweep_hold(self):
+        self._visainstrument.write("SENS%i:SWE:MODE HOLD" % self._ci)
+
+    def sweep_continuous(self):
+        self._visainstrument.write("SENS%i:SWE:MODE CONT" % self._ci)
+
+    def autoscale_all(self):
+        self._visainstrument.write("DISP:WIND:TRAC:Y:AUTO")
+
+    def read(self):
+        return self._visainstrument.read()
+
+    def write(self, msg):
+        return self._visainstrument.write(msg)
+
+    def query(self, msg):
+        return self._visainstrument.query(msg)
@@ -0,0 +1,202 @@
+"""
+Simulated counterpart of `drivers.keysightM3202A.KeysightM3202A`.
+
+Channel outputs are reported to a `SimulatedLab` where channels
+`lab.mixer_channels` drive the I and Q ports of the simulated mixer.
+"""
+import numpy as np
+
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.latency_model import LatencyModel, \
+    SimulatedVisaInstrument
+from lib2.Profiler import span
+from lib2.dac import quantize, resample_periodic, to_volts
+
+
+class SimulatedM3202A:
+    MAX_OUTPUT_VOLTAGE = 1.5  # V
+    VOLTAGE_RESOLUTION_BITS = 12
+    MIN_SAMPLE_PERIOD = 1  # ns
+    DAC_MAX_CODE = 32767
+    # PXIe waveform upload rate, bytes per second
+    UPLOAD_RATE = 1e9
+
+    def __init__(self, awg_alias, slot=0, chassis=0,
+                 allow_unmatched_waveforms=True, lab=None, latency=None):
+        self.alias = awg_alias
+        self._lab = lab if lab is not None else SimulatedLab.get_default()
+        self._visainstrument = SimulatedVisaInstrument(
+            awg_alias, latency if latency is not None else LatencyModel())
+
+        self.waveforms = [None] * 4
+        self.repetition_frequencies = [None] * 4
+        self.output_voltages = [None] * 4
+        self.deviation_gains = [0.0] * 4
+        self.running = [False] * 4
+        self.synchronized_channels = None
+        self.trigger_length = 100  # ns
+        self._prescaler = 0
+        self._allow_unmatched_waveforms = allow_unmatched_waveforms
+
+        self.reset()
+
+    def get_voltage_range(self):
+        return [-1.5, 1.5]
+
+    def reset(self, channels=None):
+        if channels is None:
+            channels = [1, 2, 3, 4]
+        for channel in channels:
+            self._visainstrument.write("AWGflush %i" % (channel - 1))
+            self.waveforms[channel - 1] = None
+            self.repetition_frequencies[channel - 1] = None
+            self.running[channel - 1] = False
+            self._lab.set_awg_channel(self.alias, channel, mode="fg",
+                                      frequency=0, amplitude=0, phase=0,
+                                      offset=0)
+
+    def synchronize_channels(self, *channels):
+        self.synchronized_channels = channels
+
+    def unsynchronize_channels(self):
+        self.synchronized_channels = None
+
+    def set_trigger(self, trigger_string="CONT", channel=-1):
+        self._visainstrument.write("TRIG %s %i" % (trigger_string, channel))
+
+    def trigger_output_config(self, trig_mode="ON", channel=-1,
+                              trig_length=100, **kwargs):
+        self.trigger_length = trig_length
+        self._visainstrument.write("TRIG:OUT %s %i" % (trig_mode, channel))
+
+    def output_arbitrary_waveform(self, waveform, frequency, channel,
+                                  full_scale=None):
+        waveform_duration = np.round(1 / frequency * 1e9)
+        if waveform_duration % 100 != 0:
+            raise ValueError("Duration of the waveform must be a "
+                             "multiple of 100 ns, because the "
+                             "bias trigger is synchronized with "
+                             "PXI clock and therefore sampled with "
+                             "10 MHz. Not following this requirement "
+                             "leads to uncertainty of the trigger "
+                             "pulse position relative to the waveform")
+        self.stop_AWG(channel)
+        if not self._allow_unmatched_waveforms:
+            to_clear = [idx + 1 for idx, existing_freq in
+                        enumerate(self.repetition_frequencies)
+                        if idx != channel - 1 and existing_freq is not None
+                        and existing_freq != frequency]
+            self.reset(to_clear)
+        self.load_waveform_to_channel(waveform, frequency, channel,
+                                      full_scale)
+        self.start_AWG(channel)
+
+    def output_continuous_wave(self, frequency, amplitude, phase, offset,
+                               waveform_resolution,
+                               channel, asynchronous=False,
+                               trigger_sync_every=None):
+        self.stop_AWG(channel)
+        self.setup_fg_sine(frequency, amplitude, phase, offset, channel)
+        if trigger_sync_every is not None:
+            self.trigger_output_config(trig_mode="ON", channel=channel,
+                                       trig_length=self.trigger_length)
+        self.start_AWG(channel)
+
+    def setup_fg_sine(self, frequency, amplitude, phase, offset, channel):
+        self._visainstrument.write("channelWaveShape %i" % (channel - 1))
+        self._visainstrument.write("channelAmplitude %i" % (channel - 1))
+        self._visainstrument.write("channelFrequency %i" % (channel - 1))
+        self._visainstrument.write("channelPhase %i" % (channel - 1))
+        self._visainstrument.write("channelOffset %i" % (channel - 1))
+        self.output_voltages[channel - 1] = amplitude
+        self.repetition_frequencies[channel - 1] = None
+        self._lab.set_awg_channel(self.alias, channel, mode="fg",
+                                  frequency=frequency, amplitude=amplitude,
+                                  phase=phase, offset=offset)
+
+    def setup_modulation_amp(self, channel, deviation_gain):
+        self.deviation_gains[channel - 1] = deviation_gain
+        self._visainstrument.write("modulationAmplitudeConfig %i" %
+                                   (channel - 1))
+
+    def stop_modulation(self, channel):
+        self.deviation_gains[channel - 1] = 0.0
+
+    def get_sample_rate(self):
+        """
+        Returns
+        -------
+        sample_rate : int
+            Returns bias AWG's sample rate in Hz.
+        """
+        if self._prescaler == 0:
+            return int(1e9)
+        elif self._prescaler == 1:
+            return int(2e8)
+        return int(100 / self._prescaler * 1e6)
+
+    def get_sample_period(self):
+        """
+        Returns
+        -------
+        sample_period : float
+            Sample period in nanoseconds
+        """
+        if self._prescaler == 0:
+            return 1
+        elif self._prescaler == 1:
+            return 5
+        return 10 * self._prescaler
+
+    def load_waveform_to_channel(self, waveform, frequency, channel,
+                                 full_scale=None):
+        waveform = np.asarray(waveform)
+        if full_scale is not None:
+            if full_scale > self.MAX_OUTPUT_VOLTAGE:
+                raise ValueError("Trace maximal amplitude is exceeding AWG "
+                                 "range: (-1.5 ; 1.5) volts")
+        elif np.max(np.abs(waveform)) > 1.5:
+            raise ValueError("Trace maximal amplitude is exceeding AWG "
+                             "range: (-1.5 ; 1.5) volts")
+        if frequency > 1e9:
+            raise ValueError("if_freq is exceeding AWG sampling rate: 1 GHz")
+
+        duration = 1 / frequency * 1e9 if frequency != 0 else 10.0  # ns
+        n_points = int(np.round(duration / self.get_sample_period()))
+        if n_points != len(waveform):
+            if full_scale is not None and \
+                    np.issubdtype(waveform.dtype, np.integer):
+                waveform = quantize(
+                    resample_periodic(waveform, n_points), self.DAC_MAX_CODE,
+                    waveform.dtype, self.DAC_MAX_CODE)
+            else:
+                waveform = resample_periodic(waveform, n_points)
+        if full_scale is not None:
+            waveform = to_volts(waveform, full_scale, self.DAC_MAX_CODE
+                                if np.issubdtype(waveform.dtype, np.integer)
+                                else 1.)
+        waveform = np.asarray(waveform, dtype=float)
+
+        # 12 bit DAC grid
+        lsb = 2 * self.MAX_OUTPUT_VOLTAGE / 2 ** self.VOLTAGE_RESOLUTION_BITS
+        waveform = np.round(waveform / lsb) * lsb
+
+        with span("awg.upload"):
+            self._visainstrument.latency.sleep(waveform.size * 2 /
+                                               self.UPLOAD_RATE)
+            self._visainstrument.transfer(waveform.size)
+        self.waveforms[channel - 1] = waveform
+        self.output_voltages[channel - 1] = np.max(np.abs(waveform))
+        self.repetition_frequencies[channel - 1] = frequency
+        self._prescaler = 0
+        self._lab.set_awg_channel(self.alias, channel, mode="awg",
+                                  waveform=waveform,
+                                  sample_period=self.get_sample_period())
+
+    def start_AWG(self, channel):
+        self._visainstrument.write("AWGstart %i" % (channel - 1))
+        self.running[channel - 1] = True
+
+    def stop_AWG(self, channel):
+        self._visainstrument.write("AWGstop %i" % (channel - 1))
+        self.running[channel - 1] = False
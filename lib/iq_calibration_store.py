@@ -0,0 +1,378 @@
+"""
+Append-only store of IQ mixer calibrations with an index over the radiation
+parameters.
+
+Calibrations of a mixer are kept in a single file as a sequence of
+length-prefixed pickled records. A new calibration is one `os.write` of a
+record to the end of the file, so an interrupted write can only damage the
+last record. It is skipped on loading and cut off before the next record is
+appended, the records are found by their lengths only. A record for the same parameters
+supersedes the older ones; `compact()` rewrites the file without them.
+
+In memory calibrations are grouped by everything except the LO frequency
+(iq_attenuation, if_frequency, lo_power, ssb_power, sideband_to_maintain,
+waveform_resolution), and every group keeps its LO frequencies sorted, so
+that exact, nearest and neighbour lookups are binary searches. The numeric
+parameters are rounded to `KEY_DECIMALS` decimals, so that values that
+differ by a floating point error are the same key.
+
+Saving a calibration does not need the store in memory: `append_calibration`
+only appends the record to the file.
+"""
+import os
+import pickle as pkl
+import struct
+from bisect import bisect_left, insort
+
+import numpy as np
+
+_RECORD_HEADER = struct.Struct("<Q")
+# Hz, dBm, ns and dB are all resolved far below 1e-6
+KEY_DECIMALS = 6
+DEFAULT_DIRECTORY = os.path.join("data", "IQMXCalibration")
+
+
+def _rounded(value):
+    if isinstance(value, str):
+        return value
+    return round(float(value), KEY_DECIMALS)
+
+
+def _group_key(iq_attenuation, if_frequency, lo_power, ssb_power,
+               sideband_to_maintain, waveform_resolution):
+    return (_rounded(iq_attenuation), _rounded(if_frequency),
+            _rounded(lo_power), _rounded(ssb_power), sideband_to_maintain,
+            _rounded(waveform_resolution))
+
+
+def _calibration_keys(calibration):
+    radiation = calibration.get_radiation_parameters()
+    group = _group_key(calibration.get_mixer_parameters()["iq_attenuation"],
+                       radiation["if_frequency"], radiation["lo_power"],
+                       radiation["ssb_power"],
+                       radiation["sideband_to_maintain"],
+                       radiation["waveform_resolution"])
+    return group, _rounded(radiation["lo_frequency"])
+
+
+def _store_path(mixer_id, directory):
+    return os.path.join(directory, mixer_id + IQCalibrationStore.EXTENSION)
+
+
+def _legacy_path(mixer_id, directory):
+    return os.path.join(directory, mixer_id + ".pkl")
+
+
+def _complete_length(f):
+    """
+    Bytes of the file taken by complete records, found by the headers
+    without reading the records
+    """
+    size = f.seek(0, os.SEEK_END)
+    position = 0
+    while position + _RECORD_HEADER.size <= size:
+        f.seek(position)
+        record_size, = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+        if position + _RECORD_HEADER.size + record_size > size:
+            break
+        position += _RECORD_HEADER.size + record_size
+    return position, size
+
+
+def _append_record(path, calibration):
+    payload = pkl.dumps(calibration)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        end, size = _complete_length(f)
+        if end < size:
+            # the record would not be found after an incomplete one
+            f.truncate(end)
+        f.write(_RECORD_HEADER.pack(len(payload)) + payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def append_calibration(calibration, directory=DEFAULT_DIRECTORY):
+    """
+    Appends a calibration to the store file of its mixer without loading
+    the store. Only the first save of a mixer with a legacy database loads
+    it, to import the legacy calibrations.
+    """
+    mixer_id = calibration.get_mixer_parameters()["mixer_id"]
+    path = _store_path(mixer_id, directory)
+    if not os.path.exists(path) and \
+            os.path.exists(_legacy_path(mixer_id, directory)):
+        IQCalibrationStore(mixer_id, directory).add(calibration)
+    else:
+        _append_record(path, calibration)
+
+
+def _rescale_to_ssb_power(calibration, ssb_power):
+    """
+    The maintained sideband power scales as the square of the IF amplitudes
+    """
+    calibration = calibration.copy()
+    calibration._if_amplitudes = calibration._if_amplitudes * \
+        10 ** ((ssb_power - calibration._ssb_power) / 20)
+    calibration._ssb_power = ssb_power
+    return calibration
+
+
+class _CalibrationGroup:
+    """
+    Calibrations that differ only by the LO frequency
+    """
+
+    def __init__(self):
+        self.lo_frequencies = []
+        self.calibrations = {}
+
+    def __len__(self):
+        return len(self.lo_frequencies)
+
+    def add(self, lo_frequency, calibration):
+        if lo_frequency not in self.calibrations:
+            insort(self.lo_frequencies, lo_frequency)
+        self.calibrations[lo_frequency] = calibration
+
+    def neighbours(self, lo_frequency):
+        """
+        Returns
+        -------
+        left, right : float or None
+            closest LO frequencies below (or equal) and above the requested
+        """
+        idx = bisect_left(self.lo_frequencies, lo_frequency)
+        if idx < len(self.lo_frequencies) and \
+                self.lo_frequencies[idx] == lo_frequency:
+            return lo_frequency, lo_frequency
+        left = self.lo_frequencies[idx - 1] if idx > 0 else None
+        right = self.lo_frequencies[idx] \
+            if idx < len(self.lo_frequencies) else None
+        return left, right
+
+
+class IQCalibrationStore:
+    """
+    Calibrations of a single mixer.
+
+    Parameters
+    ----------
+    mixer_id : str
+        name of the mixer, also the name of the store file
+    directory : str
+        folder of the store file; a legacy "<mixer_id>.pkl" database in the
+        same folder is imported when the store file does not exist yet
+    """
+    EXTENSION = ".calstore"
+
+    def __init__(self, mixer_id, directory=DEFAULT_DIRECTORY):
+        self._mixer_id = mixer_id
+        self._directory = directory
+        self._path = _store_path(mixer_id, directory)
+        self._groups = {}
+        self._n_records = 0
+
+        if os.path.exists(self._path):
+            self._load()
+        else:
+            legacy_path = _legacy_path(mixer_id, directory)
+            if os.path.exists(legacy_path):
+                self.import_legacy_database(legacy_path)
+
+    def __len__(self):
+        return sum(len(group) for group in self._groups.values())
+
+    def get_path(self):
+        return self._path
+
+    """ Writing """
+
+    def add(self, calibration):
+        """
+        Appends a calibration to the store file and indexes it
+        """
+        _append_record(self._path, calibration)
+        self._n_records += 1
+        self._index(calibration)
+
+    def compact(self):
+        """
+        Rewrites the store file without superseded records. The new file
+        replaces the old one atomically.
+        """
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for calibration in self.get_all():
+                payload = pkl.dumps(calibration)
+                f.write(_RECORD_HEADER.pack(len(payload)) + payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+        self._n_records = len(self)
+
+    def import_legacy_database(self, path):
+        """
+        Imports a database written by `save_IQMX_calibration`:
+        {iq_attenuation: {frozenset(radiation_parameters): calibration}}
+        """
+        with open(path, "rb") as f:
+            known_cal_data = pkl.load(f)
+        for calibrations in known_cal_data.values():
+            for calibration in calibrations.values():
+                self.add(calibration)
+
+    def _load(self):
+        with open(self._path, "rb") as f:
+            data = f.read()
+        position = 0
+        while position + _RECORD_HEADER.size <= len(data):
+            size, = _RECORD_HEADER.unpack_from(data, position)
+            start = position + _RECORD_HEADER.size
+            if start + size > len(data):
+                break
+            self._index(pkl.loads(data[start:start + size]))
+            self._n_records += 1
+            position = start + size
+        if position < len(data):
+            print("IQCalibrationStore: incomplete last record in %s is "
+                  "ignored" % self._path)
+
+    def _index(self, calibration):
+        group, lo_frequency = _calibration_keys(calibration)
+        if group not in self._groups:
+            self._groups[group] = _CalibrationGroup()
+        self._groups[group].add(lo_frequency, calibration)
+
+    """ Reading """
+
+    def get_all(self, iq_attenuation=None):
+        return [calibration
+                for group_key, group in self._groups.items()
+                if iq_attenuation is None or group_key[0] == iq_attenuation
+                for calibration in group.calibrations.values()]
+
+    def as_legacy_database(self, iq_attenuation):
+        """
+        Returns
+        -------
+        database : dict
+            {frozenset(radiation_parameters): calibration}, the format
+            returned by `load_IQMX_calibration_database`
+        """
+        return {frozenset(calibration.get_radiation_parameters().items()):
+                calibration
+                for calibration in self.get_all(iq_attenuation)}
+
+    def get(self, lo_frequency, if_frequency, lo_power, ssb_power,
+            sideband_to_maintain="left", waveform_resolution=1,
+            iq_attenuation=0):
+        """
+        Exact lookup, returns None if there is no such calibration
+        """
+        group = self._groups.get(_group_key(
+            iq_attenuation, if_frequency, lo_power, ssb_power,
+            sideband_to_maintain, waveform_resolution))
+        if group is None:
+            return None
+        return group.calibrations.get(_rounded(lo_frequency))
+
+    def find(self, lo_frequency, if_frequency, lo_power, ssb_power,
+             sideband_to_maintain="left", waveform_resolution=1,
+             iq_attenuation=0, max_interpolation_span=0,
+             max_nearest_distance=0, rescale_ssb_power=False):
+        """
+        Looks up a calibration with the following policy:
+
+            1. a calibration at exactly `lo_frequency` is returned as is
+            2. if the closest calibrations below and above `lo_frequency`
+               are at most `max_interpolation_span` apart, their parameters
+               are linearly interpolated
+            3. otherwise the closest calibration is returned if it is at
+               most `max_nearest_distance` away
+
+        With `rescale_ssb_power` calibrations made at another SSB power
+        (the closest one) are used as well, the IF amplitudes are rescaled.
+
+        Returns
+        -------
+        calibration : IQCalibrationData or None
+            None means that the mixer has to be calibrated
+        """
+        group_key = _group_key(iq_attenuation, if_frequency, lo_power,
+                               ssb_power, sideband_to_maintain,
+                               waveform_resolution)
+        group = self._groups.get(group_key)
+        rescale = False
+        if group is None and rescale_ssb_power:
+            candidates = [(abs(key[3] - group_key[3]), key)
+                          for key in self._groups
+                          if key[:3] == group_key[:3]
+                          and key[4:] == group_key[4:]]
+            if candidates:
+                group = self._groups[min(candidates)[1]]
+                rescale = True
+        if group is None:
+            return None
+
+        calibration = self._find_in_group(group, _rounded(lo_frequency),
+                                          max_interpolation_span,
+                                          max_nearest_distance)
+        if calibration is not None and rescale:
+            calibration = _rescale_to_ssb_power(calibration, ssb_power)
+        return calibration
+
+    @staticmethod
+    def _find_in_group(group, lo_frequency, max_interpolation_span,
+                       max_nearest_distance):
+        left, right = group.neighbours(lo_frequency)
+        if left is not None and left == right:
+            return group.calibrations[left]
+        if left is not None and right is not None and \
+                right - left <= max_interpolation_span:
+            return interpolate_calibrations(group.calibrations[left],
+                                            group.calibrations[right],
+                                            lo_frequency)
+        distances = [(abs(f - lo_frequency), f) for f in (left, right)
+                     if f is not None]
+        if distances and min(distances)[0] <= max_nearest_distance:
+            return group.calibrations[min(distances)[1]]
+        return None
+
+
+def interpolate_calibrations(left, right, lo_frequency):
+    """
+    Linear interpolation of the mixer parameters between two calibrations
+    that differ only by the LO frequency. The spectral values of the worse
+    of the two are kept as a conservative estimate.
+    """
+    x = (lo_frequency - left._lo_frequency) / \
+        (right._lo_frequency - left._lo_frequency)
+
+    def lerp(a, b):
+        if a is None or b is None:
+            return a
+        return (1 - x) * np.asarray(a) + x * np.asarray(b)
+
+    # phases are interpolated along the shortest arc
+    left_phase = np.asarray(left._if_phase) \
+        if left._if_phase is not None else None
+    right_phase = None if left_phase is None else \
+        left_phase + np.angle(np.exp(1j * (np.asarray(right._if_phase) -
+                                           left_phase)))
+
+    # the calibrations of lib3 are not graded
+    graded = hasattr(left, "grade")
+    worst = min((left, right), key=lambda cal: min(cal.grade().values())) \
+        if graded else left
+    return type(left)(
+        left._mixer_id, left._iq_attenuation, lo_frequency, left._lo_power,
+        left._if_frequency, left._sideband_to_maintain, left._ssb_power,
+        left._waveform_resolution,
+        lerp(left._dc_offsets, right._dc_offsets),
+        lerp(left._dc_offsets_open, right._dc_offsets_open),
+        lerp(left._if_offsets, right._if_offsets),
+        lerp(left._if_amplitudes, right._if_amplitudes),
+        lerp(left_phase, right_phase),
+        worst._spectral_values, 0, worst._end_date,
+        **({"grade_warning": False} if graded else {}))
@@ -6,7 +6,6 @@ from drivers.Spectrum_m4x import SPCM_TRIGGER, SPCM
 import matplotlib.pyplot as plt
 from .iq_mixer_calibration import IQCalibrationData
 import copy
-import lib.data_management as dm
 
 
 class IQDownconversionCalibrationResult:
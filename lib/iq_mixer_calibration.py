@@ -110,6 +110,27 @@ class IQCalibrationData:
                                  self._optimization_time, self._end_date,
                                  grade_warning=False)
 
+    def replace(self, **optimization_results):
+        """
+        Copy of the calibration with some of the optimization results
+        replaced, e.g. `replace(dc_offsets=array([0, 0]))`; the keys are the
+        ones of `get_optimization_results()[0]`.
+
+        Calibrations are shared by the pulse builders and the AWGs, so they
+        should not be modified in place.
+        """
+        attributes = dict(dc_offsets="_dc_offsets",
+                          dc_offset_open="_dc_offsets_open",
+                          if_offsets="_if_offsets",
+                          if_amplitudes="_if_amplitudes",
+                          if_phase="_if_phase")
+        calibration = self.copy()
+        for name, value in optimization_results.items():
+            if name not in attributes:
+                raise ValueError("Unknown optimization result: %s" % name)
+            setattr(calibration, attributes[name], value)
+        return calibration
+
     def toJSON(self):
         return self.__str__()
 
@@ -220,6 +241,10 @@ class IQCalibrator():
         self._lo_freq_idx = None
         self._iterations = 0
         self._optimized_awg_calls = optimized_awg_calls
+        # progress message of the last loss evaluation, it is shown while
+        # the analyzer sweeps for the next one
+        self._pending_message = None
+        self._sa_reads = 0
 
     def _output_text_message(self, message):
         if self._output_widget is None:
@@ -228,6 +253,36 @@ class IQCalibrator():
         else:
             self._output_widget.value = message
 
+    def _post_message(self, message):
+        self._pending_message = message
+
+    def _flush_message(self):
+        if self._pending_message is not None:
+            self._output_text_message(self._pending_message)
+            self._pending_message = None
+
+    def _setup_list_sweep(self, frequencies, sa_res_bandwidth):
+        self._sa.setup_list_sweep(list(frequencies),
+                                  [sa_res_bandwidth] * len(frequencies))
+
+    def _measure_powers(self):
+        """
+        Powers at the frequencies of the current list sweep, measured with
+        a single trigger and a single trace transfer. The previous progress
+        message is printed while the analyzer is sweeping.
+        """
+        self._sa.start_list_sweep()
+        self._flush_message()
+        self._sa_reads += 1
+        return self._sa.get_list_sweep_data()
+
+    def get_sa_reads_number(self):
+        """
+        Number of spectrum analyzer acquisitions made since the calibrator
+        was created
+        """
+        return self._sa_reads
+
     def calibrate(self, lo_frequency, if_frequency, lo_power, ssb_power,
                   waveform_resolution=1, initial_guess=None,
                   sa_res_bandwidth=500, iterations=5, minimize_iterlimit=20):
@@ -272,19 +327,14 @@ class IQCalibrator():
                 offsets=dc_offsets, waveform_resolution=waveform_resolution,
                 optimized=self._optimized_awg_calls
             )
-            self._sa.prepare_for_stb()
-            self._sa.sweep_single()
-            self._sa.wait_for_stb()
-            data = self._sa.get_tracedata()
+            data = self._measure_powers()
             self._iterations += 1
 
             answer = data[0]
-            self._output_text_message("DC offsets: " + format_number_list(
-                dc_offsets) + " " +
-                                      format_number_list(
-                                          data) + " " + str(self._iterations)
-                                      + " " +
-                                      "loss: " + " " + str(answer))
+            self._post_message("DC offsets: " + format_number_list(
+                dc_offsets) + " " + format_number_list(data) + " " +
+                               str(self._iterations) + " " +
+                               "loss: " + " " + str(answer))
             return answer
 
         def loss_function_dc_offsets_open(dc_offset_open):
@@ -296,17 +346,13 @@ class IQCalibrator():
                 optimized=self._optimized_awg_calls
             )
 
-            self._sa.prepare_for_stb()
-            self._sa.sweep_single()
-            self._sa.wait_for_stb()
-
-            data = self._sa.get_tracedata()
+            data = self._measure_powers()
 
             answer = abs(data[0] - ssb_power)
             msg = "DC offsets open: " + \
                   format_number_list([dc_offset_open] * 2) + " " + \
                   format_number_list(data) + " " + "loss: " + " " + str(answer)
-            self._output_text_message(msg)
+            self._post_message(msg)
             return answer
 
         # def loss_function_if_offsets(if_offsets, args):
@@ -340,10 +386,7 @@ class IQCalibrator():
                 waveform_resolution=waveform_resolution,
                 optimized=self._optimized_awg_calls
             )
-            self._sa.prepare_for_stb()
-            self._sa.sweep_single()
-            self._sa.wait_for_stb()
-            data = self._sa.get_tracedata()
+            data = self._measure_powers()
 
             loss_value_amp = 0
             for i, psd in enumerate(data):
@@ -366,7 +409,7 @@ class IQCalibrator():
                   "loss: %.2e," % answer + " " + \
                   "incl. IF IQ amplitude difference loss: %.2e" % (
                           abs(amp1 - amp2) / abs(amp1) / 10)
-            self._output_text_message(msg)
+            self._post_message(msg)
             return answer
 
         def loss_function_if_phase(phase, args):
@@ -378,28 +421,15 @@ class IQCalibrator():
                 offsets=if_offsets,
                 waveform_resolution=waveform_resolution,
                 optimized=self._optimized_awg_calls)
-            self._sa.prepare_for_stb()
-            self._sa.sweep_single()
-            self._sa.wait_for_stb()
-            data = self._sa.get_tracedata()
-
-            answer = 25e3 * sum(np.array(
-                [abs((self._target_freq_idx - i)) ** (-1.8) * 10 ** (psd / 10)
-                 for i, psd in enumerate(data) if
-                 i != self._target_freq_idx])
-            ) + 10 ** (abs(ssb_power - data[self._target_freq_idx]) / 10)
-
-            if self._sideband_to_maintain == "right":
-                answer = -data[self._target_freq_idx] + data[
-                    self._target_freq_idx - 2]
-            else:
-                answer = -data[self._target_freq_idx] + data[
-                    self._target_freq_idx + 2]
+            # only the maintained sideband and its image are swept,
+            # see `phase_freqs` below
+            data = self._measure_powers()
+            answer = -data[0] + data[1]
 
             msg = "Phase: %3.2f" % (phase / pi * 180) + " " + \
                   format_number_list(data) + " " + \
                   "loss: " + str(answer)
-            self._output_text_message(msg)
+            self._post_message(msg)
             return answer
 
         def iterate_minimization(prev_results, n=2):
@@ -414,6 +444,7 @@ class IQCalibrator():
             res_if_offs = results["dc_offsets"]
             options = {"maxiter": minimize_iterlimit, "xatol": .1e-3,
                        "fatol": 5}
+            self._setup_list_sweep(phase_freqs, sa_res_bandwidth)
             res_phase = minimize(loss_function_if_phase,
                                  prev_results["if_phase"],
                                  args=[res_if_offs,
@@ -421,6 +452,7 @@ class IQCalibrator():
                                  method="Nelder-Mead", options=options)
             options = {"maxiter": minimize_iterlimit, "xatol": .1e-3,
                        "fatol": 1}
+            self._setup_list_sweep(freqs, sa_res_bandwidth)
             res_amps = minimize(loss_function_if_amplitudes,
                                 prev_results["if_amplitudes"],
                                 args=[res_if_offs, res_phase.x],
@@ -449,7 +481,7 @@ class IQCalibrator():
             else:
                 results = initial_guess
 
-            self._sa.setup_list_sweep([lo_frequency], [sa_res_bandwidth])
+            self._setup_list_sweep([lo_frequency], sa_res_bandwidth)
 
             lo_leakage = ssb_power
             while lo_leakage > ssb_power - 40:
@@ -464,6 +496,7 @@ class IQCalibrator():
                     self._iterations = 0
                     results["dc_offsets"] = res_dc_offs.x
                 lo_leakage = res_dc_offs.fun
+            self._flush_message()
 
 
             if if_frequency == 0:
@@ -477,6 +510,7 @@ class IQCalibrator():
                                                     "fatol": 100})
                     self._iterations = 0
                     results["dc_offset_open"] = res_dc_offs_open.x
+                self._flush_message()
                 spectral_values = {"dc": res_dc_offs.fun,
                                    "dc_open": self._sa.get_tracedata()}
                 elapsed_time = (datetime.now() - start).total_seconds()
@@ -498,14 +532,17 @@ class IQCalibrator():
                 if self._sideband_to_maintain == "right":
                     freqs += if_frequency
                     self._lo_freq_idx = self._target_freq_idx - 1
+                    image_idx = self._target_freq_idx - 2
                 elif self._sideband_to_maintain == "left":
                     freqs -= if_frequency
                     self._lo_freq_idx = self._target_freq_idx + 1
-
-                self._sa.setup_list_sweep(list(freqs), [sa_res_bandwidth] * 3)
+                    image_idx = self._target_freq_idx + 2
+                # the phase loss depends only on these two powers
+                phase_freqs = [freqs[self._target_freq_idx], freqs[image_idx]]
 
                 results["if_offsets"] = res_dc_offs.x
                 iterate_minimization(results, iterations)
+                self._flush_message()
                 spectral_values = {"dc": res_dc_offs.fun,
                                    "if": self._sa.get_tracedata()}
                 elapsed_time = (datetime.now() - start).total_seconds()
@@ -533,6 +570,251 @@ class IQCalibrator():
                                     nop=1001, rbw=1e4)
             self._sa.set_continuous()
 
+def _fit_quadratic_minimum(points, values):
+    """
+    Least squares fit of a 2D quadratic surface
+        f(x, y) = a x^2 + b y^2 + c xy + d x + e y + g
+
+    Parameters
+    ----------
+    points : np.ndarray
+        shape (N, 2), N >= 6
+    values : np.ndarray
+        shape (N,)
+
+    Returns
+    -------
+    minimum : np.ndarray or None
+        coordinates of the minimum of the fitted surface or None if the
+        surface is not convex
+    min_value : float
+        value of the fitted surface at the minimum
+    """
+    x, y = points[:, 0], points[:, 1]
+    design = np.column_stack((x ** 2, y ** 2, x * y, x, y, np.ones_like(x)))
+    a, b, c, d, e, g = np.linalg.lstsq(design, values, rcond=None)[0]
+    hessian = np.array([[2 * a, c], [c, 2 * b]])
+    if a <= 0 or np.linalg.det(hessian) <= 0:
+        return None, None
+    minimum = np.linalg.solve(hessian, -np.array([d, e]))
+    min_value = g + 0.5 * np.dot([d, e], minimum)
+    return minimum, min_value
+
+
+class FastIQCalibrator(IQCalibrator):
+    """
+    Model-based alternative to `IQCalibrator`.
+
+    Near the optimum the LO leakage power (in mW) is a quadratic function of
+    the DC offsets, and the image sideband power is a quadratic function of
+    w = A_Q / A_I * exp(1j * phase). Instead of running Nelder-Mead rounds
+    the calibrator measures a 3x3 design around the current estimate, fits
+    the quadratic model, jumps to its analytic minimum and repeats on a
+    finer design. The result is the same `IQCalibrationData` that
+    `IQCalibrator.calibrate` returns.
+    """
+
+    def __init__(self, iqawg, sa, lo, mixer_id, iq_attenuation,
+                 sideband_to_maintain="left", sidebands_to_suppress=6,
+                 optimized_awg_calls=True, output_widget=None,
+                 design_rounds=3, step_reduction=5):
+        """
+        Parameters are the same as for `IQCalibrator` plus
+
+        design_rounds : int
+            number of fit-and-jump rounds for every optimized quantity
+        step_reduction : float
+            the design is shrunk by this factor after every round
+        """
+        super().__init__(iqawg, sa, lo, mixer_id, iq_attenuation,
+                         sideband_to_maintain, sidebands_to_suppress,
+                         optimized_awg_calls, output_widget)
+        self._design_rounds = design_rounds
+        self._step_reduction = step_reduction
+
+    def calibrate(self, lo_frequency, if_frequency, lo_power, ssb_power,
+                  waveform_resolution=1, initial_guess=None,
+                  sa_res_bandwidth=500, dc_step=0.05, iq_step=0.2):
+        """
+        Parameters are the same as for `IQCalibrator.calibrate` except for
+
+        dc_step: float
+            initial half-width of the DC offsets design, V
+        iq_step: float
+            initial half-width of the design in the complex amplitude ratio
+            A_Q / A_I * exp(1j * phase)
+
+        Returns:
+        iqmx_calibration: IQCalibrationData
+        """
+        start = datetime.now()
+        self._lo.set_power(lo_power)
+        self._lo.set_frequency(lo_frequency)
+        self._lo.set_output_state("ON")
+
+        if initial_guess is None:
+            dc_offsets = np.zeros(2)
+            dc_offset_open = 1
+            if_amplitudes = np.array([0.5, 0.5])
+            if_phase = pi / 2 if self._sideband_to_maintain == "right" \
+                else -pi / 2
+        else:
+            if isinstance(initial_guess, IQCalibrationData):
+                initial_guess = initial_guess.get_optimization_results()[0]
+            dc_offsets = np.array(initial_guess["dc_offsets"], dtype=float)
+            dc_offset_open = np.ravel(initial_guess["dc_offset_open"])[0]
+            if_amplitudes = np.array(initial_guess["if_amplitudes"],
+                                     dtype=float)
+            if_phase = np.ravel(initial_guess["if_phase"])[0]
+
+        def output(amplitudes, phase, offsets, frequency=if_frequency):
+            self._iqawg.output_continuous_IQ_waves(
+                frequency=frequency, amplitudes=amplitudes,
+                relative_phase=phase, offsets=offsets,
+                waveform_resolution=waveform_resolution,
+                optimized=self._optimized_awg_calls)
+
+        try:
+            self._setup_list_sweep([lo_frequency], sa_res_bandwidth)
+
+            def leakage(offsets):
+                output((0, 0), 0, offsets, frequency=0)
+                return self._measure_powers()[0]
+
+            dc_offsets, dc_leakage = self._minimize_quadratic(
+                leakage, dc_offsets, dc_step, "DC offsets")
+
+            if if_frequency == 0:
+                dc_offset_open, dc_open = self._solve_dc_offset_open(
+                    leakage, dc_offset_open, ssb_power)
+                self._flush_message()
+                return IQCalibrationData(
+                    self._mixer_id, self._iq_attenuation, lo_frequency,
+                    lo_power, if_frequency, self._sideband_to_maintain,
+                    ssb_power, waveform_resolution, dc_offsets,
+                    array([dc_offset_open] * 2), None, None, None,
+                    {"dc": dc_leakage, "dc_open": dc_open},
+                    (datetime.now() - start).total_seconds(), datetime.now())
+
+            freqs = np.linspace(
+                lo_frequency - self._N_sup // 2 * if_frequency,
+                lo_frequency + self._N_sup // 2 * if_frequency,
+                self._N_sup + 1)
+            if self._sideband_to_maintain == "right":
+                freqs += if_frequency
+                image_idx = self._target_freq_idx - 2
+            else:
+                freqs -= if_frequency
+                image_idx = self._target_freq_idx + 2
+            self._setup_list_sweep([freqs[self._target_freq_idx],
+                                    freqs[image_idx]], sa_res_bandwidth)
+
+            amplitude_i = if_amplitudes[0]
+            sideband_power = [None]
+
+            def image(ratio):
+                ratio = ratio[0] + 1j * ratio[1]
+                output((amplitude_i, amplitude_i * abs(ratio)),
+                       np.angle(ratio), dc_offsets)
+                data = self._measure_powers()
+                sideband_power[0] = data[0]
+                return data[1]
+
+            ratio = if_amplitudes[1] / if_amplitudes[0] * \
+                np.exp(1j * if_phase)
+            ratio, _ = self._minimize_quadratic(
+                image, np.array([ratio.real, ratio.imag]), iq_step,
+                "IF amplitudes and phase")
+            ratio = ratio[0] + 1j * ratio[1]
+            if_phase = np.angle(ratio)
+
+            # the maintained sideband scales linearly with both amplitudes
+            for i in range(2):
+                amplitude_i *= 10 ** ((ssb_power - sideband_power[0]) / 20)
+                amplitude_i = min(amplitude_i, self._iqawg.MAX_OUTPUT_VOLTAGE
+                                  / max(1, abs(ratio)))
+                image((ratio.real, ratio.imag))
+            if_amplitudes = np.array([amplitude_i, amplitude_i * abs(ratio)])
+
+            self._setup_list_sweep(freqs, sa_res_bandwidth)
+            output(if_amplitudes, if_phase, dc_offsets)
+            spectral_values = {"dc": dc_leakage,
+                               "if": self._measure_powers()}
+            self._flush_message()
+            return IQCalibrationData(
+                self._mixer_id, self._iq_attenuation, lo_frequency, lo_power,
+                if_frequency, self._sideband_to_maintain, ssb_power,
+                waveform_resolution, dc_offsets, None, dc_offsets.copy(),
+                if_amplitudes, np.array([if_phase]), spectral_values,
+                (datetime.now() - start).total_seconds(), datetime.now())
+
+        finally:
+            shift = if_frequency if self._sideband_to_maintain == "right" \
+                else -if_frequency
+            self._sa.setup_swept_sa(lo_frequency + shift,
+                                    10 * if_frequency if if_frequency > 0
+                                    else 1e9, nop=1001, rbw=1e4)
+            self._sa.set_continuous()
+
+    def _minimize_quadratic(self, loss, center, step, name):
+        """
+        Minimizes a loss in dBm that is quadratic in mW around its minimum.
+
+        Returns
+        -------
+        center, loss_value : np.ndarray, float
+            the best point and the loss measured at it
+        """
+        offsets = np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)],
+                           dtype=float)
+        best_point, best_value = None, None
+        for i in range(self._design_rounds):
+            points = center + step * offsets
+            values = np.array([loss(point) for point in points])
+            idx = np.argmin(values)
+            if best_value is None or values[idx] < best_value:
+                best_point, best_value = points[idx], values[idx]
+
+            # fit in the design coordinates for a well-conditioned problem
+            minimum, _ = _fit_quadratic_minimum(offsets, 10 ** (values / 10))
+            if minimum is None:
+                center = best_point  # noise dominated, shrink around the best
+            else:
+                center = center + step * minimum
+                value = loss(center)
+                if value < best_value:
+                    best_point, best_value = center, value
+                center = best_point
+            self._post_message(name + ": " + format_number_list(best_point) +
+                               " loss: %.2f dBm" % best_value)
+            step /= self._step_reduction
+        return np.array(best_point), best_value
+
+    def _solve_dc_offset_open(self, leakage, dc_offset_open, ssb_power):
+        """
+        Finds the common DC offset that opens the mixer to `ssb_power`. The
+        LO power in mW is quadratic in the offset, so three points define it.
+        """
+        target = 10 ** (ssb_power / 10)
+        step = abs(dc_offset_open) / 2 if dc_offset_open != 0 else 0.1
+        value = None
+        for i in range(self._design_rounds):
+            points = dc_offset_open + step * np.array([-1, 0, 1])
+            powers = 10 ** (np.array([leakage((p, p)) for p in points]) / 10)
+            a, b, c = np.polyfit(points, powers, 2)
+            roots = np.roots([a, b, c - target])
+            roots = roots[np.isreal(roots)].real
+            if len(roots) > 0:
+                dc_offset_open = roots[np.argmin(abs(roots - dc_offset_open))]
+            else:
+                dc_offset_open = -b / (2 * a)  # closest approach
+            value = leakage((dc_offset_open, dc_offset_open))
+            self._post_message("DC offset open: %.5f" % dc_offset_open +
+                               " loss: %.2f dB" % abs(value - ssb_power))
+            step /= self._step_reduction
+        return dc_offset_open, value
+
+
 def format_number_list(number_list):
     formatted_string = "[ "
     for number in number_list:
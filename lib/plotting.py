@@ -30,8 +30,8 @@ def plot_measurement(measurement, kwargs_amp={}, kwargs_phas={},
 
         ax_amps.plot(measurement[0], measurement[2], **kwargs_amp)
         ax_phas.plot(measurement[0], measurement[3], **kwargs_phas)
-        fig_phas.canvas.set_window_title("Phase")
-        fig_amps.canvas.set_window_title("Amplitude")
+        fig_phas.canvas.manager.set_window_title("Phase")
+        fig_amps.canvas.manager.set_window_title("Amplitude")
         ax_phas.set_title("Phase")
         ax_amps.set_title("Amplitude")
         return fig_amps, fig_phas
@@ -48,8 +48,8 @@ def plot_measurement(measurement, kwargs_amp={}, kwargs_phas={},
         X = measurement[1] if len(measurement[0]) == 1 else measurement[0]
         ax_amps.plot(X, measurement[3][0], **kwargs_amp)
         ax_phas.plot(X, measurement[4][0], **kwargs_phas)
-        fig_phas.canvas.set_window_title("Phase")
-        fig_amps.canvas.set_window_title("Amplitude")
+        fig_phas.canvas.manager.set_window_title("Phase")
+        fig_amps.canvas.manager.set_window_title("Amplitude")
         ax_phas.set_title("Phase")
         ax_amps.set_title("Amplitude")
         return fig_amps, fig_phas
@@ -73,8 +73,8 @@ def plot_measurement(measurement, kwargs_amp={}, kwargs_phas={},
                                       measurement[3].T if not unwrap_phase
                                       else unwrap(unwrap(measurement[3]).T),
                                       cmap=cmap, **kwargs_phas)
-        fig_phas.canvas.set_window_title("Phase")
-        fig_amps.canvas.set_window_title("Amplitude")
+        fig_phas.canvas.manager.set_window_title("Phase")
+        fig_amps.canvas.manager.set_window_title("Amplitude")
         ax_phas.set_title("Phase")
         ax_amps.set_title("Amplitude")
         plt.colorbar(amps_map, ax=ax_amps)
@@ -103,8 +103,8 @@ def plot_measurement(measurement, kwargs_amp={}, kwargs_phas={},
                                       cmap=cmap,
                                       **kwargs_phas)
 
-        fig_phas.canvas.set_window_title("Phase")
-        fig_amps.canvas.set_window_title("Amplitude")
+        fig_phas.canvas.manager.set_window_title("Phase")
+        fig_amps.canvas.manager.set_window_title("Amplitude")
         ax_phas.set_title("Phase")
         ax_amps.set_title("Amplitude")
         plt.colorbar(amps_map, ax=ax_amps)
@@ -137,7 +137,7 @@ def plot_one_trace(trace: np.ndarray, sampling_resolution: float = 0.8,
         time_limits = (time[0], time[-1])
     fig, axs = plt.subplots(2, sharex=True)
     if len(comment) > 0:
-        fig.canvas.set_window_title(comment)
+        fig.canvas.manager.set_window_title(comment)
         fig.suptitle(comment)
     else:
         fig.suptitle("One trace")
@@ -164,7 +164,7 @@ def plot_fourier_of_trace(trace: np.ndarray, sampling_resolution: float = 0.8,
 
     fig, ax = plt.subplots()
     if len(comment) > 0:
-        fig.canvas.set_window_title(comment)
+        fig.canvas.manager.set_window_title(comment)
         ax.set_title(comment)
     else:
         ax.set_title("FFT")
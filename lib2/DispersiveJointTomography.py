@@ -258,7 +258,7 @@ class DispersiveJointTomographyResult(VNATimeResolvedDispersiveMeasurementResult
 
     def _prepare_figure(self):
         fig, axes = plt.subplots(2, 2, figsize=(15, 7))
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         axes = ravel(axes)
         for ax in axes:
             ax.set_xlabel('Qubit 2 local rotations')
@@ -323,7 +323,7 @@ class DispersiveJointTomographyResult(VNATimeResolvedDispersiveMeasurementResult
         axs = [1, 2]
         axs = list(map(lambda x: fig.add_subplot(1, 2, x, projection="3d"), axs))
 
-        fig.canvas.set_window_title(self._name + " F = {:.4f}".format(self._fidelity))
+        fig.canvas.manager.set_window_title(self._name + " F = {:.4f}".format(self._fidelity))
         matrix_histogram_complex(self._expect_dm, ax=axs[0])
         matrix_histogram_complex(self._experiment_rho, ax=axs[1])
 
@@ -434,7 +434,7 @@ class DispersiveJointTomographyResultMultiplexed(VNATimeResolvedDispersiveMeasur
 
     def _prepare_figure(self):
         fig, axes = plt.subplots(1, 2, figsize=(15, 7), sharex=True)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         axes = ravel(axes)
         for ax in axes:
             ax.set_xlabel('Qubit 2 local rotations')
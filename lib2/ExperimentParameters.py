@@ -40,7 +40,7 @@ class ExperimentParameters:
 
     def _init_fields(self):
         for property_name in vars(self).keys():
-            if property_name[0] is not "_":
+            if not property_name.startswith("_"):
                 self.__setattr__(property_name, self._parameters[property_name])
 
 
@@ -1,4 +1,6 @@
 from copy import deepcopy
+from functools import lru_cache
+import hashlib
 
 import numpy as np
 from matplotlib import pyplot as plt
@@ -6,57 +8,602 @@ from numpy import *
 from scipy import signal
 
 from lib.iq_mixer_calibration import IQCalibrationData
+from lib2.dac import quantize
 
 from itertools import cycle, islice
 
 from typing import Dict, List
 
 
+# windows of IQPulseBuilder.add_sine_pulse that depend on window_parameter
+PARAMETRIC_WINDOWS = ("tukey", "kaiser", "decaying_exponent")
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=256)
+def get_unit_envelope(window, n_points, waveform_resolution,
+                      window_parameter=None):
+    """
+    Window of unit amplitude of a sine pulse of `n_points` points and its
+    time derivative for the half derivative correction. The results are
+    cached and read-only.
+
+    Parameters:
+    -----------
+    window: string
+        "rectangular", "gaussian", "hahn", "tukey", "kaiser" or
+        "decaying_exponent"
+    waveform_resolution: float, ns
+    window_parameter: float
+        alpha of "tukey", beta of "kaiser", rate of "decaying_exponent"
+
+    Returns:
+    --------
+    window, derivative: np.ndarray
+    """
+    duration = n_points * waveform_resolution
+    points = np.linspace(0, duration, n_points, endpoint=False)
+    if window == "rectangular":
+        envelope = np.ones_like(points)
+    elif window == "gaussian":
+        B = np.exp(-(duration / 2) ** 2 / 2 / (duration / 3) ** 2)
+        envelope = (np.exp(-(points - duration / 2) ** 2 / 2 / (
+                duration / 3) ** 2) - B) / (1 - B)
+    elif window == "hahn":
+        envelope = np.sin(np.pi * np.arange(n_points) / n_points) ** 2
+    elif window == "tukey":
+        # https://docs.scipy.org/doc/scipy-1.1.0/reference/generated/scipy.signal.windows.tukey.html
+        envelope = signal.windows.tukey(n_points, alpha=window_parameter)
+    elif window == "kaiser":
+        # https://docs.scipy.org/doc/scipy-1.1.0/reference/generated/scipy.signal.windows.kaiser.html
+        envelope = signal.windows.kaiser(n_points, beta=window_parameter)
+    elif window == "decaying_exponent":
+        envelope = np.exp(window_parameter * np.arange(n_points) / n_points)
+    else:
+        raise KeyError(window)
+
+    if window in ("rectangular", "decaying_exponent") or n_points < 2:
+        derivative = np.zeros_like(envelope)
+    else:
+        derivative = np.gradient(envelope, waveform_resolution)
+        derivative[0] = derivative[-1] = 0
+    return _read_only(envelope), _read_only(derivative)
+
+
+@lru_cache(maxsize=256)
+def get_unit_carrier(frequency, n_points, waveform_resolution):
+    """
+    exp(1j * frequency * t) at the points of a pulse starting at t = 0; a
+    pulse with an initial phase is this carrier rotated by exp(1j * phase).
+    The result is cached and read-only.
+
+    Parameters:
+    -----------
+    frequency: float, rad/ns
+    """
+    points = np.linspace(0, n_points * waveform_resolution, n_points,
+                         endpoint=False)
+    return _read_only(np.exp(1j * frequency * points))
+
+
+WINDOWS = ("rectangular", "gaussian", "hahn") + PARAMETRIC_WINDOWS
+
+
+class PulseRecord():
+    """
+    Pulse of a PulseSequence described by its parameters and sampled only
+    when the waveform is needed:
+
+        offset + amplitude * envelope(t) * cos(2 pi frequency t + phase)
+
+    at the `n_points` points t of the pulse, where envelope is the window
+    `shape`; "constant" pulses are the offset only. Records are immutable
+    and compared, hashed and serialized by their parameters; equal records
+    give equal samples.
+    """
+    __slots__ = ("shape", "n_points", "waveform_resolution", "amplitude",
+                 "phase", "frequency", "offset", "window_parameter",
+                 "hd_amplitude", "length", "_samples")
+    _FIELDS = __slots__[:-1]
+    dtype = np.dtype(float)
+
+    def __init__(self, shape, n_points, waveform_resolution, amplitude=0.,
+                 phase=0., frequency=0., offset=0., window_parameter=None,
+                 hd_amplitude=0., length=None):
+        """
+        Parameters:
+        -----------
+        shape: string
+            "constant" or a window of `get_unit_envelope`
+        phase: float, rad
+            phase of the carrier at the first point
+        frequency: float, Hz
+        length: int
+            number of the first points of the pulse kept in the sequence,
+            n_points by default
+        """
+        if shape != "constant" and shape not in WINDOWS:
+            raise KeyError(shape)
+        self.shape = shape
+        self.n_points = int(n_points)
+        self.waveform_resolution = waveform_resolution
+        self.amplitude = float(amplitude)
+        self.phase = float(phase)
+        self.frequency = float(frequency)
+        self.offset = float(offset)
+        self.window_parameter = window_parameter \
+            if shape in PARAMETRIC_WINDOWS else None
+        self.hd_amplitude = float(hd_amplitude)
+        self.length = self.n_points if length is None else int(length)
+        self._samples = None
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        return self.sample()[key]
+
+    def _key(self):
+        return tuple(getattr(self, field) for field in self._FIELDS)
+
+    def __eq__(self, other):
+        if not hasattr(other, "sample") or not hasattr(other, "_key"):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return "PulseRecord(%s)" % ", ".join(
+            "%s=%r" % (field, getattr(self, field)) for field in self._FIELDS)
+
+    def truncate(self, length):
+        """
+        Record of the first `length` points of this pulse
+        """
+        return PulseRecord(**dict(self.to_dict(),
+                                  length=min(max(length, 0), self.length)))
+
+    def sample(self):
+        """
+        Returns:
+        --------
+        np.ndarray
+            read-only samples, computed once
+        """
+        if self._samples is None:
+            if self.shape == "constant":
+                samples = np.broadcast_to(self.offset, (self.length,))
+            else:
+                resolution = self.waveform_resolution
+                carrier = (self.amplitude * np.exp(1j * self.phase)) * \
+                    get_unit_carrier(2 * pi * self.frequency / 1e9,
+                                     self.n_points, resolution)
+                window, derivative = get_unit_envelope(
+                    self.shape, self.n_points, resolution,
+                    self.window_parameter)
+                if self.hd_amplitude != 0:
+                    hd_correction = - derivative * self.hd_amplitude / 2 / (
+                            -2 * pi * 0.2)  # anharmonicity
+                    samples = window * carrier.real + \
+                        hd_correction * carrier.imag
+                else:
+                    samples = window * carrier.real
+                samples = _read_only(samples[:self.length] + self.offset)
+            self._samples = samples
+        return self._samples
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self._FIELDS}
+
+
+def _samples(points):
+    # lib2.IQPulseSequence is reloaded by some measurement modules, so the
+    # records are not checked with isinstance
+    return points.sample() if hasattr(points, "sample") else points
+
+
+def _digest(points):
+    """
+    Hex digest of an array of samples, its dtype and shape
+    """
+    digest = hashlib.sha1(("%s%s" % (points.dtype.str, points.shape))
+                          .encode())
+    digest.update(np.ascontiguousarray(points).data)
+    return digest.hexdigest()
+
+
+def _is_constant(points):
+    # the shape of an array is a tuple
+    return getattr(points, "shape", None) == "constant"
+
+
+def _same_points(first, second):
+    return first is second or (hasattr(first, "sample") and
+                               hasattr(second, "sample") and first == second)
+
+
+def _equal_points(first, second):
+    if first.strides == second.strides == (0,):
+        # constant pulses
+        return len(first) == 0 or first[0] == second[0]
+    return np.array_equal(first, second)
+
+
 class PulseSequence():
+    """
+    Ordered list of waveform segments that are rendered into one array
+    only when the waveform is requested, so that appending a pulse does
+    not copy the whole sequence. Overlapping segments are summed and the
+    gaps between segments are zeros.
+
+    The pulses of the builders are stored as `PulseRecord`s, arbitrary
+    pulses as arrays of samples. Sequences are compared, hashed and
+    serialized (`toJSON`) by the records, without sampling them, and the
+    arrays by their digests.
+    """
+
     def __init__(self, waveform_resolution):
-        self._waveform = np.empty(0)
+        # (start point, PulseRecord or points) of every segment
+        self._segments = []
+        # id of an array segment -> (array, digest), shared by the copies
+        self._digests = {}
+        self._length = 0
+        self._rendered = None
+        # set by ParametricSequence for the waveforms patched in place
+        self._changed_ranges = None
+        self._revision = None
         # trace interpreted as having this resolution in ns
         # then AWG tries it best to output this trace with the resolution involved
         self._waveform_resolution = waveform_resolution
         self._pulses = []
 
+    @property
+    def _waveform(self):
+        return self.get_waveform()
+
+    @_waveform.setter
+    def _waveform(self, waveform):
+        self._segments = [(0, np.asarray(waveform))]
+        self._length = len(waveform)
+        self._invalidate()
+
+    def _invalidate(self):
+        self._rendered = None
+        self._changed_ranges = None
+        self._revision = None
+
     def append_pulse(self, points):
         if len(points) > 1:
-            self._waveform = concatenate((self._waveform, points))
+            self.add_segment(points, self._length)
         else:
             # We ingore pulses of zero length
             return
 
+    def append_constant(self, value, n_points):
+        """
+        Appends `n_points` points equal to `value` without allocating them
+        """
+        if n_points > 1:
+            self.append_pulse(PulseRecord("constant", n_points,
+                                          self._waveform_resolution,
+                                          offset=value))
+        elif n_points < 0:
+            raise ValueError("negative number of points: %d" % n_points)
+
+    def add_segment(self, points, start):
+        """
+        Places `points`, an array or a `PulseRecord`, at the point `start`
+        of the sequence, adding them to the segments they overlap; the
+        sequence is extended with zeros if `start` is beyond its end
+        """
+        if not hasattr(points, "sample"):
+            points = np.array(points)
+        self._segments.append((start, points))
+        self._length = max(self._length, start + len(points))
+        self._invalidate()
+
+    def clear(self):
+        """
+        Removes all segments, keeping the sequence object
+        """
+        self._segments.clear()
+        self._digests = {}
+        self._length = 0
+        self._invalidate()
+
+    def get_records(self):
+        """
+        Returns:
+        --------
+        list[tuple]
+            (start point, PulseRecord or array of samples) of the segments
+        """
+        return list(self._segments)
+
+    def _copy(self):
+        copy = PulseSequence(self._waveform_resolution)
+        # the segments are never modified in place and can be shared
+        copy._segments = list(self._segments)
+        copy._digests = self._digests
+        copy._length = self._length
+        copy._pulses = list(self._pulses)
+        return copy
+
     def __add__(self, other):
-        copy = deepcopy(self)
-        copy._waveform = np.concatenate((copy._waveform[:-1], other._waveform))
+        copy = self._copy()
+        # the last point of self is replaced by the first point of other
+        copy._truncate(self._length - 1)
+        for start, points in other._segments:
+            copy._segments.append((start + copy._length, points))
+        copy._length += other._length
+        return copy
+
+    def _truncate(self, length):
+        self._segments = [(start, points.truncate(length - start)
+                           if hasattr(points, "truncate")
+                           else points[:length - start])
+                          for start, points in self._segments
+                          if start < length]
+        self._length = max(length, 0)
+        self._invalidate()
+
+    def shift(self, n_points):
+        """
+        Sequence delayed by `n_points` points, the first points are zeros
+        """
+        if n_points < 0:
+            raise ValueError("negative shift: %d" % n_points)
+        copy = self._copy()
+        copy._segments = [(start + n_points, points)
+                          for start, points in self._segments]
+        copy._length += n_points
+        return copy
+
+    def merge(self, other):
+        """
+        Sum of the sequences, the shorter one is extended with zeros
+        """
+        copy = self._copy()
+        copy._segments += other._segments
+        copy._length = max(self._length, other._length)
         return copy
 
     def direct_add(self, another):
-        copy = deepcopy(self)
-        try:
-            copy._waveform = self._waveform + another._waveform
-            return copy
-        except Exception as e:
-            print("Direct summation is not possible:", e)
-            print(self._waveform.shape, another._waveform.shape)
-            raise e
+        if self._length != another._length:
+            print("Direct summation is not possible:")
+            print((self._length,), (another._length,))
+            raise ValueError("operands could not be added together with "
+                             "lengths %d %d" % (self._length,
+                                                another._length))
+        return self.merge(another)
+
+    def _get_digest(self, points):
+        # the array is kept in the entry, so its id is not reused while
+        # the entry exists
+        entry = self._digests.get(id(points))
+        if entry is None or entry[0] is not points:
+            entry = (points, _digest(points))
+            self._digests[id(points)] = entry
+        return entry[1]
+
+    def _key(self):
+        return (self._waveform_resolution, self._length,
+                tuple((start, points._key() if hasattr(points, "_key") else
+                       ("samples", len(points), self._get_digest(points)))
+                      for start, points in self._segments))
+
+    def __eq__(self, other):
+        if not hasattr(other, "get_records"):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def toJSON(self, with_samples=False):
+        """
+        Description of the sequence by its records; the arrays of samples
+        are referenced by their digests, or listed if `with_samples`
+        """
+        segments = []
+        for start, points in self._segments:
+            if hasattr(points, "to_dict"):
+                segments.append(dict(points.to_dict(), start=start))
+            elif with_samples:
+                segments.append({"start": start, "shape": "samples",
+                                 "samples": points.tolist()})
+            else:
+                segments.append({"start": start, "shape": "samples",
+                                 "n_points": len(points),
+                                 "digest": self._get_digest(points)})
+        return {"waveform_resolution": self._waveform_resolution,
+                "length": self._length, "segments": segments}
+
+    @staticmethod
+    def from_json(description):
+        """
+        Sequence from the result of `toJSON`; the arrays of samples must
+        have been listed
+        """
+        sequence = PulseSequence(description["waveform_resolution"])
+        for segment in description["segments"]:
+            segment = dict(segment)
+            start = segment.pop("start")
+            if segment["shape"] == "samples":
+                if "samples" not in segment:
+                    raise ValueError("the samples of the segment at %d are "
+                                     "referenced by their digest only"
+                                     % start)
+                sequence.add_segment(segment["samples"], start)
+            else:
+                sequence.add_segment(PulseRecord(**segment), start)
+        sequence._length = description["length"]
+        return sequence
 
     def total_points(self):
-        return len(self._waveform)
+        return self._length
 
     def get_duration(self):
         return self._waveform_resolution * self.total_points()
 
     def get_waveform(self):
-        return self._waveform
+        if self._rendered is None:
+            dtype = np.result_type(float, *{points.dtype for _, points
+                                            in self._segments})
+            waveform = np.zeros(self._length, dtype=dtype)
+            for start, points in self._segments:
+                if _is_constant(points):
+                    waveform[start:start + len(points)] += points.offset
+                else:
+                    waveform[start:start + len(points)] += _samples(points)
+            self._rendered = waveform
+        return self._rendered
+
+    def get_peak(self):
+        """
+        Largest absolute value of the waveform; constant segments are not
+        rendered for it
+        """
+        if self._rendered is not None or not self._is_contiguous():
+            waveform = self.get_waveform()
+            return float(np.max(np.abs(waveform))) if len(waveform) else 0.
+        peak = 0.
+        for _, points in self._segments:
+            points = _samples(points)
+            if points.strides == (0,):
+                points = points[:1]
+            peak = max(peak, float(np.max(np.abs(points))))
+        return peak
+
+    def get_dac_waveform(self, full_scale=None, dtype=np.int16,
+                         max_code=None):
+        """
+        Waveform in the samples of the DAC, see `lib2.dac.quantize`
+
+        Parameters
+        ----------
+        full_scale : float
+            volts of the largest code, `get_peak()` by default; samples
+            beyond it are clipped
+        dtype : np.dtype
+            np.int16 for DAC codes, np.float32 for normalized samples
+        max_code : int
+            largest code of the DAC
+
+        Returns
+        -------
+        np.ndarray
+        """
+        if full_scale is None:
+            full_scale = self.get_peak() or 1.
+        if self._rendered is not None or not self._is_contiguous():
+            return quantize(self.get_waveform(), full_scale, dtype, max_code)
+        # the segments are quantized one by one, the constant ones as a
+        # single point, so no float waveform of the full length is made
+        waveform = np.empty(self._length, dtype=dtype)
+        for start, points in self._segments:
+            points = _samples(points)
+            if points.strides == (0,):
+                waveform[start:start + len(points)] = \
+                    quantize(points[:1], full_scale, dtype, max_code)
+            else:
+                waveform[start:start + len(points)] = \
+                    quantize(points, full_scale, dtype, max_code)
+        return waveform
+
+    def _is_contiguous(self):
+        end = 0
+        for start, points in self._segments:
+            if start != end:
+                return False
+            end += len(points)
+        return True
+
+    def render_over(self, previous):
+        """
+        Renders the waveform into the rendered waveform of `previous`,
+        writing only the samples that differ. The cost does not depend on
+        the length of the constant parts of the sequences. The waveform
+        arrays returned by `previous` before are modified.
+
+        Both sequences must be of the same length and consist of adjacent
+        segments as built by the pulse builders.
+
+        Returns:
+        --------
+        changed_ranges: list[tuple] or None
+            (start, stop) of the changed samples; None if the sequences are
+            not compatible, then nothing is done
+        """
+        buffer = previous._rendered
+        if buffer is None or previous._length != self._length or \
+                not self._is_contiguous() or \
+                not previous._is_contiguous() or \
+                np.result_type(buffer, *{points.dtype for _, points
+                                         in self._segments}) != buffer.dtype:
+            return None
+
+        ranges = []
+        old, new = previous._segments, self._segments
+        i = j = position = 0
+        while position < self._length:
+            old_start, old_points = old[i]
+            new_start, new_points = new[j]
+            old_end = old_start + len(old_points)
+            new_end = new_start + len(new_points)
+            end = min(old_end, new_end)
+            same = old_start == new_start and \
+                _same_points(old_points, new_points)
+            new_slice = slice(position - new_start, end - new_start)
+            if not same and not _equal_points(
+                    old_points[position - old_start:end - old_start],
+                    new_points[new_slice]):
+                buffer[position:end] = new_points[new_slice]
+                if ranges and ranges[-1][1] == position:
+                    ranges[-1] = (ranges[-1][0], end)
+                else:
+                    ranges.append((position, end))
+            position = end
+            i += old_end == end
+            j += new_end == end
+
+        self._rendered = buffer
+        previous._rendered = None
+        return ranges
+
+    def get_changed_ranges(self):
+        """
+        Returns:
+        --------
+        list[tuple] or None
+            (start, stop) of the samples that changed since the previous
+            sequence of the same `ParametricSequence`, None if unknown
+        """
+        return self._changed_ranges
+
+    def get_revision(self):
+        """
+        Token equal for the sequences that render into the same buffer
+        with the same content; for the other sequences it is the
+        description of the sequence, equal for equal sequences
+        """
+        if self._revision is not None:
+            return self._revision
+        return self._key()
 
     def get_waveform_resolution(self):
         return self._waveform_resolution
 
     def plot(self, **kwargs):
-        times = linspace(0, self.get_duration(), len(self._waveform))
-        plt.plot(times, self._waveform, **kwargs)
+        waveform = self.get_waveform()
+        times = linspace(0, self.get_duration(), len(waveform))
+        plt.plot(times, waveform, **kwargs)
 
 
 class IQPulseSequence():
@@ -76,6 +623,23 @@ class IQPulseSequence():
     def get_duration(self):
         return self._i.get_duration()
 
+    def __eq__(self, other):
+        if not hasattr(other, "get_IQ_sequences"):
+            return NotImplemented
+        return self.get_IQ_sequences() == other.get_IQ_sequences()
+
+    def __hash__(self):
+        return hash(self.get_IQ_sequences())
+
+    def toJSON(self, with_samples=False):
+        return {"I": self._i.toJSON(with_samples),
+                "Q": self._q.toJSON(with_samples)}
+
+    @staticmethod
+    def from_json(description):
+        return IQPulseSequence(PulseSequence.from_json(description["I"]),
+                               PulseSequence.from_json(description["Q"]))
+
     def direct_add(self, another):
         I, Q = another.get_IQ_sequences()
         return IQPulseSequence(self._i.direct_add(I), self._q.direct_add(Q))
@@ -89,6 +653,15 @@ class IQPulseSequence():
     def get_Q_waveform(self):
         return self._q.get_waveform()
 
+    def get_dac_waveforms(self, full_scale=None, dtype=np.int16,
+                          max_code=None):
+        """
+        I and Q waveforms in the samples of the DAC, see
+        `PulseSequence.get_dac_waveform`
+        """
+        return (self._i.get_dac_waveform(full_scale, dtype, max_code),
+                self._q.get_dac_waveform(full_scale, dtype, max_code))
+
     def get_duration(self):
         return self._i.get_duration()
 
@@ -130,7 +703,7 @@ class PulseBuilder():
         offset = self._calibration.get_optimization_results()[0]["dc_offsets"][0] \
             if dc_offsets is None else dc_offsets
         N_time_steps = int(round(duration / self._waveform_resolution))
-        self._pulse_seq.append_pulse(zeros(N_time_steps + 1) + offset)
+        self._pulse_seq.append_constant(offset, N_time_steps + 1)
         return self
 
     def add_rect_pulse(self, duration, offset_voltage, tanh_sigma=0):
@@ -153,7 +726,8 @@ class PulseBuilder():
         N_time_steps = int(round(duration / self._waveform_resolution))
 
         if tanh_sigma == 0:
-            waveform = zeros(N_time_steps + 1) + offset
+            self._pulse_seq.append_constant(offset, N_time_steps + 1)
+            return self
         else:
             X = linspace(0, duration, N_time_steps + 1)
             start, end = (X - 2 * tanh_sigma) / tanh_sigma, \
@@ -232,19 +806,60 @@ class IQPulseBuilder():
         iqmx_calibration: IQCalibrationData
             Calibration data for the IQ mixer that will be used to send out the pulse sequence.
             Make sure that the radiation parameters of this calibration are in match with your actual settings
+            The calibration is not copied, use `override_calibration` to
+            change it for this builder only
         """
-        self._iqmx_calibration = deepcopy(iqmx_calibration)
-        self._waveform_resolution = \
-            iqmx_calibration.get_radiation_parameters()["waveform_resolution"]
+        self._iqmx_calibration = iqmx_calibration
+        self._derive_corrections()
         self._pulse_seq_I = PulseSequence(self._waveform_resolution)
         self._pulse_seq_Q = PulseSequence(self._waveform_resolution)
 
+    def _derive_corrections(self):
+        # the scalars of the calibration used by every pulse
+        parameters = self._iqmx_calibration.get_optimization_results()[0]
+        radiation = self._iqmx_calibration.get_radiation_parameters()
+        self._dc_offsets = parameters["dc_offsets"]
+        self._dc_offsets_open = parameters["dc_offset_open"]
+        self._if_offsets = parameters["if_offsets"]
+        self._if_amplitudes = parameters["if_amplitudes"]
+        self._if_phase = float(np.squeeze(parameters["if_phase"])) \
+            if parameters["if_phase"] is not None else None
+        self._if_frequency = radiation["if_frequency"]
+        self._waveform_resolution = radiation["waveform_resolution"]
+
     def get_duration(self):
         return self._pulse_seq_I.get_duration()
 
     def get_calibration(self):
         return self._iqmx_calibration
 
+    def override_calibration(self, **optimization_results):
+        """
+        Replaces the calibration of this builder by a copy with some of the
+        optimization results changed, e.g. dc_offsets=array([0, 0]); the
+        calibration passed to the constructor is left intact
+        """
+        self._iqmx_calibration = \
+            self._iqmx_calibration.replace(**optimization_results)
+        self._derive_corrections()
+        return self
+
+    def copy(self):
+        """
+        Copy of the builder with the pulses added so far, sharing the
+        calibration
+        """
+        return deepcopy(self, {id(self._iqmx_calibration):
+                               self._iqmx_calibration})
+
+    def reset(self):
+        """
+        Discards the pulses added since the last build
+        """
+        self._pulse_seq_I.clear()
+        self._pulse_seq_Q.clear()
+        return self
+
     def add_pulse(self, duration, amplitude_mult=1):
         '''
         Adds a DC pulse or a sine pulse depending on the IF frequency of the
@@ -257,8 +872,7 @@ class IQPulseBuilder():
             the value that the IQ calibration values (dc_offsets_open or
             if_amplitudes) are multiplied by
         '''
-        if self._iqmx_calibration.get_radiation_parameters()[
-            "if_frequency"] == 0:
+        if self._if_frequency == 0:
             self.add_dc_pulse(duration)
         else:
             self.add_sine_pulse(duration, amplitude_mult=amplitude_mult)
@@ -277,14 +891,13 @@ class IQPulseBuilder():
             The value of the dc voltage applied at the IQ mixer ports during the
             pulse. If not specified, calibration data will be used
         """
-        vdc1, vdc2 = self._iqmx_calibration.get_optimization_results()[0][
-            "dc_offset_open"] \
+        vdc1, vdc2 = self._dc_offsets_open \
             if dc_offsets_open is None else dc_offsets_open
 
         N_time_steps = int(round(duration / self._waveform_resolution))
 
-        self._pulse_seq_I.append_pulse(zeros(N_time_steps) + vdc1)
-        self._pulse_seq_Q.append_pulse(zeros(N_time_steps) + vdc2)
+        self._pulse_seq_I.append_constant(vdc1, N_time_steps)
+        self._pulse_seq_Q.append_constant(vdc2, N_time_steps)
         return self
 
     def add_zero_pulse(self, duration, dc_offsets=None):
@@ -297,14 +910,13 @@ class IQPulseBuilder():
         duration: float, ns
             Duration of the pulse in nanoseconds
         """
-        vdc1, vdc2 = self._iqmx_calibration.get_optimization_results()[0][
-            "dc_offsets"] \
+        vdc1, vdc2 = self._dc_offsets \
             if dc_offsets is None else dc_offsets
 
         N_time_steps = int(round(duration / self._waveform_resolution))
         try:
-            self._pulse_seq_I.append_pulse(zeros(N_time_steps) + vdc1)
-            self._pulse_seq_Q.append_pulse(zeros(N_time_steps) + vdc2)
+            self._pulse_seq_I.append_constant(vdc1, N_time_steps)
+            self._pulse_seq_Q.append_constant(vdc2, N_time_steps)
         except ValueError as e:
             raise ValueError(f"Error {e} for duration of {duration} ns!")
         return self
@@ -340,103 +952,37 @@ class IQPulseBuilder():
                 Hahn sin^2 window
         hd_amplitude: float
             correction for the Half Derivative method, theoretically should be 1
-        if_freq : float, Hz
+        frequency : float, Hz
             Used instead of the corresponding parameter from self._iqmx_calibration if provided
         if_offsets : tuple[float]
             Used instead of the corresponding parameter from self._iqmx_calibration if provided
         """
-        if_offs1, if_offs2 = \
-            self._iqmx_calibration.get_optimization_results()[0]["if_offsets"] \
-                if if_offsets is None else if_offsets
+        if_offs1, if_offs2 = self._if_offsets \
+            if if_offsets is None else if_offsets
 
-        if_amp1, if_amp2 = \
-            self._iqmx_calibration.get_optimization_results()[0][
-                "if_amplitudes"] \
-                if if_amplitudes is None else if_amplitudes
+        if_amp1, if_amp2 = self._if_amplitudes \
+            if if_amplitudes is None else if_amplitudes
 
         if_amp1, if_amp2 = \
             if_amp1 * amplitude_mult, if_amp2 * amplitude_mult
 
-        if_phase = \
-            self._iqmx_calibration.get_optimization_results()[0]["if_phase"]
-        frequency = 2 * pi * self._iqmx_calibration.get_radiation_parameters()[
-            "if_frequency"] / 1e9 if frequency is None else \
-            2 * pi * frequency / 1e9
+        if_phase = self._if_phase
+        frequency_hz = self._if_frequency if frequency is None else frequency
+        frequency = 2 * pi * frequency_hz / 1e9
 
         N_time_steps = int(np.round(duration / self._waveform_resolution))
 
-        duration = N_time_steps * self._waveform_resolution
-
         phase += self._pulse_seq_I.total_points() * self._waveform_resolution * frequency
-        points = linspace(0, duration, N_time_steps,
-                          endpoint=False)  # divide duration into N_time_steps intervals
-        carrier_I = if_amp1 * exp(1j * (frequency * points + if_phase + phase))
-        carrier_Q = if_amp2 * exp(1j * (frequency * points + phase))
-
-        # print(real(carrier_Q)
-
-        def rectangular():
-            return ones_like(points), zeros_like(points)
-
-        def gaussian():
-            B = exp(-(duration / 2) ** 2 / 2 / (duration / 3) ** 2)
-            window = (exp(-(points - duration / 2) ** 2 / 2 / (
-                    duration / 3) ** 2) - B) / (1 - B)
-            if (N_time_steps > 0):
-                derivative = gradient(window, self._waveform_resolution)
-                derivative[0] = derivative[-1] = 0
-            else:
-                derivative = 0
-            return window, derivative
-
-        def hahn():
-            window = sin(pi * linspace(0, N_time_steps, N_time_steps,
-                                       endpoint=False) / N_time_steps) ** 2
-            if N_time_steps > 0:
-                derivative = gradient(window, self._waveform_resolution)
-                derivative[0] = derivative[-1] = 0
-            else:
-                derivative = 0
-            return window, derivative
-
-        def tukey():
-            # https://docs.scipy.org/doc/scipy-1.0.0/reference/generated/scipy.signal.tukey.html
-            window = signal.tukey(N_time_steps, alpha=window_parameter)
-            if N_time_steps > 1:
-                derivative = gradient(window, self._waveform_resolution)
-                derivative[0] = derivative[-1] = 0
-            else:
-                derivative = 0
-            return window, derivative
-
-        def kaiser():
-            # https://docs.scipy.org/doc/scipy-1.0.0/reference/generated/scipy.signal.kaiser.html
-            window = signal.kaiser(N_time_steps, beta=window_parameter)
-            if N_time_steps > 0:
-                derivative = gradient(window, self._waveform_resolution)
-                derivative[0] = derivative[-1] = 0
-            else:
-                derivative = 0
-            return window, derivative
-
-        def decaying_exponent():
-            window = exp(window_parameter * linspace(0, N_time_steps,
-                                                     N_time_steps,
-                                                      endpoint=False) / N_time_steps)
-            return window
-
-        windows = {"rectangular": rectangular, "gaussian": gaussian,
-                   "hahn": hahn, "tukey": tukey, "kaiser": kaiser,
-                   "decaying_exponent": decaying_exponent}
-        window, derivative = windows[window]()
-
-        hd_correction = - derivative * hd_amplitude / 2 / (
-                -2 * pi * 0.2)  # anharmonicity
-        carrier_I = window * real(carrier_I) + hd_correction * imag(carrier_I)
-        carrier_Q = window * real(carrier_Q) + hd_correction * imag(carrier_Q)
-
-        self._pulse_seq_I.append_pulse(carrier_I + if_offs1)
-        self._pulse_seq_Q.append_pulse(carrier_Q + if_offs2)
+        window_parameter = window_parameter \
+            if window in PARAMETRIC_WINDOWS else None
+
+        self._pulse_seq_I.append_pulse(PulseRecord(
+            window, N_time_steps, self._waveform_resolution, if_amp1,
+            if_phase + phase, frequency_hz, if_offs1, window_parameter,
+            hd_amplitude))
+        self._pulse_seq_Q.append_pulse(PulseRecord(
+            window, N_time_steps, self._waveform_resolution, if_amp2,
+            phase, frequency_hz, if_offs2, window_parameter, hd_amplitude))
         return self
 
     def add_sine_pulse_from_string(self, pulse_string, pulse_duration,
@@ -477,6 +1023,41 @@ class IQPulseBuilder():
                     pulse_string))
         return self
 
+    def add_multiplexed_pulse(self, duration, multiplexed_readout):
+        """
+        Adds the sum of the tones of a
+        `lib2.multiplexed_readout.MultiplexedReadout`, each calibrated at
+        its own IF frequency
+
+        Parameters:
+        -----------
+        duration: float, ns
+        multiplexed_readout: MultiplexedReadout
+        """
+        waveform_I, waveform_Q = multiplexed_readout.get_waveforms(
+            duration, self._pulse_seq_I.total_points())
+        self._pulse_seq_I.append_pulse(waveform_I)
+        self._pulse_seq_Q.append_pulse(waveform_Q)
+        return self
+
+    def add_gates(self, gates, gate_library):
+        """
+        Adds the gates, e.g. ["+X/2", "+Z/2", "-Y"], assembled from the
+        cached waveforms of a `lib2.gate_library.GateLibrary`; the "Z"
+        gates are virtual
+
+        Parameters:
+        -----------
+        gates: list[str]
+        gate_library: GateLibrary
+            library made for the calibration of this builder
+        """
+        waveform_I, waveform_Q = gate_library.render(
+            gates, self._pulse_seq_I.total_points())
+        self._pulse_seq_I.append_pulse(waveform_I)
+        self._pulse_seq_Q.append_pulse(waveform_Q)
+        return self
+
     # """
     # for 1 AWG and 2 qubits SHAMIL
     # """
@@ -950,12 +1531,10 @@ class IQPulseBuilder():
         '''
         pb0 = exc_pb
         # pulse sequence is separated into positive and negative sequences
-        pb0._iqmx_calibration._if_offsets /= 2
-        pb0._iqmx_calibration._dc_offsets /= 2
-        pb_p = deepcopy(pb0)
-        pb_n = deepcopy(pb0)
-        pb0._iqmx_calibration._if_offsets *= 2
-        pb0._iqmx_calibration._dc_offsets *= 2
+        halved_offsets = dict(if_offsets=asarray(pb0._if_offsets) / 2,
+                              dc_offsets=asarray(pb0._dc_offsets) / 2)
+        pb_p = pb0.copy().override_calibration(**halved_offsets)
+        pb_n = pb0.copy().override_calibration(**halved_offsets)
 
         ''' 
         Calculating positions of the
@@ -1090,7 +1669,7 @@ class IQPulseBuilder():
                     pulse_freq = freq + d_freq
                     pb_p = pb_p.add_sine_pulse(excitation_duration,
                                                window=window,
-                                               if_freq=pulse_freq,
+                                               frequency=pulse_freq,
                                                phase=phase_shift,
                                                amplitude_mult=amplitude) \
                         .add_zero_pulse(p_delays[p_idx])
@@ -1099,7 +1678,7 @@ class IQPulseBuilder():
                     pulse_freq = freq - d_freq
                     pb_n = pb_n.add_sine_pulse(excitation_duration,
                                                window=window,
-                                               if_freq=pulse_freq,
+                                               frequency=pulse_freq,
                                                phase=phase_shift,
                                                amplitude_mult=amplitude) \
                         .add_zero_pulse(n_delays[n_idx])
@@ -1168,7 +1747,7 @@ class IQPulseBuilder():
                 exc_pb = exc_pb.add_sine_pulse(excitation_durations[j],
                                                window=window,
                                                phase=(phase_shifts[j]),
-                                               if_freq=freqs[pulse_types[j]],
+                                               frequency=freqs[pulse_types[j]],
                                                amplitude_mult=amplitudes[j],
                                                window_parameter=
                                                window_parameter)
@@ -1256,13 +1835,13 @@ class IQPulseBuilder():
             exc_pb = exc_pb.add_zero_pulse(start_delay) \
                 .add_sine_pulse(excitation_durations[0],
                                 window=window,
-                                if_freq=freqs[pulse_types[0]],
+                                frequency=freqs[pulse_types[0]],
                                 phase=(phase_shifts[0]),
                                 amplitude_mult=amplitudes[0]) \
                 .add_zero_pulse(after_pulse_delay) \
                 .add_sine_pulse(excitation_durations[1],
                                 window=window,
-                                if_freq=freqs[pulse_types[1]],
+                                frequency=freqs[pulse_types[1]],
                                 phase=(phase_shifts[1]),
                                 amplitude_mult=amplitudes[1]) \
                 .add_zero_until((i + 1) * repetition_period)
@@ -1644,12 +2223,19 @@ class IQPulseBuilder():
         exc_pb.add_zero_pulse(awg_trigger_reaction_delay)
         global_phase = 0
         excitation_duration = 0
-        for idx, pulse_str in enumerate(benchmarking_sequence):
-            exc_pb.add_sine_pulse_from_string(pulse_str,
-                                              pulse_duration,
-                                              pi_pulse_amplitude, window)
-            exc_pb.add_zero_pulse(padding)
-            excitation_duration += pulse_duration + padding
+        if "gate_library" in pulse_sequence_parameters:
+            # the gate parameters and the padding are the ones of the library
+            exc_pb.add_gates(benchmarking_sequence,
+                             pulse_sequence_parameters["gate_library"])
+            excitation_duration = \
+                exc_pb.get_duration() - awg_trigger_reaction_delay
+        else:
+            for idx, pulse_str in enumerate(benchmarking_sequence):
+                exc_pb.add_sine_pulse_from_string(pulse_str,
+                                                  pulse_duration,
+                                                  pi_pulse_amplitude, window)
+                exc_pb.add_zero_pulse(padding)
+                excitation_duration += pulse_duration + padding
         exc_pb.add_zero_until(repetition_period)
         ro_pb.add_zero_pulse(excitation_duration) \
             .add_dc_pulse(readout_duration) \
@@ -2253,8 +2839,8 @@ class IQPulseBuilder():
         ro_pb = pbs['ro_pbs'][0]
         z_pb = pbs['q_z_pbs'][0]
 
-        exc_pbs[0][1]._iqmx_calibration._dc_offsets = array([0, 0])
-        exc_pbs[0][1]._iqmx_calibration._if_offsets = array([0, 0])
+        exc_pbs[0][1].override_calibration(dc_offsets=array([0, 0]),
+                                           if_offsets=array([0, 0]))
         exc_pbs[0][0].add_zero_pulse(awg_trigger_reaction_delay) \
             .add_sine_pulse(excitation_duration, 0, amplitude_mult=amplitude_1,
                             window=window) \
@@ -2373,8 +2959,8 @@ class IQPulseBuilder():
 
         exc_pb1 = pbs['q_pbs'][0][0]
         exc_pb2 = pbs["q_pbs"][0][1]
-        exc_pb2._iqmx_calibration._dc_offsets = array([0, 0])
-        exc_pb2._iqmx_calibration._if_offsets = array([0, 0])
+        exc_pb2.override_calibration(dc_offsets=array([0, 0]),
+                                     if_offsets=array([0, 0]))
 
         z_pb = pbs['q_z_pbs'][0]
         ro_pb = pbs['ro_pbs'][0]
@@ -2461,8 +3047,8 @@ class IQPulseBuilder():
 
         exc_pb1 = pbs['q_pbs'][0][0]
         exc_pb2 = pbs["q_pbs"][0][1]
-        exc_pb2._iqmx_calibration._dc_offsets = array([0, 0])
-        exc_pb2._iqmx_calibration._if_offsets = array([0, 0])
+        exc_pb2.override_calibration(dc_offsets=array([0, 0]),
+                                     if_offsets=array([0, 0]))
 
         z_pb = pbs['q_z_pbs'][0]
         ro_pb = pbs['ro_pbs'][0]
@@ -2520,8 +3106,8 @@ class IQPulseBuilder():
 
         exc_pb1 = pbs['q_pbs'][0]
         exc_pb2 = pbs["q_pbs"][1]
-        exc_pb2._iqmx_calibration._dc_offsets = array([0, 0])
-        exc_pb2._iqmx_calibration._if_offsets = array([0, 0])
+        exc_pb2.override_calibration(dc_offsets=array([0, 0]),
+                                     if_offsets=array([0, 0]))
 
         z_pb = pbs['q_z_pbs'][0]
         ro_pb = pbs['ro_pbs'][0]
@@ -2,18 +2,35 @@ from numpy import *
 from lib2.QuantumState import *
 from random import choice
 
+from lib2.clifford import CliffordGroup
+
 
 class InterleavedBenchmarkingSequenceGenerator():
 
     def __init__(self, number_of_sequences=2, max_sequence_length=10,
-                 gate_to_benchmark="X/2"):
-
+                 gate_to_benchmark="X/2", clifford_group=None):
+        """
+        clifford_group : CliffordGroup
+            if given, the sequences consist of random elements of the
+            single-qubit Clifford group and the recovery gates are found in
+            its tables; `gate_to_benchmark` has to be a Clifford gate then
+        """
         self._gate_to_benchmark = gate_to_benchmark
         self._number_of_sequences = number_of_sequences
         self._cliffords = ["I", "X/2", "Y/2"]
         self._max_sequence_length = max_sequence_length
+        self._clifford_group = clifford_group
 
     def generate_full_sequences(self):
+        if self._clifford_group is not None:
+            group = self._clifford_group
+            gate = self._gate_to_benchmark
+            gate = gate if gate[0] in "+-" else "+" + gate
+            self._reference_sequences = group.random_cliffords(
+                self._number_of_sequences, self._max_sequence_length)
+            self._interleaved_sequences = group.interleave(
+                self._reference_sequences, group.index_of([gate]))
+            return
         self._reference_sequences = \
             [self._generate_reference_sequence() \
              for i in range(self._number_of_sequences)]
@@ -22,6 +39,14 @@ class InterleavedBenchmarkingSequenceGenerator():
              for sequence in self._reference_sequences]
 
     def generate_partial_sequences(self, subsequence_length):
+        if self._clifford_group is not None:
+            group = self._clifford_group
+            return [group.to_pulses(sequence) for sequence in
+                    group.with_recovery(self._reference_sequences[
+                                        :, :subsequence_length])], \
+                   [group.to_pulses(sequence) for sequence in
+                    group.with_recovery(self._interleaved_sequences[
+                                        :, :subsequence_length * 2])]
         recovered_reference_sequences = \
             [self._calculate_and_insert_recovery_gate(sequence[:subsequence_length]) \
              for sequence in self._reference_sequences]
@@ -19,9 +19,12 @@ from threading import Thread
 from typing import Dict, Tuple, List
 
 from lib2.MeasurementResult import MeasurementResult
+from lib2.Profiler import Profiler, ProfiledVisaResource, null_span
 import copy
 from loggingserver import LoggingServer
 from drivers import *
+from drivers import simulated
+from drivers.simulated import *
 from log.LogName import LogName
 
 
@@ -70,7 +73,17 @@ class Measurement:
          'yok4': [["gs210"], [Yokogawa_GS210, "Yokogawa_GS210"]],
          'yok5': [["GS_210_3"], [Yokogawa_GS210, "Yokogawa_GS210"]],
          'yok6': [["YOK1"], [Yokogawa_GS210, "Yokogawa_GS210"]],
-         'k6220': [["k6220"], [k6220, "K6220"]]
+         'k6220': [["k6220"], [k6220, "K6220"]],
+         # simulated devices, see drivers.simulated
+         'sim_vna': [["SIM-PNA-L"], [sim_agilent_PNA_L, "SimulatedPNA_L"]],
+         'sim_exa': [["SIM-EXA"], [sim_agilent_EXA, "SimulatedEXA"]],
+         'sim_mxg': [["SIM-MXG"], [sim_E8257D, "SimulatedMXG"]],
+         'sim_exg': [["SIM-EXG"], [sim_E8257D, "SimulatedEXG"]],
+         'sim_yok': [["SIM-GS210"],
+                     [sim_Yokogawa_GS210, "SimulatedYokogawa_GS210"]],
+         'sim_dig': [["SIM-M4X"], [sim_Spectrum_m4x, "SimulatedSPCM"]],
+         'sim_awg': [["SIM-M3202A"],
+                     [sim_keysightM3202A, "SimulatedM3202A"]]
          }
 
     def __init__(self, name, sample_name, devs_aliases_map,
@@ -135,6 +148,7 @@ class Measurement:
         self._swept_pars_names: List[str] = None
         # TODO: explicit definition of members in child classes
         self._measurement_result = None  # should be initialized in child class
+        self._profiler = None  # see enable_profiling()
 
         self._resonator_detector = ResonatorDetector(
             type=GlobalParameters().resonator_type,
@@ -142,6 +156,7 @@ class Measurement:
 
         self._devs_aliases_map = devs_aliases_map
         self._list = ""
+        self._devs_info = []
         try:
             rm = pyvisa.ResourceManager()
             # returns list of tuples: (IP Address string, alias) for all
@@ -151,6 +166,8 @@ class Measurement:
         except ValueError:
             print(
                 "NI Visa implementation not found; automatic device discovery unavailable")
+        # simulated devices are always discoverable
+        self._devs_info += simulated.SIMULATED_ADDRESSES
 
         for field_name, dev_list in self._devs_aliases_map.items():
             atr_name = "_" + field_name
@@ -280,6 +297,7 @@ class Measurement:
 
     def measure(self):
         self._measurement_result.set_is_finished(False)  # ensure
+        restore_devices = self._start_profiling()
 
         try:
             self._record_data()
@@ -288,12 +306,68 @@ class Measurement:
             self._measurement_result.set_exception_info(sys.exc_info())
         finally:
             self._finalize()
+            self._stop_profiling(restore_devices)
             self._measurement_result.set_is_finished(True)
 
+    def enable_profiling(self, enabled=True):
+        """
+        Turns on timing of the main loop phases and of the device I/O.
+        Statistics of the last `measure()` call are returned by
+        `get_profile()` and stored into the result context, see
+        `ContextBase.get_profile()`.
+        """
+        self._profiler = Profiler() if enabled else None
+
+    def get_profile(self):
+        """
+        Returns
+        -------
+        profile : dict or None
+            {span_name: {"count", "total", "mean", "min", "max", "p50",
+            "p99"}}, durations in seconds; None if profiling is disabled
+        """
+        if self._profiler is None:
+            return None
+        return self._profiler.get_profile()
+
+    def _start_profiling(self):
+        """
+        Returns
+        -------
+        restore_devices : list[tuple]
+            (device, original VISA resource) pairs for `_stop_profiling()`
+        """
+        if self._profiler is None:
+            return []
+        self._profiler.reset()
+        self._profiler.activate()
+        restore_devices = []
+        for field_name in self._devs_aliases_map.keys():
+            for device in getattr(self, "_" + field_name):
+                resource = getattr(device, "_visainstrument", None)
+                if resource is None or \
+                        isinstance(resource, ProfiledVisaResource):
+                    continue  # same device listed twice
+                device._visainstrument = ProfiledVisaResource(resource,
+                                                              self._profiler)
+                restore_devices.append((device, resource))
+        return restore_devices
+
+    def _stop_profiling(self, restore_devices):
+        if self._profiler is None:
+            return
+        for device, resource in restore_devices:
+            device._visainstrument = resource
+        self._profiler.deactivate()
+        self._measurement_result.get_context().set_profile(
+            self._profiler.get_profile())
+
     def _record_data(self):
         par_names = self._swept_pars_names
         done_iterations = 0
         start_time = self._measurement_result.get_start_datetime()
+        phase = self._profiler.span if self._profiler is not None \
+            else null_span
 
         parameters_values = [self._swept_pars[parameter_name][1]
                              for parameter_name in par_names]
@@ -304,46 +378,37 @@ class Measurement:
 
         for idx_group, values_group in zip(product(*parameters_idxs),
                                            product(*parameters_values)):
-            self._call_setters(values_group)
-            # This should be implemented in child classes:
-            data = self._recording_iteration()
-
-            # dynamically allocating memory for the measurement based on
-            # the returned data dimensions
-            if done_iterations == 0:
-                try:
-                    self._raw_data = zeros(raw_data_shape + [len(data)],
-                                           dtype=complex_)
-                except TypeError:  # data has no __len__ attribute
-                    self._raw_data = zeros(raw_data_shape, dtype=complex_)
-            self._raw_data[idx_group] = data
-
-            # This may need to be extended in child classes:
-            measurement_data = self._prepare_measurement_result_data(par_names,
-                                                                     parameters_values)
-            self._measurement_result.set_data(measurement_data)
-            self._measurement_result._iter_idx_ready = idx_group
-
-            done_iterations += 1
-
-            avg_time = (dt.now() - start_time).total_seconds() / \
-                       done_iterations
-            time_left = self._format_time_delta(
-                avg_time * (total_iterations - done_iterations))
-
-            formatted_values_group = "["
-            for idx, value in enumerate(values_group):
-                if isinstance(value, (float, int, np.float)):
-                    formatted_values_group += "{}: {:.2e}, ".format(
-                        par_names[idx], value)
-                else:
-                    formatted_values_group += "{}: {}, ".format(par_names[idx],
-                                                                value)
-            formatted_values_group = formatted_values_group[:-2] + "]"
-
-            print(f"\rTime left: {time_left}, {formatted_values_group}, "
-                  f"average cycle time: {avg_time:.2f} s",
-                  end="", flush=True)
+            with phase("iteration"):
+                with phase("iteration.setters"):
+                    self._call_setters(values_group)
+                with phase("iteration.recording"):
+                    # This should be implemented in child classes:
+                    data = self._recording_iteration()
+
+                with phase("iteration.set_data"):
+                    # dynamically allocating memory for the measurement based
+                    # on the returned data dimensions
+                    if done_iterations == 0:
+                        try:
+                            self._raw_data = zeros(
+                                raw_data_shape + [len(data)], dtype=complex_)
+                        except TypeError:  # data has no __len__ attribute
+                            self._raw_data = zeros(raw_data_shape,
+                                                   dtype=complex_)
+                    self._raw_data[idx_group] = data
+
+                    # This may need to be extended in child classes:
+                    measurement_data = self._prepare_measurement_result_data(
+                        par_names, parameters_values)
+                    self._measurement_result.set_data(measurement_data)
+                    self._measurement_result._iter_idx_ready = idx_group
+
+                done_iterations += 1
+
+                with phase("iteration.progress"):
+                    self._print_progress(start_time, done_iterations,
+                                         total_iterations, par_names,
+                                         values_group)
 
             if self._interrupted:
                 return
@@ -353,6 +418,26 @@ class Measurement:
         print(f"\nElapsed time: "
               f"{self._format_time_delta(time_elapsed.total_seconds())}")
 
+    def _print_progress(self, start_time, done_iterations, total_iterations,
+                        par_names, values_group):
+        avg_time = (dt.now() - start_time).total_seconds() / done_iterations
+        time_left = self._format_time_delta(
+            avg_time * (total_iterations - done_iterations))
+
+        formatted_values_group = "["
+        for idx, value in enumerate(values_group):
+            if isinstance(value, (float, int)):
+                formatted_values_group += "{}: {:.2e}, ".format(
+                    par_names[idx], value)
+            else:
+                formatted_values_group += "{}: {}, ".format(par_names[idx],
+                                                            value)
+        formatted_values_group = formatted_values_group[:-2] + "]"
+
+        print(f"\rTime left: {time_left}, {formatted_values_group}, "
+              f"average cycle time: {avg_time:.2f} s",
+              end="", flush=True)
+
     def _finalize(self):
         """
         Post-measurement clean-up. E.g. setting all voltage/bias sources to 0,
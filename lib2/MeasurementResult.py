@@ -18,6 +18,8 @@ from matplotlib import animation, pyplot as plt
 from matplotlib._pylab_helpers import Gcf
 from IPython.display import clear_output
 
+from lib2.Profiler import span
+
 locale.setlocale(locale.LC_TIME, "C")
 
 
@@ -35,10 +37,22 @@ class ContextBase:
     def __init__(self):
         self._equipment = {}
         self._comment = ""
+        self._profile = None
 
     def get_equipment(self):
         return self._equipment
 
+    def get_profile(self):
+        """
+        Timing statistics of the measurement, see `Measurement.get_profile`;
+        None if it was not profiled
+        """
+        # the contexts saved before have no profile
+        return getattr(self, "_profile", None)
+
+    def set_profile(self, profile):
+        self._profile = profile
+
     def to_string(self):
         self._equipment.update({"comment:": self._comment})
 
@@ -321,10 +335,14 @@ class MeasurementResult:
             # we are probably in the notebook regime
             fig.set_size_inches(10, 5)
 
-        self._anim = animation.FuncAnimation(fig, self._plot,
+        self._anim = animation.FuncAnimation(fig, self._plot_frame,
                                              frames=self._yield_data,
                                              repeat=False, interval=100)
 
+    def _plot_frame(self, data):
+        with span("plot"):
+            self._plot(data)
+
     def _prepare_figure(self):
         """
         This method must be implemented for each new measurement type.
@@ -366,7 +384,7 @@ class MeasurementResult:
                 ax_map_im.set_title("Imaginary", position=(0.5, -0.1))
                 ax_map_re.grid(False)
                 ax_map_im.grid(False)
-                fig.canvas.set_window_title(self._name)
+                fig.canvas.manager.set_window_title(self._name)
                 return fig, (ax_trace, ax_map_re, ax_map_im), (cax_re, cax_im)
         """
         fig, axes = plt.subplots(1, 2, figsize=(15, 7))
@@ -0,0 +1,161 @@
+"""
+Timing instrumentation of the measurement loop.
+
+A `Profiler` collects durations of named spans. `Measurement` times the
+phases of every iteration of its main loop with it, and drivers mark their
+own hot spots (DMA transfers, waveform uploads) with the module-level
+`span()`:
+
+    from lib2.Profiler import span
+
+    def obtain_data(self):
+        with span("dig.dma"):
+            ...
+
+`span()` returns a shared no-op context manager while no profiler is
+active, so the instrumentation costs one function call when disabled.
+VISA traffic is timed without touching the drivers by temporarily replacing
+`device._visainstrument` with a `ProfiledVisaResource`.
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+# the profiler that receives the spans opened by the drivers
+_active_profiler = None
+
+
+class _NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def null_span(name):
+    return _NULL_SPAN
+
+
+class _Span:
+    __slots__ = ("_profiler", "_name", "_start")
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._profiler.record(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class Profiler:
+    """
+    Accumulates durations of named spans.
+
+    Span names are dot-separated, e.g. "iteration.setters" or "visa.query";
+    the statistics are aggregated by the full name.
+    """
+
+    def __init__(self):
+        self._durations = OrderedDict()
+        self._lock = Lock()  # plotting spans come from the GUI thread
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def record(self, name, duration):
+        with self._lock:
+            if name not in self._durations:
+                self._durations[name] = []
+            self._durations[name].append(duration)
+
+    def reset(self):
+        with self._lock:
+            self._durations = OrderedDict()
+
+    def activate(self):
+        """
+        Makes the profiler receive the spans opened with `span()`
+        """
+        global _active_profiler
+        _active_profiler = self
+
+    def deactivate(self):
+        global _active_profiler
+        if _active_profiler is self:
+            _active_profiler = None
+
+    def get_profile(self):
+        """
+        Returns
+        -------
+        profile : dict
+            {span_name: {"count", "total", "mean", "min", "max", "p50",
+            "p99"}}, durations in seconds
+        """
+        with self._lock:
+            durations = [(name, np.array(values))
+                         for name, values in self._durations.items()]
+        profile = OrderedDict()
+        for name, values in durations:
+            profile[name] = {"count": len(values),
+                             "total": float(np.sum(values)),
+                             "mean": float(np.mean(values)),
+                             "min": float(np.min(values)),
+                             "max": float(np.max(values)),
+                             "p50": float(np.percentile(values, 50)),
+                             "p99": float(np.percentile(values, 99))}
+        return profile
+
+
+def span(name):
+    """
+    Times the enclosed block if a profiler is active.
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name)
+
+
+class ProfiledVisaResource:
+    """
+    Proxy of a pyvisa resource that reports the time of every I/O call as
+    a "visa.<method>" span. Everything else is passed to the resource.
+    """
+    _TIMED_METHODS = ("write", "read", "query", "ask", "write_raw",
+                      "read_raw", "read_bytes", "write_ascii_values",
+                      "write_binary_values", "read_ascii_values",
+                      "read_binary_values", "query_ascii_values",
+                      "query_binary_values")
+
+    def __init__(self, resource, profiler):
+        object.__setattr__(self, "_resource", resource)
+        object.__setattr__(self, "_profiler", profiler)
+
+    def __getattr__(self, name):
+        attr = getattr(self._resource, name)
+        if name not in self._TIMED_METHODS:
+            return attr
+        profiler = self._profiler
+        span_name = "visa." + name
+
+        def timed(*args, **kwargs):
+            with profiler.span(span_name):
+                return attr(*args, **kwargs)
+
+        return timed
+
+    def __setattr__(self, name, value):
+        setattr(self._resource, name, value)
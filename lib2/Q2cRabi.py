@@ -47,7 +47,7 @@ class Q2cRabiResult(VNATimeResolvedDispersiveMeasurement1DResult):
 
     def _prepare_figure(self):
         fig, axes = plt.subplots(4, 1, figsize=(15, 7), sharex=True)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         axes = ravel(axes)
 
         self._DRO_one_result._figure = fig
@@ -118,7 +118,7 @@ class Q2cRabiResultMultiplexed(VNATimeResolvedDispersiveMeasurement1DResult):
 
     def _prepare_figure(self):
         fig, axes = plt.subplots(4, 1, figsize=(15, 7), sharex=True)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         axes = ravel(axes)
 
         self._DRO_one_result._figure = fig
@@ -48,7 +48,7 @@ class Q2cRamseyResult(VNATimeResolvedDispersiveMeasurement1DResult):
 
     def _prepare_figure(self):
         fig, axes = plt.subplots(4, 1, figsize=(15, 7), sharex=True)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         axes = ravel(axes)
 
         self._DR_one_result._figure = fig
@@ -117,7 +117,7 @@ class Q2cRamseyResultMultiplexed(VNATimeResolvedDispersiveMeasurement1DResult):
 
     def _prepare_figure(self):
         fig, axes = plt.subplots(4, 1, figsize=(15, 7), sharex=True)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         axes = ravel(axes)
 
         self._DR_one_result._figure = fig
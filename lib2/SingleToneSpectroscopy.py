@@ -186,7 +186,7 @@ class SingleToneSpectroscopyResult(MeasurementResult):
                            position=(0.5, -0.1))
         ax_amps.grid()
         ax_phas.grid()
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         return fig, axes, (cax_amps, cax_phas)
 
     def set_phase_units(self, units):
@@ -396,7 +396,7 @@ class SingleToneSpectroscopy2(DigitizerTimeResolvedDirectMeasurement):
 
     def _recording_iteration(self):
         self._q_iqawg.output_pulse_sequence()
-        trace = np.empty_like(self._frequencies, dtype=np.complex)
+        trace = np.empty_like(self._frequencies, dtype=complex)
         for i, freq in enumerate(self._frequencies):
             self._q_lo.set_frequency(freq)
             sleep(self._rf_generator_delay)
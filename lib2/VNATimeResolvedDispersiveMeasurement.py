@@ -3,6 +3,8 @@ from lib2.MeasurementResult import *
 from lib2.IQPulseSequence import *
 
 from scipy.optimize import curve_fit
+import hashlib
+import json
 
 
 class VNATimeResolvedDispersiveMeasurementContext(ContextBase):
@@ -10,10 +12,38 @@ class VNATimeResolvedDispersiveMeasurementContext(ContextBase):
     def __init__(self):
         super().__init__()
         self._pulse_sequence_parameters = {}
+        self._pulse_sequences = []
+        # digests of the descriptions in _pulse_sequences
+        self._pulse_sequence_digests = set()
 
     def get_pulse_sequence_parameters(self):
         return self._pulse_sequence_parameters
 
+    def get_pulse_sequences(self):
+        """
+        Returns
+        -------
+        list[dict]
+            descriptions (see `PulseSequence.toJSON`) of the distinct
+            sequences output during the measurement, in the order of their
+            first output; the arrays of samples are referenced by digests
+        """
+        # the contexts saved before have no sequences
+        return getattr(self, "_pulse_sequences", [])
+
+    def add_pulse_sequences(self, seqs):
+        description = {key: [sequence.toJSON() for sequence in sequences
+                             if hasattr(sequence, "toJSON")]
+                       for key, sequences in seqs.items()}
+        digest = hashlib.sha1(json.dumps(description, sort_keys=True)
+                              .encode()).hexdigest()
+        if not hasattr(self, "_pulse_sequence_digests"):
+            # contexts saved before keep every point
+            self._pulse_sequence_digests = set()
+        if digest not in self._pulse_sequence_digests:
+            self._pulse_sequence_digests.add(digest)
+            self._pulse_sequences.append(description)
+
     def to_string(self):
         return "Pulse sequence parameters:\n" + \
                str(self._pulse_sequence_parameters) + "\n" + \
@@ -187,7 +217,10 @@ class VNATimeResolvedDispersiveMeasurement(Measurement):
                'ro_pbs': ro_pbs,
                'q_z_pbs': q_z_pbs}
 
-        seqs = self._sequence_generator(self._pulse_sequence_parameters, **pbs)
+        seqs = self._build_sequences(pbs)
+        context = self._measurement_result.get_context()
+        if hasattr(context, "add_pulse_sequences"):
+            context.add_pulse_sequences(seqs)
 
         for (seq, dev) in zip(seqs['q_seqs'], self._q_awg):
             dev.output_pulse_sequence(seq)
@@ -197,6 +230,9 @@ class VNATimeResolvedDispersiveMeasurement(Measurement):
             for (seq, dev) in zip(seqs['q_z_seqs'], self._q_z_awg):
                 dev.output_pulse_sequence(seq, asynchronous=False)
 
+    def _build_sequences(self, pbs):
+        return self._sequence_generator(self._pulse_sequence_parameters, **pbs)
+
 
 class VNATimeResolvedDispersiveMeasurementResult(MeasurementResult):
 
@@ -243,6 +279,6 @@ class VNATimeResolvedDispersiveMeasurementResult(MeasurementResult):
 
     def _prepare_figure(self):
         fig, axes = plt.subplots(1, 2, figsize=(15, 7), sharey=True)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         axes = ravel(axes)
         return fig, axes, (None, None)
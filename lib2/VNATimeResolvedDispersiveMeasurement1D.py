@@ -1,5 +1,7 @@
 from lib2.VNATimeResolvedDispersiveMeasurement import \
     VNATimeResolvedDispersiveMeasurement, VNATimeResolvedDispersiveMeasurementResult
+from lib2.Profiler import span
+from lib2.parametric_sequence import ParametricSequence
 # from lib2.IQPulseSequence import *
 
 import numpy as np
@@ -39,6 +41,19 @@ class VNATimeResolvedDispersiveMeasurement1D(VNATimeResolvedDispersiveMeasuremen
         self._pulse_sequence_parameters[self._swept_parameter_name] = sequence_parameter
         super()._output_pulse_sequence()
 
+    def _build_sequences(self, pbs):
+        # only the samples that depend on the swept parameter are updated
+        # from point to point
+        sequence = getattr(self, "_parametric_sequence", None)
+        if sequence is None or \
+                sequence.get_sequence_generator() != self._sequence_generator:
+            sequence = self._parametric_sequence = ParametricSequence(
+                self._sequence_generator, self._pulse_sequence_parameters,
+                self._swept_parameter_name)
+        return sequence.build(
+            self._pulse_sequence_parameters[self._swept_parameter_name],
+            **pbs)
+
 
 class VNATimeResolvedDispersiveMeasurement1DResult( \
         VNATimeResolvedDispersiveMeasurementResult):
@@ -164,7 +179,8 @@ class VNATimeResolvedDispersiveMeasurement1DResult( \
         X = X[:len(data)]
 
         try:
-            result, err = self._fit_complex_curve(X, data)
+            with span("fit"):
+                result, err = self._fit_complex_curve(X, data)
             if result.success:
                 self._fit_params = result.x
                 self._fit_errors = err
@@ -174,7 +190,7 @@ class VNATimeResolvedDispersiveMeasurement1DResult( \
 
     def _prepare_figure(self):
         fig, axes = plt.subplots(2, 1, figsize=(15, 7), sharex=True)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         axes = np.ravel(axes)
         return fig, axes, (None, None)
 
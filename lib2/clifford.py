@@ -0,0 +1,228 @@
+"""
+Clifford groups of one and two qubits as integer tables.
+
+    group = CliffordGroup()        # 24 elements, CliffordGroup(2) has 11520
+    cliffords = group.random_cliffords(1000, 50)
+    reference = group.with_recovery(cliffords)
+    interleaved = group.with_recovery(
+        group.interleave(cliffords, group.index_of(["+X/2"])))
+    group.to_pulses(reference[0])   # ["+Y/2", "-X/2", "+X", ...]
+
+The elements are enumerated once by a breadth-first search over the
+generating pulses, whose unitaries are the ones of
+`lib2.QuantumState.matrix_from_gate`, so every element keeps one of its
+shortest decompositions into the pulses understood by
+`IQPulseBuilder.add_sine_pulse_from_string`. Afterwards composition and
+inversion are integer table lookups: the recovery gate of a sequence of
+m Cliffords costs m lookups, and all sequences of an experiment are
+processed together in one vectorized pass.
+
+Two-qubit elements are decomposed into moments: pairs of pulses of the
+first and the second qubit, or "CZ".
+"""
+import numpy as np
+
+from lib2.QuantumState import matrix_from_gate
+
+SINGLE_QUBIT_GENERATORS = ("+X/2", "-X/2", "+Y/2", "-Y/2", "+X", "+Y")
+IDLE = "+I"
+# groups up to this size get a full multiplication table
+MAX_PRODUCT_TABLE_SIZE = 1024
+
+
+def _generators(n_qubits):
+    if n_qubits == 1:
+        return list(SINGLE_QUBIT_GENERATORS)
+    if n_qubits == 2:
+        return [(pulse, IDLE) for pulse in SINGLE_QUBIT_GENERATORS] + \
+               [(IDLE, pulse) for pulse in SINGLE_QUBIT_GENERATORS] + ["CZ"]
+    raise ValueError("Clifford groups of %d qubits are not supported"
+                     % n_qubits)
+
+
+def _moment_unitary(moment):
+    if moment == "CZ":
+        return np.diag([1, 1, 1, -1]).astype(complex)
+    if isinstance(moment, str):
+        return np.asarray(matrix_from_gate(moment))
+    return np.kron(np.asarray(matrix_from_gate(moment[0])),
+                   np.asarray(matrix_from_gate(moment[1])))
+
+
+def _keys(unitaries):
+    """
+    Hashable keys of the unitaries, equal for the unitaries that differ
+    by a global phase only
+    """
+    flat = unitaries.reshape(len(unitaries), -1)
+    pivot = flat[np.arange(len(flat)),
+                 np.argmax(np.abs(flat) > 1e-6, axis=1)]
+    normalized = np.round(flat * (np.abs(pivot) / pivot)[:, np.newaxis], 6)
+    # + 0. turns the negative zeros into positive ones
+    parts = np.stack((normalized.real, normalized.imag), axis=-1) + 0.
+    return [row.tobytes() for row in parts.reshape(len(flat), -1)]
+
+
+class CliffordGroup:
+
+    def __init__(self, n_qubits=1):
+        """
+        Parameters
+        ----------
+        n_qubits : int
+            1 or 2
+        """
+        self.n_qubits = n_qubits
+        self.generators = _generators(n_qubits)
+        generator_unitaries = np.array([_moment_unitary(moment)
+                                        for moment in self.generators])
+        dimension = 2 ** n_qubits
+
+        unitaries = [np.eye(dimension, dtype=complex)]
+        words = [()]
+        self._index = {_keys(unitaries[0][np.newaxis])[0]: 0}
+        # element after the generator, the last column is the identity
+        # that pads the words to one length
+        table = []
+        frontier = [0]
+        while frontier:
+            products = generator_unitaries[np.newaxis] @ \
+                np.array([unitaries[element] for element in frontier]
+                         )[:, np.newaxis]
+            keys = _keys(products.reshape(-1, dimension, dimension))
+            new_frontier = []
+            for row, element in enumerate(frontier):
+                entry = []
+                for column in range(len(self.generators)):
+                    key = keys[row * len(self.generators) + column]
+                    if key not in self._index:
+                        self._index[key] = len(unitaries)
+                        unitaries.append(products[row, column])
+                        words.append(words[element] + (column,))
+                        new_frontier.append(self._index[key])
+                    entry.append(self._index[key])
+                table.append((element, entry))
+            frontier = new_frontier
+
+        self.size = len(unitaries)
+        self.unitaries = np.array(unitaries)
+        self.generator_table = np.empty((self.size, len(self.generators) + 1),
+                                        dtype=np.int32)
+        for element, entry in table:
+            self.generator_table[element, :-1] = entry
+        self.generator_table[:, -1] = np.arange(self.size)
+        self._words = words
+        self._padded_words = np.full(
+            (self.size, max(len(word) for word in words)),
+            len(self.generators), dtype=np.int32)
+        for element, word in enumerate(words):
+            self._padded_words[element, :len(word)] = word
+
+        self.inverse = np.array(
+            [self._index[key] for key in
+             _keys(np.conj(np.swapaxes(self.unitaries, 1, 2)))],
+            dtype=np.int32)
+        self.products = None
+        if self.size <= MAX_PRODUCT_TABLE_SIZE:
+            elements = np.arange(self.size, dtype=np.int32)
+            self.products = self._walk(elements[:, np.newaxis],
+                                       elements[np.newaxis, :])
+
+    def __len__(self):
+        return self.size
+
+    def _walk(self, first, second):
+        result, words = np.broadcast_arrays(first, second)
+        result = result.astype(np.int32)
+        words = self._padded_words[words]
+        for step in range(words.shape[-1]):
+            result = self.generator_table[result, words[..., step]]
+        return result
+
+    def compose(self, first, second):
+        """
+        Index of the element `first` followed by `second`, i.e. of the
+        unitary U_second U_first; arrays of indices are broadcast
+        """
+        if self.products is not None:
+            return self.products[first, second]
+        return self._walk(first, second)
+
+    def product(self, sequences):
+        """
+        Index of the whole sequence of elements along the last axis
+        """
+        sequences = np.asarray(sequences)
+        result = np.zeros(sequences.shape[:-1], dtype=np.int32)
+        for step in range(sequences.shape[-1]):
+            result = self.compose(result, sequences[..., step])
+        return result
+
+    def random_cliffords(self, n_sequences, length, rng=None):
+        """
+        Returns
+        -------
+        np.ndarray
+            shape (n_sequences, length), uniformly distributed indices
+        """
+        rng = np.random.default_rng(rng)
+        return rng.integers(self.size, size=(n_sequences, length),
+                            dtype=np.int32)
+
+    def interleave(self, sequences, element):
+        """
+        Places `element` after every element of the sequences
+        """
+        sequences = np.asarray(sequences)
+        interleaved = np.empty(sequences.shape[:-1] +
+                               (2 * sequences.shape[-1],), dtype=np.int32)
+        interleaved[..., ::2] = sequences
+        interleaved[..., 1::2] = element
+        return interleaved
+
+    def with_recovery(self, sequences):
+        """
+        Appends to every sequence the element that inverts it
+        """
+        sequences = np.asarray(sequences)
+        recovery = self.inverse[self.product(sequences)]
+        return np.concatenate((sequences, recovery[..., np.newaxis]), axis=-1)
+
+    def get_unitary(self, moments):
+        """
+        Unitary of the pulses or the moments applied one after another,
+        computed by the matrices of `matrix_from_gate`
+        """
+        unitary = np.eye(2 ** self.n_qubits, dtype=complex)
+        for moment in moments:
+            unitary = _moment_unitary(moment) @ unitary
+        return unitary
+
+    def index_of(self, moments):
+        """
+        Index of the element equal to the pulses or the moments applied
+        one after another, e.g. ["+X/2"]
+        """
+        key = _keys(self.get_unitary(moments)[np.newaxis])[0]
+        if key not in self._index:
+            raise ValueError("%s is not a Clifford gate" % (moments,))
+        return self._index[key]
+
+    def get_decomposition(self, element):
+        """
+        Shortest list of generating pulses or moments of the element, the
+        identity is one idle pulse
+        """
+        word = self._words[element]
+        if not word:
+            return [IDLE if self.n_qubits == 1 else (IDLE,) * self.n_qubits]
+        return [self.generators[column] for column in word]
+
+    def to_pulses(self, sequence):
+        """
+        Pulses or moments of a sequence of elements
+        """
+        pulses = []
+        for element in sequence:
+            pulses += self.get_decomposition(element)
+        return pulses
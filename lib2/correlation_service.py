@@ -0,0 +1,362 @@
+"""
+Correlation service that owns a digitizer and serves the correlation
+matrices of its buffers over gRPC
+(`CUPY_DEV/digitizer_correlation_grpc.proto`).
+
+The server runs on the acquisition host next to the card, so that only
+the accumulated matrices travel to the Jupyter kernel:
+
+    python -m lib2.correlation_service --simulated --port 50051
+
+Every buffer of the card is n_seg segments of interleaved samples
+x = (I0, Q0, I1, Q1, ...) in mV. For the buffers acquired since the
+previous request the server returns the first and second moments
+
+    <x>         vector of length trace_len = 2 * segment_size
+    <x x^T>     trace_len x trace_len matrix
+
+as `CorrelationMatrix.samples` = concatenation of <x> and the flattened
+<x x^T>; the number of segments is sent in the trailing metadata. Moments
+of the real samples are enough to obtain the correlators of the traces
+after any affine processing (`lib2.correlators.transform_moments`), so the
+calibration, the conversion to DC and the filtering stay in the
+measurement class.
+
+The proto has a unary call only, so partial results are streamed by
+repeated requests: `CorrelationServiceClient.stream` yields running
+averages while the server keeps acquiring in the background.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lib2 import dsp
+
+DEFAULT_PORT = 50051
+# sample rate of the card without oversampling, Hz
+MAX_SAMPLE_RATE = 1250000000
+N_SEGMENTS_KEY = "n-segments"
+GRPC_OPTIONS = [("grpc.max_send_message_length", -1),
+                ("grpc.max_receive_message_length", -1)]
+PARAMETER_NAMES = ["channels", "ch_amplitude", "dur_seg", "n_seg",
+                   "oversampling_factor", "pretrigger"]
+
+
+def _import_stubs():
+    """
+    The generated modules import each other by their top-level names
+    """
+    stubs_dir = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), "CUPY_DEV")
+    if stubs_dir not in sys.path:
+        sys.path.append(stubs_dir)
+    import grpc
+    import digitizer_correlation_grpc_pb2 as pb2
+    import digitizer_correlation_grpc_pb2_grpc as pb2_grpc
+    return grpc, pb2, pb2_grpc
+
+
+def get_dig_params(dig):
+    """
+    Parameters of the proto that reproduce the acquisition of `dig`
+    without the hardware trigger delay: the delay is dropped in software
+    by the client, so the segment is extended by it.
+
+    Returns
+    -------
+    dict
+    """
+    sample_rate = dig.get_sample_rate()
+    n_samples = dig.delay_in_samples + dig.get_segment_size()
+    return {"channels": list(dig.channels),
+            "ch_amplitude": int(dig.ch_amplitude),
+            "dur_seg": n_samples / sample_rate * 1e9,
+            "n_seg": int(dig.n_seg),
+            "oversampling_factor": int(round(MAX_SAMPLE_RATE / sample_rate)),
+            "pretrigger": int(dig.pretrigger_in_samples)}
+
+
+def params_to_message(params, pb2):
+    message = pb2.DigParams(**{name: params[name] for name in PARAMETER_NAMES
+                               if name != "channels"})
+    # the proto has a single integer for the list of channels
+    message.channels = sum(1 << channel for channel in params["channels"])
+    return message
+
+
+def message_to_params(message):
+    params = {name: getattr(message, name) for name in PARAMETER_NAMES}
+    params["channels"] = [channel for channel in range(64)
+                          if (message.channels >> channel) & 1]
+    return params
+
+
+def combine_moments(first, second):
+    """
+    Weighted average of two (n_segments, mean, second_moment) tuples
+    """
+    if first is None:
+        return second
+    n = first[0] + second[0]
+    return (n, (first[0] * first[1] + second[0] * second[1]) / n,
+            (first[0] * first[2] + second[0] * second[2]) / n)
+
+
+class CorrelationEngine:
+    """
+    Acquires digitizer buffers and accumulates the moments of the samples.
+
+    `read` returns the moments of the buffers whose acquisition started
+    after the previous `read` returned. With `start()` the digitizer is
+    read continuously in a background thread, otherwise every `read`
+    acquires one buffer itself.
+    """
+
+    def __init__(self, dig, fixed_parameters=None, backend=None):
+        """
+        Parameters
+        ----------
+        dig : SPCM or SimulatedSPCM
+        fixed_parameters : dict
+            digitizer parameters that are not in the proto, e.g. "mode"
+            and "trig_source"
+        backend : NumpyBackend or CupyBackend
+            `lib2.dsp` backend, the CPU one by default
+        """
+        self._dig = dig
+        self._fixed_parameters = fixed_parameters if fixed_parameters \
+            is not None else {"mode": "MULTIPLE", "trig_source": "EXT0"}
+        self._backend = backend or dsp.get_backend("cpu")
+        self._params = None
+        self._dig_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stop = threading.Event()
+        self._since = 0
+        self._reset()
+
+    def _reset(self):
+        self._n_segments = 0
+        self._field_sum = None
+        self._second_sum = None
+
+    def configure(self, params):
+        """
+        Sets up the digitizer if `params` differ from the current ones,
+        the accumulated moments are discarded then
+        """
+        with self._dig_lock:
+            if params == self._params:
+                return
+            self._dig.set_parameters(dict(self._fixed_parameters, **params))
+            self._dig.setup_current_mode()
+            self._params = dict(params)
+            with self._condition:
+                self._reset()
+                self._since = time.monotonic()
+
+    def _buffer_moments(self, buffer, mv_per_code):
+        xp = self._backend.xp
+        data = self._backend.asarray(buffer).reshape(self._dig.n_seg, -1)
+
+        def chunk_moments(chunk):
+            chunk = chunk.astype(np.float32) * np.float32(mv_per_code)
+            return chunk.sum(axis=0, dtype=np.float64), \
+                (chunk.T @ chunk).astype(np.float64)
+
+        results = self._backend.map_chunks(chunk_moments, data)
+        field = xp.sum(xp.stack([r[0] for r in results]), axis=0)
+        second = results[0][1]
+        for result in results[1:]:
+            second += result[1]
+        return data.shape[0], self._backend.to_numpy(field), \
+            self._backend.to_numpy(second)
+
+    def _acquire(self):
+        """
+        Measures one buffer and adds it to the sums unless the settings
+        changed or a `read` returned during the acquisition
+        """
+        with self._dig_lock:
+            started = time.monotonic()
+            buffer = self._dig.measure(raw=True)
+            mv_per_code = self._dig.get_mv_per_code()
+        n, field, second = self._buffer_moments(buffer, mv_per_code)
+        with self._condition:
+            if started < self._since:
+                return
+            if self._field_sum is None:
+                self._field_sum, self._second_sum = field, second
+            else:
+                self._field_sum += field
+                self._second_sum += second
+            self._n_segments += n
+            self._condition.notify_all()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._params is None:
+                self._stop.wait(0.1)
+                continue
+            self._acquire()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def read(self, params, timeout=None):
+        """
+        Parameters
+        ----------
+        params : dict
+            digitizer parameters, see `PARAMETER_NAMES`
+        timeout : float
+            seconds to wait for a buffer in the continuous mode
+
+        Returns
+        -------
+        n_segments, mean, second_moment
+            n_segments is 0 if no buffer was acquired before the timeout
+        """
+        self.configure(params)
+        if self._thread is None:
+            self._acquire()
+        with self._condition:
+            self._condition.wait_for(lambda: self._n_segments > 0, timeout)
+            n = self._n_segments
+            if n == 0:
+                return 0, None, None
+            result = (n, self._field_sum / n, self._second_sum / n)
+            self._reset()
+            self._since = time.monotonic()
+        return result
+
+
+def create_server(engine, port=DEFAULT_PORT, max_workers=4):
+    """
+    gRPC server of `engine` listening on localhost only
+
+    Returns
+    -------
+    server, port
+        the port is chosen by the system if `port` is 0
+    """
+    grpc, pb2, pb2_grpc = _import_stubs()
+
+    class DigitizerServicer(pb2_grpc.DigitizerServicer):
+        def measure_correlation_matrix(self, request, context):
+            n, mean, second = engine.read(message_to_params(request))
+            context.set_trailing_metadata(((N_SEGMENTS_KEY, str(n)),))
+            samples = np.concatenate((mean, second.ravel()))
+            return pb2.CorrelationMatrix(
+                trace_len=len(mean),
+                samples=samples.astype(np.float32).tolist())
+
+    server = grpc.server(ThreadPoolExecutor(max_workers),
+                         options=GRPC_OPTIONS)
+    pb2_grpc.add_DigitizerServicer_to_server(DigitizerServicer(), server)
+    port = server.add_insecure_port("localhost:%d" % port)
+    return server, port
+
+
+class CorrelationServiceClient:
+    """
+    Client of the correlation service
+    """
+
+    def __init__(self, address="localhost:%d" % DEFAULT_PORT, timeout=None):
+        grpc, self._pb2, pb2_grpc = _import_stubs()
+        self._channel = grpc.insecure_channel(address, options=GRPC_OPTIONS)
+        self._stub = pb2_grpc.DigitizerStub(self._channel)
+        self._timeout = timeout
+
+    def close(self):
+        self._channel.close()
+
+    def _call(self, params):
+        response, call = self._stub.measure_correlation_matrix.with_call(
+            params_to_message(params, self._pb2), timeout=self._timeout)
+        n = int(dict(call.trailing_metadata())[N_SEGMENTS_KEY])
+        trace_len = response.trace_len
+        samples = np.array(response.samples, dtype=np.float64)
+        return n, samples[:trace_len], \
+            samples[trace_len:].reshape(trace_len, trace_len)
+
+    def measure(self, params, fresh=False):
+        """
+        Parameters
+        ----------
+        params : dict
+            see `get_dig_params`
+        fresh : bool
+            skip the buffers acquired before the call, e.g. after the
+            output of the AWG has been changed
+
+        Returns
+        -------
+        n_segments, mean, second_moment
+        """
+        if fresh:
+            self._call(params)
+        return self._call(params)
+
+    def stream(self, params, n_updates=None):
+        """
+        Yields running (n_segments, mean, second_moment) averages
+        """
+        moments = None
+        update = 0
+        while n_updates is None or update < n_updates:
+            moments = combine_moments(moments, self._call(params))
+            update += 1
+            yield moments
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m lib2.correlation_service")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--simulated", action="store_true",
+                        help="use a simulated digitizer")
+    parser.add_argument("--card", default="/dev/spcm0")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="threads of the CPU backend")
+    args = parser.parse_args(argv)
+
+    if args.simulated:
+        from drivers.simulated.sim_Spectrum_m4x import SimulatedSPCM
+        dig = SimulatedSPCM()
+        fixed_parameters = None
+    else:
+        from drivers.Spectrum_m4x import SPCM, SPCM_MODE, SPCM_TRIGGER
+        dig = SPCM(args.card.encode())
+        fixed_parameters = {"mode": SPCM_MODE.MULTIPLE,
+                            "trig_source": SPCM_TRIGGER.EXT0}
+    engine = CorrelationEngine(
+        dig, fixed_parameters,
+        dsp.get_backend("cpu", **({} if args.threads is None
+                                  else {"n_threads": args.threads})))
+    engine.start()
+    server, port = create_server(engine, args.port)
+    server.start()
+    print("Correlation service is listening on localhost:%d" % port)
+    try:
+        server.wait_for_termination()
+    finally:
+        engine.stop()
+
+
+if __name__ == "__main__":
+    main()
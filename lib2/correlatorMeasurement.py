@@ -1,7 +1,7 @@
 from copy import deepcopy
 
 import numpy as np
-import tqdm
+from tqdm.auto import tqdm
 
 from lib2.MeasurementResult import MeasurementResult
 from lib2.stimulatedEmission import StimulatedEmission
@@ -9,17 +9,14 @@ from datetime import datetime as dt
 import matplotlib.pyplot as plt
 from matplotlib import colorbar
 from scipy import signal
-import numba
 
+from lib2.correlators import StreamingCorrelator, DEFAULT_CHUNK_SIZE, \
+    transform_moments
+from lib2.correlation_service import get_dig_params, combine_moments
+from lib2.fir import FIRFilter
+from lib2.directMeasurements.demodulation import get_affine_coefficients, \
+    get_calibration_key
 
-@numba.njit(parallel=True)
-def apply_along_axis(data, trace_len):
-    temp = np.zeros((trace_len, trace_len),
-                    dtype=np.complex128)
-    for i in numba.prange(data.shape[0]):
-        temp += np.kron(np.conj(data[i]), data[i]) \
-            .reshape(trace_len, trace_len)
-    return temp
 
 class CorrelatorMeasurement(StimulatedEmission):
 
@@ -36,8 +33,18 @@ class CorrelatorMeasurement(StimulatedEmission):
         self._segments_number = 1
         self._freq_lims = None  # for digital filtering
         self._conv = None
-        self._b = None
+        # (trace length, IF), FIRFilter designed for them
+        self._fir = None
+        self._decimation = 1
         self._temp = None
+        self._correlator_dtype = np.complex128
+        self._correlator_chunk_size = DEFAULT_CHUNK_SIZE
+        self._correlator_workers = 1
+        self._fourth_order = False
+        self._correlator = None
+        self._correlation_service = None
+        self._remote_moments = None
+        self._remote_weights = None
 
         self._pause_in_samples_before_next_trigger = 0  # > 80 samples
 
@@ -47,7 +54,10 @@ class CorrelatorMeasurement(StimulatedEmission):
                              subtract_pi=False, q_lo_params=None,
                              q_iqawg_params=None, dig_params=None,
                              apply_filter=True, iterations_number=100,
-                             do_convert=True):
+                             do_convert=True, correlator_dtype=np.complex128,
+                             correlator_chunk_size=DEFAULT_CHUNK_SIZE,
+                             correlator_workers=1, fourth_order=False,
+                             correlation_service=None, decimation=1):
         """
 
         Parameters
@@ -67,6 +77,26 @@ class CorrelatorMeasurement(StimulatedEmission):
         q_lo_params
         q_iqawg_params
         dig_params
+        correlator_dtype: np.complex128 or np.complex64
+            precision of the <E+(t1) E(t2)> products; the sums are
+            accumulated in complex128 anyway
+        correlator_chunk_size: int
+            number of segments multiplied at once, bounds the memory of
+            the correlator calculation
+        correlator_workers: int
+            number of chunks processed in parallel
+        fourth_order: bool
+            whether to accumulate the intensity correlator
+            <E+(t1) E+(t2) E(t2) E(t1)> and calculate g2 with the noise
+            of the background traces subtracted
+        correlation_service: CorrelationServiceClient
+            if given, the digitizer buffers are acquired and correlated by
+            the correlation service (`lib2.correlation_service`), and `dig`
+            only holds the settings of the remote card. Only the
+            second-order correlators are available then
+        decimation: int
+            every `decimation`-th sample of the filtered traces is
+            correlated; requires `apply_filter`
 
         Returns
         -------
@@ -92,6 +122,23 @@ class CorrelatorMeasurement(StimulatedEmission):
         self._freq_lims = freq_limits
         self.apply_filter = apply_filter
         self._do_convert = do_convert
+        self._correlator_dtype = correlator_dtype
+        self._correlator_chunk_size = correlator_chunk_size
+        self._correlator_workers = correlator_workers
+        self._fourth_order = fourth_order
+        if correlation_service is not None and fourth_order:
+            raise ValueError("fourth-order correlators are not calculated "
+                             "by the correlation service")
+        self._correlation_service = correlation_service
+        if self._correlator is not None:
+            self._correlator.close()
+        self._correlator = None
+        self._remote_moments = None
+        self._remote_weights = None
+        if decimation > 1 and not apply_filter:
+            raise ValueError("decimation without the anti-aliasing filter")
+        self._decimation = decimation
+        self._fir = None
 
         # longest repetition period is initially set with data from
         # 'pulse_sequence_paramaters'
@@ -216,6 +263,19 @@ class CorrelatorMeasurement(StimulatedEmission):
               f"{self._format_time_delta(time_elapsed.total_seconds())}")
         self._finalize()
 
+    def _prepare_measurement_result_data(self, parameter_names,
+                                         parameters_values):
+        measurement_data = super()._prepare_measurement_result_data(
+            parameter_names, parameters_values)
+        if self._fourth_order:
+            tau, g2_tau = self._correlator.get_g2_tau()
+            measurement_data["g2"] = self._correlator.get_normalized_g2()
+            # delays in nanoseconds
+            measurement_data["g2_tau"] = (
+                tau * self._decimation / self._dig[0].get_sample_rate() * 1e9,
+                g2_tau)
+        return measurement_data
+
     def _measure_one_trace(self):
         """
         Function starts digitizer measurement.
@@ -288,8 +348,112 @@ class CorrelatorMeasurement(StimulatedEmission):
 
         return time, data
 
+    def _get_remote_weights(self, trace_len):
+        """
+        Weights and constant of `transform_moments` that apply the
+        processing of `_measure_one_trace` and `_recording_iteration` to
+        the interleaved samples of the remote buffers
+        """
+        dig = self._dig[0]
+        # the remote card has no hardware trigger delay
+        front = dig.delay_in_samples + self._n_samples_to_drop_by_delay
+        length = dig.get_segment_size() - self._n_samples_to_drop_by_delay \
+            - self._n_samples_to_drop_in_end
+        if 2 * (front + length) > trace_len:
+            raise ValueError("segments of the correlation service are too "
+                             "short for the requested trace")
+        time = np.arange(length) / dig.get_sample_rate() * 1e9
+
+        # calibrated trace is alpha * I + beta * Q + offset
+        alpha, beta, offsets = \
+            get_affine_coefficients(self._down_conversion_calibration)
+        offset = -(alpha * offsets[0] + beta * offsets[1])
+        conv = np.ones(length)
+        if self._do_convert:
+            if_freq = self._q_iqawg[0].get_calibration().get_if_frequency()
+            conv = np.exp(-2j * np.pi * if_freq * time / 1e9)
+        weights = np.zeros((trace_len, length), dtype=complex)
+        samples = np.arange(length)
+        weights[2 * (front + samples), samples] = alpha * conv
+        weights[2 * (front + samples) + 1, samples] = beta * conv
+        constant = offset * conv
+
+        if self.apply_filter:
+            # the filter is linear, so it is applied to the rows of the
+            # weights and to the constant
+            fir = self._get_fir(length, if_frequency=0)
+            weights = fir.apply(weights)
+            constant = fir.apply(constant)
+        return weights, constant
+
+    def _get_remote_weights_key(self, trace_len):
+        # e.g. StimulatedEmission changes the calibration, its shift and
+        # the IF at every sweep point
+        cal_key = get_calibration_key(self._down_conversion_calibration)
+        if_freq = self._q_iqawg[0].get_calibration().get_if_frequency() \
+            if self._do_convert else None
+        dig = self._dig[0]
+        return (trace_len, cal_key, if_freq, dig.delay_in_samples,
+                dig.get_segment_size(), self._n_samples_to_drop_by_delay,
+                self._n_samples_to_drop_in_end)
+
+    def _get_cached_remote_weights(self, trace_len):
+        """
+        `_get_remote_weights`, rebuilt only when the calibration, the IF,
+        the crop or the trace length change
+        """
+        key = self._get_remote_weights_key(trace_len)
+        if self._remote_weights is None or self._remote_weights[0] != key:
+            self._remote_weights = \
+                (key,) + self._get_remote_weights(trace_len)
+        return self._remote_weights[1:]
+
+    def _get_fir(self, trace_len, if_frequency):
+        """
+        Low-pass filter of the down-converted traces or band-pass filter
+        of the raw traces, the same for every segment
+        """
+        sample_rate = self._dig[0].get_sample_rate()
+        if self._do_convert:
+            return FIRFilter.design(trace_len, self._freq_lims[1], sample_rate,
+                                    if_frequency=if_frequency,
+                                    decimation=self._decimation)
+        return FIRFilter.design(trace_len, self._freq_lims, sample_rate,
+                                pass_zero=(self._freq_lims[0] < 0 <
+                                           self._freq_lims[1]),
+                                decimation=self._decimation)
+
+    def _recording_iteration_remote(self):
+        self._remote_moments = [None, None]
+        for i in tqdm(range(self._iterations_number)):
+            self._output_pulse_sequence()
+            params = get_dig_params(self._dig[0])
+            data = self._correlation_service.measure(params, fresh=True)
+            self._output_pulse_sequence(zero=True)
+            data_bg = self._correlation_service.measure(params, fresh=True)
+            self._remote_moments = [
+                combine_moments(self._remote_moments[0], data),
+                combine_moments(self._remote_moments[1], data_bg)]
+
+            weights, constant = self._get_cached_remote_weights(
+                len(data[1]))
+            self.avg, g1 = transform_moments(
+                *self._remote_moments[0][1:], weights, constant)
+            _, g1_bg = transform_moments(
+                *self._remote_moments[1][1:], weights, constant)
+            self.corr_avg = np.outer(np.conj(self.avg), self.avg)
+            self.avg_corr = g1 - g1_bg
+            self._measurement_result.corr_avg = self.corr_avg
+            self._measurement_result.avg_corr = self.avg_corr
+        return self.corr_avg, self.avg_corr
+
     def _recording_iteration(self):
-        for i in tqdm.tqdm_notebook(range(self._iterations_number)):
+        if self._correlation_service is not None:
+            return self._recording_iteration_remote()
+        # every sweep point is averaged separately
+        if self._correlator is not None:
+            self._correlator.reset()
+        for i in tqdm(range(self._iterations_number)):
             # measuring trace
             self._output_pulse_sequence()
             time, data = self._measure_one_trace()
@@ -299,73 +463,52 @@ class CorrelatorMeasurement(StimulatedEmission):
 
             trace_len = data.shape[-1]
 
-            # down-converting to DC
-            if self._do_convert:
-                if_freq = self._q_iqawg[0].get_calibration().get_if_frequency()
+            if_freq = self._q_iqawg[0].get_calibration().get_if_frequency()
+            if self.apply_filter:
+                # filtering excessive frequencies, the down-conversion to
+                # DC is fused with the filter
+                fir_key = (trace_len, if_freq if self._do_convert else 0)
+                if self._fir is None or self._fir[0] != fir_key:
+                    self._fir = (fir_key, self._get_fir(*fir_key))
+                fir = self._fir[1]
+                data = fir.apply(data)
+                data_bg = fir.apply(data_bg)
+            elif self._do_convert:
+                # down-converting to DC
                 self._conv = np.exp(-2j * np.pi * if_freq * time / 1e9)
-                self._conv = np.resize(self._conv, data.shape)
                 data = data * self._conv
                 data_bg = data_bg * self._conv
-            # filtering excessive frequencies
-            if self.apply_filter:
-                if self._b is None:
-                    if self._do_convert:
-                        self._b = signal.firwin(trace_len, self._freq_lims[1],
-                                  fs=self._dig[0].get_sample_rate())
-                    else:
-                        self._b = signal.firwin(len(data), self._freq_lims,
-                                  fs=self._dig[0].get_sample_rate(),
-                                  pass_zero=(self._freq_lims[0] < 0 <
-                                             self._freq_lims[1]))
-                    self._b = np.resize(self._b, data.shape)
-                data = signal.fftconvolve(self._b, data, mode="same", axes=-1)
-                data_bg = signal.fftconvolve(self._b, data_bg, mode="same",
-                                             axes=-1)
-            # initializing arrays for correlators storage
-            if self.avg is None:
-                self.avg = np.zeros(trace_len, dtype=np.clongdouble)
-                self.corr_avg = np.zeros((trace_len, trace_len),
-                                         dtype=np.clongdouble)
-                self.avg_corr = np.zeros((trace_len, trace_len),
-                                         dtype=np.clongdouble)
-
-            # processing data with trace applied
-            avg_corrs = apply_along_axis(data, trace_len)
-            # avg_corrs = np.apply_along_axis(
-            #     lambda x: np.reshape(
-            #         np.kron(np.conj(x), x),
-            #         (trace_len, trace_len)
-            #     ),
-            #     1,  # axis that function is applied along (along traces)
-            #     data
-            # ).sum(axis=0)
-            # processing background data
-            avg_bg_corrs = apply_along_axis(data_bg, trace_len)
-            # avg_bg_corrs = np.apply_along_axis(
-            #     lambda x: np.reshape(
-            #         np.kron(np.conj(x), x),
-            #         (trace_len, trace_len)
-            #     ),
-            #     1,  # axis along which function is applied (along traces)
-            #     data_bg
-            # ).sum(axis=0)
+            trace_len = data.shape[-1]
+            # initializing correlators storage, again if a new crop or
+            # decimation changed the trace length
+            if self._correlator is not None and \
+                    self._correlator.trace_len != trace_len:
+                self._correlator.close()
+                self._correlator = None
+            if self._correlator is None:
+                self._correlator = StreamingCorrelator(
+                    trace_len, fourth_order=self._fourth_order,
+                    chunk_size=self._correlator_chunk_size,
+                    dtype=self._correlator_dtype,
+                    n_workers=self._correlator_workers)
+
+            self._correlator.update(data, data_bg)
             # <E(t)>
-            self.avg += data.sum(axis=0)
+            self.avg = self._correlator.get_mean_field()
             # <E+(t1)><E(t2)>
-            self.corr_avg = np.reshape(
-                np.kron(np.conj(self.avg), self.avg),
-                (trace_len, trace_len)
-            )
+            self.corr_avg = self._correlator.get_coherent_part()
             # <E+(t1) E(t2)>
-            self.avg_corr += avg_corrs - avg_bg_corrs
+            self.avg_corr = self._correlator.get_g1()
             # Saving preliminary data in the Measurement Result
-            K = (i + 1) * self._segments_number
-            self._measurement_result.corr_avg = self.corr_avg.copy() / K**2
-            self._measurement_result.avg_corr = self.avg_corr.copy() / K
+            self._measurement_result.corr_avg = self.corr_avg
+            self._measurement_result.avg_corr = self.avg_corr
+            if self._fourth_order:
+                self._measurement_result.g2 = \
+                    self._correlator.get_normalized_g2()
 
+        self._correlator.close()
         # returning the final result
-        K = self._iterations_number * self._segments_number
-        return self.corr_avg / K**2, self.avg_corr / K
+        return self.corr_avg, self.avg_corr
 
 class CorrelatorResult(MeasurementResult):
 
@@ -375,6 +518,8 @@ class CorrelatorResult(MeasurementResult):
         self._YY = None
         self.corr_avg = None
         self.avg_corr = None
+        # normalized g2(t1, t2), if the fourth order is measured
+        self.g2 = None
         self.sample_rate = 1.25e9
 
     def set_parameter_name(self, parameter_name):
@@ -404,7 +549,7 @@ class CorrelatorResult(MeasurementResult):
                             r"\rangle$")
         ax_map_re.grid(False)
         ax_map_im.grid(False)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         return fig, (ax_map_re, ax_map_im), (cax_re, cax_im)
 
     def _plot(self, data):
@@ -0,0 +1,289 @@
+"""
+Accumulation of field correlators of digitized traces.
+
+Traces are 2D arrays of complex amplitudes E(t) with segments along the
+first axis and time along the second one. The second-order correlator
+
+    sum over segments of E+(t1) E(t2)
+
+is the Gram matrix data^H @ data, so it is computed with matrix products
+(BLAS) over chunks of segments instead of summing outer products segment
+by segment. Chunking bounds the temporary memory, and the chunk results
+are added into a complex128 accumulator in a fixed order, so the sum does
+not depend on the number of BLAS threads.
+
+`StreamingCorrelator` extends this to intensity correlations: it keeps
+running sums of the first, second and fourth moments of the signal and of
+the background traces and reconstructs g1 and g2 of the signal with the
+detection noise subtracted.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# number of segments multiplied at once
+DEFAULT_CHUNK_SIZE = 1024
+
+
+def _chunks(data, chunk_size):
+    for start in range(0, data.shape[0], chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def accumulate_gram(data, out=None, sign=1, chunk_size=DEFAULT_CHUNK_SIZE,
+                    dtype=np.complex128):
+    """
+    Adds sum_n conj(data[n, t1]) * data[n, t2] to `out`.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        shape (n_segments, trace_len)
+    out : np.ndarray
+        (trace_len, trace_len) accumulator, created if None
+    sign : int
+        +1 to add the correlator, -1 to subtract it (background)
+    chunk_size : int
+        number of segments multiplied at once
+    dtype : np.dtype
+        precision of the products, np.complex128 or np.complex64;
+        chunk results are always accumulated in the dtype of `out`
+
+    Returns
+    -------
+    out : np.ndarray
+    """
+    data = np.asarray(data)
+    trace_len = data.shape[-1]
+    if out is None:
+        out = np.zeros((trace_len, trace_len), dtype=np.complex128)
+    for chunk in _chunks(data, chunk_size):
+        chunk = np.asarray(chunk, dtype=dtype)
+        product = chunk.conj().T @ chunk
+        if sign > 0:
+            out += product
+        else:
+            out -= product
+    return out
+
+
+class MomentAccumulator:
+    """
+    Running sums of the moments of a stream of traces:
+
+        sum E(t)                            first order
+        sum E+(t1) E(t2)                    second order
+        sum E+(t1) E+(t2) E(t2) E(t1)       fourth order, optional
+
+    Only the sums are stored, so memory does not grow with the number of
+    segments. Traces are processed in chunks; with `n_workers` > 1 up to
+    `n_workers` chunks are multiplied at the same time in threads (numpy
+    releases the GIL in BLAS calls), and their sums are added in the chunk
+    order.
+    """
+
+    def __init__(self, trace_len, fourth_order=True,
+                 chunk_size=DEFAULT_CHUNK_SIZE, dtype=np.complex128,
+                 n_workers=1):
+        self._trace_len = trace_len
+        self._fourth_order = fourth_order
+        self._chunk_size = chunk_size
+        self._dtype = np.dtype(dtype)
+        self._n_workers = n_workers
+        self._executor = None
+        self.reset()
+
+    def reset(self):
+        self.n_segments = 0
+        self.field_sum = np.zeros(self._trace_len, dtype=np.complex128)
+        self.g1_sum = np.zeros((self._trace_len, self._trace_len),
+                               dtype=np.complex128)
+        self.g2_sum = np.zeros((self._trace_len, self._trace_len)) \
+            if self._fourth_order else None
+
+    def update(self, data):
+        """
+        Parameters
+        ----------
+        data : np.ndarray
+            shape (n_segments, trace_len)
+        """
+        data = np.asarray(data).reshape(-1, self._trace_len)
+        chunks = list(_chunks(data, self._chunk_size))
+        if self._n_workers > 1 and len(chunks) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._n_workers)
+            # at most n_workers partial sums are held in memory at once
+            for start in range(0, len(chunks), self._n_workers):
+                for moments in self._executor.map(
+                        self._chunk_moments,
+                        chunks[start:start + self._n_workers]):
+                    self._add(*moments)
+        else:
+            for chunk in chunks:
+                self._add(*self._chunk_moments(chunk))
+
+    def _chunk_moments(self, chunk):
+        chunk = np.asarray(chunk, dtype=self._dtype)
+        g2 = None
+        if self._fourth_order:
+            intensity = chunk.real ** 2 + chunk.imag ** 2
+            g2 = intensity.T @ intensity
+        return len(chunk), chunk.sum(axis=0), chunk.conj().T @ chunk, g2
+
+    def _add(self, n, field, g1, g2):
+        self.n_segments += n
+        self.field_sum += field
+        self.g1_sum += g1
+        if g2 is not None:
+            self.g2_sum += g2
+
+    def get_mean_field(self):
+        return self.field_sum / max(self.n_segments, 1)
+
+    def get_g1(self):
+        return self.g1_sum / max(self.n_segments, 1)
+
+    def get_g2(self):
+        if not self._fourth_order:
+            raise ValueError("fourth-order moments are not accumulated")
+        return self.g2_sum / max(self.n_segments, 1)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class StreamingCorrelator:
+    """
+    Field and intensity correlators of a signal with the background noise
+    of the detection chain subtracted.
+
+    The measured field is S = a + h, where the noise h is measured alone in
+    the background traces. The noise is assumed independent of the signal,
+    zero-mean and phase-insensitive (<h h> = 0). Then the correlators of
+    the signal a are
+
+        G1_a(t1, t2) = G1_S - G1_h
+        G2_a(t1, t2) = G2_S - G2_h - n_a(t1) n_h(t2) - n_h(t1) n_a(t2)
+                       - 2 Re[G1_a(t1, t2) G1_h*(t1, t2)]
+
+    where G1(t1, t2) = <E+(t1) E(t2)>, G2(t1, t2) = <E+(t1) E+(t2) E(t2)
+    E(t1)> and n(t) = G1(t, t).
+    """
+
+    def __init__(self, trace_len, fourth_order=True,
+                 chunk_size=DEFAULT_CHUNK_SIZE, dtype=np.complex128,
+                 n_workers=1):
+        self.trace_len = trace_len
+        self.signal = MomentAccumulator(trace_len, fourth_order, chunk_size,
+                                        dtype, n_workers)
+        self.background = MomentAccumulator(trace_len, fourth_order,
+                                            chunk_size, dtype, n_workers)
+
+    def update(self, data, data_bg=None):
+        self.signal.update(data)
+        if data_bg is not None:
+            self.background.update(data_bg)
+
+    def reset(self):
+        self.signal.reset()
+        self.background.reset()
+
+    def close(self):
+        self.signal.close()
+        self.background.close()
+
+    def get_mean_field(self):
+        """
+        <a(t)>, the noise is zero-mean
+        """
+        return self.signal.get_mean_field()
+
+    def get_coherent_part(self):
+        """
+        <a+(t1)><a(t2)>
+        """
+        mean = self.get_mean_field()
+        return np.outer(np.conj(mean), mean)
+
+    def get_g1(self):
+        """
+        <a+(t1) a(t2)>
+        """
+        if self.background.n_segments == 0:
+            return self.signal.get_g1()
+        return self.signal.get_g1() - self.background.get_g1()
+
+    def get_g2(self):
+        """
+        <a+(t1) a+(t2) a(t2) a(t1)>
+        """
+        if self.background.n_segments == 0:
+            return self.signal.get_g2()
+        g1_noise = self.background.get_g1()
+        g1 = self.signal.get_g1() - g1_noise
+        n = np.real(np.diag(g1))
+        n_noise = np.real(np.diag(g1_noise))
+        return self.signal.get_g2() - self.background.get_g2() \
+            - np.outer(n, n_noise) - np.outer(n_noise, n) \
+            - 2 * np.real(g1 * np.conj(g1_noise))
+
+    def get_normalized_g2(self):
+        """
+        g2(t1, t2) = G2(t1, t2) / (n(t1) n(t2))
+        """
+        n = np.real(np.diag(self.get_g1()))
+        return self.get_g2() / np.outer(n, n)
+
+    def get_g2_tau(self):
+        """
+        g2 as a function of the delay in samples, G2 and n(t1) n(t2) are
+        summed along the diagonals t2 - t1 = tau before the division
+
+        Returns
+        -------
+        tau, g2 : np.ndarray
+        """
+        g2 = self.get_g2()
+        n = np.real(np.diag(self.get_g1()))
+        norm = np.outer(n, n)
+        tau = np.arange(len(n))
+        return tau, np.array([np.trace(g2, offset=t) /
+                              np.trace(norm, offset=t) for t in tau])
+
+
+def transform_moments(mean, second_moment, weights, constant=0):
+    """
+    Moments of the traces y = x @ weights + constant from the moments of x.
+
+    Any affine processing of the samples, e.g. cropping, the down-conversion
+    calibration, the conversion to DC and FIR filtering, can be written in
+    this form, so the correlators of the processed traces are obtained
+    without the traces themselves.
+
+    Parameters
+    ----------
+    mean : np.ndarray
+        <x>, shape (n,)
+    second_moment : np.ndarray
+        <x+_i x_j>, shape (n, n)
+    weights : np.ndarray
+        shape (n, m)
+    constant : complex or np.ndarray
+        shape (m,)
+
+    Returns
+    -------
+    mean, g1 : np.ndarray
+        <y> and <y+(t1) y(t2)>
+    """
+    weights = np.asarray(weights)
+    mean_linear = np.asarray(mean) @ weights
+    g1 = weights.conj().T @ np.asarray(second_moment) @ weights
+    constant = np.broadcast_to(constant, mean_linear.shape)
+    g1 = g1 + np.outer(mean_linear.conj(), constant) + \
+        np.outer(constant.conj(), mean_linear) + \
+        np.outer(constant.conj(), constant)
+    return mean_linear + constant, g1
@@ -0,0 +1,118 @@
+"""
+DAC sample formats of the AWG waveforms.
+
+Waveforms are built in volts. The AWGs take samples relative to their
+full scale, either as normalized floats in [-1, 1] or as integer DAC
+codes in [-max_code, max_code]:
+
+    codes = quantize(waveform, full_scale, np.int16, max_code=8191)
+    volts = to_volts(codes, full_scale, max_code=8191)
+
+A waveform sampled at a rate other than the one of the DAC is resampled
+as one period of a periodic signal by `resample_periodic`, with the
+polyphase filter of every rational rate kept in a cache.
+"""
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+from scipy import signal
+
+# rates up/down with larger factors are resampled in the Fourier domain,
+# the polyphase filter would be too long
+MAX_POLYPHASE_FACTOR = 64
+
+
+def get_max_code(dtype):
+    """
+    Code of the full scale for the integer types, 1 for the normalized
+    floats
+    """
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.integer):
+        return np.iinfo(dtype).max
+    return 1.
+
+
+def quantize(waveform, full_scale, dtype=np.int16, max_code=None):
+    """
+    Parameters
+    ----------
+    waveform : np.ndarray
+        volts
+    full_scale : float
+        volts of the code `max_code`; samples beyond it are clipped
+    dtype : np.dtype
+        integer type for DAC codes, float type for normalized samples
+    max_code : int
+        largest code of the DAC, `get_max_code(dtype)` by default
+
+    Returns
+    -------
+    np.ndarray
+        samples of `dtype`
+    """
+    dtype = np.dtype(dtype)
+    if max_code is None:
+        max_code = get_max_code(dtype)
+    # float32 holds the 16 bit codes exactly
+    scaled = np.multiply(waveform, max_code / full_scale,
+                         dtype=np.float32 if dtype.itemsize <= 4 else float)
+    if np.issubdtype(dtype, np.integer):
+        np.rint(scaled, out=scaled)
+    np.clip(scaled, -max_code, max_code, out=scaled)
+    return scaled.astype(dtype, copy=False)
+
+
+def to_volts(samples, full_scale, max_code=None):
+    """
+    Inverse of `quantize`
+    """
+    samples = np.asarray(samples)
+    if max_code is None:
+        max_code = get_max_code(samples.dtype)
+    return samples * (full_scale / max_code)
+
+
+@lru_cache(maxsize=64)
+def get_polyphase_kernel(up, down, half_length=16):
+    """
+    Low-pass filter of the polyphase resampler with the rate up/down,
+    `half_length` zero crossings on each side; the result is read-only
+    """
+    rate = max(up, down)
+    kernel = signal.firwin(2 * half_length * rate + 1, 1 / rate,
+                           window=("kaiser", 8.6))
+    kernel.flags.writeable = False
+    return kernel
+
+
+def resample_periodic(waveform, n_points):
+    """
+    Resamples one period of a periodic signal to `n_points` points
+
+    Parameters
+    ----------
+    waveform : np.ndarray
+    n_points : int
+
+    Returns
+    -------
+    np.ndarray
+        float64 for integer waveforms, the float type of the waveform
+        otherwise
+    """
+    waveform = np.asarray(waveform)
+    if not np.issubdtype(waveform.dtype, np.floating):
+        waveform = waveform.astype(float)
+    common = gcd(n_points, len(waveform))
+    up, down = n_points // common, len(waveform) // common
+    if up == down:
+        return waveform
+    if max(up, down) > MAX_POLYPHASE_FACTOR:
+        return signal.resample(waveform, n_points).astype(waveform.dtype,
+                                                          copy=False)
+    return signal.resample_poly(waveform, up, down,
+                                window=get_polyphase_kernel(up, down),
+                                padtype="wrap").astype(waveform.dtype,
+                                                       copy=False)
@@ -0,0 +1,254 @@
+"""
+Demodulation of digitizer buffers at the IF frequency.
+
+The measurements in this package take one Fourier component of the
+digitized I/Q trace as the measured point:
+
+    IQ = 1/N sum_n cal(I_n + 1j Q_n) exp(-2 pi i f_if t_n)
+
+where the sum runs over the samples of all segments that are left after
+cropping, and `cal` is the affine down-conversion calibration
+(`IQDownconversionCalibrationResult.apply`). Since `cal` is affine, it is
+folded into two real kernels that are applied to the interleaved raw
+buffer of the card segment by segment:
+
+    IQ = mean over segments of (raw_segment @ K + C) exp(-i phi_segment)
+
+The kernels, the conversion of card codes to mV and the crop are cached
+and rebuilt only when the digitizer settings, the IF frequency or the
+calibration change.
+
+`MultiplexedDemodulator` extracts several IF components at once, one per
+tone of a frequency-multiplexed readout, with the kernels of all tones
+stacked into one matrix, so that all tones of all segments come out of a
+single matrix product.
+"""
+import numpy as np
+
+
+def get_calibration_key(calibration):
+    """
+    Hashable parameters of an `IQDownconversionCalibrationResult`, None for
+    no calibration
+    """
+    if calibration is None:
+        return None
+    return (tuple(np.ravel(calibration.offsets)), calibration.phase,
+            calibration.r, calibration.cryostat_delay, calibration.shift)
+
+
+def get_affine_coefficients(calibration):
+    """
+    Coefficients of the calibration as an affine map of the raw samples:
+
+        cal(I + 1j Q) = alpha (I - offsets[0]) + beta (Q - offsets[1])
+
+    Returns
+    -------
+    alpha, beta : complex
+    offsets : tuple
+        (1, 1j, (0, 0)) for no calibration
+    """
+    if calibration is None:
+        return 1, 1j, (0, 0)
+    rotation = np.exp(-1j * calibration.cryostat_delay * calibration.shift)
+    alpha = rotation * (1 + 1j * np.tan(calibration.phase))
+    beta = rotation * 1j / calibration.r / np.cos(calibration.phase)
+    return alpha, beta, tuple(np.ravel(calibration.offsets))
+
+
+class Demodulator:
+    """
+    Caches demodulation kernels for the current digitizer settings.
+
+    Typical use:
+
+        demodulator.configure(n_seg, segment_size, drop_front, drop_end,
+                              sample_rate, if_frequency, mv_per_code,
+                              calibration)
+        IQ = demodulator.demodulate(dig.measure(raw=True))
+    """
+
+    def __init__(self):
+        self._key = None
+        self._kernel = None
+        self._segment_phases = None
+        self._constant = 0
+        self._crop = None
+        self._n_seg = None
+        self._segment_size = None
+        self._mv_per_code = 1
+        self._calibration = None
+        self._time = None
+
+    def configure(self, n_seg, segment_size, drop_front, drop_end,
+                  sample_rate, if_frequency, mv_per_code=1,
+                  calibration=None):
+        """
+        Rebuilds the kernels if any of the parameters changed
+
+        Parameters
+        ----------
+        n_seg : int
+            number of segments in the buffer
+        segment_size : int
+            samples per channel in a segment of the buffer
+        drop_front, drop_end : int
+            samples to crop from the beginning and the end of every segment
+        sample_rate : float
+            Hz
+        if_frequency : float
+            Hz, frequency of the extracted Fourier component
+        mv_per_code : float
+            scale of the raw card codes
+        calibration : IQDownconversionCalibrationResult
+            applied to the trace before the demodulation
+        """
+        self._calibration = calibration
+        self._configure_tones(n_seg, segment_size, drop_front, drop_end,
+                              sample_rate, (if_frequency,), mv_per_code,
+                              (calibration,))
+
+    def _configure_tones(self, n_seg, segment_size, drop_front, drop_end,
+                         sample_rate, if_frequencies, mv_per_code,
+                         calibrations):
+        """
+        Kernels of one or more tones, rebuilt if any of the parameters
+        changed
+        """
+        key = (n_seg, segment_size, drop_front, drop_end, sample_rate,
+               tuple(if_frequencies), mv_per_code,
+               tuple(get_calibration_key(cal) for cal in calibrations))
+        if key == self._key:
+            return
+        self._key = key
+        self._n_seg, self._segment_size = n_seg, segment_size
+        self._mv_per_code = mv_per_code
+        self._crop = slice(2 * drop_front, 2 * (segment_size - drop_end))
+        length = segment_size - drop_front - drop_end
+        n_tones = len(if_frequencies)
+
+        kernel = np.empty((length, 2, n_tones), dtype=complex)
+        self._constant = np.empty(n_tones, dtype=complex)
+        self._segment_phases = np.empty((n_seg, n_tones), dtype=complex)
+        for tone, (if_frequency, calibration) in \
+                enumerate(zip(if_frequencies, calibrations)):
+            alpha, beta, offsets = get_affine_coefficients(calibration)
+            # time runs continuously through the cropped segments
+            omega_dt = 2 * np.pi * if_frequency / sample_rate
+            exponent = np.exp(-1j * omega_dt * np.arange(length)) / length
+            self._segment_phases[:, tone] = \
+                np.exp(-1j * omega_dt * length * np.arange(n_seg))
+            kernel[:, 0, tone] = mv_per_code * alpha * exponent
+            kernel[:, 1, tone] = mv_per_code * beta * exponent
+            self._constant[tone] = \
+                -(alpha * offsets[0] + beta * offsets[1]) * np.sum(exponent)
+        # interleaved as the raw samples
+        kernel = kernel.reshape(2 * length, n_tones)
+        # complex kernel split into real columns: the real parts of all
+        # tones, then the imaginary parts
+        self._kernel = np.concatenate((kernel.real, kernel.imag), axis=1)
+        self._time = np.arange(n_seg * length) / sample_rate * 1e9  # ns
+
+    def _get_segments(self, raw):
+        return np.asarray(raw).reshape(self._n_seg,
+                                       2 * self._segment_size)[:, self._crop]
+
+    def _demodulate_tones(self, raw):
+        """
+        Returns
+        -------
+        np.ndarray
+            shape (n_seg, n_tones), the point of every segment and tone
+        """
+        products = self._get_segments(raw) @ self._kernel
+        n_tones = len(self._constant)
+        return (products[:, :n_tones] + 1j * products[:, n_tones:] +
+                self._constant) * self._segment_phases
+
+    def demodulate(self, raw, per_segment=False):
+        """
+        Parameters
+        ----------
+        raw : np.ndarray
+            interleaved I/Q buffer of the card (I0 Q0 I1 Q1 ...), raw codes
+            or mV with `mv_per_code` = 1
+        per_segment : bool
+            return the demodulated point of every segment instead of
+            their average
+
+        Returns
+        -------
+        IQ : complex or np.ndarray
+        """
+        points = self._demodulate_tones(raw)[:, 0]
+        if per_segment:
+            return points
+        return np.mean(points)
+
+    def get_trace(self, raw, calibrate=True):
+        """
+        Cropped segments joined into a single complex trace
+
+        Returns
+        -------
+        time, data : np.ndarray
+            time in ns and the trace in mV
+        """
+        segments = self._get_segments(raw) * self._mv_per_code
+        data = segments[:, 0::2].ravel() + 1j * segments[:, 1::2].ravel()
+        if calibrate and self._calibration is not None:
+            data = self._calibration.apply(data)
+        return self._time, data
+
+
+class MultiplexedDemodulator(Demodulator):
+    """
+    Demodulates several IF frequencies, each with its own down-conversion
+    calibration:
+
+        demodulator.configure(n_seg, segment_size, drop_front, drop_end,
+                              sample_rate, if_frequencies, mv_per_code,
+                              calibrations)
+        IQ = demodulator.demodulate(dig.measure(raw=True))  # (n_tones,)
+
+    `get_trace` returns the trace without calibration.
+    """
+
+    def configure(self, n_seg, segment_size, drop_front, drop_end,
+                  sample_rate, if_frequencies, mv_per_code=1,
+                  calibrations=None):
+        """
+        Rebuilds the kernels if any of the parameters changed
+
+        Parameters
+        ----------
+        if_frequencies : list[float]
+            Hz, frequencies of the tones
+        calibrations : list[IQDownconversionCalibrationResult]
+            calibration of every tone, None for no calibration; one
+            calibration or None for all tones
+        other parameters
+            see `Demodulator.configure`
+        """
+        if_frequencies = tuple(np.ravel(if_frequencies))
+        if calibrations is None or not isinstance(calibrations,
+                                                  (list, tuple)):
+            calibrations = [calibrations] * len(if_frequencies)
+        if len(calibrations) != len(if_frequencies):
+            raise ValueError("one calibration per tone is required")
+        self._configure_tones(n_seg, segment_size, drop_front, drop_end,
+                              sample_rate, if_frequencies, mv_per_code,
+                              calibrations)
+
+    def demodulate(self, raw, per_segment=False):
+        """
+        Returns
+        -------
+        IQ : np.ndarray
+            shape (n_tones,), or (n_tones, n_seg) with `per_segment`
+        """
+        points = self._demodulate_tones(raw)
+        if per_segment:
+            return points.T
+        return np.mean(points, axis=0)
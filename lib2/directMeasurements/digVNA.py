@@ -221,7 +221,7 @@ class DigVNAResult(MeasurementResult):
         ax_amp.set_ylabel(r"$\left|S_{21}\right|$, dBV")
         ax_amp.set_xlabel("Frequency, [Hz]")
         ax_phase.set_ylabel(r"$\angle S_{21}$, [deg]")
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
 
         return fig, (ax_amp, ax_phase), None
 
@@ -15,6 +15,8 @@ from drivers.E8257D import MXG
 
 from typing import Dict, Union
 
+from lib2.directMeasurements.demodulation import Demodulator
+
 reload(lib2.IQPulseSequence)
 from lib2.IQPulseSequence import IQPulseBuilder
 
@@ -47,6 +49,8 @@ class DigitizerPowerMeasurement(Measurement):
         # for debug purposes
         self.dataIQ = []
         self._save_traces = save_traces
+        self._demodulator = Demodulator()
+        self._per_segment_output = False
 
     def set_fixed_parameters(self, pulse_sequence_parameters, q_lo_params=[],
                              q_iqawg_params=[], dig_params=[]):
@@ -199,32 +203,34 @@ class DigitizerPowerMeasurement(Measurement):
 
     def _single_measurement(self):
         dig = self._dig[0]
-        dig_data = dig.measure()  # data in mV
-
-        # I channel data exctraction
-        data_i = dig_data[0::2]
-        data_i = data_i.reshape(dig.n_seg, round(data_i.shape[0] / dig.n_seg))
-        data_i = data_i[:, self._n_samples_to_drop_by_delay: -self._n_samples_to_drop_in_end]
-        data_i = data_i.flatten()
-
-        # Q channel data exctraction
-        data_q = dig_data[1::2]
-        data_q = data_q.reshape(dig.n_seg, round(data_q.shape[0] / dig.n_seg))
-        data_q = data_q[:, self._n_samples_to_drop_by_delay: -self._n_samples_to_drop_in_end]
-        data_q = data_q.flatten()
-
-        freq = np.fft.fftfreq(len(data_i), d=1/self._dig[0].get_sample_rate())
-        freq = np.fft.fftshift(freq)
-        signal = np.fft.fftshift(np.fft.fft(data_i + 1j * data_q))
-        # next row can be optimized with np.searchsorted and 2 comparisons with nearest elements
-        idx = np.argmin(np.abs(freq - (self._q_iqawg[0]._calibration._if_frequency)))
-        IQ = signal[idx] / len(data_i)
+        raw_data = dig.measure(raw=True)
+        segment_size = raw_data.size // (2 * dig.n_seg)
+        n_samples = dig.n_seg * (segment_size -
+                                 self._n_samples_to_drop_by_delay -
+                                 self._n_samples_to_drop_in_end)
+        # the point is taken at the FFT bin closest to the IF frequency
+        sample_rate = dig.get_sample_rate()
+        if_freq = self._q_iqawg[0]._calibration._if_frequency
+        bin_freq = round(if_freq * n_samples / sample_rate) * \
+            sample_rate / n_samples
+        self._demodulator.configure(
+            dig.n_seg, segment_size, self._n_samples_to_drop_by_delay,
+            self._n_samples_to_drop_in_end, sample_rate, bin_freq,
+            dig.get_mv_per_code())
 
         # save full data in case of more detailed investigation
         if self._save_traces:
-            self.dataIQ.append(data_i + 1j*data_q)
+            self.dataIQ.append(self._demodulator.get_trace(raw_data)[1])
+
+        return self._demodulator.demodulate(
+            raw_data, per_segment=self._per_segment_output)
 
-        return IQ
+    def set_per_segment_output(self, value=False):
+        """
+        If True, every measured point is an array of the points demodulated
+        from every digitizer segment instead of their average
+        """
+        self._per_segment_output = value
 
     def _recording_iteration(self):
         if self._ult_calib:
@@ -19,6 +19,8 @@ from drivers.Yokogawa_GS210 import Yokogawa_GS210
 
 from typing import Dict, Union
 
+from lib2.directMeasurements.demodulation import Demodulator
+
 reload(lib2.IQPulseSequence)
 from lib2.IQPulseSequence import IQPulseBuilder
 
@@ -52,6 +54,8 @@ class DigitizerTimeResolvedDirectMeasurement(Measurement):
 
         # ADC trace fourier component if_freq [Hz]
         self._downconv_freq = None
+        self._demodulator = Demodulator()
+        self._per_segment_output = False
 
         ''' DEBUG '''
         # if 'True' all traces will be saved in 'dataI' and 'dataQ' for
@@ -222,44 +226,35 @@ class DigitizerTimeResolvedDirectMeasurement(Measurement):
     def set_ult_calib(self, value=False):
         self._ult_calib = value
 
+    def set_per_segment_output(self, value=False):
+        """
+        If True, every measured point is an array of the points demodulated
+        from every digitizer segment instead of their average
+        """
+        self._per_segment_output = value
+
     def _single_measurement(self):
         dig = self._dig[0]
         # digitizer measurement setup is already configured in
         # 'self.set_fixed_parameters'
-        dig_data = dig.safe_measure()
-
+        raw_data = dig.safe_measure(raw=True)
+        # kernels are rebuilt only if the settings have changed
+        self._demodulator.configure(
+            dig.n_seg, raw_data.size // (2 * dig.n_seg),
+            self._n_samples_to_drop_by_delay, self._n_samples_to_drop_in_end,
+            dig.get_sample_rate(), self._downconv_freq,
+            dig.get_mv_per_code(), self._down_conversion_calibration)
 
-        # I channel data exctraction
-        data_i = dig_data[0::2]
-        data_i = data_i.reshape(dig.n_seg, round(data_i.shape[0] / dig.n_seg))
-        data_i = data_i[:, self._n_samples_to_drop_by_delay: -self._n_samples_to_drop_in_end]
-        data_i = data_i.flatten()
-
-        # Q channel data exctraction
-        data_q = dig_data[1::2]
-        data_q = data_q.reshape(dig.n_seg, round(data_q.shape[0] / dig.n_seg))
-        data_q = data_q[:, self._n_samples_to_drop_by_delay: -self._n_samples_to_drop_in_end]
-        data_q = data_q.flatten()
-
-        data = data_i + 1j * data_q
         # save full data in case of more detailed investigation
         if self._save_traces:
-            self.dataIQ.append(data)
-
-        if self._down_conversion_calibration is not None:
-            data = self._down_conversion_calibration.apply(data)
+            self.dataIQ.append(
+                self._demodulator.get_trace(raw_data, calibrate=False)[1])
 
         # exctacting Fourier component that exactly matches
         # 'self._downconv_freq' (because if use FFT, if_freq mesh may not
         # exactly coincide with desired 'self._downconv_freq'
-        dt = 1/self._dig[0].get_sample_rate()  # sec
-        t = np.linspace(0, data.shape[-1]*dt, data.shape[-1], endpoint=False)
-        IQ = np.dot(data, np.exp(-2 * np.pi * 1j * self._downconv_freq * t))
-
-        # normalizing DFT
-        IQ /= len(data)
-
-        return IQ
+        return self._demodulator.demodulate(
+            raw_data, per_segment=self._per_segment_output)
 
     def _recording_iteration(self):
         if self._ult_calib:
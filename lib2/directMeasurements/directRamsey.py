@@ -114,53 +114,21 @@ class DirectRamseyBase(DigitizerTimeResolvedDirectMeasurement):
     def _single_measurement(self):
         dig = self._dig[0]
 
-        dig_data = dig.measure()  # in mV
-        # construct complex valued scalar trace
-
-        data = dig_data[0::2] + 1j * dig_data[1::2]
+        raw_data = dig.measure(raw=True)
+        self._demodulator.configure(
+            dig.n_seg, raw_data.size // (2 * dig.n_seg),
+            self._n_samples_to_drop_by_delay, self._n_samples_to_drop_in_end,
+            dig.get_sample_rate(), self._downconv_freq,
+            dig.get_mv_per_code(), self._down_conversion_calibration)
 
         # save traces for debug purposes
         if self._save_traces:
-            self.dataIQ.append(data)
-        '''
-        In order to allow digitizer not to miss very next 
-        trigger while the acquisition window is almost equal to 
-        the trigger period, acquisition window is shrank
-        by 'self.__pause_in_samples_before_trigger' samples.
-        In order to obtain data of the desired length the code below adds
-        'self.__pause_in_samples_before_trigger' trailing zeros to the end
-        of each segment.
-        Finally result is flattened in order to perform DFT.
-        '''
-        # 2D array that will be set to the trace avg value
-        # and appended to the end of each segment of the trace
-        # scalar average is multiplied by 'np.ones()' of the appropriate 2D
-        # shape
-        self._pause_in_samples_before_next_trigger = 0  # 32 * 4
-        avgs_to_concat = np.full((dig.n_seg,
-                                  self._pause_in_samples_before_next_trigger),
-                                 np.mean(data))
-        data = data.reshape(dig.n_seg, -1)
-        # 'slice_stop' is needed in case when 'pm._n_samples_to_drop_in_end'
-        # equals zero. It helps to avoid production of an empty list by slicing
-        # operation with `arr[a, self._n_samples_to_drop_in_end]`.
-        slice_stop = data.shape[-1] - self._n_samples_to_drop_in_end
-        data = data[:, self._n_samples_to_drop_by_delay:slice_stop]
-
-        data = np.hstack((data, avgs_to_concat)).ravel()
-
-        # Applying mixer down-conversion calibration to data
-        time = np.linspace(
-            0,
-            len(data) / dig.get_sample_rate() * 1e9,
-            len(data),
-            endpoint=False
-        )
-
-        if self._down_conversion_calibration is not None:
-            data = self._down_conversion_calibration.apply(data)
+            self.dataIQ.append(
+                self._demodulator.get_trace(raw_data, calibrate=False)[1])
 
-        return time, data
+        # cropped segments are joined into a single trace in mV with
+        # the mixer down-conversion calibration applied
+        return self._demodulator.get_trace(raw_data)
 
     def setup_pi_subtraction(self, val):
         """
@@ -527,7 +495,7 @@ class DirectRamsey2D_Result(MeasurementResult):
         ax_map_im.set_title("Imaginary", position=(0.5, -0.1))
         ax_map_re.grid(False)
         ax_map_im.grid(False)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         return fig, (ax_map_re, ax_map_im), (cax_re, cax_im)
 
     def _plot(self, data):
@@ -17,6 +17,8 @@ import lib2.IQPulseSequence
 reload(lib2.IQPulseSequence)
 from lib2.IQPulseSequence import IQPulseBuilder
 from lib2.MeasurementResult import MeasurementResult
+from lib2.fourier import custom_fourier
+from lib2.psd import PSDAccumulator
 
 # import `Measurement-automation` measurement base classes
 from . import digitizerTimeResolvedDirectMeasurement
@@ -617,36 +619,9 @@ class PulseMixing(DigitizerTimeResolvedDirectMeasurement):
         np.ndarray
 
         """
-        time_arr = np.linspace(
-            0,
-            complex_data.shape[-1] * dt,
-            complex_data.shape[-1],
-            endpoint=False)
-
-        """ 
-            Memory usage check. 
-            Large data and frequencies arrays may cause some data to be 
-            dumped to hard drive. This is to be avoided
-            The upper bounds for memory usage is 1 GByte.
-        """
-        # np.float64 assumed
-        assumed_size_bytes = len(time_arr)*len(custom_freqs)*64/8
-        if assumed_size_bytes / 2**30 > 1:
-            self._measurement_result.set_is_finished(True)
-            raise UserWarning("Custom fourier transform requires more than "
-                                "1 GB of memory, execution is terminated")
-
-        tmp = np.exp(
-            -1j * 2 * np.pi * np.tensordot(custom_freqs, time_arr, axes=0)
-        )  # len(freqs) x len(time) 2D array
-
-        # tensor contraction along last axes
-        # result has shape = (complex_data.shape[:-1], len(freqs))
-        fourier_data = np.tensordot(
-            complex_data, tmp,
-            axes=([-1], [-1])
-        ) / np.sqrt(complex_data.shape[-1])
-        return fourier_data
+        # chirp-z transform for equally spaced frequencies, see lib2.fourier
+        return custom_fourier(complex_data, dt, custom_freqs) / \
+            np.sqrt(complex_data.shape[-1])
 
 
 class PulseMixingResult(MeasurementResult):
@@ -770,7 +745,7 @@ class PulseMixingResult(MeasurementResult):
         ax_map_phas.set_title("Phase, °", position=(0.5, -0.1))
         ax_map_amps.grid(False)
         ax_map_phas.grid(False)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         return fig, (ax_trace, ax_map_amps, ax_map_phas), (cax_amps, cax_phas)
 
     def _prepare_figure2D_re_n_im(self):
@@ -799,7 +774,7 @@ class PulseMixingResult(MeasurementResult):
         ax_map_im.set_title("Imaginary", position=(0.5, -0.1))
         ax_map_re.grid(False)
         ax_map_im.grid(False)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         return fig, (ax_trace, ax_map_re, ax_map_im), (cax_re, cax_im)
 
     def _plot(self, data):
@@ -1138,8 +1113,7 @@ class DigitizerWithPowerSweepMeasurementBase(Measurement):
         self._sweep_powers = None
         self.pulse_builder = None
 
-        self._start_idx = None
-        self._end_idx = None
+        self._psd = None
         self._frequencies = None
         self._freq_limits = None
         self._nfft = None
@@ -1230,17 +1204,14 @@ class DigitizerWithPowerSweepMeasurementBase(Measurement):
             self._adc_parameters["n_seg"] * self._segment_size_optimal
         )
 
-        # obtaining frequencies (frequencies is duplicating)
-        xf = np.fft.fftfreq(self._nfft, 1 / self._dig.get_sample_rate()) / 1e6
-        self._start_idx = np.searchsorted(
-            xf[:self._nfft // 2 - 1],
-            self._freq_limits[0]
-        )
-        self._end_idx = np.searchsorted(
-            xf[:self._nfft // 2 - 1],
-            self._freq_limits[1]
+        # amplitude spectrum of the whole trace in the frequency limits (MHz)
+        self._psd = PSDAccumulator(
+            self._adc_parameters["n_seg"] * self._segment_size_optimal,
+            self._dig.get_sample_rate(), nfft=self._nfft, onesided=True,
+            band=(self._freq_limits[0] * 1e6, self._freq_limits[1] * 1e6),
+            scaling=None
         )
-        self._frequencies = xf[self._start_idx:self._end_idx + 1]
+        self._frequencies = self._psd.frequencies / 1e6
 
         self._measurement_result.get_context().update(
             {
@@ -1308,10 +1279,9 @@ class DigitizerWithPowerSweepMeasurementBase(Measurement):
     def _recording_iteration(self):
         data = self._dig.measure(self._bufsize)  # data in mV
         # deleting extra samples from segments
-        a = np.arange(self._segment_size_optimal, len(data), self._segment_size)
-        b = np.concatenate([a + i for i in range(0, self._segment_size - self._segment_size_optimal)])
-        data_cut = np.delete(data, b)
-        yf = np.abs(np.fft.fft(data_cut, self._nfft))[self._start_idx:self._end_idx + 1] * 2 / self._nfft
+        data_cut = data.reshape(-1, self._segment_size)[
+            :, :self._segment_size_optimal]
+        yf = np.sqrt(self._psd.power(data_cut)[0]) * 2 / self._nfft
         self._measurement_result._iter += 1
         return yf
 
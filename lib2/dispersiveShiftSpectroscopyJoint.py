@@ -128,7 +128,7 @@ class TimeResolvedDispersiveShiftSpectroscopyResult(VNATimeResolvedDispersiveMea
 
     def _prepare_figure(self):
         fig, axes = plt.subplots(2, 2, figsize=(15, 7), sharex=True)
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
         axes = ravel(axes)
         return fig, axes, (None, None)
 
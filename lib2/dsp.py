@@ -0,0 +1,291 @@
+"""
+Signal processing of digitizer segments for the power and noise
+measurements (P1, P2, averaged power spectra) on the CPU or on a GPU.
+
+The functions mirror the CuPy pipeline of `CUPY_DEV/measurement_functions`:
+
+    i_segs, q_segs = unpack_segments(buffer, n_seg, segment_size, dig_amp)
+    i_segs, q_segs = down_calibrate(i_segs, q_segs, coefficients)
+    i_segs, q_segs = downconvert(i_segs, q_segs, downconversion)
+    filter(i_segs, kernel)
+    calculate_p1(i_segs, q_segs, out=p1)
+
+and take a `backend` argument. `get_backend("auto")` returns the CuPy
+backend if CuPy and a GPU are available and the NumPy backend otherwise, so
+the same code runs on the PXI controllers without a GPU.
+
+The NumPy backend splits the segments into chunks that are processed by a
+pool of threads (numpy and scipy release the GIL in the heavy loops); the
+FFTs of a chunk run in the thread of the chunk. Results are added into
+preallocated accumulators passed as `out`.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.fft
+from scipy import ndimage
+
+try:
+    import cupy
+    import cupyx.scipy.ndimage as cupy_ndimage
+except ImportError:
+    cupy = None
+
+# segments processed by one thread at a time
+DEFAULT_CHUNK_SIZE = 256
+
+
+class NumpyBackend:
+    name = "cpu"
+
+    def __init__(self, n_threads=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.xp = np
+        self.n_threads = n_threads if n_threads is not None \
+            else os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    def asarray(self, data, dtype=None):
+        return np.asarray(data, dtype=dtype)
+
+    def to_numpy(self, data):
+        return np.asarray(data)
+
+    def fft(self, data, axis=-1):
+        # called for chunks that are already processed in parallel
+        return scipy.fft.fft(data, axis=axis, workers=1)
+
+    def convolve1d(self, data, kernel, output):
+        ndimage.convolve1d(data, kernel, output=output, axis=-1,
+                           mode="wrap")
+
+    def map_chunks(self, func, *arrays):
+        """
+        Calls func(*chunks) for chunks of segments of `arrays` in threads
+
+        Returns
+        -------
+        results : list
+            in the order of the chunks
+        """
+        n_seg = arrays[0].shape[0]
+        slices = [slice(start, start + self.chunk_size)
+                  for start in range(0, n_seg, self.chunk_size)]
+        if self.n_threads == 1 or len(slices) == 1:
+            return [func(*(array[s] for array in arrays)) for s in slices]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.n_threads)
+        return list(self._executor.map(
+            lambda s: func(*(array[s] for array in arrays)), slices))
+
+
+class CupyBackend:
+    name = "cupy"
+
+    def __init__(self):
+        if cupy is None:
+            raise ImportError("CuPy is not installed")
+        self.xp = cupy
+
+    def asarray(self, data, dtype=None):
+        return cupy.asarray(data, dtype=dtype)
+
+    def to_numpy(self, data):
+        return cupy.asnumpy(data)
+
+    def fft(self, data, axis=-1):
+        return cupy.fft.fft(data, axis=axis)
+
+    def convolve1d(self, data, kernel, output):
+        cupy_ndimage.convolve1d(data, kernel, output=output, axis=-1,
+                                mode="wrap")
+
+    def map_chunks(self, func, *arrays):
+        # the GPU processes all segments at once
+        return [func(*arrays)]
+
+
+def _gpu_available():
+    if cupy is None:
+        return False
+    try:
+        return cupy.cuda.runtime.getDeviceCount() > 0
+    except Exception:  # CUDA driver is missing
+        return False
+
+
+_backends = {}
+
+
+def get_backend(name="auto", **kwargs):
+    """
+    Parameters
+    ----------
+    name : str
+        "cpu", "cupy" or "auto"; "auto" selects "cupy" if a GPU is available
+    kwargs
+        n_threads and chunk_size of the CPU backend
+
+    Returns
+    -------
+    backend : NumpyBackend or CupyBackend
+    """
+    if name == "auto":
+        name = "cupy" if _gpu_available() else "cpu"
+    if name == "cupy":
+        return CupyBackend()
+    if name != "cpu":
+        raise ValueError("unknown DSP backend: %s" % name)
+    key = tuple(sorted(kwargs.items()))
+    if key not in _backends:
+        _backends[key] = NumpyBackend(**kwargs)
+    return _backends[key]
+
+
+def _reduce(backend, results, out):
+    xp = backend.xp
+    if out is None:
+        out = xp.zeros_like(results[0])
+    for result in results:
+        xp.add(out, result, out=out)
+    return out
+
+
+def unpack_segments(buffer, n_seg, segment_size, dig_amp, backend=None):
+    """
+    Interleaved int8 card buffer to I and Q segments in mV (float32)
+    """
+    backend = backend or get_backend()
+    data = (dig_amp / 128) * backend.asarray(buffer, dtype=np.int8) \
+        .astype(np.float32).reshape((n_seg, segment_size, 2))
+    return data[:, :, 0], data[:, :, 1]
+
+
+def down_calibrate(i_segs, q_segs, coefficients):
+    """
+    Applies the down-conversion mixer calibration given by
+    `IQDownconversionCalibrationResult.get_coefficients()`
+    """
+    i_out = coefficients[0, 0] * i_segs + coefficients[0, 2]
+    q_out = coefficients[1, 0] * i_segs + coefficients[1, 1] * q_segs + \
+        coefficients[1, 2]
+    return i_out, q_out
+
+
+def downconvert(i_segs, q_segs, downconversion, backend=None):
+    """
+    Multiplies the complex traces by `downconversion`, e.g.
+    exp(-2 pi i f_if t)
+    """
+    backend = backend or get_backend()
+    xp = backend.xp
+    # the downconversion array may hold a row for every segment
+    if downconversion.ndim == 2 and downconversion.shape[0] > 1:
+        arrays = (i_segs, q_segs, downconversion)
+    else:
+        arrays = (i_segs, q_segs, xp.broadcast_to(
+            downconversion, (i_segs.shape[0], i_segs.shape[-1])))
+
+    def chunk_downconvert(i_chunk, q_chunk, downconversion_chunk):
+        traces = (i_chunk + 1j * q_chunk) * downconversion_chunk
+        return traces.real, traces.imag
+
+    results = backend.map_chunks(chunk_downconvert, *arrays)
+    return xp.concatenate([r[0] for r in results]), \
+        xp.concatenate([r[1] for r in results])
+
+
+def filter(traces, kernel, backend=None):
+    """
+    Filters the traces in place with a circular convolution
+    """
+    backend = backend or get_backend()
+
+    def chunk_filter(chunk):
+        backend.convolve1d(chunk, kernel, chunk)
+
+    backend.map_chunks(chunk_filter, traces)
+    return traces
+
+
+def calculate_p1(i_segs, q_segs, out=None, backend=None):
+    """
+    Sum over segments of the instantaneous power, added to `out`
+    """
+    backend = backend or get_backend()
+    xp = backend.xp
+
+    def chunk_p1(i_chunk, q_chunk):
+        return xp.sum(i_chunk ** 2 + q_chunk ** 2, axis=0,
+                      dtype=np.float32) / 5e7
+
+    return _reduce(backend, backend.map_chunks(chunk_p1, i_segs, q_segs),
+                   out)
+
+
+def calculate_p2(i_segs, q_segs, average_i, average_q, out=None,
+                 backend=None):
+    """
+    Sum over segments of the power of the fluctuations around the average
+    traces, added to `out`
+    """
+    backend = backend or get_backend()
+    xp = backend.xp
+
+    def chunk_p2(i_chunk, q_chunk):
+        return (1000 / 50) * xp.sum((i_chunk - average_i) ** 2 +
+                                    (q_chunk - average_q) ** 2,
+                                    axis=0, dtype=np.float32)
+
+    return _reduce(backend, backend.map_chunks(chunk_p2, i_segs, q_segs),
+                   out)
+
+
+def calculate_power_spectrum(i_segs, q_segs, out=None, backend=None):
+    """
+    Sum over segments of |FFT(I)|^2 + |FFT(Q)|^2 (not shifted), added to
+    `out`. Divide by the number of segments and the impedance and apply
+    fftshift to get the spectrum of `meas_p1_spectrum_gpu`.
+    """
+    backend = backend or get_backend()
+    xp = backend.xp
+
+    def chunk_spectrum(i_chunk, q_chunk):
+        spectrum = xp.zeros(i_chunk.shape[-1], dtype=np.float64)
+        for chunk in (i_chunk, q_chunk):
+            fft = backend.fft(chunk, axis=-1)
+            spectrum += xp.sum(fft.real ** 2 + fft.imag ** 2, axis=0)
+        return spectrum
+
+    return _reduce(backend,
+                   backend.map_chunks(chunk_spectrum, i_segs, q_segs), out)
+
+
+class PowerAccumulator:
+    """
+    Preallocated accumulators of P1 and of the averaged power spectrum
+    over many digitizer buffers
+    """
+
+    def __init__(self, segment_size, spectrum=False, backend=None):
+        self.backend = backend or get_backend()
+        xp = self.backend.xp
+        self.n_segments = 0
+        self.p1 = xp.zeros(segment_size, dtype=np.float32)
+        self.spectrum = xp.zeros(segment_size, dtype=np.float64) \
+            if spectrum else None
+
+    def add(self, i_segs, q_segs):
+        calculate_p1(i_segs, q_segs, out=self.p1, backend=self.backend)
+        if self.spectrum is not None:
+            calculate_power_spectrum(i_segs, q_segs, out=self.spectrum,
+                                     backend=self.backend)
+        self.n_segments += i_segs.shape[0]
+
+    def get_p1(self):
+        return self.backend.to_numpy(self.p1) / max(self.n_segments, 1)
+
+    def get_spectrum(self, impedance=50):
+        return np.fft.fftshift(self.backend.to_numpy(self.spectrum)) / \
+            max(self.n_segments, 1) / impedance
@@ -0,0 +1,149 @@
+"""
+FIR filtering of multi-segment digitizer data.
+
+`FIRFilter` filters every segment (row) of the data like
+
+    signal.fftconvolve(data, taps[np.newaxis, :], mode="same", axes=-1)
+
+with the frequency response of the taps computed once per segment length.
+Long segments are filtered by overlap-save in blocks of `block_size`
+samples, all segments and blocks in one batched FFT.
+
+The filter can be fused with the down-conversion
+
+    y = filter(x * exp(-2 pi i f_if t))
+
+by modulating the taps instead of the data: the phase factor is then
+applied to the output samples only, i.e. after the decimation.
+"""
+import numpy as np
+import scipy.fft
+from scipy import signal
+
+
+class FIRFilter:
+
+    def __init__(self, taps, sample_rate=1., if_frequency=0., decimation=1,
+                 block_size=None):
+        """
+        Parameters
+        ----------
+        taps : np.ndarray
+            impulse response
+        sample_rate : float
+            Hz
+        if_frequency : float
+            Hz, the data are down-converted by exp(-2 pi i f_if t) before
+            the filter; t = 0 at the first sample of every segment
+        decimation : int
+            every `decimation`-th output sample is returned
+        block_size : int
+            FFT length of the overlap-save blocks, by default it is chosen
+            from the number of taps
+        """
+        self.taps = np.asarray(taps)
+        self.sample_rate = sample_rate
+        self.if_frequency = if_frequency
+        self.decimation = int(decimation)
+        self._block_size = block_size
+        self._omega = 2 * np.pi * if_frequency / sample_rate
+        if if_frequency != 0:
+            # filter(x exp(-i w j))[k] = exp(-i w (k + s)) (b' * x)[k + s]
+            # with b'[m] = b[m] exp(i w m)
+            self._modulated_taps = self.taps * \
+                np.exp(1j * self._omega * np.arange(len(self.taps)))
+        else:
+            self._modulated_taps = self.taps
+        self._plans = {}
+
+    @classmethod
+    def design(cls, numtaps, cutoff, sample_rate, pass_zero=True,
+               window="hamming", **kwargs):
+        """
+        Filter with `signal.firwin` taps, other arguments are passed to
+        the constructor
+        """
+        taps = signal.firwin(numtaps, cutoff, fs=sample_rate,
+                             pass_zero=pass_zero, window=window)
+        return cls(taps, sample_rate, **kwargs)
+
+    def _get_plan(self, n_samples, is_complex):
+        key = (n_samples, is_complex)
+        if key not in self._plans:
+            n_taps = len(self.taps)
+            full_len = n_samples + n_taps - 1
+            block = self._block_size
+            if block is None:
+                block = scipy.fft.next_fast_len(8 * n_taps)
+            if block < n_taps:
+                raise ValueError("block size must not be shorter than the "
+                                 "filter")
+            if block >= full_len:
+                # the whole segment is one block
+                block = scipy.fft.next_fast_len(full_len)
+            step = block - n_taps + 1
+            n_blocks = -(-full_len // step)
+            if is_complex:
+                response = scipy.fft.fft(self._modulated_taps, block)
+            else:
+                response = scipy.fft.rfft(self._modulated_taps, block)
+            shift = (n_taps - 1) // 2
+            output = np.arange(shift, shift + n_samples)[::self.decimation]
+            phases = np.exp(-1j * self._omega * output) \
+                if self.if_frequency != 0 else None
+            self._plans[key] = (block, step, n_blocks, response, output,
+                                phases)
+        return self._plans[key]
+
+    def apply(self, data):
+        """
+        Parameters
+        ----------
+        data : np.ndarray
+            shape (..., n_samples), segments along the last axis
+
+        Returns
+        -------
+        np.ndarray
+            shape (..., ceil(n_samples / decimation))
+        """
+        data = np.asarray(data)
+        n_samples = data.shape[-1]
+        segments = data.reshape(-1, n_samples)
+        is_complex = np.iscomplexobj(segments) or \
+            np.iscomplexobj(self._modulated_taps)
+        block, step, n_blocks, response, output, phases = \
+            self._get_plan(n_samples, is_complex)
+        n_taps = len(self.taps)
+
+        # zeros before the data give the full convolution; every block
+        # starts n_taps - 1 samples before the samples it outputs
+        padded = np.zeros((segments.shape[0],
+                           (n_blocks - 1) * step + block),
+                          dtype=complex if is_complex else float)
+        padded[:, n_taps - 1:n_taps - 1 + n_samples] = segments
+        blocks = np.lib.stride_tricks.as_strided(
+            padded, (segments.shape[0], n_blocks, block),
+            (padded.strides[0], step * padded.strides[1], padded.strides[1]),
+            writeable=False)
+        if is_complex:
+            spectra = scipy.fft.fft(blocks, axis=-1)
+            spectra *= response
+            filtered = scipy.fft.ifft(spectra, axis=-1, overwrite_x=True)
+        else:
+            spectra = scipy.fft.rfft(blocks, axis=-1)
+            spectra *= response
+            filtered = scipy.fft.irfft(spectra, block, axis=-1,
+                                       overwrite_x=True)
+        full = filtered[:, :, n_taps - 1:].reshape(segments.shape[0], -1)
+        result = full[:, output]
+        if phases is not None:
+            result *= phases
+        return result.reshape(data.shape[:-1] + (len(output),))
+
+    def get_time(self, n_samples):
+        """
+        Time of the output samples in ns
+        """
+        return np.arange(n_samples)[::self.decimation] / \
+            self.sample_rate * 1e9
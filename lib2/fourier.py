@@ -0,0 +1,219 @@
+"""
+Fourier transform of time traces at arbitrary frequencies.
+
+    X(f) = sum_n x[n] exp(-2 pi i f n dt)
+
+is evaluated along the last axis of the data without building the dense
+len(freqs) x len(time) matrix of exponents:
+
+    equally spaced frequencies      chirp-z (Bluestein) transform,
+                                    O((N + M) log(N + M)) per trace
+    frequencies on a common grid    chirp-z transform over the grid that
+                                    covers them, e.g. sidebands k * d_freq
+    scattered frequencies           direct transform in blocks of
+                                    frequencies, O(N M) per trace with
+                                    bounded memory
+
+Plans of the chirp-z transforms hold the precomputed chirps, O(N + M), and
+are cached per (trace length, dt, frequencies). Direct plans may hold up to
+CHUNK_MEMORY of exponents and are built for every call instead. Leading
+dimensions of the data are processed in chunks, so the temporary memory
+does not depend on them.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# bytes of temporary arrays allowed per chunk of traces
+CHUNK_MEMORY = 64 * 2 ** 20
+# a common frequency grid is used if it is at most this many times longer
+# than the number of requested frequencies plus the trace length
+MAX_GRID_EXPANSION = 4
+PLAN_CACHE_SIZE = 32
+
+
+def _next_fast_len(n):
+    """
+    Smallest 2^a 3^b 5^c >= n
+    """
+    best = 2 ** int(np.ceil(np.log2(n)))
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            p = p35
+            while p < n:
+                p *= 2
+            best = min(best, p)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _chirp(rate, idx):
+    """
+    exp(-i pi rate idx^2) with the phase reduced before exponentiation
+    """
+    phase = np.mod(rate * idx.astype(float) ** 2, 2)
+    return np.exp(-1j * np.pi * phase)
+
+
+class ChirpZPlan:
+    """
+    Transform at M equally spaced frequencies f0 + k df.
+
+    With nk = (n^2 + k^2 - (k - n)^2) / 2 the sum becomes a convolution
+    that is done with FFTs of length >= N + M - 1.
+    """
+
+    def __init__(self, n, dt, f0, df, m):
+        self.n, self.m = n, m
+        self.fft_len = _next_fast_len(n + m - 1)
+        rate = df * dt
+        n_idx = np.arange(n)
+        k_idx = np.arange(m)
+        self._pre = np.exp(-2j * np.pi * f0 * dt * n_idx) * _chirp(rate,
+                                                                  n_idx)
+        self._post = _chirp(rate, k_idx)
+        kernel = np.zeros(self.fft_len, dtype=complex)
+        kernel[:m] = np.conj(_chirp(rate, k_idx))
+        kernel[self.fft_len - n + 1:] = np.conj(
+            _chirp(rate, np.arange(n - 1, 0, -1)))
+        self._kernel_fft = np.fft.fft(kernel)
+
+    def bytes_per_trace(self):
+        return self.fft_len * 16 * 2
+
+    def apply(self, traces):
+        spectrum = np.fft.fft(traces * self._pre, self.fft_len, axis=-1)
+        spectrum *= self._kernel_fft
+        return np.fft.ifft(spectrum, axis=-1)[:, :self.m] * self._post
+
+
+class GridPlan:
+    """
+    Chirp-z transform over a uniform grid followed by a selection of the
+    requested points
+    """
+
+    def __init__(self, n, dt, f0, df, grid_len, indices):
+        self._plan = ChirpZPlan(n, dt, f0, df, grid_len)
+        self._indices = indices
+
+    def bytes_per_trace(self):
+        return self._plan.bytes_per_trace()
+
+    def apply(self, traces):
+        return self._plan.apply(traces)[:, self._indices]
+
+
+class DirectPlan:
+    """
+    Direct transform at scattered frequencies, the exponents are computed
+    for blocks of frequencies so that a block takes CHUNK_MEMORY at most
+    """
+
+    def __init__(self, n, dt, freqs):
+        self._time = np.arange(n) * dt
+        self._freqs = freqs
+        self._block = max(1, CHUNK_MEMORY // (16 * n))
+        self._exponents = None
+        if len(freqs) <= self._block:
+            # the whole matrix fits into one block and is kept in the plan
+            self._exponents = self._get_exponents(freqs)
+
+    def _get_exponents(self, freqs):
+        return np.exp(-2j * np.pi * np.outer(self._time, freqs))
+
+    def bytes_per_trace(self):
+        return 16 * (len(self._time) + len(self._freqs))
+
+    def apply(self, traces):
+        if self._exponents is not None:
+            return traces @ self._exponents
+        result = np.empty((traces.shape[0], len(self._freqs)), dtype=complex)
+        for start in range(0, len(self._freqs), self._block):
+            stop = start + self._block
+            result[:, start:stop] = \
+                traces @ self._get_exponents(self._freqs[start:stop])
+        return result
+
+
+def _find_grid(freqs, n):
+    """
+    Returns (f0, df, grid_len, indices) of a uniform grid that contains
+    all `freqs` or None
+    """
+    m = len(freqs)
+    if m < 2:
+        return None
+    steps = np.diff(np.sort(freqs))
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return None
+    df = np.min(steps)
+    f0 = np.min(freqs)
+    positions = (freqs - f0) / df
+    indices = np.round(positions).astype(int)
+    tolerance = 1e-9 * max(1, np.max(np.abs(positions)))
+    if not np.all(np.abs(positions - indices) <= tolerance):
+        return None
+    grid_len = int(np.max(indices)) + 1
+    if grid_len + n > MAX_GRID_EXPANSION * (m + n):
+        return None
+    return f0, df, grid_len, indices
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _get_grid_plan(n, dt, freqs_bytes):
+    """
+    Chirp-z plan of the frequencies, None for scattered frequencies
+    """
+    freqs = np.frombuffer(freqs_bytes, dtype=float)
+    grid = _find_grid(freqs, n)
+    if grid is None:
+        return None
+    f0, df, grid_len, indices = grid
+    if grid_len == len(freqs) and np.all(indices == np.arange(grid_len)):
+        return ChirpZPlan(n, dt, f0, df, grid_len)
+    return GridPlan(n, dt, f0, df, grid_len, indices)
+
+
+def get_plan(n, dt, freqs):
+    """
+    Transform plan for traces of `n` points sampled every `dt`; the
+    chirp-z plans are cached
+    """
+    freqs = np.ascontiguousarray(freqs, dtype=float).ravel()
+    plan = _get_grid_plan(int(n), float(dt), freqs.tobytes())
+    if plan is None:
+        return DirectPlan(int(n), float(dt), freqs)
+    return plan
+
+
+def custom_fourier(data, dt, freqs):
+    """
+    Fourier transform along the last axis of `data` at frequencies `freqs`
+
+    Parameters
+    ----------
+    data : np.ndarray
+        time traces along the last dimension
+    dt : float
+        sampling period, in the inverse units of `freqs`
+    freqs : np.ndarray
+
+    Returns
+    -------
+    np.ndarray
+        shape data.shape[:-1] + (len(freqs),)
+    """
+    data = np.asarray(data)
+    n = data.shape[-1]
+    plan = get_plan(n, dt, freqs)
+    traces = data.reshape(-1, n)
+    result = np.empty((traces.shape[0], np.size(freqs)), dtype=complex)
+    chunk = max(1, CHUNK_MEMORY // plan.bytes_per_trace())
+    for start in range(0, traces.shape[0], chunk):
+        result[start:start + chunk] = plan.apply(traces[start:start + chunk])
+    return result.reshape(data.shape[:-1] + (np.size(freqs),))
@@ -67,7 +67,7 @@ class ACStarkOracle:
 
     def _plot_result(self):
         fig = plt.figure()
-        fig.canvas.set_window_title(self._result._name + "-fit")
+        fig.canvas.manager.set_window_title(self._result._name + "-fit")
 
         powers = concatenate((self._powers, [self._powers[-1] + diff(self._powers)[0]]))
 
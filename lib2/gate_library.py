@@ -0,0 +1,173 @@
+"""
+Cached waveforms of the native gates of one qubit.
+
+    library = GateLibrary(exc_pb.get_calibration(), pulse_duration=20,
+                          pulse_amplitude=0.8, window="gaussian", padding=5)
+    exc_pb.add_zero_pulse(100).add_gates(["+X/2", "+Z/2", "-Y"], library)
+
+The gates are the strings of `IQPulseBuilder.add_sine_pulse_from_string`,
+"+X", "-Y/2", "+I", ..., and every gate is followed by `padding` ns of
+the closed mixer. "Z" gates are virtual: they take no time and rotate the
+phase of the following pulses instead.
+
+The I and Q samples of a pulse are the real parts of
+
+    exp(1j * phase) * amplitude * carrier(t) * (window(t) - 1j * hd(t))
+
+so the complex block after `phase` is computed once per gate, and a
+sequence is assembled by copying the blocks into one buffer, each rotated
+by the phase of its gate, the accumulated virtual Z rotations and the
+carrier at its start. The blocks are dropped as soon as the calibration
+or the pulse parameters differ from the ones they were computed with.
+"""
+from collections import namedtuple
+from fractions import Fraction
+
+import numpy as np
+
+from lib2.IQPulseSequence import PARAMETRIC_WINDOWS, get_unit_carrier, \
+    get_unit_envelope
+
+# n_points: samples of the pulse, phase: of the pulse, virtual_z: rotation
+# of the frame, block_I, block_Q: complex blocks or None for idle gates
+_Gate = namedtuple("_Gate", "n_points phase virtual_z block_I block_Q")
+
+
+class GateLibrary:
+
+    def __init__(self, calibration, pulse_duration, pulse_amplitude,
+                 window="gaussian", hd_amplitude=0, window_parameter=0.5,
+                 padding=0):
+        """
+        Parameters
+        ----------
+        calibration : IQCalibrationData
+            calibration of the excitation mixer of the qubit
+        pulse_duration : float, ns
+            duration of the pi pulse for the rectangular window, of all
+            pulses for the others
+        pulse_amplitude : float
+            amplitude of the pi pulse for the shaped windows
+        window, hd_amplitude, window_parameter
+            see `IQPulseBuilder.add_sine_pulse`
+        padding : float, ns
+            closed mixer after every pulse
+
+        All parameters are public attributes and may be changed later.
+        """
+        self.calibration = calibration
+        self.pulse_duration = pulse_duration
+        self.pulse_amplitude = pulse_amplitude
+        self.window = window
+        self.hd_amplitude = hd_amplitude
+        self.window_parameter = window_parameter
+        self.padding = padding
+        self._signature = None
+        self._gates = {}
+
+    def _get_signature(self):
+        parameters = self.calibration.get_optimization_results()[0]
+        radiation = self.calibration.get_radiation_parameters()
+        return (tuple(np.ravel(parameters["dc_offsets"])),
+                tuple(np.ravel(parameters["if_offsets"])),
+                tuple(np.ravel(parameters["if_amplitudes"])),
+                float(np.squeeze(parameters["if_phase"])),
+                radiation["if_frequency"], radiation["waveform_resolution"],
+                self.pulse_duration, self.pulse_amplitude, self.window,
+                self.hd_amplitude, self.window_parameter, self.padding)
+
+    def _validate(self):
+        signature = self._get_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self._gates = {}
+
+    def _make_gate(self, gate):
+        dc_offsets, if_offsets, if_amplitudes, if_phase, if_frequency, \
+            resolution = self._signature[:6]
+        axis = gate[1]
+        angle = float(Fraction(gate.replace(axis, "1")))
+        if axis == "Z":
+            return _Gate(0, 0., np.pi * angle, None, None)
+        if axis not in "XYI":
+            raise ValueError("Axis of %s is not allowed" % gate)
+
+        if self.window == "rectangular" or axis == "I":
+            duration = self.pulse_duration * abs(angle)
+            amplitude = self.pulse_amplitude
+        else:
+            duration = self.pulse_duration
+            amplitude = abs(angle) * self.pulse_amplitude
+        n_points = int(round(duration / resolution))
+        if n_points <= 1:
+            # the builders drop such pulses
+            n_points = 0
+        if axis == "I" or n_points == 0:
+            return _Gate(n_points, 0., 0., None, None)
+
+        phase = np.pi / 2 * (1 - np.sign(angle)) + \
+            (np.pi / 2 if axis == "Y" else 0)
+        window, derivative = get_unit_envelope(
+            self.window, n_points, resolution,
+            self.window_parameter if self.window in PARAMETRIC_WINDOWS
+            else None)
+        hd_correction = - derivative * self.hd_amplitude / 2 / (
+                -2 * np.pi * 0.2)  # anharmonicity
+        block = get_unit_carrier(2 * np.pi * if_frequency / 1e9, n_points,
+                                 resolution) * (window - 1j * hd_correction)
+        return _Gate(n_points, phase, 0.,
+                     block * (amplitude * if_amplitudes[0] *
+                              np.exp(1j * if_phase)),
+                     block * (amplitude * if_amplitudes[1]))
+
+    def _get_gate(self, gate):
+        if gate not in self._gates:
+            self._gates[gate] = self._make_gate(gate)
+        return self._gates[gate]
+
+    def render(self, gates, start=0):
+        """
+        Parameters
+        ----------
+        gates : list[str]
+        start : int
+            point of the sequence where the gates begin; the carrier is
+            continuous with the pulses of `IQPulseBuilder` before it
+
+        Returns
+        -------
+        I, Q : np.ndarray
+            waveforms of the gates
+        """
+        self._validate()
+        dc_offsets, if_offsets, _, _, if_frequency, resolution = \
+            self._signature[:6]
+        padding = int(round(self.padding / resolution))
+        if padding <= 1:
+            padding = 0
+
+        entries = [self._get_gate(gate) for gate in gates]
+        lengths = np.array([entry.n_points + padding
+                            if entry.virtual_z == 0 else 0
+                            for entry in entries], dtype=int)
+        starts = np.cumsum(lengths) - lengths
+        frame = -np.cumsum([entry.virtual_z for entry in entries])
+        omega = 2 * np.pi * if_frequency / 1e9
+
+        waveform_I = np.full(lengths.sum(), dc_offsets[0])
+        waveform_Q = np.full(lengths.sum(), dc_offsets[1])
+        positions = {}
+        for index, gate in enumerate(gates):
+            if entries[index].block_I is not None:
+                positions.setdefault(gate, []).append(index)
+        for gate, indices in positions.items():
+            entry = self._gates[gate]
+            indices = np.array(indices)
+            points = starts[indices][:, np.newaxis] + \
+                np.arange(entry.n_points)
+            phasors = np.exp(1j * (entry.phase + frame[indices] +
+                                   omega * resolution *
+                                   (start + starts[indices])))[:, np.newaxis]
+            waveform_I[points] = (phasors * entry.block_I).real + if_offsets[0]
+            waveform_Q[points] = (phasors * entry.block_Q).real + if_offsets[1]
+        return waveform_I, waveform_Q
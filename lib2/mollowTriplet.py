@@ -14,10 +14,36 @@ from datetime import datetime as dt
 import os
 import psutil
 
+from lib2.trace_ring_buffer import SharedTraceRing, TraceWorkerPool, Reducer, \
+    WorkerError
+from lib2.psd import PSDAccumulator
+
 import lib2.IQPulseSequence
 reload(lib2.IQPulseSequence)
 from lib2.IQPulseSequence import IQPulseBuilder
 
+
+class PowerSpectrumProcessor:
+    """
+    Power spectra of the traces in a slot (foreground and, optionally,
+    background) cropped to the frequency limits of the measurement.
+    Executed in the workers of `TraceWorkerPool`, every worker has its own
+    copy.
+    """
+
+    def __init__(self, psd):
+        self._psd = psd
+
+    def __call__(self, traces):
+        return tuple(self._psd.power(traces))
+
+
+def _raise_priority():
+    # priority classes exist on Windows only
+    if hasattr(psutil, "HIGH_PRIORITY_CLASS"):
+        psutil.Process().nice(psutil.HIGH_PRIORITY_CLASS)
+
+
 class MollowTriplet(Measurement):
 
     def __init__(self, name, sample_name, plot_update_interval=1,
@@ -48,13 +74,13 @@ class MollowTriplet(Measurement):
         self._freq_limits = None  # tuple with if_freq limits
         self._nfft = 0  # number of FFT points
         self._frequencies = None
-        # self._frequencies[self._start_idx-1]  < self._freq_limits[0] <= self._frequencies[self._start_idx]
-        self._start_idx = None
-        # self._frequencies[self._end_idx-1]  < self._freq_limits[1] <= self._frequencies[self._end_idx]
-        self._end_idx = None
+        # power spectra of the traces cropped to '_freq_limits'
+        self._psd = None
 
-        self.data_queue = mp.Queue()
-        self.fft_queue = mp.Queue()
+        self._trace_len = 0
+        # traces are passed to the FFT workers through shared memory
+        self._ring = None
+        self._slots_per_worker = 4
         self.measuring_flag = False
 
     def set_fixed_parameters(self, internal_avg=100, freq_limits=(0,50e6), **dev_params):
@@ -91,11 +117,10 @@ class MollowTriplet(Measurement):
         # Fourier and measurement parameters setup
         self._freq_limits = freq_limits
         trace_len = self._dig[0]._segment_size - self._n_samples_to_drop_in_end - self._n_samples_to_drop_by_dig_delay
+        self._trace_len = trace_len
         self._nfft = fftpack.helper.next_fast_len(trace_len)
-        xf = fftpack.fftshift(fftpack.fftfreq(self._nfft, 1 / self._dig[0].get_sample_rate()))
-        self._start_idx = np.searchsorted(xf, self._freq_limits[0])
-        self._end_idx = np.searchsorted(xf, self._freq_limits[1])
-        self._frequencies = xf[self._start_idx:self._end_idx + 1]
+        self._psd = self._make_psd()
+        self._frequencies = self._psd.frequencies
         self._internal_data = np.zeros(self._frequencies.shape[0], dtype=np.float64)
         self._internal_data_bg = np.zeros(self._frequencies.shape[0], dtype=np.float64)
 
@@ -112,6 +137,12 @@ class MollowTriplet(Measurement):
         # temporary for division testing see 'self.record_iteration'
         # self.__internal_data_bg = np.ones((self._internal_avg, self._frequencies.shape[0]), dtype=np.float64)
 
+    def _make_psd(self, n_channels=1):
+        return PSDAccumulator(
+            self._trace_len, self._dig[0].get_sample_rate(), nfft=self._nfft,
+            band=self._freq_limits, n_channels=n_channels,
+            scaling=1 / self._nfft ** 2)
+
     def set_swept_parameters(self, iterations):
         def dummy_setter(parameter):
             # print(parameter)
@@ -146,167 +177,100 @@ class MollowTriplet(Measurement):
         self.measuring_flag = True
         if self._ult_calib:
             for i in range(self._internal_avg):
+                slot = self._ring.acquire()
+                traces = self._ring.get_slot(slot)
                 self.turn_signal_on()
-                fg = self._single_measurement()
+                traces[0] = self._single_measurement()
                 self.turn_signal_off()
-                bg = self._single_measurement()
-                self.data_queue.put((fg, bg))
+                traces[1] = self._single_measurement()
+                self._ring.publish(slot)
         else:
             self.turn_signal_on()
             for i in range(self._internal_avg):
-                fg = self._single_measurement()
-                self.data_queue.put((fg,))
-        self.data_queue.put(None)
+                slot = self._ring.acquire()
+                self._ring.get_slot(slot)[0] = self._single_measurement()
+                self._ring.publish(slot)
         self.measuring_flag = False
 
-    def _measurer_serial(self):
-        self.measuring_flag = True
-        if self._ult_calib:
-            for i in range(self._internal_avg):
-                self.turn_signal_on()
-                fg = self._single_measurement()
-                self.turn_signal_off()
-                bg = self._single_measurement()
-                self.data_queue.put((fg, bg))
-        else:
-            self.turn_signal_on()
-            for i in range(self._internal_avg):
-                fg = self._single_measurement()
-                self.data_queue.put((fg,))
-        self.data_queue.put(None)
-        self.measuring_flag = False
-
-    """The method has to be static, because it will be sent to another process and has no shared memory
-        with the main process, except for the arguments of a function. Creating new processes speeds up the execution"""
-    @staticmethod
-    def _power_spectrum(data_queue, fft_queue, nfft, start_idx, end_idx, ult_calib, counter, lock):
-        p = psutil.Process()
-        N = 100
-        n = 0
-        buff_fg = np.zeros(end_idx - start_idx + 1)
-        buff_bg = np.zeros(end_idx - start_idx + 1)
-        p.nice(psutil.HIGH_PRIORITY_CLASS)
-        if ult_calib:
-            for (fg_trace, bg_trace) in iter(data_queue.get, None):
-                # fg_pd = np.abs(trace.welch(fg_trace, 1.25e9, nperseg=nfft)[1])
-                # bg_pd = np.abs(trace.welch(bg_trace, 1.25e9, nperseg=nfft)[1])
-                # if len(buff_fg) != len(fg_pd):
-                #     buff_fg = np.zeros(len(fg_pd))
-                #     buff_bg = np.zeros(len(bg_pd))
-                fg_spectrum = fftpack.fftshift(fftpack.fft(fg_trace, nfft)) / nfft
-                bg_spectrum = fftpack.fftshift(fftpack.fft(bg_trace, nfft)) / nfft
-                fg_spectrum = fg_spectrum[start_idx:end_idx + 1]
-                bg_spectrum = bg_spectrum[start_idx:end_idx + 1]
-                buff_fg = np.add(np.abs(fg_spectrum) ** 2, buff_fg)
-                buff_bg = np.add(np.abs(bg_spectrum) ** 2, buff_bg)
-                # buff_fg = np.add(fg_pd, buff_fg)
-                # buff_bg = np.add(bg_pd, buff_bg)
-                n += 1
-                if n == N:
-                    fft_queue.put((buff_fg, buff_bg))
-                    buff_fg = np.zeros(end_idx - start_idx + 1)
-                    buff_bg = np.zeros(end_idx - start_idx + 1)
-                    n = 0
-        else:
-            for (fg_trace,) in iter(data_queue.get, None):
-                fg_spectrum = fftpack.fftshift(fftpack.fft(fg_trace, nfft)) / nfft
-                fgsp_cut = fg_spectrum[start_idx:end_idx + 1]
-                buff_fg = np.add(np.abs(fgsp_cut) ** 2, buff_fg)
-                n += 1
-                if n == N:
-                    fft_queue.put((buff_fg, ))
-                    buff_fg = np.zeros(end_idx - start_idx + 1)
-                    n = 0
-            if n > 0:
-                fft_queue.put((buff_fg))
-        data_queue.put(None)
-        with lock:
-            counter.value -= 1
-
-    """This method will be launched in a new thread of the main process and therefore does not have to be static,
-    as it is allowed access to shared memory. It is convenient that this method should stay in the local process, as it
-    executes one simple task: adding new data to the all one. Threading almost does not speed up the execution."""
-    def _summator(self, counter, lock, done_iterations, lock2):
-        is_running = True
-        N = 100
-        while is_running or not self.fft_queue.empty():
-            with lock:
-                if counter.value == 0:
-                    is_running = False
-            if not self.fft_queue.empty():
-                if self._ult_calib:
-                    power_spectrum_fg, power_spectrum_bg = self.fft_queue.get()
-                    self._internal_data = np.add(self._internal_data, power_spectrum_fg)
-                    self._internal_data_bg = np.add(self._internal_data_bg, power_spectrum_bg)
-                else:
-                    power_spectrum_fg, = self.fft_queue.get()
-                    self._internal_data = np.add(self._internal_data, power_spectrum_fg)
-                with lock2:
-                    done_iterations.value += N
-
     def _record_data(self):
         start_time = self._measurement_result.get_start_datetime()
         number_of_workers = 3 #mp.cpu_count() # PXI CPU has 8 cores
-
-        done_iterations = mp.Value("i", 0)
-        lock1 = mp.Lock()
-        active_workers_number = mp.Value("i", number_of_workers)
-        lock2 = mp.Lock()
+        n_traces = 2 if self._ult_calib else 1
+
+        self._ring = SharedTraceRing(
+            self._slots_per_worker * number_of_workers,
+            (n_traces, self._trace_len), np.complex128)
+        pool = TraceWorkerPool(
+            self._ring,
+            PowerSpectrumProcessor(self._make_psd(n_traces)),
+            number_of_workers, flush_every=100, initializer=_raise_priority)
+        reducer = Reducer(pool.results, number_of_workers)
+
+        def measure():
+            try:
+                self._measurer()
+            finally:
+                self._ring.finish(number_of_workers)
 
         self.measuring_flag = True
-        measurer = th.Thread(target=self._measurer)
+        measurer = th.Thread(target=measure)
         measurer.start()
-        worker_args = (self.data_queue, self.fft_queue, self._nfft, self._start_idx, self._end_idx, self._ult_calib,
-                       active_workers_number, lock2)
-        pool = mp.Pool(number_of_workers, MollowTriplet._power_spectrum, worker_args)
-        summator = th.Thread(target=self._summator, args=(active_workers_number, lock2, done_iterations, lock1))
-        summator.start()
-
-        while summator.is_alive():
-            with lock1:
+
+        try:
+            while reducer.is_alive():
                 time_since = (dt.now() - start_time).total_seconds()
-                if done_iterations.value > 0:
-                    avg_time = time_since / done_iterations.value
-                    measurement_data = self._measurement_result.get_data()
-                    if self._ult_calib:
-                        measurement_data["data"] = self._internal_data.copy() / self._internal_data_bg.copy()
-                    else:
-                        measurement_data["data"] = self._internal_data.copy()
-                    self._measurement_result.set_data(measurement_data)
+                done_iterations, sums = reducer.get()
+                if done_iterations > 0:
+                    avg_time = time_since / done_iterations
+                    self._set_spectra(sums)
                 else:
                     avg_time = time_since
-                time_left = self._format_time_delta(avg_time * (self._internal_avg - done_iterations.value))
+                time_left = self._format_time_delta(avg_time * (self._internal_avg - done_iterations))
 
-                print(f"Time left: {time_left}, iteration number: {done_iterations.value}, "
-                      f"measurement queue size: {self.data_queue.qsize()}, fft queue size: {self.fft_queue.qsize()}, "
+                print(f"Time left: {time_left}, iteration number: {done_iterations}, "
                       f"average cycle time: {round(avg_time, 2)} s",
                       end="\r", flush=True)
 
-            if self._interrupted:
-                self._dig[0].stop_card()
-                measurer.join()
-                pool.terminate()
-                summator.join()
-                return
-            sleep(5.0)
-
-        measurement_data = self._measurement_result.get_data()
-        if self._ult_calib:
-            measurement_data["data"] = self._internal_data.copy() / self._internal_data_bg.copy()
-        else:
-            measurement_data["data"] = self._internal_data.copy() / self._internal_avg
-        self._measurement_result.set_data(measurement_data)
-
-        measurer.join()
-        summator.join()
-        pool.terminate()
-        pool.close()
+                if self._interrupted:
+                    self._dig[0].stop_card()
+                    measurer.join()
+                    pool.terminate()
+                    return
+                reducer.join(5.0)
+
+            measurer.join()
+            pool.join()
+            done_iterations, sums = reducer.get()
+            self._set_spectra(sums, final=True)
+        except WorkerError:
+            # the workers keep releasing the slots, the measurer can end
+            self._dig[0].stop_card()
+            measurer.join()
+            raise
+        finally:
+            pool.terminate()
+            self._ring.unlink()
+            self._ring = None
 
         self._measurement_result.set_recording_time(dt.now() - start_time)
         print("\nElapsed time: %s" % self._format_time_delta((dt.now() - start_time)
                                                              .total_seconds()))
         self._finalize()
 
+    def _set_spectra(self, sums, final=False):
+        if sums is None:
+            return
+        self._internal_data = sums[0]
+        measurement_data = self._measurement_result.get_data()
+        if self._ult_calib:
+            self._internal_data_bg = sums[1]
+            measurement_data["data"] = self._internal_data / self._internal_data_bg
+        elif final:
+            measurement_data["data"] = self._internal_data / self._internal_avg
+        else:
+            measurement_data["data"] = self._internal_data.copy()
+        self._measurement_result.set_data(measurement_data)
+
     def _single_measurement(self):
         dig = self._dig[0]
         dig_data = dig.measure(dig._bufsize)  # data in mV
@@ -370,7 +334,7 @@ class MollowTripletResult(MeasurementResult):
 
     def _prepare_figure(self):
         fig = plt.figure(figsize=(15, 7))
-        fig.canvas.set_window_title(self._name)
+        fig.canvas.manager.set_window_title(self._name)
 
         ax = fig.add_subplot(111)
         return fig, (ax,), (None, None)
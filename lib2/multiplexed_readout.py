@@ -0,0 +1,183 @@
+"""
+Frequency-multiplexed readout of several resonators through one IQ mixer.
+
+    readout = MultiplexedReadout([cal_1, cal_2], names=["q1", "q2"],
+                                 amplitudes=[1, 0.7])
+    ro_pb.add_zero_pulse(1000).add_multiplexed_pulse(2000, readout)
+    ...
+    readout.configure_demodulation(dig.n_seg, segment_size, drop_front,
+                                   drop_end, dig.get_sample_rate(),
+                                   dig.get_mv_per_code())
+    readout.demodulate(dig.measure(raw=True))   # {"q1": IQ, "q2": IQ}
+
+Every tone is up-converted with the mixer calibration made at its IF
+frequency: the amplitudes and the phase skew of its calibration, so the
+summed waveform is the sum of the pulses `IQPulseBuilder.add_sine_pulse`
+would give for the tones one by one. The complex blocks of the tones are
+computed once per pulse length and the composite waveform of the last
+pulse is kept for the next sequence. All tones of all digitizer segments are
+demodulated by one matrix product of `MultiplexedDemodulator`.
+"""
+import numpy as np
+
+from lib2.directMeasurements.demodulation import MultiplexedDemodulator
+from lib2.IQPulseSequence import PARAMETRIC_WINDOWS, get_unit_carrier, \
+    get_unit_envelope
+
+# pulse lengths with cached tone blocks
+MAX_CACHED_LENGTHS = 16
+
+
+class MultiplexedReadout:
+
+    def __init__(self, calibrations, if_frequencies=None, amplitudes=None,
+                 phases=None, names=None, window="rectangular",
+                 window_parameter=0.5):
+        """
+        Parameters
+        ----------
+        calibrations : list[IQCalibrationData]
+            calibration of the readout mixer at the IF frequency of every
+            tone; the offsets of the first one are used for the sum
+        if_frequencies : list[float]
+            Hz, IF frequencies of the tones, the ones of the calibrations
+            by default
+        amplitudes : list[float]
+            multipliers of the calibrated amplitudes, 1 by default
+        phases : list[float]
+            rad, initial phases of the tones, 0 by default
+        names : list
+            keys of the demodulated tones, e.g. the qubit names; the
+            indices of the tones by default
+        window : str
+            envelope of all tones, see `IQPulseBuilder.add_sine_pulse`
+        window_parameter : float
+        """
+        n_tones = len(calibrations)
+        self._calibrations = list(calibrations)
+        self.if_frequencies = np.array(
+            [cal.get_radiation_parameters()["if_frequency"]
+             for cal in calibrations] if if_frequencies is None
+            else if_frequencies, dtype=float)
+        self.names = list(range(n_tones)) if names is None else list(names)
+        if len(self.if_frequencies) != n_tones or \
+                len(self.names) != n_tones:
+            raise ValueError("one IF frequency and one name per tone is "
+                             "required")
+        amplitudes = np.ones(n_tones) if amplitudes is None \
+            else np.asarray(amplitudes, dtype=float)
+        phases = np.zeros(n_tones) if phases is None \
+            else np.asarray(phases, dtype=float)
+
+        # complex amplitudes of the I and Q channels of every tone
+        self._tone_I = np.empty(n_tones, dtype=complex)
+        self._tone_Q = np.empty(n_tones, dtype=complex)
+        for tone, calibration in enumerate(calibrations):
+            parameters = calibration.get_optimization_results()[0]
+            if_amplitudes = parameters["if_amplitudes"]
+            if_phase = float(np.squeeze(parameters["if_phase"]))
+            self._tone_I[tone] = amplitudes[tone] * if_amplitudes[0] * \
+                np.exp(1j * (phases[tone] + if_phase))
+            self._tone_Q[tone] = amplitudes[tone] * if_amplitudes[1] * \
+                np.exp(1j * phases[tone])
+        self._if_offsets = calibrations[0].get_optimization_results()[0][
+            "if_offsets"]
+        self._waveform_resolution = calibrations[0].get_radiation_parameters()[
+            "waveform_resolution"]
+        self._window = window
+        self._window_parameter = window_parameter \
+            if window in PARAMETRIC_WINDOWS else None
+
+        self._blocks = {}
+        # (n_points, start), (I, Q) of the last pulse
+        self._waveforms = (None, None)
+        self._demodulator = MultiplexedDemodulator()
+
+    def get_calibrations(self):
+        return self._calibrations
+
+    def _get_blocks(self, n_points):
+        """
+        (n_tones, n_points) complex waveforms of the tones starting at t = 0
+        """
+        if n_points not in self._blocks:
+            if len(self._blocks) >= MAX_CACHED_LENGTHS:
+                self._blocks.clear()
+            resolution = self._waveform_resolution
+            window = get_unit_envelope(self._window, n_points, resolution,
+                                       self._window_parameter)[0]
+            carriers = np.array(
+                [get_unit_carrier(2 * np.pi * frequency / 1e9, n_points,
+                                  resolution)
+                 for frequency in self.if_frequencies]) * window
+            self._blocks[n_points] = carriers
+        return self._blocks[n_points]
+
+    def get_waveforms(self, duration, start=0):
+        """
+        Parameters
+        ----------
+        duration : float, ns
+        start : int
+            point of the sequence where the pulse begins, the carriers are
+            continuous with the pulses of `IQPulseBuilder` before it
+
+        Returns
+        -------
+        I, Q : np.ndarray
+            read-only summed waveforms; the ones of the last call are
+            cached
+        """
+        n_points = int(np.round(duration / self._waveform_resolution))
+        key = (n_points, start)
+        if key != self._waveforms[0]:
+            blocks = self._get_blocks(n_points)
+            start_phases = np.exp(1j * 2 * np.pi * self.if_frequencies /
+                                  1e9 * start * self._waveform_resolution)
+            waveform_I = ((self._tone_I * start_phases) @ blocks).real + \
+                self._if_offsets[0]
+            waveform_Q = ((self._tone_Q * start_phases) @ blocks).real + \
+                self._if_offsets[1]
+            waveform_I.setflags(write=False)
+            waveform_Q.setflags(write=False)
+            self._waveforms = (key, (waveform_I, waveform_Q))
+        return self._waveforms[1]
+
+    def configure_demodulation(self, n_seg, segment_size, drop_front,
+                               drop_end, sample_rate, mv_per_code=1,
+                               calibrations=None, if_frequencies=None):
+        """
+        Parameters
+        ----------
+        calibrations : list[IQDownconversionCalibrationResult]
+            down-conversion calibration of every tone or None
+        if_frequencies : list[float]
+            Hz, frequencies of the tones in the digitized trace, the IF
+            frequencies of the tones by default
+        other parameters
+            see `Demodulator.configure`
+        """
+        self._demodulator.configure(
+            n_seg, segment_size, drop_front, drop_end, sample_rate,
+            self.if_frequencies if if_frequencies is None
+            else if_frequencies, mv_per_code, calibrations)
+
+    def demodulate(self, raw, per_segment=False):
+        """
+        Parameters
+        ----------
+        raw : np.ndarray
+            interleaved I/Q buffer of the card
+        per_segment : bool
+            points of every segment instead of their average
+
+        Returns
+        -------
+        dict
+            name -> complex IQ, or an array of n_seg points
+        """
+        points = self._demodulator.demodulate(raw, per_segment)
+        return dict(zip(self.names, points))
+
+    def get_demodulator(self):
+        return self._demodulator
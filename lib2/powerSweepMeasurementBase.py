@@ -3,6 +3,7 @@ from scipy import fftpack
 
 from lib2.Measurement import *
 from lib2.IQPulseSequence import IQPulseBuilder
+from lib2.psd import PSDAccumulator
 
 
 class DigitizerWithPowerSweepMeasurementBase(Measurement):
@@ -57,8 +58,7 @@ class DigitizerWithPowerSweepMeasurementBase(Measurement):
         self._sweep_powers = None
         self.pulse_builder = None
 
-        self._start_idx = None
-        self._end_idx = None
+        self._psd = None
         self._frequencies = None
 
     def set_fixed_parameters(self, waveform_type, awg_parameters=[], adc_parameters=[], freq_limits=(), lo_parameters=[]):
@@ -143,11 +143,13 @@ class DigitizerWithPowerSweepMeasurementBase(Measurement):
         # optimal size calculation
         self.nfft = fftpack.helper.next_fast_len(self._adc_parameters["n_seg"] * self._segment_size_optimal)
 
-        # obtaining frequencies (frequencies is duplicating)
-        xf = np.fft.fftfreq(self.nfft, 1 / self._dig.get_sample_rate()) / 1e6
-        self._start_idx = np.searchsorted(xf[:self.nfft // 2 - 1], self._freq_limits[0])
-        self._end_idx = np.searchsorted(xf[:self.nfft // 2 - 1], self._freq_limits[1])
-        self._frequencies = xf[self._start_idx:self._end_idx + 1]
+        # amplitude spectrum of the whole trace in the frequency limits (MHz)
+        self._psd = PSDAccumulator(
+            self._adc_parameters["n_seg"] * self._segment_size_optimal,
+            self._dig.get_sample_rate(), nfft=self.nfft, onesided=True,
+            band=(self._freq_limits[0] * 1e6, self._freq_limits[1] * 1e6),
+            scaling=None)
+        self._frequencies = self._psd.frequencies / 1e6
 
         self._measurement_result.get_context().update({"calibration_results": self._cal.get_optimization_results(), \
                                                        "radiation_parameters": self._cal.get_radiation_parameters()})
@@ -211,10 +213,8 @@ class DigitizerWithPowerSweepMeasurementBase(Measurement):
     def _recording_iteration(self):
         data = self._dig.measure(self._bufsize)  # data in mV
         # deleting extra samples from segments
-        a = np.arange(self._segment_size_optimal, len(data), self._segment_size)
-        b = np.concatenate([a + i for i in range(0, self._segment_size - self._segment_size_optimal)])
-        data_cut = np.delete(data, b)
-        yf = np.abs(np.fft.fft(data_cut, self.nfft))[self._start_idx:self._end_idx + 1] * 2 / self.nfft
+        data_cut = data.reshape(-1, self._segment_size)[:, :self._segment_size_optimal]
+        yf = np.sqrt(self._psd.power(data_cut)[0]) * 2 / self.nfft
         self._measurement_result._iter += 1
         return yf
 
@@ -0,0 +1,185 @@
+"""
+Streaming averaged power spectra (Welch's method).
+
+    psd = PSDAccumulator(nperseg, sample_rate, noverlap=nperseg // 2,
+                         window="hann", band=(10e6, 90e6))
+    for trace in traces:
+        psd.add(trace)
+    frequencies, power, error = psd.frequencies, psd.get_mean(), \
+        psd.get_std_error()
+
+Traces are split into overlapping segments, every segment is windowed
+into a preallocated buffer, transformed and only the bins inside `band`
+are accumulated together with their squares, so the variance of the
+estimate is available at any time. With `n_channels` = 2 the rows of the
+traces are the foreground and the background of the same measurement,
+e.g. with the signal switched on and off.
+"""
+import numpy as np
+import scipy.fft
+from scipy import signal
+
+
+class PSDAccumulator:
+
+    def __init__(self, nperseg, sample_rate=1., noverlap=0, nfft=None,
+                 window="boxcar", onesided=False, band=None, n_channels=1,
+                 scaling="spectrum"):
+        """
+        Parameters
+        ----------
+        nperseg : int
+            samples per segment
+        sample_rate : float
+            Hz
+        noverlap : int
+            samples shared by neighbouring segments
+        nfft : int
+            FFT length >= nperseg, segments are zero-padded
+        window : str, tuple or np.ndarray
+            see `scipy.signal.get_window`
+        onesided : bool
+            real traces and the non-negative frequencies only
+        band : tuple
+            (f_min, f_max) in Hz; bins from the first one not below f_min
+            to the first one not below f_max inclusive, in the order of
+            increasing frequency
+        n_channels : int
+            rows of the traces, e.g. 2 for foreground/background pairs
+        scaling : "spectrum", "density", float or None
+            "spectrum" gives the power of a sine wave of unit amplitude in
+            its bin, "density" the power spectral density in 1/Hz, a float
+            multiplies |FFT|^2
+        """
+        self.nperseg = nperseg
+        self.nfft = nfft if nfft is not None else nperseg
+        if self.nfft < nperseg:
+            raise ValueError("nfft must not be shorter than nperseg")
+        self.step = nperseg - noverlap
+        if self.step <= 0:
+            raise ValueError("noverlap must be less than nperseg")
+        self.n_channels = n_channels
+        self._onesided = onesided
+        if isinstance(window, np.ndarray):
+            self._window = window
+        else:
+            self._window = signal.get_window(window, nperseg)
+
+        if onesided:
+            frequencies = np.fft.rfftfreq(self.nfft, 1 / sample_rate)
+        else:
+            frequencies = np.fft.fftfreq(self.nfft, 1 / sample_rate)
+        index = np.argsort(frequencies, kind="stable")
+        if band is not None:
+            sorted_frequencies = frequencies[index]
+            start = np.searchsorted(sorted_frequencies, band[0])
+            end = np.searchsorted(sorted_frequencies, band[1])
+            index = index[start:end + 1]
+        self._index = index
+        self.frequencies = frequencies[index]
+
+        if scaling == "spectrum":
+            scale = 1 / np.sum(self._window) ** 2
+        elif scaling == "density":
+            scale = 1 / (sample_rate * np.sum(self._window ** 2))
+        elif scaling is None:
+            scale = 1.
+        else:
+            scale = float(scaling)
+        self._scale = np.full(len(index), scale)
+        if onesided and scaling in ("spectrum", "density"):
+            # power of the negative frequencies
+            self._scale[(index > 0) & ~((self.nfft % 2 == 0) &
+                                         (index == self.nfft // 2))] *= 2
+
+        dtype = float if onesided else complex
+        self._segment = np.zeros((n_channels, self.nfft), dtype=dtype)
+        self._power = np.empty((n_channels, len(index)))
+        self._squared = np.empty((n_channels, len(index)))
+        self.reset()
+
+    def reset(self):
+        self.n_segments = 0
+        self._sum = np.zeros((self.n_channels, len(self._index)))
+        self._sum_sq = np.zeros((self.n_channels, len(self._index)))
+
+    def power(self, segment):
+        """
+        Power in the band of one segment of `nperseg` samples.
+
+        Returns
+        -------
+        np.ndarray
+            shape (n_channels, len(frequencies)); the array is reused by
+            the next call
+        """
+        segment = np.reshape(segment, (self.n_channels, self.nperseg))
+        np.multiply(segment, self._window,
+                    out=self._segment[:, :self.nperseg])
+        # the zero padding of the buffer has to survive the transform
+        overwrite = self.nfft == self.nperseg
+        if self._onesided:
+            spectrum = scipy.fft.rfft(self._segment, axis=-1,
+                                      overwrite_x=overwrite)
+        else:
+            spectrum = scipy.fft.fft(self._segment, axis=-1,
+                                     overwrite_x=overwrite)
+        spectrum = spectrum[:, self._index]
+        np.multiply(spectrum.real, spectrum.real, out=self._power)
+        np.multiply(spectrum.imag, spectrum.imag, out=self._squared)
+        self._power += self._squared
+        self._power *= self._scale
+        return self._power
+
+    def add(self, trace):
+        """
+        Accumulates the segments of `trace`, shape (n_samples,) or
+        (n_channels, n_samples); the samples after the last full segment
+        are ignored
+        """
+        trace = np.reshape(trace, (self.n_channels, -1))
+        for start in range(0, trace.shape[-1] - self.nperseg + 1,
+                           self.step):
+            power = self.power(trace[:, start:start + self.nperseg])
+            self._sum += power
+            np.multiply(power, power, out=self._squared)
+            self._sum_sq += self._squared
+            self.n_segments += 1
+
+    def _squeeze(self, data):
+        return data[0] if self.n_channels == 1 else data
+
+    def get_mean(self):
+        return self._squeeze(self._sum / max(self.n_segments, 1))
+
+    def get_variance(self):
+        """
+        Sample variance of the power of single segments
+        """
+        n = self.n_segments
+        if n < 2:
+            return self._squeeze(np.zeros_like(self._sum))
+        mean = self._sum / n
+        return self._squeeze(
+            np.maximum(self._sum_sq / n - mean ** 2, 0) * n / (n - 1))
+
+    def get_std_error(self):
+        """
+        Standard error of `get_mean()`; neighbouring overlapping segments
+        are correlated, so it is underestimated for large overlaps
+        """
+        return np.sqrt(self.get_variance() / max(self.n_segments, 1))
+
+    def get_ratio(self):
+        """
+        Foreground power divided by the background power
+        """
+        mean = self._sum / max(self.n_segments, 1)
+        return mean[0] / mean[1]
+
+    def get_difference(self):
+        """
+        Foreground power with the background subtracted
+        """
+        mean = self._sum / max(self.n_segments, 1)
+        return mean[0] - mean[1]
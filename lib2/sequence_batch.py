@@ -0,0 +1,385 @@
+"""
+Vectorized generation of all the pulse sequences of a sweep.
+
+`BatchPulseBuilder` has the methods of `IQPulseBuilder`, but durations,
+amplitudes and phases may be arrays of the sweep values. Every element of
+the broadcast arrays is one sequence, i.e. one row of the waveform bank:
+
+    parameters = dict(pulse_sequence_parameters,
+                      excitation_duration=np.arange(10, 1000, 5))
+    seqs = build_dispersive_rabi_batch(parameters, q_calibration,
+                                       ro_calibration)
+    batch = seqs["q_seqs"][0]
+    for rows, waveforms_I, waveforms_Q in batch.iter_chunks(max_bytes=1e8):
+        ...                             # (n_rows, n_samples) arrays
+
+The rows are the waveforms `IQPulseBuilder` builds for every sweep value.
+Pulses replace the constant zero level, the carrier of all pulses is one
+continuous wave evaluated once on the sample grid, and the envelopes come
+from the cache of `get_unit_envelope`, one table row per distinct pulse
+length. Only the columns spanned by a pulse are touched. Chunks are
+C-contiguous float arrays in volts, so a row can be passed as it is to
+the AWG drivers or copied into the waveform memory.
+"""
+import numpy as np
+
+from lib2.IQPulseSequence import IQPulseSequence, PulseSequence, \
+    PARAMETRIC_WINDOWS, get_unit_envelope
+
+# default bound of the memory taken by a chunk of waveforms
+DEFAULT_CHUNK_BYTES = 64 * 2 ** 20
+
+
+def _to_points(duration, waveform_resolution):
+    return np.round(np.asarray(duration, dtype=float) /
+                    waveform_resolution).astype(int)
+
+
+class SequenceBatch:
+    """
+    I and Q waveforms of a sweep, rendered chunk by chunk
+    """
+
+    def __init__(self, calibration, pulses, n_rows, n_samples):
+        """
+        Parameters
+        ----------
+        calibration : IQCalibrationData
+        pulses : list[dict]
+            see `BatchPulseBuilder`
+        n_rows : int
+        n_samples : int
+        """
+        self._calibration = calibration
+        self._pulses = pulses
+        self.n_rows = n_rows
+        self.n_samples = n_samples
+        results = calibration.get_optimization_results()[0]
+        radiation = calibration.get_radiation_parameters()
+        self._waveform_resolution = radiation["waveform_resolution"]
+        self._zero_levels = np.asarray(results["dc_offsets"], dtype=float)
+        frequency = 2 * np.pi * radiation["if_frequency"] / 1e9
+        grid = frequency * self._waveform_resolution * np.arange(n_samples)
+        if_phase = float(np.ravel(results["if_phase"])[0])
+        # cos and sin of the continuous carrier of the I and Q channels
+        self._carriers = ((np.cos(grid + if_phase), np.sin(grid + if_phase)),
+                          (np.cos(grid), np.sin(grid)))
+
+    def get_waveform_resolution(self):
+        return self._waveform_resolution
+
+    def get_duration(self):
+        return self.n_samples * self._waveform_resolution
+
+    def _render_rows(self, rows, dtype):
+        n = rows.stop - rows.start
+        waveforms = [np.empty((n, self.n_samples), dtype=dtype)
+                     for _ in range(2)]
+        for waveform, level in zip(waveforms, self._zero_levels):
+            waveform[...] = level
+        for pulse in self._pulses:
+            start = pulse["start"][rows]
+            length = pulse["length"][rows]
+            if not np.any(length > 0):
+                continue
+            low = start[length > 0].min()
+            high = (start + length)[length > 0].max()
+            offset = np.arange(low, high) - start[:, np.newaxis]
+            mask = (offset >= 0) & (offset < length[:, np.newaxis])
+            if pulse["kind"] == "sine":
+                table = pulse["envelopes"]
+                envelope = table[pulse["table_row"][rows][:, np.newaxis],
+                                 np.clip(offset, 0, table.shape[1] - 1)]
+                rotation = np.exp(1j * pulse["phase"][rows])[:, np.newaxis]
+            for channel in range(2):
+                level = pulse["levels"][channel]
+                if pulse["kind"] == "sine":
+                    cos, sin = self._carriers[channel]
+                    values = envelope * pulse["amplitudes"][channel][rows] \
+                        [:, np.newaxis] * (cos[low:high] * rotation.real -
+                                           sin[low:high] * rotation.imag)
+                    values += level
+                else:
+                    values = level
+                block = waveforms[channel][:, low:high]
+                np.copyto(block, values, where=mask, casting="unsafe")
+        return waveforms
+
+    def iter_chunks(self, max_bytes=DEFAULT_CHUNK_BYTES, dtype=np.float64):
+        """
+        Yields (rows, waveforms_I, waveforms_Q) for consecutive chunks of
+        rows; the chunk size is chosen so that the waveforms and the
+        temporary arrays of a chunk take about `max_bytes`
+        """
+        # waveforms, envelopes, masks and carrier products
+        row_bytes = 8 * self.n_samples * 6
+        chunk = max(1, int(max_bytes // row_bytes))
+        for start in range(0, self.n_rows, chunk):
+            rows = slice(start, min(start + chunk, self.n_rows))
+            yield (rows,) + tuple(self._render_rows(rows, dtype))
+
+    def render(self, dtype=np.float64, max_bytes=DEFAULT_CHUNK_BYTES):
+        """
+        Returns
+        -------
+        waveforms_I, waveforms_Q : np.ndarray
+            shape (n_rows, n_samples), the whole bank
+        """
+        waveforms = [np.empty((self.n_rows, self.n_samples), dtype=dtype)
+                     for _ in range(2)]
+        for rows, waveform_I, waveform_Q in self.iter_chunks(max_bytes,
+                                                             dtype):
+            waveforms[0][rows] = waveform_I
+            waveforms[1][rows] = waveform_Q
+        return tuple(waveforms)
+
+    def get_sequence(self, index):
+        """
+        IQPulseSequence of one row, e.g. for `IQAWG.output_pulse_sequence`
+        """
+        rows = slice(index, index + 1)
+        sequences = []
+        for waveform in self._render_rows(rows, np.float64):
+            sequence = PulseSequence(self._waveform_resolution)
+            sequence._waveform = waveform[0]
+            sequences.append(sequence)
+        return IQPulseSequence(*sequences)
+
+
+class BatchPulseBuilder:
+    """
+    `IQPulseBuilder` for arrays of durations, amplitudes and phases; the
+    arrays of all calls are broadcast together to the rows of the batch
+    """
+
+    def __init__(self, iqmx_calibration):
+        self._calibration = iqmx_calibration
+        self._waveform_resolution = \
+            iqmx_calibration.get_radiation_parameters()["waveform_resolution"]
+        results = iqmx_calibration.get_optimization_results()[0]
+        self._results = results
+        self._position = np.zeros((), dtype=int)
+        self._pulses = []
+        self._n_samples = None
+
+    def get_calibration(self):
+        return self._calibration
+
+    def _advance(self, n_points, what):
+        if np.any(n_points < 0):
+            raise ValueError("negative duration of %s" % what)
+        # pulses of a single point are ignored by PulseSequence
+        n_points = np.where(n_points > 1, n_points, 0)
+        start = self._position
+        self._position = start + n_points
+        return start, n_points
+
+    def add_zero_pulse(self, duration):
+        self._advance(_to_points(duration, self._waveform_resolution),
+                      "zero pulse")
+        return self
+
+    def add_dc_pulse(self, duration):
+        start, length = self._advance(
+            _to_points(duration, self._waveform_resolution), "dc pulse")
+        self._pulses.append({"kind": "dc", "start": start, "length": length,
+                             "levels": self._results["dc_offset_open"]})
+        return self
+
+    def add_sine_pulse(self, duration, phase=0, amplitude_mult=1,
+                       window="rectangular", window_parameter=0.5):
+        """
+        See `IQPulseBuilder.add_sine_pulse`; the half derivative correction
+        and the custom frequency, offsets and amplitudes are not supported
+        """
+        start, length = self._advance(
+            _to_points(duration, self._waveform_resolution), "sine pulse")
+        if_amplitudes = np.asarray(self._results["if_amplitudes"],
+                                   dtype=float)
+        self._pulses.append({
+            "kind": "sine", "start": start, "length": length,
+            "levels": self._results["if_offsets"],
+            "amplitudes": [amplitude * np.asarray(amplitude_mult, dtype=float)
+                           for amplitude in if_amplitudes],
+            "phase": np.asarray(phase, dtype=float), "window": window,
+            "window_parameter": window_parameter
+            if window in PARAMETRIC_WINDOWS else None})
+        return self
+
+    def add_pulse(self, duration, amplitude_mult=1):
+        if self._calibration.get_radiation_parameters()["if_frequency"] == 0:
+            return self.add_dc_pulse(duration)
+        return self.add_sine_pulse(duration, amplitude_mult=amplitude_mult)
+
+    def add_zero_until(self, total_duration):
+        total_points = round(total_duration / self._waveform_resolution)
+        self._advance(total_points - self._position, "the end of the sequence")
+        return self
+
+    def _envelope_table(self, pulse):
+        lengths = np.unique(pulse["length"][pulse["length"] > 0])
+        table = np.zeros((max(len(lengths), 1),
+                          lengths.max() if len(lengths) else 1))
+        for row, length in enumerate(lengths):
+            table[row, :length] = get_unit_envelope(
+                pulse["window"], int(length), self._waveform_resolution,
+                pulse["window_parameter"])[0]
+        table_row = np.clip(np.searchsorted(lengths, pulse["length"]), 0,
+                            len(table) - 1)
+        return table, table_row
+
+    def build(self):
+        """
+        Returns
+        -------
+        SequenceBatch
+        """
+        arrays = [self._position]
+        for pulse in self._pulses:
+            arrays += [pulse["start"], pulse["length"]]
+            if pulse["kind"] == "sine":
+                arrays += pulse["amplitudes"] + [pulse["phase"]]
+        # pairwise: np.broadcast takes at most 32 arrays, and
+        # np.broadcast_shapes needs numpy 1.20
+        shape = ()
+        for array in arrays:
+            shape = np.broadcast(np.broadcast_to(False, shape), array).shape
+        if len(shape) > 1:
+            raise ValueError("the swept parameters must be 1-D arrays")
+        n_rows = int(np.prod(shape))
+
+        def expand(array):
+            return np.broadcast_to(array, (n_rows,)).copy()
+
+        lengths = expand(self._position)
+        if np.any(lengths != lengths[0]):
+            raise ValueError("the sequences of the batch differ in length, "
+                             "end them with add_zero_until")
+        pulses = []
+        for pulse in self._pulses:
+            pulse = dict(pulse, start=expand(pulse["start"]),
+                         length=expand(pulse["length"]))
+            if pulse["kind"] == "sine":
+                pulse["amplitudes"] = [expand(amplitude)
+                                       for amplitude in pulse["amplitudes"]]
+                pulse["phase"] = expand(pulse["phase"])
+                pulse["envelopes"], pulse["table_row"] = \
+                    self._envelope_table(pulse)
+            pulses.append(pulse)
+
+        batch = SequenceBatch(self._calibration, pulses, n_rows,
+                              int(lengths[0]))
+        self._position = np.zeros((), dtype=int)
+        self._pulses = []
+        return batch
+
+
+def build_dispersive_rabi_batch(pulse_sequence_parameters, q_calibration,
+                                ro_calibration):
+    """
+    `IQPulseBuilder.build_dispersive_rabi_sequences` for arrays of
+    "excitation_duration" or "excitation_amplitude"
+    """
+    p = pulse_sequence_parameters
+    end_gap = p.get("end_gap", 0)
+    readout_excitation_gap = p.get("readout_excitation_gap", 100)
+    exc_pb = BatchPulseBuilder(q_calibration)
+    exc_pb.add_zero_pulse(p["awg_trigger_reaction_delay"] +
+                          (p["repetition_period"] - p["readout_duration"] -
+                           np.asarray(p["excitation_duration"]))
+                          - readout_excitation_gap - end_gap) \
+        .add_sine_pulse(p["excitation_duration"], 0,
+                        amplitude_mult=p["excitation_amplitude"],
+                        window=p["modulating_window"]) \
+        .add_zero_until(p["repetition_period"])
+    return {"q_seqs": [exc_pb.build()],
+            "ro_seqs": [build_readout_batch(p, ro_calibration, end_gap)]}
+
+
+def build_dispersive_ramsey_batch(pulse_sequence_parameters, q_calibration,
+                                  ro_calibration):
+    """
+    `IQPulseBuilder.build_dispersive_ramsey_sequences` for an array of
+    "ramsey_delay"
+    """
+    p = pulse_sequence_parameters
+    half_pi = p["half_pi_pulse_duration"]
+    ramsey_delay = np.asarray(p["ramsey_delay"])
+    exc_pb = BatchPulseBuilder(q_calibration)
+    exc_pb.add_zero_pulse(p["awg_trigger_reaction_delay"] +
+                          p["repetition_period"] -
+                          (half_pi * 2 + ramsey_delay) -
+                          p["readout_duration"] - 10) \
+        .add_sine_pulse(half_pi, amplitude_mult=p["excitation_amplitude"],
+                        window=p["modulating_window"]) \
+        .add_zero_pulse(ramsey_delay) \
+        .add_sine_pulse(half_pi, amplitude_mult=p["excitation_amplitude"],
+                        window=p["modulating_window"]) \
+        .add_zero_until(p["repetition_period"])
+    return {"q_seqs": [exc_pb.build()],
+            "ro_seqs": [build_readout_batch(p, ro_calibration)]}
+
+
+def build_dispersive_hahn_echo_batch(pulse_sequence_parameters,
+                                     q_calibration, ro_calibration):
+    """
+    `IQPulseBuilder.build_dispersive_hahn_echo_sequences` for an array of
+    "echo_delay"
+    """
+    p = pulse_sequence_parameters
+    half_pi = p["half_pi_pulse_duration"]
+    echo_delay = np.asarray(p["echo_delay"])
+    amplitude, window = p["excitation_amplitude"], p["modulating_window"]
+    exc_pb = BatchPulseBuilder(q_calibration)
+    exc_pb.add_zero_pulse(p["awg_trigger_reaction_delay"] +
+                          p["repetition_period"] - 4 * half_pi - echo_delay -
+                          p["readout_duration"] - 10) \
+        .add_sine_pulse(half_pi, amplitude_mult=amplitude, window=window) \
+        .add_zero_pulse(echo_delay / 2) \
+        .add_sine_pulse(half_pi, amplitude_mult=2 * amplitude, window=window) \
+        .add_zero_pulse(echo_delay / 2) \
+        .add_sine_pulse(half_pi, amplitude_mult=amplitude, window=window) \
+        .add_zero_pulse(p["readout_duration"]) \
+        .add_zero_until(p["repetition_period"])
+    return {"q_seqs": [exc_pb.build()],
+            "ro_seqs": [build_readout_batch(p, ro_calibration, until=False)]}
+
+
+def build_dispersive_decay_batch(pulse_sequence_parameters, q_calibration,
+                                 ro_calibration):
+    """
+    `IQPulseBuilder.build_dispersive_decay_sequences` (T1) for an array of
+    "readout_delay"
+    """
+    p = pulse_sequence_parameters
+    exc_pb = BatchPulseBuilder(q_calibration)
+    exc_pb.add_zero_pulse(p["awg_trigger_reaction_delay"] +
+                          p["repetition_period"] - p["pi_pulse_duration"] -
+                          np.asarray(p["readout_delay"]) -
+                          p["readout_duration"] - 10) \
+        .add_sine_pulse(p["pi_pulse_duration"], 0) \
+        .add_zero_until(p["repetition_period"])
+    return {"q_seqs": [exc_pb.build()],
+            "ro_seqs": [build_readout_batch(p, ro_calibration, until=False)]}
+
+
+def build_readout_batch(pulse_sequence_parameters, ro_calibration,
+                        end_gap=0, until=True):
+    """
+    Dispersive readout at the end of the repetition period, a single row
+    for all points of a sweep
+
+    Parameters
+    ----------
+    until : bool
+        pad the sequence to the repetition period; the decay and the echo
+        sequences end right after the readout pulse
+    """
+    p = pulse_sequence_parameters
+    ro_pb = BatchPulseBuilder(ro_calibration)
+    ro_pb.add_zero_pulse(p["repetition_period"] - p["readout_duration"] -
+                         end_gap) \
+        .add_pulse(p["readout_duration"])
+    if until:
+        ro_pb.add_zero_until(p["repetition_period"])
+    return ro_pb.build()
@@ -6,6 +6,7 @@ import numpy as np
 from matplotlib import pyplot as plt
 from lib2.IQPulseSequence import IQPulseBuilder
 from lib2.MeasurementResult import MeasurementResult
+from lib2.fourier import custom_fourier
 import lib2.directMeasurements.digitizerTimeResolvedDirectMeasurement as dtrdm
 from typing import List
 from drivers.Spectrum_m4x import SPCM
@@ -327,36 +328,9 @@ class ReflectionTransmissionResult(MeasurementResult):
         np.ndarray
 
         """
-        time_arr = np.linspace(
-            0,
-            complex_data.shape[-1] * dt,
-            complex_data.shape[-1],
-            endpoint=False)
-
-        """ 
-            Memory usage check. 
-            Large data and frequencies arrays may cause some data to be 
-            dumped to hard drive. This is to be avoided
-            The upper bounds for memory usage is 1 GByte.
-        """
-        # np.float64 assumed
-        assumed_size_bytes = len(time_arr)*len(custom_freqs)*64/8
-        if assumed_size_bytes / 2**30 > 1:
-            self.set_is_finished(True)
-            raise UserWarning("Custom fourier transform requires more than "
-                              "1 GB of memory, execution is terminated")
-
-        tmp = np.exp(
-            -1j * 2 * np.pi * np.tensordot(custom_freqs, time_arr, axes=0)
-        )  # len(freqs) x len(time) 2D array
-
-        # tensor contraction along last axes
-        # result has shape = (complex_data.shape[:-1], len(freqs))
-        fourier_data = np.tensordot(
-            complex_data, tmp,
-            axes=([-1], [-1])
-        ) / np.sqrt(complex_data.shape[-1])
-        return fourier_data
+        # chirp-z transform for equally spaced frequencies, see lib2.fourier
+        return custom_fourier(complex_data, dt, custom_freqs) / \
+            np.sqrt(complex_data.shape[-1])
 
     def func_over_trace(self, trace):
         # could be np.real, np.imag, etc.
@@ -131,9 +131,9 @@ class Snapshot:
         tmp = self._handle_inplace(inplace)
 
         x_idxs = (self.x > xlims[0]) & (self.x < xlims[1]) if (xlims is not None) else \
-            np.full_like(self.x, True, dtype=np.bool)
+            np.full_like(self.x, True, dtype=bool)
         y_idxs = (self.y > ylims[0]) & (self.y < ylims[1]) if (ylims is not None) else \
-            np.full_like(self.y, True, dtype=np.bool)
+            np.full_like(self.y, True, dtype=bool)
         tmp.x = self.x[x_idxs]
         tmp.y = self.y[y_idxs]
         tmp.data = self.data[np.ix_(y_idxs, x_idxs)]
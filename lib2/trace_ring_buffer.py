@@ -0,0 +1,312 @@
+"""
+Shared-memory pipeline for measurements that process every digitizer
+trace in worker processes.
+
+    ring = SharedTraceRing(n_slots, (2, trace_len), np.complex128)
+    pool = TraceWorkerPool(ring, processor, n_workers)
+    reducer = Reducer(pool.results, n_workers)
+
+    for trace in traces:                # acquisition thread
+        slot = ring.acquire()           # blocks while all slots are busy
+        ring.get_slot(slot)[:] = trace
+        ring.publish(slot)
+    ring.finish(n_workers)
+
+    reducer.join()
+    n_traces, sums = reducer.get()
+    pool.join()
+    ring.unlink()
+
+Traces are written once into a block of shared memory divided into
+fixed-size slots; only slot indices go through the queues. A worker
+applies `processor(trace)` to a slot, returns the slot to the producer
+and adds the result, a tuple of arrays, to its own sums. Every
+`flush_every` traces the sums are sent to the reducer, which waits on the
+result queue in a thread of the main process and adds them up. Every
+worker calls its own copy of `processor`, which may keep buffers between
+the calls. An exception of a worker is re-raised by `Reducer.get()` as
+`WorkerError`; the failed worker keeps releasing the slots until `finish`,
+so the producer is not blocked.
+
+Without `multiprocessing.shared_memory` (Python < 3.8), or with
+`in_process=True`, the slots are a plain array and the workers are threads
+of the main process.
+"""
+import multiprocessing as mp
+import queue
+import threading
+import traceback
+from copy import deepcopy
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+
+class SharedTraceRing:
+    """
+    Fixed-size trace slots in shared memory with queues of free and filled
+    slot indices. The object can be passed to worker processes.
+
+    With `in_process` (the default if shared memory is not available) the
+    slots are an ordinary array for the worker threads of this process.
+    """
+
+    def __init__(self, n_slots, slot_shape, dtype=np.complex128,
+                 in_process=None):
+        self.n_slots = n_slots
+        self.slot_shape = tuple(np.atleast_1d(slot_shape))
+        self.dtype = np.dtype(dtype)
+        self.in_process = shared_memory is None if in_process is None \
+            else in_process
+        self._owner = True
+        if self.in_process:
+            self._shm = None
+            self._free = queue.Queue()
+            self._filled = queue.Queue()
+            self._slots = np.empty((n_slots,) + self.slot_shape, self.dtype)
+        else:
+            slot_bytes = int(np.prod(self.slot_shape)) * self.dtype.itemsize
+            self._shm = shared_memory.SharedMemory(create=True,
+                                                   size=n_slots * slot_bytes)
+            self._free = mp.Queue()
+            self._filled = mp.Queue()
+            self._slots = self._map_slots()
+        for slot in range(n_slots):
+            self._free.put(slot)
+
+    def _map_slots(self):
+        return np.ndarray((self.n_slots,) + self.slot_shape, self.dtype,
+                          buffer=self._shm.buf)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_shm"], state["_slots"]
+        state["_name"] = self._shm.name
+        state["_owner"] = False
+        return state
+
+    def __setstate__(self, state):
+        name = state.pop("_name")
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._slots = self._map_slots()
+
+    def get_slot(self, slot):
+        """
+        Returns
+        -------
+        np.ndarray
+            view of the slot, valid until the slot is released
+        """
+        return self._slots[slot]
+
+    def acquire(self, timeout=None):
+        """
+        Free slot index for the producer
+        """
+        return self._free.get(timeout=timeout)
+
+    def publish(self, slot):
+        self._filled.put(slot)
+
+    def finish(self, n_consumers):
+        """
+        Tells `n_consumers` consumers that no more traces will come
+        """
+        for _ in range(n_consumers):
+            self._filled.put(None)
+
+    def release(self, slot):
+        self._free.put(slot)
+
+    def __iter__(self):
+        """
+        Filled slot indices for a consumer, until `finish`
+        """
+        return iter(self._filled.get, None)
+
+    def close(self):
+        if self.in_process:
+            # the worker threads share the slots
+            return
+        self._slots = None
+        self._shm.close()
+
+    def unlink(self):
+        if self.in_process:
+            self._slots = None
+            return
+        self.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class WorkerError(Exception):
+    """
+    Exception of a worker, with its traceback in the message
+    """
+
+
+def _worker(ring, results, processor, flush_every, initializer):
+    slot = None
+    finished = False
+    try:
+        if initializer is not None:
+            initializer()
+        # the worker threads of an in-process ring must not share the
+        # buffers of a stateful processor
+        processor = deepcopy(processor)
+        sums = None
+        n = 0
+        for slot in ring:
+            result = processor(ring.get_slot(slot))
+            ring.release(slot)
+            slot = None
+            if sums is None:
+                sums = tuple(np.array(value,
+                                      dtype=np.result_type(value, float))
+                             for value in result)
+            else:
+                for total, value in zip(sums, result):
+                    total += value
+            n += 1
+            if n == flush_every:
+                results.put((n, sums))
+                sums, n = None, 0
+        finished = True
+        if n > 0:
+            results.put((n, sums))
+    except Exception:
+        # the exception object may not be picklable, its text is
+        results.put(WorkerError(traceback.format_exc()))
+        if slot is not None:
+            ring.release(slot)
+        if not finished:
+            for slot in ring:
+                ring.release(slot)
+    finally:
+        results.put(None)
+        ring.close()
+
+
+class TraceWorkerPool:
+    """
+    Processes that apply `processor` to the traces of a `SharedTraceRing`,
+    threads for an in-process ring.
+
+    `processor` is called with the slot array and returns a tuple of
+    arrays; it has to be picklable, e.g. a module level function or an
+    instance of a module level class.
+    """
+
+    def __init__(self, ring, processor, n_workers, flush_every=100,
+                 initializer=None):
+        self._in_process = ring.in_process
+        if self._in_process:
+            self.results = queue.Queue()
+            worker_type = threading.Thread
+        else:
+            self.results = mp.Queue()
+            worker_type = mp.Process
+        self._processes = [
+            worker_type(target=_worker, daemon=True,
+                        args=(ring, self.results, processor, flush_every,
+                              initializer))
+            for _ in range(n_workers)]
+        for process in self._processes:
+            process.start()
+
+    def join(self, timeout=None):
+        for process in self._processes:
+            process.join(timeout)
+
+    def terminate(self):
+        """
+        Stops the worker processes; the worker threads can not be stopped
+        and finish after `SharedTraceRing.finish`
+        """
+        if not self._in_process:
+            for process in self._processes:
+                process.terminate()
+        self.join()
+
+
+class Reducer:
+    """
+    Adds up the partial sums of the workers in a thread, blocking on the
+    result queue instead of polling it
+    """
+
+    def __init__(self, results, n_workers, on_update=None):
+        """
+        Parameters
+        ----------
+        results : multiprocessing.Queue or queue.Queue
+            `TraceWorkerPool.results`
+        n_workers : int
+            number of workers, the reducer stops when all of them finish
+        on_update : callable
+            called as on_update(n_traces, sums) after every partial sum
+        """
+        self._results = results
+        self._n_workers = n_workers
+        self._on_update = on_update
+        self._lock = threading.Lock()
+        self.n_traces = 0
+        self._sums = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        active = self._n_workers
+        while active > 0:
+            item = self._results.get()
+            if item is None:
+                active -= 1
+                continue
+            if isinstance(item, WorkerError):
+                with self._lock:
+                    if self._error is None:
+                        self._error = item
+                continue
+            n, sums = item
+            with self._lock:
+                if self._sums is None:
+                    self._sums = sums
+                else:
+                    for total, value in zip(self._sums, sums):
+                        total += value
+                self.n_traces += n
+                n_traces, sums = self.n_traces, self._sums
+            if self._on_update is not None:
+                self._on_update(n_traces, sums)
+
+    def get(self):
+        """
+        Returns
+        -------
+        n_traces, sums
+            copies of the current sums, None if nothing has been reduced
+
+        Raises
+        ------
+        WorkerError
+            if a worker failed
+        """
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            if self._sums is None:
+                return self.n_traces, None
+            return self.n_traces, tuple(total.copy() for total in self._sums)
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
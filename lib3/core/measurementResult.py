@@ -354,7 +354,7 @@ class MeasurementResult:
                 ax_map_im.set_title("Imaginary", position=(0.5, -0.1))
                 ax_map_re.grid(False)
                 ax_map_im.grid(False)
-                fig.canvas.set_window_title(self._name)
+                fig.canvas.manager.set_window_title(self._name)
                 return fig, (ax_trace, ax_map_re, ax_map_im), (cax_re, cax_im)
         """
         fig, axes = plt.subplots(1, 2, figsize=(15, 7))
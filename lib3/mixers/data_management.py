@@ -8,6 +8,8 @@ import numpy as np
 
 # Local application imports
 from lib import plotting as pl
+from lib.iq_calibration_store import IQCalibrationStore, \
+    append_calibration
 from lib3.mixers.iq_downconversion_calibration import \
     IQDownconversionCalibrationResult
 from lib3.core.measurement import Measurement
@@ -56,45 +58,29 @@ def load_downconversion_calibration(mixer_id, iffreq):
     return IQDownconversionCalibrationResult.load_dict(cal_dict)
 
 
-def save_IQMX_calibration(iqmx_calibration):
-    # directory = 'data\\IQMXCalibration'
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+def load_IQMX_calibration_store(mixer_id):
+    """
+    Indexed store of all calibrations of the mixer, see
+    `lib.iq_calibration_store.IQCalibrationStore`
+    """
+    return IQCalibrationStore(mixer_id, directory)
 
-    filename = iqmx_calibration.get_mixer_parameters()["mixer_id"]
-    try:
-        with open(directory + "\\" + filename + '.pkl', 'rb') as f:
-            known_cal_data = pkl.load(f)
-
-        try:
-            cal_for_known_attenuation = known_cal_data[iqmx_calibration.get_mixer_parameters()["iq_attenuation"]]
-            cal_for_known_attenuation[frozenset(iqmx_calibration.get_radiation_parameters().items())] = iqmx_calibration
-        except KeyError:
-            known_cal_data[iqmx_calibration.get_mixer_parameters()["iq_attenuation"]] = \
-                {frozenset(iqmx_calibration.get_radiation_parameters().items()): iqmx_calibration}
-
-        with open(directory + "\\" + filename + '.pkl', 'wb') as f:
-            pkl.dump(known_cal_data, f)
-
-    except FileNotFoundError:
-        new_cal_data = {iqmx_calibration.get_mixer_parameters()["iq_attenuation"]: {
-            frozenset(iqmx_calibration.get_radiation_parameters().items()): iqmx_calibration}}
 
-        with open(directory + "\\" + filename + '.pkl', 'w+b') as f:
-            pkl.dump(new_cal_data, f)
+def save_IQMX_calibration(iqmx_calibration):
+    # the calibration is appended to the store file, the store is not
+    # loaded
+    append_calibration(iqmx_calibration, directory)
 
 
 def load_IQMX_calibration_database(mixer_id, iq_attenuation):
-    # directory = 'data\\IQMXCalibration'
-    filename = mixer_id
-
-    try:
-        with open(directory + "\\" + filename + '.pkl', 'rb') as f:
-            known_cal_data = pkl.load(f)
-
-    except FileNotFoundError:
-        return None
-    return known_cal_data[iq_attenuation]
+    """
+    Returns
+    -------
+    database : dict
+        {frozenset(radiation_parameters): calibration} for the attenuation
+    """
+    return load_IQMX_calibration_store(mixer_id).as_legacy_database(
+        iq_attenuation)
 
 
 def save_measurement(measurement, filename, plot_amps_kwargs={}, plot_phas_kwargs={}, plot_kwargs={}):
@@ -1,6 +1,6 @@
 """ IN DEVELOPMENT. NOT USED ANYWHERE."""
 
-from copy import deepcopy
+from copy import copy, deepcopy
 
 from matplotlib import pyplot as plt
 import numpy as np
@@ -105,8 +105,10 @@ class IQPulseBuilder:
         iqmx_calibration : HetIQCalibration
             Calibration data for the IQ mixer that will be used to send out the pulse sequence.
             Make sure that the radiation parameters of this calibration are in match with your actual settings
+            The calibration is not copied, use `override_calibration` to
+            change it for this builder only
         """
-        self._iqmx_calibration = deepcopy(iqmx_calibration)
+        self._iqmx_calibration = iqmx_calibration
         self._waveform_resolution = iqmx_calibration.awg_sampling_period
         self._pulse_seq_I = PulseSequence(self._waveform_resolution)
         self._pulse_seq_Q = PulseSequence(self._waveform_resolution)
@@ -123,6 +125,26 @@ class IQPulseBuilder:
     def get_calibration(self):
         return self._iqmx_calibration
 
+    def override_calibration(self, **attributes):
+        """
+        Replaces the calibration of this builder by a shallow copy with
+        some attributes changed; the calibration passed to the constructor
+        is left intact
+        """
+        calibration = copy(self._iqmx_calibration)
+        for name, value in attributes.items():
+            setattr(calibration, name, value)
+        self._iqmx_calibration = calibration
+        return self
+
+    def copy(self):
+        """
+        Copy of the builder with the pulses added so far, sharing the
+        calibration
+        """
+        return deepcopy(self, {id(self._iqmx_calibration):
+                               self._iqmx_calibration})
+
     def add_dc_pulse(self, duration, dc_offsets_open=None):
         """
         Adds a pulse by putting a dc voltage at the I and Q inputs of the mixer
@@ -682,12 +704,11 @@ class IQPulseBuilder:
         '''
         pb0 = exc_pb
         # pulse sequence is separated into positive and negative sequences
-        pb0._iqmx_calibration._if_offsets /= 2
-        pb0._iqmx_calibration._dc_offsets /= 2
-        pb_p = deepcopy(pb0)
-        pb_n = deepcopy(pb0)
-        pb0._iqmx_calibration._if_offsets *= 2
-        pb0._iqmx_calibration._dc_offsets *= 2
+        halved_offsets = dict(
+            _if_offsets=np.asarray(pb0._iqmx_calibration._if_offsets) / 2,
+            _dc_offsets=np.asarray(pb0._iqmx_calibration._dc_offsets) / 2)
+        pb_p = pb0.copy().override_calibration(**halved_offsets)
+        pb_n = pb0.copy().override_calibration(**halved_offsets)
 
         ''' 
         Calculating positions of the
@@ -1976,8 +1997,8 @@ class IQPulseBuilder:
         ro_pb = pbs['ro_pbs'][0]
         z_pb = pbs['q_z_pbs'][0]
 
-        exc_pbs[0][1]._iqmx_calibration._dc_offsets = np.array([0, 0])
-        exc_pbs[0][1]._iqmx_calibration._if_offsets = np.array([0, 0])
+        exc_pbs[0][1].override_calibration(_dc_offsets=np.array([0, 0]),
+                                           _if_offsets=np.array([0, 0]))
         exc_pbs[0][0].add_zero_pulse(awg_trigger_reaction_delay) \
             .add_sine_pulse(excitation_duration, 0, amplitude_mult=amplitude_1,
                             window=window) \
@@ -2096,8 +2117,8 @@ class IQPulseBuilder:
 
         exc_pb1 = pbs['q_pbs'][0][0]
         exc_pb2 = pbs["q_pbs"][0][1]
-        exc_pb2._iqmx_calibration._dc_offsets = np.array([0, 0])
-        exc_pb2._iqmx_calibration._if_offsets = np.array([0, 0])
+        exc_pb2.override_calibration(_dc_offsets=np.array([0, 0]),
+                                     _if_offsets=np.array([0, 0]))
 
         z_pb = pbs['q_z_pbs'][0]
         ro_pb = pbs['ro_pbs'][0]
@@ -2184,8 +2205,8 @@ class IQPulseBuilder:
 
         exc_pb1 = pbs['q_pbs'][0][0]
         exc_pb2 = pbs["q_pbs"][0][1]
-        exc_pb2._iqmx_calibration._dc_offsets = np.array([0, 0])
-        exc_pb2._iqmx_calibration._if_offsets = np.array([0, 0])
+        exc_pb2.override_calibration(_dc_offsets=np.array([0, 0]),
+                                     _if_offsets=np.array([0, 0]))
 
         z_pb = pbs['q_z_pbs'][0]
         ro_pb = pbs['ro_pbs'][0]
@@ -2243,8 +2264,8 @@ class IQPulseBuilder:
 
         exc_pb1 = pbs['q_pbs'][0]
         exc_pb2 = pbs["q_pbs"][1]
-        exc_pb2._iqmx_calibration._dc_offsets = np.array([0, 0])
-        exc_pb2._iqmx_calibration._if_offsets = np.array([0, 0])
+        exc_pb2.override_calibration(_dc_offsets=np.array([0, 0]),
+                                     _if_offsets=np.array([0, 0]))
 
         z_pb = pbs['q_z_pbs'][0]
         ro_pb = pbs['ro_pbs'][0]
@@ -16,6 +16,11 @@ class PulseSequence:
     Represents concept of sequence of voltages.
     Appending sequences and elementwise summation is implemented.
     Used by `PulseBuilder` to generate complex pulse sequences.
+
+    The sequence is stored as an ordered list of segments that is rendered
+    into a single array only when the waveform is requested, so appending
+    a pulse costs no copy of the whole sequence. Overlapping segments are
+    summed, gaps between segments are filled with zeros.
     """
     def __init__(self, waveform_resolution, waveform=None):
         """
@@ -25,14 +30,68 @@ class PulseSequence:
         waveform_resolution : np.float
             Time interval between adjacent points. Points assumed to be
             equidistant.
+        waveform : Union[np.ndarray, List]
+            Initial voltages of the sequence.
         """
-        if waveform is None:
-            self._waveform = np.empty(0)
-        elif isinstance(waveform, (list, np.ndarray)):
-            self._waveform = np.array(waveform, dtype=np.float64)
+        # (start point, points) of every segment, the points arrays are
+        # never modified in place and may be shared between sequences
+        self._segments = []
+        self._length = 0
+        self._rendered = None
+        if isinstance(waveform, (list, np.ndarray)):
+            self.add_segment(waveform, 0)
         # dt between pts in ns
         self._waveform_resolution = waveform_resolution
 
+    @property
+    def _waveform(self):
+        return self.get_waveform()
+
+    def _copy(self):
+        result = PulseSequence(self._waveform_resolution)
+        result._segments = list(self._segments)
+        result._length = self._length
+        result._rendered = self._rendered
+        return result
+
+    def _get_segments(self, other):
+        """
+        Segments of `other` interpreted as a sequence with the same
+        waveform resolution.
+        """
+        if isinstance(other, (np.ndarray, list)):
+            return [(0, np.array(other, np.float64))]
+        elif isinstance(other, PulseSequence):
+            if self._waveform_resolution != other._waveform_resolution:
+                raise ValueError("`_waveform_resolution` parameters are not "
+                                 "equal for pulse sequences to append.")
+            # a copy, `other` may be the sequence that is extended
+            return list(other._segments)
+
+    def add_segment(self, points, start):
+        """
+        Places `points` on the sequence starting from point `start`.
+        Points overlapping with present segments are added to them;
+        the sequence is extended with zeros if `start` is beyond its end.
+
+        Parameters
+        ----------
+        points : Union[np.ndarray, List]
+            voltages of the segment
+        start : int
+            index of the first point of the segment in the sequence
+
+        Returns
+        -------
+        result : PulseSequence
+            modified `self`
+        """
+        points = np.array(points, np.float64)
+        self._segments.append((start, points))
+        self._length = max(self._length, start + len(points))
+        self._rendered = None
+        return self
+
     def append_pulse(self, other, inplace=False):
         """
         Parameters
@@ -51,32 +110,26 @@ class PulseSequence:
         result : PulseSequence
             Result of appending `other` at the end of `self`.
         """
-        if isinstance(other, (np.ndarray, list)):
-            points_arr = np.array(other, np.float64)
-
-        elif isinstance(other, PulseSequence):
-            if self._waveform_resolution != other._waveform_resolution:
-                raise ValueError("`_waveform_resolution` parameters are not "
-                                 "equal for pulse sequences to append.")
-            points_arr = other._waveform
-
-        result_wf = None
-        if len(points_arr) > 1:
-            # np.concatenate always creates copy
-            result_wf = np.concatenate(
-                        (self._waveform, points_arr)
-                    )
-        else:
-            result_wf = self._waveform
-
-        if inplace:
-            self._waveform = result_wf
-            return self
-        elif not inplace:
-            return PulseSequence(
-                self._waveform_resolution,
-                waveform=result_wf
-            )
+        segments = self._get_segments(other)
+        length = max((start + len(points) for start, points in segments),
+                     default=0)
+
+        result = self if inplace else self._copy()
+        if length > 1:
+            for start, points in segments:
+                result._segments.append((result._length + start, points))
+            result._length += length
+            result._rendered = None
+        return result
+
+    def _check_length(self, segments):
+        length = max((start + len(points) for start, points in segments),
+                     default=0)
+        if length != self._length:
+            print("Direct summation is not possible:")
+            print((self._length,), (length,))
+            raise ValueError("operands could not be added together with "
+                             "lengths %d %d" % (self._length, length))
 
     def __add__(self, other):
         """
@@ -93,29 +146,12 @@ class PulseSequence:
         -------
             Return new instance of `PulseSequence` class.
         """
-        wf_res = None
-        wf_other = None
-        if isinstance(other, (np.ndarray, list)):
-            wf_other = np.array(other, np.float64)
-        elif isinstance(other, PulseSequence):
-            if self._waveform_resolution != other._waveform_resolution:
-                self.plot()
-                other.plot()
-                raise("`_waveform_resolution` parameters are not equal")
-            else:
-                wf_other = other._waveform
-
-        try:
-            wf_res = self._waveform + wf_other
-        except Exception as e:
-            print("Direct summation is not possible:", e)
-            print(self._waveform.shape, other._waveform.shape)
-            raise e
-
-        return PulseSequence(
-            self._waveform_resolution,
-            waveform=wf_res
-        )
+        segments = self._get_segments(other)
+        self._check_length(segments)
+        result = self._copy()
+        result._segments += segments
+        result._rendered = None
+        return result
 
     def __iadd__(self, other):
         """
@@ -133,36 +169,40 @@ class PulseSequence:
         -------
             Return modified self
         """
-        wf_res = None
-        wf_other = None
-        if isinstance(other, (np.ndarray, list)):
-            wf_other = np.array(other, np.float64)
-        elif isinstance(other, PulseSequence):
-            if self._waveform_resolution != other._waveform_resolution:
-                self.plot()
-                other.plot()
-                raise ("`_waveform_resolution` parameters are not equal")
-            else:
-                wf_other = other._waveform
-
-        self._waveform += wf_other
+        segments = self._get_segments(other)
+        self._check_length(segments)
+        self._segments += segments
+        self._rendered = None
         return self
 
     def total_points(self):
-        return len(self._waveform)
+        return self._length
 
     def get_duration(self):
         return self._waveform_resolution * self.total_points()
 
     def get_waveform(self):
-        return self._waveform
+        """
+        Renders the segments into one preallocated array, the result is
+        cached until the sequence is modified.
+
+        Returns : np.ndarray
+        -------
+        """
+        if self._rendered is None:
+            waveform = np.zeros(self._length, dtype=np.float64)
+            for start, points in self._segments:
+                waveform[start:start + len(points)] += points
+            self._rendered = waveform
+        return self._rendered
 
     def get_waveform_resolution(self):
         return self._waveform_resolution
 
     def plot(self, **kwargs):
-        times = np.linspace(0, self.get_duration(), len(self._waveform))
-        plt.plot(times, self._waveform, **kwargs)
+        waveform = self.get_waveform()
+        times = np.linspace(0, self.get_duration(), len(waveform))
+        plt.plot(times, waveform, **kwargs)
 
 
 class PulseBuilder:
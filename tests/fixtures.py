@@ -0,0 +1,31 @@
+"""
+Objects shared by the tests.
+"""
+import numpy as np
+
+from drivers.simulated.lab_model import SimulatedLab
+from lib.iq_mixer_calibration import IQCalibrationData
+
+
+def make_calibration(lo_frequency, if_frequency=50e6, lo_power=10,
+                     waveform_resolution=1):
+    """
+    IQ mixer calibration with ideal parameters of the simulated mixer,
+    i.e. what the calibrator would have found for `SimulatedLab` defaults.
+    """
+    lab = SimulatedLab.get_default()
+    dc_offsets = -np.array([lab.mixer_dc_leakage.real,
+                            lab.mixer_dc_leakage.imag])
+    ssb_power = -20
+    return IQCalibrationData(
+        mixer_id="sim", iq_attenuation=0, lo_frequency=lo_frequency,
+        lo_power=lo_power, if_frequency=if_frequency,
+        sideband_to_maintain="right", ssb_power=ssb_power,
+        waveform_resolution=waveform_resolution, dc_offsets=dc_offsets,
+        dc_offsets_open=dc_offsets.copy(), if_offsets=dc_offsets.copy(),
+        if_amplitudes=np.array([0.5,
+                                0.5 / (1 + lab.mixer_amplitude_imbalance)]),
+        if_phase=np.array([np.pi / 2 - lab.mixer_phase_imbalance]),
+        spectral_values={"dc": -100, "dc_open": ssb_power,
+                         "if": [-80, ssb_power, -80]},
+        optimization_time=0, end_date=None, grade_warning=False)
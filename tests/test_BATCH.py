@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from lib2.IQPulseSequence import IQPulseBuilder
+from lib2.sequence_batch import BatchPulseBuilder, \
+    build_dispersive_decay_batch, build_dispersive_hahn_echo_batch, \
+    build_dispersive_rabi_batch, build_dispersive_ramsey_batch
+from tests.fixtures import make_calibration
+
+PARAMETERS = {"awg_trigger_reaction_delay": 0, "readout_duration": 500,
+              "repetition_period": 3000, "modulating_window": "gaussian",
+              "excitation_amplitude": 0.8, "half_pi_pulse_duration": 20,
+              "excitation_duration": 40, "pi_pulse_duration": 40}
+
+
+def _pbs(calibration):
+    return {"q_pbs": [IQPulseBuilder(calibration)],
+            "ro_pbs": [IQPulseBuilder(calibration)]}
+
+
+@pytest.mark.parametrize("build, build_batch, parameter, values", [
+    (IQPulseBuilder.build_dispersive_rabi_sequences,
+     build_dispersive_rabi_batch, "excitation_duration",
+     [1, 2, 10, 35, 120]),
+    (IQPulseBuilder.build_dispersive_rabi_sequences,
+     build_dispersive_rabi_batch, "excitation_amplitude", [0, 0.3, -1]),
+    (IQPulseBuilder.build_dispersive_ramsey_sequences,
+     build_dispersive_ramsey_batch, "ramsey_delay", [0, 7, 100, 333]),
+    (IQPulseBuilder.build_dispersive_hahn_echo_sequences,
+     build_dispersive_hahn_echo_batch, "echo_delay", [0, 50, 401]),
+    (IQPulseBuilder.build_dispersive_decay_sequences,
+     build_dispersive_decay_batch, "readout_delay", [0, 13, 250, 1200])])
+def test_batch_rows_match_builders(build, build_batch, parameter, values):
+    calibration = make_calibration(6e9)
+    batch = build_batch(dict(PARAMETERS, **{parameter: np.array(values)}),
+                        calibration, calibration)
+    waveforms_I, waveforms_Q = batch["q_seqs"][0].render()
+    readout = batch["ro_seqs"][0].get_sequence(0)
+    for row, value in enumerate(values):
+        expected = build(dict(PARAMETERS, **{parameter: value}),
+                         **_pbs(calibration))
+        assert np.allclose(waveforms_I[row],
+                           expected["q_seqs"][0].get_I_waveform(), atol=1e-9)
+        assert np.allclose(waveforms_Q[row],
+                           expected["q_seqs"][0].get_Q_waveform(), atol=1e-9)
+        assert np.allclose(readout.get_I_waveform(),
+                           expected["ro_seqs"][0].get_I_waveform(), atol=1e-9)
+
+
+def test_chunks_cover_the_bank():
+    calibration = make_calibration(6e9)
+    builder = BatchPulseBuilder(calibration)
+    durations = np.arange(0, 200, 3)
+    batch = builder.add_zero_pulse(100 - durations / 2) \
+        .add_sine_pulse(durations, phase=np.linspace(0, np.pi, len(durations)),
+                        window="gaussian") \
+        .add_zero_until(400).build()
+    waveforms_I, waveforms_Q = batch.render()
+    row_bytes = 8 * 6 * batch.n_samples
+    chunks = list(batch.iter_chunks(max_bytes=5 * row_bytes))
+    assert [rows.stop - rows.start for rows, _, _ in chunks] == \
+        [5] * 13 + [2]
+    for rows, chunk_I, chunk_Q in chunks:
+        assert chunk_I.flags.c_contiguous
+        assert np.array_equal(chunk_I, waveforms_I[rows])
+        assert np.array_equal(chunk_Q, waveforms_Q[rows])
+    with pytest.raises(ValueError):
+        BatchPulseBuilder(calibration).add_zero_pulse(durations).build()
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from benchmarks.cases import SingleToneSpectroscopyCase, CorrelatorCase, \
+    DigitizerRabiCase, PulseMixingCase
+from benchmarks.runner import BenchmarkRunner, compare_results
+
+
+def test_benchmark_runner_reports_metrics():
+    runner = BenchmarkRunner(n_frames=1, measure_io=False)
+    report = runner.run([SingleToneSpectroscopyCase()], sizes=[(3, 51)])
+    entry = report["cases"][0]
+
+    assert entry["status"] == "ok"
+    assert entry["n_points"] == 3 * 51
+    assert entry["n_iterations"] == 3
+    assert entry["points_per_second"] > 0
+    assert entry["latency"]["n"] == 3
+    assert entry["frame_time"]["n"] == 1
+    json.loads(json.dumps(report))
+
+
+@pytest.mark.parametrize("case, size", [
+    (DigitizerRabiCase(), (3, 100)), (PulseMixingCase(), (3, 8)),
+    (CorrelatorCase(), (2, 8))])
+def test_time_domain_cases_report_metrics(case, size):
+    entry = BenchmarkRunner(n_frames=1, measure_io=False).run_case(case, size)
+
+    assert entry["status"] == "ok", entry.get("reason")
+    # the correlator times both traces of every iteration
+    assert entry["n_iterations"] >= size[0]
+    assert entry["n_points"] > 0
+    assert entry["points_per_second"] > 0
+    assert entry["latency"]["n"] == entry["n_iterations"]
+
+
+def test_compare_results():
+    baseline = {"cases": [{"name": "A", "size": [1, 2],
+                           "points_per_second": 1000.,
+                           "latency": {"p50": 1e-3, "p99": 2e-3}}]}
+    current = {"cases": [{"name": "A", "size": [1, 2],
+                          "points_per_second": 500.,
+                          "latency": {"p50": 1.05e-3, "p99": 2e-3}}]}
+    regressions = compare_results(baseline, current, tolerance=0.1)
+    assert [r["metric"] for r in regressions] == ["points_per_second"]
+    assert regressions[0]["change"] == -0.5
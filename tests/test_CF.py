@@ -0,0 +1,30 @@
+import numpy as np
+
+from lib2.fourier import ChirpZPlan, DirectPlan, GridPlan, custom_fourier, \
+    get_plan
+
+
+def _dense_fourier(data, dt, freqs):
+    time = np.arange(data.shape[-1]) * dt
+    return np.tensordot(data, np.exp(-2j * np.pi * np.outer(freqs, time)),
+                        axes=([-1], [-1]))
+
+
+def test_custom_fourier_matches_dense_transform():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(3, 4, 500)) + 1j * rng.normal(size=(3, 4, 500))
+    dt = 0.8e-9
+    for freqs, plan_type in [(np.linspace(-90e6, 90e6, 181), ChirpZPlan),
+                             (np.array([-2, 0, 1, 3]) * 10e6, GridPlan),
+                             (rng.uniform(-1e8, 1e8, 7), DirectPlan)]:
+        assert isinstance(get_plan(500, dt, freqs), plan_type)
+        result = custom_fourier(data, dt, freqs)
+        assert result.shape == (3, 4, len(freqs))
+        assert np.allclose(result, _dense_fourier(data, dt, freqs),
+                           atol=1e-8)
+
+    freqs = np.linspace(0, 1e8, 11)
+    assert get_plan(500, dt, freqs) is get_plan(500, dt, freqs.copy())
+    # the exponents of the direct plans are not kept by the cache
+    freqs = rng.uniform(-1e8, 1e8, 7)
+    assert get_plan(500, dt, freqs) is not get_plan(500, dt, freqs)
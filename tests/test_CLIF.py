@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from lib2.clifford import CliffordGroup
+from lib2.InterleavedBenchmarkingSequenceGenerator import \
+    InterleavedBenchmarkingSequenceGenerator
+
+
+def _is_identity(unitary):
+    return np.isclose(abs(np.trace(unitary)), len(unitary))
+
+
+@pytest.fixture(scope="module")
+def group():
+    return CliffordGroup()
+
+
+def test_tables_match_matrices(group):
+    assert len(group) == 24
+    unitaries = [group.get_unitary(group.get_decomposition(element))
+                 for element in range(len(group))]
+    for first in range(len(group)):
+        assert _is_identity(unitaries[group.inverse[first]] @
+                            unitaries[first])
+        for second in range(len(group)):
+            assert group.index_of(group.get_decomposition(first) +
+                                  group.get_decomposition(second)) == \
+                group.compose(first, second)
+
+
+def test_recovered_sequences_are_identity(group):
+    cliffords = group.random_cliffords(20, 15, rng=0)
+    x2 = group.index_of(["+X/2"])
+    for sequences in (cliffords, group.interleave(cliffords, x2)):
+        recovered = group.with_recovery(sequences)
+        assert recovered.shape == (20, sequences.shape[1] + 1)
+        for sequence in recovered:
+            assert _is_identity(group.get_unitary(group.to_pulses(sequence)))
+
+
+def test_two_qubit_group():
+    group = CliffordGroup(2)
+    assert len(group) == 11520
+    assert group.products is None
+    for sequence in group.with_recovery(group.random_cliffords(5, 10, 1)):
+        assert _is_identity(group.get_unitary(group.to_pulses(sequence)))
+
+
+def test_interleaved_generator_with_cliffords(group):
+    generator = InterleavedBenchmarkingSequenceGenerator(
+        3, 8, "X/2", clifford_group=group)
+    generator.generate_full_sequences()
+    reference, interleaved = generator.generate_partial_sequences(5)
+    assert len(reference) == len(interleaved) == 3
+    for pulses in reference + interleaved:
+        assert _is_identity(group.get_unitary(pulses))
@@ -0,0 +1,61 @@
+import numpy as np
+
+from lib2.correlators import accumulate_gram, StreamingCorrelator, \
+    transform_moments
+
+
+def test_gram_accumulation_matches_outer_products():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(37, 16)) + 1j * rng.normal(size=(37, 16))
+    data_bg = rng.normal(size=(37, 16)) + 1j * rng.normal(size=(37, 16))
+    expected = sum(np.kron(np.conj(x), x).reshape(16, 16) for x in data) - \
+        sum(np.kron(np.conj(x), x).reshape(16, 16) for x in data_bg)
+
+    out = accumulate_gram(data, chunk_size=5)
+    accumulate_gram(data_bg, out, sign=-1, chunk_size=8)
+    assert out.dtype == np.complex128
+    assert np.allclose(out, expected)
+
+    out = accumulate_gram(data, chunk_size=10, dtype=np.complex64)
+    accumulate_gram(data_bg, out, sign=-1, dtype=np.complex64)
+    assert np.allclose(out, expected, atol=1e-3)
+
+
+def test_streaming_g2_with_noise_subtraction():
+    rng = np.random.default_rng(1)
+
+    def gaussian(shape, sigma):
+        return sigma * (rng.normal(size=shape) +
+                        1j * rng.normal(size=shape)) / np.sqrt(2)
+
+    n_segments, trace_len = 100000, 4
+    coherent = StreamingCorrelator(trace_len, chunk_size=8192, n_workers=2)
+    thermal = StreamingCorrelator(trace_len, chunk_size=8192)
+    for i in range(4):
+        coherent.update(np.full((n_segments, trace_len), 1 + 1j) +
+                        gaussian((n_segments, trace_len), 2),
+                        gaussian((n_segments, trace_len), 2))
+        thermal.update(gaussian((n_segments, 1), 1.4) *
+                       np.ones(trace_len) +
+                       gaussian((n_segments, trace_len), 2),
+                       gaussian((n_segments, trace_len), 2))
+
+    assert coherent.signal.n_segments == 4 * n_segments
+    assert np.allclose(np.diag(coherent.get_g1()), 2, rtol=0.05)
+    assert np.allclose(coherent.get_g2_tau()[1], 1, atol=0.05)
+    assert np.allclose(thermal.get_g2_tau()[1], 2, atol=0.1)
+    assert np.allclose(thermal.get_normalized_g2(), 2, atol=0.15)
+
+
+def test_moments_of_affine_transformed_traces():
+    rng = np.random.default_rng(2)
+    samples = rng.normal(size=(500, 12)) + 0.3
+    weights = rng.normal(size=(12, 5)) + 1j * rng.normal(size=(12, 5))
+    constant = rng.normal(size=5) + 1j * rng.normal(size=5)
+    traces = samples @ weights + constant
+
+    mean, g1 = transform_moments(samples.mean(axis=0),
+                                 samples.T @ samples / len(samples),
+                                 weights, constant)
+    assert np.allclose(mean, traces.mean(axis=0))
+    assert np.allclose(g1, traces.conj().T @ traces / len(traces))
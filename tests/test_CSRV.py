@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.sim_Spectrum_m4x import SimulatedSPCM
+from lib2 import dsp
+from lib2.correlation_service import CorrelationEngine, combine_moments
+
+PARAMS = {"channels": [0, 1], "ch_amplitude": 200, "dur_seg": 200,
+          "n_seg": 40, "oversampling_factor": 4, "pretrigger": 32}
+
+
+def _reference_buffer():
+    dig = SimulatedSPCM(lab=SimulatedLab(seed=0))
+    dig.set_parameters(dict(PARAMS, mode="MULTIPLE", trig_source="EXT0"))
+    data = dig.measure().reshape(PARAMS["n_seg"], -1)
+    return data
+
+
+def test_engine_moments_match_buffer():
+    backend = dsp.get_backend("cpu", n_threads=2, chunk_size=16)
+    engine = CorrelationEngine(SimulatedSPCM(lab=SimulatedLab(seed=0)),
+                               backend=backend)
+    n, mean, second = engine.read(PARAMS)
+
+    data = _reference_buffer()
+    assert n == PARAMS["n_seg"]
+    assert np.allclose(mean, data.mean(axis=0), atol=1e-4)
+    assert np.allclose(second, data.T @ data / n, rtol=1e-5, atol=1e-4)
+
+    first = (1, np.zeros(2), np.zeros((2, 2)))
+    combined = combine_moments(first, (3, np.ones(2), np.eye(2)))
+    assert combined[0] == 4 and np.allclose(combined[1], 0.75)
+
+
+def test_engine_continuous_acquisition():
+    engine = CorrelationEngine(SimulatedSPCM(lab=SimulatedLab(seed=0)))
+    engine.configure(PARAMS)
+    engine.start()
+    try:
+        for _ in range(3):
+            n, mean, second = engine.read(PARAMS, timeout=10)
+            assert n % PARAMS["n_seg"] == 0 and n > 0
+            assert second.shape == (len(mean), len(mean))
+    finally:
+        engine.stop()
+
+
+def test_grpc_roundtrip_on_localhost():
+    pytest.importorskip("grpc")
+    from lib2.correlation_service import create_server, \
+        CorrelationServiceClient
+    engine = CorrelationEngine(SimulatedSPCM(lab=SimulatedLab(seed=0)))
+    server, port = create_server(engine, port=0)
+    server.start()
+    client = CorrelationServiceClient("localhost:%d" % port, timeout=30)
+    try:
+        n, mean, second = client.measure(PARAMS)
+        assert n == PARAMS["n_seg"]
+        data = _reference_buffer()
+        assert np.allclose(mean, data.mean(axis=0), atol=1e-3)
+        updates = list(client.stream(PARAMS, n_updates=2))
+        assert updates[-1][0] == 2 * PARAMS["n_seg"]
+    finally:
+        client.close()
+        server.stop(None)
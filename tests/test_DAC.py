@@ -0,0 +1,60 @@
+import numpy as np
+
+from benchmarks.cases import make_iqawg
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.sim_keysightM3202A import SimulatedM3202A
+from lib2.IQPulseSequence import IQPulseBuilder
+from lib2.dac import get_polyphase_kernel, quantize, resample_periodic, \
+    to_volts
+from tests.fixtures import make_calibration
+
+
+def _sequence(calibration):
+    return IQPulseBuilder(calibration).add_zero_pulse(300) \
+        .add_sine_pulse(50, window="gaussian").add_zero_pulse(20) \
+        .add_dc_pulse(30).add_zero_until(1000).build()
+
+
+def test_dac_waveforms_match_quantized_render():
+    codes = quantize(np.array([0.5, -2, 0.25]), 1., np.int16, max_code=8191)
+    assert codes.dtype == np.int16
+    assert codes.tolist() == [4096, -8191, 2048]
+    assert np.allclose(to_volts(codes, 1., 8191), [0.5, -1, 0.25],
+                       atol=1 / 8191)
+
+    sequence = _sequence(make_calibration(6e9)).get_IQ_sequences()[0]
+    peak = sequence.get_peak()
+    codes = sequence.get_dac_waveform(dtype=np.int16)
+    normalized = sequence.get_dac_waveform(dtype=np.float32)
+    # the constant segments are not rendered to floats
+    assert sequence._rendered is None
+    waveform = sequence.get_waveform()
+    assert peak == np.max(np.abs(waveform))
+    assert np.array_equal(codes, quantize(waveform, peak, np.int16))
+    assert normalized.dtype == np.float32
+    assert np.allclose(normalized, waveform / peak, atol=1e-6)
+
+
+def test_periodic_resampling():
+    t = np.arange(400) / 400
+    for n_points in (500, 320, 401):
+        resampled = resample_periodic(np.sin(2 * np.pi * 5 * t), n_points)
+        expected = np.sin(2 * np.pi * 5 * np.arange(n_points) / n_points)
+        assert np.max(np.abs(resampled - expected)) < 1e-4
+    assert get_polyphase_kernel(5, 4) is get_polyphase_kernel(5, 4)
+
+
+def test_iqawg_uploads_dac_codes():
+    calibration = make_calibration(6e9)
+    sequence = _sequence(calibration)
+    waveforms = []
+    for dac_dtype in (None, np.int16, np.float32):
+        awg = SimulatedM3202A("awg", lab=SimulatedLab())
+        iqawg = make_iqawg(awg)
+        iqawg.set_parameters({"dac_dtype": dac_dtype})
+        iqawg.output_pulse_sequence(sequence)
+        waveforms.append(awg.waveforms[:2])
+    for channel in range(2):
+        for loaded in waveforms[1:]:
+            assert np.allclose(loaded[channel], waveforms[0][channel],
+                               atol=1e-3)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from lib2.directMeasurements.demodulation import Demodulator
+
+
+class _DownconversionCalibration:
+    """
+    Same affine correction as IQDownconversionCalibrationResult, which
+    can not be imported without the digitizer library
+    """
+    offsets = [0.3, -0.2]
+    phase = 0.1
+    r = 1.1
+    cryostat_delay = 2.
+    shift = 0.5
+
+    def apply(self, trace):
+        return np.exp(-1j * self.cryostat_delay * self.shift) * \
+            ((1 + 1j * np.tan(self.phase)) * (np.real(trace) - self.offsets[0])
+             + 1j / self.r / np.cos(self.phase) *
+             (np.imag(trace) - self.offsets[1]))
+
+
+def test_demodulation_matches_dot_product():
+    rng = np.random.default_rng(0)
+    n_seg, segment_size, sample_rate, if_freq = 4, 100, 1.25e9, 50e6
+    raw = rng.integers(-128, 127, size=2 * n_seg * segment_size,
+                       dtype=np.int16)
+    mv_per_code = 200 / 128
+
+    for calibration in (None, _DownconversionCalibration()):
+        demodulator = Demodulator()
+        demodulator.configure(n_seg, segment_size, 8, 4, sample_rate,
+                              if_freq, mv_per_code, calibration)
+
+        # reference: the trace is built first, then one dot product
+        segments = raw.reshape(n_seg, -1)[:, 16:-8] * mv_per_code
+        data = segments[:, 0::2].ravel() + 1j * segments[:, 1::2].ravel()
+        if calibration is not None:
+            data = calibration.apply(data)
+        time = np.arange(len(data)) / sample_rate
+        expected = np.dot(data, np.exp(-2j * np.pi * if_freq * time)) / \
+            len(data)
+
+        assert np.isclose(demodulator.demodulate(raw), expected)
+        points = demodulator.demodulate(raw, per_segment=True)
+        assert points.shape == (n_seg,)
+        assert np.isclose(np.mean(points), expected)
+        assert np.allclose(demodulator.get_trace(raw)[1], data)
@@ -0,0 +1,57 @@
+import numpy as np
+from scipy import ndimage
+
+from lib2 import dsp
+
+
+def _segments(n_seg=300, segment_size=64):
+    rng = np.random.default_rng(0)
+    buffer = rng.integers(-128, 128, size=2 * n_seg * segment_size,
+                          dtype=np.int8)
+    return buffer, n_seg, segment_size
+
+
+def test_cpu_pipeline_matches_reference():
+    buffer, n_seg, segment_size = _segments()
+    backend = dsp.get_backend("cpu", n_threads=4, chunk_size=64)
+    i_segs, q_segs = dsp.unpack_segments(buffer, n_seg, segment_size, 200,
+                                         backend)
+    raw = buffer.reshape(n_seg, segment_size, 2) * 200 / 128
+    assert np.allclose(i_segs, raw[:, :, 0])
+
+    downconversion = np.exp(-2j * np.pi * 0.1 * np.arange(segment_size))
+    i_out, q_out = dsp.downconvert(i_segs, q_segs, downconversion, backend)
+    traces = (i_segs + 1j * q_segs) * downconversion
+    assert np.allclose(i_out, traces.real, atol=1e-4)
+    assert np.allclose(q_out, traces.imag, atol=1e-4)
+
+    kernel = np.hanning(9) / np.sum(np.hanning(9))
+    filtered = ndimage.convolve1d(i_out, kernel, axis=-1, mode="wrap")
+    dsp.filter(i_out, kernel, backend)
+    assert np.allclose(i_out, filtered, atol=1e-4)
+
+    average_i, average_q = np.mean(i_out, axis=0), np.mean(q_out, axis=0)
+    p2 = dsp.calculate_p2(i_out, q_out, average_i, average_q,
+                          backend=backend)
+    assert np.allclose(p2, 20 * np.sum((i_out - average_i) ** 2 +
+                                       (q_out - average_q) ** 2, axis=0),
+                       rtol=1e-4)
+
+
+def test_power_accumulator():
+    buffer, n_seg, segment_size = _segments()
+    backend = dsp.get_backend("cpu", n_threads=3, chunk_size=50)
+    i_segs, q_segs = dsp.unpack_segments(buffer, n_seg, segment_size, 200,
+                                         backend)
+    accumulator = dsp.PowerAccumulator(segment_size, spectrum=True,
+                                       backend=backend)
+    accumulator.add(i_segs[:100], q_segs[:100])
+    accumulator.add(i_segs[100:], q_segs[100:])
+
+    assert np.allclose(accumulator.get_p1(),
+                       np.mean(i_segs ** 2 + q_segs ** 2, axis=0) / 5e7,
+                       rtol=1e-4)
+    spectrum = np.fft.fftshift(
+        np.mean(np.abs(np.fft.fft(i_segs, axis=1)) ** 2 +
+                np.abs(np.fft.fft(q_segs, axis=1)) ** 2, axis=0)) / 50
+    assert np.allclose(accumulator.get_spectrum(), spectrum, rtol=1e-5)
@@ -0,0 +1,30 @@
+import numpy as np
+from scipy import signal
+
+from lib2.fir import FIRFilter
+
+
+def test_overlap_save_matches_fftconvolve():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(5, 1000)) + 1j * rng.normal(size=(5, 1000))
+    taps = signal.firwin(63, 0.1)
+    expected = signal.fftconvolve(data, taps[np.newaxis, :], mode="same",
+                                  axes=-1)
+    for block_size in (None, 64, 256, 4096):
+        fir = FIRFilter(taps, block_size=block_size)
+        assert np.allclose(fir.apply(data), expected)
+        assert np.allclose(fir.apply(data.real), expected.real)
+
+
+def test_fused_downconversion_and_decimation():
+    rng = np.random.default_rng(1)
+    sample_rate, if_frequency = 1.25e9, 50e6
+    data = rng.normal(size=(4, 500))
+    time = np.arange(500) / sample_rate
+    fir = FIRFilter.design(101, 20e6, sample_rate, if_frequency=if_frequency,
+                           decimation=4)
+    expected = signal.fftconvolve(
+        data * np.exp(-2j * np.pi * if_frequency * time),
+        fir.taps[np.newaxis, :], mode="same", axes=-1)[:, ::4]
+    assert np.allclose(fir.apply(data), expected)
+    assert np.allclose(fir.get_time(500), time[::4] * 1e9)
@@ -0,0 +1,57 @@
+import numpy as np
+
+from lib2.gate_library import GateLibrary
+from lib2.IQPulseSequence import IQPulseBuilder
+from tests.fixtures import make_calibration
+
+GATES = ["+X/2", "-Y", "+I", "+X/2", "-X/2", "+Y/2", "+X"]
+
+
+def _reference(calibration, gates, window, duration, amplitude, padding,
+               hd_amplitude=0):
+    builder = IQPulseBuilder(calibration).add_zero_pulse(13)
+    for gate in gates:
+        builder.add_sine_pulse_from_string(gate, duration, amplitude, window)
+        builder.add_zero_pulse(padding)
+    return builder.build()
+
+
+def _assembled(library, gates):
+    return IQPulseBuilder(library.calibration).add_zero_pulse(13) \
+        .add_gates(gates, library).build()
+
+
+def test_library_matches_pulse_builder():
+    calibration = make_calibration(6e9)
+    for window in ("gaussian", "rectangular", "hahn"):
+        library = GateLibrary(calibration, 20, 0.7, window, padding=5)
+        expected = _reference(calibration, GATES, window, 20, 0.7, 5)
+        assembled = _assembled(library, GATES)
+        assert np.allclose(assembled.get_I_waveform(),
+                           expected.get_I_waveform(), atol=1e-12)
+        assert np.allclose(assembled.get_Q_waveform(),
+                           expected.get_Q_waveform(), atol=1e-12)
+
+
+def test_virtual_z_rotates_following_pulses():
+    library = GateLibrary(make_calibration(6e9), 20, 0.7, padding=5)
+    for first, second in ((["+Z/2", "+X/2"], ["-Y/2"]),
+                          (["+Z", "+Y", "-Z", "+X"], ["-Y", "+X"])):
+        for rendered, expected in zip(library.render(first),
+                                      library.render(second)):
+            assert np.allclose(rendered, expected, atol=1e-12)
+
+
+def test_library_follows_calibration_changes():
+    calibration = make_calibration(6e9)
+    library = GateLibrary(calibration, 20, 0.7, padding=5)
+    library.render(GATES)
+
+    library.calibration = calibration.replace(
+        if_amplitudes=np.asarray(
+            calibration.get_optimization_results()[0]["if_amplitudes"]) / 2)
+    library.pulse_duration = 30
+    expected = _reference(library.calibration, GATES, "gaussian", 30, 0.7, 5)
+    assembled = _assembled(library, GATES)
+    assert np.allclose(assembled.get_I_waveform(), expected.get_I_waveform(),
+                       atol=1e-12)
@@ -0,0 +1,89 @@
+import numpy as np
+
+from lib.iq_calibration_store import IQCalibrationStore, append_calibration
+from tests.fixtures import make_calibration
+
+
+def _calibration(lo_frequency, dc_offset, phase=np.pi / 2):
+    cal = make_calibration(lo_frequency)
+    cal._dc_offsets = np.array([dc_offset, -dc_offset])
+    cal._if_phase = np.array([phase])
+    return cal
+
+
+def _find(store, lo_frequency, **kwargs):
+    return store.find(lo_frequency, 50e6, 10, -20, "right", **kwargs)
+
+
+def test_store_lookup_and_interpolation(tmp_path):
+    store = IQCalibrationStore("sim", str(tmp_path))
+    for lo_frequency, dc_offset in [(5.02e9, 0.3), (5e9, 0.1), (5.01e9, 0.2)]:
+        store.add(_calibration(lo_frequency, dc_offset))
+
+    assert _find(store, 5.01e9)._dc_offsets[0] == 0.2
+    assert _find(store, 5.005e9) is None
+
+    cal = _find(store, 5.005e9, max_interpolation_span=10e6)
+    assert cal.get_lo_frequency() == 5.005e9
+    assert np.allclose(cal._dc_offsets, [0.15, -0.15])
+
+    cal = _find(store, 5.004e9, max_nearest_distance=5e6)
+    assert cal.get_lo_frequency() == 5e9
+    assert _find(store, 5.03e9, max_interpolation_span=10e6,
+                 max_nearest_distance=5e6) is None
+
+    cal = store.find(5e9, 50e6, 10, -26, "right", rescale_ssb_power=True)
+    assert cal.get_ssb_power() == -26
+    assert np.allclose(cal._if_amplitudes,
+                       make_calibration(5e9)._if_amplitudes / 2, rtol=1e-2)
+
+
+def test_store_phase_interpolation_wraps(tmp_path):
+    store = IQCalibrationStore("sim", str(tmp_path))
+    store.add(_calibration(5e9, 0.1, phase=np.pi - 0.1))
+    store.add(_calibration(5.01e9, 0.1, phase=-np.pi + 0.1))
+    cal = _find(store, 5.005e9, max_interpolation_span=10e6)
+    assert np.isclose(np.cos(cal._if_phase[0]), -1)
+
+
+def test_store_survives_reload_and_truncation(tmp_path):
+    store = IQCalibrationStore("sim", str(tmp_path))
+    store.add(_calibration(5e9, 0.1))
+    store.add(_calibration(5.01e9, 0.2))
+    store.add(_calibration(5e9, 0.4))  # supersedes the first record
+
+    reloaded = IQCalibrationStore("sim", str(tmp_path))
+    assert len(reloaded) == 2
+    assert _find(reloaded, 5e9)._dc_offsets[0] == 0.4
+    assert len(reloaded.as_legacy_database(0)) == 2
+
+    reloaded.compact()
+    assert len(IQCalibrationStore("sim", str(tmp_path))) == 2
+
+    with open(store.get_path(), "ab") as f:
+        f.write(b"\x10\x00\x00\x00\x00\x00\x00\x00partial")
+    assert len(IQCalibrationStore("sim", str(tmp_path))) == 2
+
+    # the incomplete record is cut off before the next one is appended
+    append_calibration(_calibration(5.02e9, 0.5), str(tmp_path))
+    with open(store.get_path(), "ab") as f:
+        f.write(b"\x10\x00")
+    IQCalibrationStore("sim", str(tmp_path)).add(_calibration(5.03e9, 0.6))
+    reloaded = IQCalibrationStore("sim", str(tmp_path))
+    assert len(reloaded) == 4
+    assert _find(reloaded, 5.03e9)._dc_offsets[0] == 0.6
+
+
+def test_append_without_loading_and_rounded_keys(tmp_path):
+    append_calibration(_calibration(5e9, 0.1), str(tmp_path))
+    append_calibration(_calibration(5e9 + 1e-7, 0.2), str(tmp_path))
+    store = IQCalibrationStore("sim", str(tmp_path))
+    assert len(store) == 1
+    assert _find(store, 5e9)._dc_offsets[0] == 0.2
+    assert store.find(5e9, 50e6 + 1e-9, 10 + 1e-12, -20, "right") \
+        is not None
+
+    append_calibration(_calibration(5.01e9, 0.3), str(tmp_path))
+    store = IQCalibrationStore("sim", str(tmp_path))
+    cal = _find(store, 5.005e9, max_interpolation_span=10e6)
+    assert type(cal) is type(_calibration(5e9, 0.1))
@@ -0,0 +1,75 @@
+import numpy as np
+
+from lib2.directMeasurements.demodulation import Demodulator, \
+    MultiplexedDemodulator
+from lib2.IQPulseSequence import IQPulseBuilder
+from lib2.multiplexed_readout import MultiplexedReadout
+from tests.fixtures import make_calibration
+from tests.test_DEMOD import _DownconversionCalibration
+
+IF_FREQUENCIES = (30e6, -45e6, 110e6)
+
+
+def test_composite_waveform_is_sum_of_tones():
+    calibrations = [make_calibration(7e9, if_frequency=frequency)
+                    for frequency in IF_FREQUENCIES]
+    amplitudes, phases = [1, 0.5, 0.8], [0, 1., -2.]
+    readout = MultiplexedReadout(calibrations, amplitudes=amplitudes,
+                                 phases=phases, names=["a", "b", "c"])
+    sequence = IQPulseBuilder(calibrations[0]).add_zero_pulse(37) \
+        .add_multiplexed_pulse(300, readout).build()
+
+    offsets = calibrations[0].get_optimization_results()[0]["if_offsets"]
+    expected_I, expected_Q = np.zeros(337), np.zeros(337)
+    for calibration, amplitude, phase in zip(calibrations, amplitudes,
+                                             phases):
+        tone = IQPulseBuilder(calibration).add_zero_pulse(37, (0, 0)) \
+            .add_sine_pulse(300, phase, amplitude, if_offsets=(0, 0)).build()
+        expected_I += tone.get_I_waveform()
+        expected_Q += tone.get_Q_waveform()
+    expected_I[37:] += offsets[0]
+    expected_Q[37:] += offsets[1]
+    assert np.allclose(sequence.get_I_waveform()[37:], expected_I[37:])
+    assert np.allclose(sequence.get_Q_waveform()[37:], expected_Q[37:])
+
+
+def test_multiplexed_demodulation_matches_single_tones():
+    rng = np.random.default_rng(1)
+    n_seg, segment_size, sample_rate = 3, 120, 1.25e9
+    raw = rng.integers(-128, 127, size=2 * n_seg * segment_size,
+                       dtype=np.int16)
+    mv_per_code = 200 / 128
+    calibrations = [None, _DownconversionCalibration(), None]
+
+    multiplexed = MultiplexedDemodulator()
+    multiplexed.configure(n_seg, segment_size, 8, 4, sample_rate,
+                          IF_FREQUENCIES, mv_per_code, calibrations)
+    points = multiplexed.demodulate(raw)
+    per_segment = multiplexed.demodulate(raw, per_segment=True)
+    assert points.shape == (3,) and per_segment.shape == (3, n_seg)
+    for tone, (frequency, calibration) in \
+            enumerate(zip(IF_FREQUENCIES, calibrations)):
+        single = Demodulator()
+        single.configure(n_seg, segment_size, 8, 4, sample_rate, frequency,
+                         mv_per_code, calibration)
+        assert np.isclose(points[tone], single.demodulate(raw))
+        assert np.allclose(per_segment[tone],
+                           single.demodulate(raw, per_segment=True))
+
+
+def test_readout_returns_iq_per_qubit():
+    calibrations = [make_calibration(7e9, if_frequency=frequency)
+                    for frequency in IF_FREQUENCIES]
+    readout = MultiplexedReadout(calibrations, names=["q1", "q2", "q3"],
+                                 amplitudes=[1, 2, 3])
+    # the digitizer sees the composite pulse directly, 1 GS/s
+    waveform_I, waveform_Q = readout.get_waveforms(400)
+    offsets = calibrations[0].get_optimization_results()[0]["if_offsets"]
+    raw = np.empty(2 * 400)
+    raw[0::2] = waveform_I - offsets[0]
+    raw[1::2] = waveform_Q - offsets[1]
+    readout.configure_demodulation(1, 400, 0, 0, 1e9)
+    result = readout.demodulate(raw)
+    assert list(result) == ["q1", "q2", "q3"]
+    magnitudes = np.array([abs(result[name]) for name in result])
+    assert np.allclose(magnitudes / magnitudes[0], [1, 2, 3], rtol=1e-2)
@@ -0,0 +1,152 @@
+import json
+
+import numpy as np
+import pytest
+
+from lib2.IQPulseSequence import IQPulseBuilder, IQPulseSequence, \
+    PulseRecord, PulseSequence, get_unit_carrier, get_unit_envelope
+from tests.fixtures import make_calibration
+
+
+def _sequence(*pulses):
+    sequence = PulseSequence(1)
+    for pulse in pulses:
+        sequence.append_pulse(pulse)
+    return sequence
+
+
+def test_render_matches_concatenation():
+    rng = np.random.default_rng(0)
+    pulses = [rng.normal(size=n) for n in (5, 1, 0, 7, 3)]
+    sequence = _sequence(*pulses)
+    expected = np.concatenate([p for p in pulses if len(p) > 1])
+    assert sequence.total_points() == len(expected)
+    assert np.array_equal(sequence.get_waveform(), expected)
+
+    sequence.append_pulse(np.ones(4))
+    assert np.array_equal(sequence.get_waveform(),
+                          np.concatenate((expected, np.ones(4))))
+
+
+def test_overlapping_and_padded_segments():
+    sequence = _sequence(np.ones(4))
+    sequence.add_segment(np.full(3, 2.), 2)
+    sequence.add_segment(np.full(2, 3.), 8)
+    assert np.array_equal(sequence.get_waveform(),
+                          [1, 1, 3, 3, 2, 0, 0, 0, 3, 3])
+
+
+def test_add_and_direct_add():
+    first, second = _sequence(np.arange(3.), np.arange(2.)), \
+        _sequence(np.full(4, 5.))
+    joined = first + second
+    assert np.array_equal(joined.get_waveform(), [0, 1, 2, 0, 5, 5, 5, 5])
+    # the operands are not modified
+    assert np.array_equal(first.get_waveform(), [0, 1, 2, 0, 1])
+
+    summed = _sequence(np.ones(5)).direct_add(first)
+    assert np.array_equal(summed.get_waveform(), [1, 2, 3, 1, 2])
+    with pytest.raises(ValueError):
+        first.direct_add(second)
+
+
+def test_unit_envelopes_are_cached():
+    window, derivative = get_unit_envelope("gaussian", 40, 0.8)
+    assert get_unit_envelope("gaussian", 40, 0.8)[0] is window
+    assert not window.flags.writeable
+    assert np.allclose(derivative[1:-1],
+                       np.gradient(window, 0.8)[1:-1])
+    assert derivative[0] == derivative[-1] == 0
+    assert np.allclose(get_unit_envelope("decaying_exponent", 4, 1, -1.)[0],
+                       np.exp(-np.arange(4) / 4))
+
+    carrier = get_unit_carrier(0.3, 40, 0.8)
+    assert np.allclose(np.exp(0.5j) * carrier,
+                       np.exp(1j * (0.3 * np.arange(40) * 0.8 + 0.5)))
+
+
+def _built(delay, phase=0.):
+    return IQPulseBuilder(make_calibration(6e9)).add_zero_pulse(delay) \
+        .add_sine_pulse(30, phase, window="gaussian", hd_amplitude=1) \
+        .add_zero_pulse(10).add_sine_pulse(20, window="tukey") \
+        .add_zero_until(500).build()
+
+
+def test_sequences_are_records_sampled_on_demand():
+    sequence = _built(100)
+    sequence_I = sequence.get_IQ_sequences()[0]
+    records = [points for _, points in sequence_I.get_records()]
+    assert [record.shape for record in records] == \
+        ["constant", "gaussian", "constant", "tukey", "constant"]
+    assert all(record._samples is None for record in records)
+
+    assert sequence == _built(100) and hash(sequence) == hash(_built(100))
+    assert sequence != _built(101) and sequence != _built(100, 0.1)
+    assert sequence_I.get_revision() == \
+        _built(100).get_IQ_sequences()[0].get_revision()
+
+    restored = IQPulseSequence.from_json(
+        json.loads(json.dumps(sequence.toJSON())))
+    assert restored == sequence
+    assert np.array_equal(restored.get_I_waveform(), sequence.get_I_waveform())
+    assert np.array_equal(restored.get_Q_waveform(), sequence.get_Q_waveform())
+
+
+def test_arrays_are_described_by_digests():
+    samples = np.arange(1000.)
+    sequence = _sequence(samples)
+    segment = sequence.toJSON()["segments"][0]
+    assert "samples" not in segment and segment["n_points"] == 1000
+    assert sequence == _sequence(samples.copy())
+    assert sequence != _sequence(samples + 1)
+    assert sequence.get_revision() == _sequence(samples).get_revision()
+
+    with pytest.raises(ValueError):
+        PulseSequence.from_json(sequence.toJSON())
+    restored = PulseSequence.from_json(
+        json.loads(json.dumps(sequence.toJSON(with_samples=True))))
+    assert restored == sequence
+
+
+def test_context_keeps_distinct_sequences():
+    from lib2.VNATimeResolvedDispersiveMeasurement import \
+        VNATimeResolvedDispersiveMeasurementContext
+    context = VNATimeResolvedDispersiveMeasurementContext()
+    for duration in (100, 101, 100, 101, 100):
+        context.add_pulse_sequences({"q_iqawg": [_built(duration)]})
+    assert len(context.get_pulse_sequences()) == 2
+
+
+def test_shift_and_merge():
+    pulse = PulseRecord("hahn", 10, 1, amplitude=2, frequency=1e8)
+    sequence = PulseSequence(1)
+    sequence.append_pulse(pulse)
+    shifted = sequence.shift(5)
+    assert shifted.total_points() == 15
+    assert np.array_equal(shifted.get_waveform(),
+                          np.concatenate((np.zeros(5), pulse.sample())))
+    merged = shifted.merge(sequence)
+    assert np.allclose(merged.get_waveform(),
+                       shifted.get_waveform() +
+                       np.pad(pulse.sample(), (0, 5)))
+    assert pulse.truncate(4) == PulseRecord("hahn", 10, 1, amplitude=2,
+                                            frequency=1e8, length=4)
+    assert np.array_equal(pulse.truncate(4).sample(), pulse.sample()[:4])
+
+
+def test_builders_share_calibration():
+    calibration = make_calibration(6e9)
+    dc_offsets = calibration.get_optimization_results()[0]["dc_offsets"]
+    builder = IQPulseBuilder(calibration)
+    assert builder.get_calibration() is calibration
+
+    builder.override_calibration(dc_offsets=np.array([0, 0]))
+    assert calibration.get_optimization_results()[0]["dc_offsets"] is \
+        dc_offsets
+    i_seq = builder.add_zero_pulse(10).build().get_IQ_sequences()[0]
+    assert np.array_equal(i_seq.get_waveform(), np.zeros(10))
+
+    builder.add_sine_pulse(20).reset().add_zero_pulse(5)
+    other = IQPulseBuilder(calibration).add_zero_pulse(5)
+    assert builder.get_duration() == other.get_duration()
+    assert builder.copy().get_calibration() is builder.get_calibration()
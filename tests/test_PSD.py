@@ -0,0 +1,42 @@
+import numpy as np
+from scipy import signal
+
+from lib2.psd import PSDAccumulator
+
+
+def test_streaming_welch_matches_scipy():
+    rng = np.random.default_rng(0)
+    trace = rng.normal(size=4096)
+    frequencies, expected = signal.welch(trace, fs=1e3, window="hann",
+                                         nperseg=256, noverlap=128,
+                                         detrend=False)
+    psd = PSDAccumulator(256, 1e3, noverlap=128, window="hann",
+                         onesided=True, scaling="density")
+    psd.add(trace[:2048 + 128])  # segments shared by the two calls
+    psd.add(trace[2048:])
+    assert np.allclose(psd.frequencies, frequencies)
+    assert np.allclose(psd.get_mean(), expected)
+
+
+def test_band_and_foreground_background_pairs():
+    rng = np.random.default_rng(1)
+    n = 200
+    t = np.arange(64 * n)
+    noise = rng.normal(size=(2, 64 * n)) + 1j * rng.normal(size=(2, 64 * n))
+    noise[0] += 3 * np.exp(2j * np.pi * 0.25 * t)
+    psd = PSDAccumulator(64, 1., nfft=128, band=(-12 / 128, 40 / 128), n_channels=2,
+                         scaling=None)
+    psd.add(noise)
+
+    spectra = np.abs(np.fft.fft(noise.reshape(2, n, 64), 128, axis=-1)) ** 2
+    frequencies = np.fft.fftfreq(128)
+    order = np.argsort(frequencies)
+    band = order[(frequencies[order] >= -12 / 128) &
+                 (frequencies[order] <= 40 / 128)]
+    assert np.allclose(psd.frequencies, frequencies[band])
+    assert psd.n_segments == n
+    assert np.allclose(psd.get_mean(), spectra.mean(axis=1)[:, band])
+    assert np.allclose(psd.get_variance(),
+                       spectra.var(axis=1, ddof=1)[:, band])
+    ratio = psd.get_ratio()
+    assert ratio[np.argmin(np.abs(psd.frequencies - 0.25))] > 10
@@ -0,0 +1,72 @@
+import numpy as np
+
+from benchmarks.cases import make_iqawg
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.sim_keysightM3202A import SimulatedM3202A
+from lib2.IQPulseSequence import IQPulseBuilder
+from lib2.parametric_sequence import ParametricSequence
+from tests.fixtures import make_calibration
+
+PARAMETERS = {"awg_trigger_reaction_delay": 0, "readout_duration": 500,
+              "repetition_period": 5000, "modulating_window": "gaussian",
+              "excitation_amplitude": 1, "half_pi_pulse_duration": 20}
+
+
+def _pbs(calibration):
+    return {"q_pbs": [IQPulseBuilder(calibration)],
+            "ro_pbs": [IQPulseBuilder(calibration)]}
+
+
+def test_patched_waveforms_match_full_builds():
+    calibration = make_calibration(6e9)
+    build = IQPulseBuilder.build_dispersive_ramsey_sequences
+    ramsey = ParametricSequence(build, PARAMETERS, "ramsey_delay")
+    previous = previous_delay = None
+    for delay in (0, 40, 45, 300, 300):
+        seqs = ramsey.build(delay, **_pbs(calibration))
+        expected = build(dict(PARAMETERS, ramsey_delay=delay),
+                         **_pbs(calibration))
+        sequence_I = seqs["q_seqs"][0].get_IQ_sequences()[0]
+        waveform = sequence_I.get_waveform()
+        assert np.array_equal(waveform,
+                              expected["q_seqs"][0].get_I_waveform())
+        assert np.array_equal(seqs["ro_seqs"][0].get_Q_waveform(),
+                              expected["ro_seqs"][0].get_Q_waveform())
+        ranges = sequence_I.get_changed_ranges()
+        if previous is not None:
+            assert waveform is previous[0]
+            changed = np.zeros(len(waveform), dtype=bool)
+            for start, stop in ranges:
+                changed[start:stop] = True
+            assert np.array_equal(waveform[~changed], previous[1][~changed])
+            assert changed.sum() <= 2 * (delay + 40 + 10)
+            assert seqs["ro_seqs"][0].get_IQ_sequences()[0] \
+                .get_changed_ranges() == []
+        if delay == previous_delay:
+            assert ranges == []
+        previous, previous_delay = (waveform, waveform.copy()), delay
+
+
+def test_awg_skips_unchanged_channels():
+    lab = SimulatedLab()
+    awg = SimulatedM3202A("awg", lab=lab)
+    iqawg = make_iqawg(awg)
+    calibration = make_calibration(6e9)
+    rabi = ParametricSequence(IQPulseBuilder.build_dispersive_rabi_sequences,
+                              PARAMETERS, "excitation_duration")
+    instrument = awg._visainstrument
+    transfers = []
+    for duration in (20, 40, 40):
+        seqs = rabi.build(duration, **_pbs(calibration))
+        n_transfers = instrument.n_queries
+        iqawg.output_pulse_sequence(seqs["q_seqs"][0])
+        transfers.append(instrument.n_queries - n_transfers)
+        assert np.allclose(awg.waveforms[0],
+                           seqs["q_seqs"][0].get_I_waveform(), atol=1e-3)
+    assert transfers == [2, 2, 0]
+
+    # the channels are set up anew after a continuous wave
+    iqawg.output_continuous_IQ_waves(50e6, (0.1, 0.1), 0, (0, 0), 1)
+    n_transfers = instrument.n_queries
+    iqawg.output_pulse_sequence(seqs["q_seqs"][0])
+    assert instrument.n_queries - n_transfers == 2
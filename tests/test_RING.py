@@ -0,0 +1,96 @@
+import threading
+
+import numpy as np
+import pytest
+
+from lib2.psd import PSDAccumulator
+from lib2.trace_ring_buffer import SharedTraceRing, TraceWorkerPool, \
+    Reducer, WorkerError
+
+
+def _power(traces):
+    return tuple(np.abs(traces) ** 2)
+
+
+class _PowerSpectrum:
+    # like mollowTriplet.PowerSpectrumProcessor, returns the buffers of
+    # the accumulator that the next call overwrites
+    def __init__(self, psd):
+        self._psd = psd
+
+    def __call__(self, traces):
+        return tuple(self._psd.power(traces))
+
+
+class _Failing:
+    def __init__(self):
+        self._n_calls = 0
+
+    def __call__(self, traces):
+        self._n_calls += 1
+        if self._n_calls == 3:
+            raise ValueError("bad trace")
+        return _power(traces)
+
+
+def _run(traces, processor, in_process, n_workers=3, n_slots=4,
+         on_update=None):
+    ring = SharedTraceRing(n_slots, traces.shape[1:], np.complex128,
+                           in_process)
+    pool = TraceWorkerPool(ring, processor, n_workers, flush_every=7)
+    reducer = Reducer(pool.results, n_workers, on_update=on_update)
+
+    def produce():
+        for trace in traces:
+            slot = ring.acquire(timeout=10)
+            ring.get_slot(slot)[:] = trace
+            ring.publish(slot)
+        ring.finish(n_workers)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    reducer.join(30)
+    producer.join(30)
+    pool.join(10)
+    ring.unlink()
+    assert not producer.is_alive() and not reducer.is_alive()
+    return reducer
+
+
+def _traces(n_traces, trace_len=16):
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(n_traces, 2, trace_len)) + \
+        1j * rng.normal(size=(n_traces, 2, trace_len))
+
+
+@pytest.mark.parametrize("in_process", [False, True])
+def test_ring_pipeline_reduces_all_traces(in_process):
+    traces = _traces(50)
+    updates = []
+    reducer = _run(traces, _power, in_process,
+                   on_update=lambda n, sums: updates.append(n))
+
+    n_traces, (fg, bg) = reducer.get()
+    assert n_traces == len(traces)
+    assert updates[-1] == len(traces)
+    assert np.allclose(fg, np.sum(np.abs(traces[:, 0]) ** 2, axis=0))
+    assert np.allclose(bg, np.sum(np.abs(traces[:, 1]) ** 2, axis=0))
+
+
+@pytest.mark.parametrize("in_process", [False, True])
+def test_stateful_processor_is_not_shared(in_process):
+    traces = _traces(400, 64)
+    psd = PSDAccumulator(64, n_channels=2)
+    reducer = _run(traces, _PowerSpectrum(psd), in_process)
+
+    expected = np.sum([psd.power(trace).copy() for trace in traces], axis=0)
+    n_traces, sums = reducer.get()
+    assert n_traces == len(traces)
+    assert np.allclose(sums, expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("in_process", [False, True])
+def test_worker_error_is_raised(in_process):
+    reducer = _run(_traces(50), _Failing(), in_process)
+    with pytest.raises(WorkerError, match="bad trace"):
+        reducer.get()
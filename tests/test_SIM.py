@@ -0,0 +1,128 @@
+import datetime
+
+import numpy as np
+
+from drivers.simulated.lab_model import SimulatedLab
+from drivers.simulated.sim_agilent_EXA import SimulatedEXA
+from drivers.simulated.sim_keysightM3202A import SimulatedM3202A
+from drivers.simulated.sim_Spectrum_m4x import SimulatedSPCM
+from lib2.SingleToneSpectroscopy import SingleToneSpectroscopy
+
+
+def test_sts_with_simulated_devices():
+    lab = SimulatedLab.get_default()
+    sts = SingleToneSpectroscopy("test_sim_sts", "test",
+                                 vna=["sim_vna"], src=["sim_yok"])
+    assert sts._vna[0] is not None
+    assert sts._src[0] is not None
+
+    resonator = lab.get_resonator_frequency()
+    sts.set_fixed_parameters(vna=[{"bandwidth": 1e3, "power": -20,
+                                   "averages": 1, "nop": 201,
+                                   "freq_limits": (resonator - 10e6,
+                                                   resonator + 10e6)}])
+    currents = np.linspace(0, 0.5e-3, 3)
+    sts.sweep_current(currents)
+    sts._measurement_result.set_start_datetime(datetime.datetime.now())
+    sts.measure()
+
+    data = sts._measurement_result.get_data()["data"]
+    assert data.shape == (3, 201)
+    dips = np.argmin(np.abs(data), axis=1)
+    # resonator is pulled by the tunable qubit
+    assert len(set(dips)) > 1
+
+
+def test_sim_exa_sees_mixer_leakage():
+    lab = SimulatedLab(seed=0)
+    lab.set_tone("LO", 6e9, 10, True)
+    awg = SimulatedM3202A("awg", lab=lab)
+    exa = SimulatedEXA("exa", lab=lab)
+    exa.setup_list_sweep([6e9 - 50e6, 6e9, 6e9 + 50e6], [1e3])
+
+    awg.output_continuous_wave(50e6, 0.3, 0, 0, 1, channel=1)
+    awg.output_continuous_wave(50e6, 0.3, -np.pi / 2, 0, 1, channel=2)
+    lower, leakage, upper = exa.make_sweep_get_data()
+    assert upper > leakage and upper > lower
+
+    # offsets compensating the DC leakage suppress the carrier
+    dc = lab.mixer_dc_leakage
+    awg.output_continuous_wave(50e6, 0.3, 0, -dc.real, 1, channel=1)
+    awg.output_continuous_wave(50e6, 0.3, -np.pi / 2, -dc.imag, 1,
+                               channel=2)
+    assert exa.make_sweep_get_data()[1] < leakage - 20
+
+
+def test_sim_spcm_data_format():
+    dig = SimulatedSPCM(lab=SimulatedLab(seed=0))
+    dig.set_parameters({"channels": [0, 1], "ch_amplitude": 200,
+                        "dur_seg": 1000, "n_avg": 100, "n_seg": 2,
+                        "oversampling_factor": 4, "pretrigger": 32,
+                        "mode": "AVERAGING", "digitizer_delay": 0})
+    assert dig.get_segment_size() % 32 == 0
+    data = dig.measure()
+    assert data.shape == (2 * dig.get_segment_size() * 2,)
+    # samples are quantized to 1/128 of the channel amplitude
+    codes = data * 128 / 200
+    assert np.allclose(codes, np.round(codes))
+
+
+def test_profiling_with_simulated_devices():
+    sts = SingleToneSpectroscopy("test_sim_sts_profile", "test",
+                                 vna=["sim_vna"], src=["sim_yok"])
+    resonator = SimulatedLab.get_default().get_resonator_frequency()
+    sts.set_fixed_parameters(vna=[{"bandwidth": 1e3, "power": -20,
+                                   "averages": 1, "nop": 51,
+                                   "freq_limits": (resonator - 10e6,
+                                                   resonator + 10e6)}])
+    sts.sweep_current(np.linspace(0, 0.5e-3, 4))
+    assert sts.get_profile() is None
+
+    sts.enable_profiling()
+    sts._measurement_result.set_start_datetime(datetime.datetime.now())
+    sts.measure()
+
+    profile = sts.get_profile()
+    for phase in ["iteration", "iteration.setters", "iteration.recording",
+                  "iteration.set_data", "iteration.progress"]:
+        assert profile[phase]["count"] == 4
+    assert profile["visa.write"]["count"] > 0
+    assert profile["iteration"]["total"] >= \
+        profile["iteration.recording"]["total"]
+    context = sts._measurement_result.get_context()
+    assert context.get_profile() == profile
+    assert "profile" not in context.get_equipment()
+    # VISA resources are restored after the measurement
+    assert type(sts._vna[0]._visainstrument).__name__ != \
+        "ProfiledVisaResource"
+
+
+def test_sim_exa_list_sweep_in_one_transfer():
+    lab = SimulatedLab(seed=0)
+    lab.set_tone("LO", 6e9, 10, True)
+    exa = SimulatedEXA("exa", lab=lab)
+    frequencies = [6e9 - 50e6, 6e9, 6e9 + 50e6]
+    exa.setup_list_sweep(frequencies, [1e3] * 3)
+
+    n_queries = exa._visainstrument.n_queries
+    exa.start_list_sweep()
+    powers = exa.get_list_sweep_data()
+    assert len(powers) == 3
+    assert exa._visainstrument.n_queries == n_queries + 1
+    assert np.allclose(powers, exa.make_sweep_get_data(), atol=1)
+
+    exa.set_averages(4)
+    exa.set_average(True)
+    n_writes = exa._visainstrument.n_writes
+    exa.start_list_sweep()
+    exa.get_list_sweep_data()
+    assert exa._visainstrument.n_writes == n_writes + 4
+
+
+def test_fast_iq_calibrator():
+    from benchmarks.calibration import run_calibration_benchmark
+    results = {entry["name"]: entry for entry in run_calibration_benchmark()}
+    fast = results["FastIQCalibrator"]
+    assert fast["status"] == "ok"
+    assert min(fast["grades"].values()) > 4.5
+    assert fast["sa_reads"] < results["IQCalibrator"]["sa_reads"] / 4